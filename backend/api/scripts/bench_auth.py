@@ -0,0 +1,281 @@
+"""Бенчмарк аутентификации на /api/v1/stats: req/s для Basic Auth и Bearer токенов.
+
+Приложение запускается в процессе (httpx.ASGITransport) с эмуляцией БД
+и фиксированным ответом collector: измеряется только стоимость аутентификации.
+
+Запуск:
+    cd backend/api
+    uv run python -m scripts.bench_auth --requests 500 --concurrent 20
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Annotated, Any
+
+import httpx
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBasicCredentials
+
+# Shared models бота (в Docker - /app/shared)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "bot" / "src"))
+
+from src.app import app  # noqa: E402
+from src.middlewares.rate_limit import limiter  # noqa: E402
+from src.stats.collector import PeriodType, StatCollector  # noqa: E402
+from src.stats.mock_collector import MockStatCollector  # noqa: E402
+from src.utils.auth import (  # noqa: E402
+    ApiUser,
+    credentials_cache,
+    hash_password,
+    security,
+    token_signer,
+    verify_password,
+    verify_token_or_credentials,
+)
+
+logger = logging.getLogger(__name__)
+
+USERNAME = "bench"
+PASSWORD = "bench-password-123"
+
+
+class FakeResult:
+    """Результат запроса пользователя."""
+
+    def __init__(self, user: Any) -> None:
+        """
+        Args:
+            user: Возвращаемый пользователь
+        """
+        self.user = user
+
+    def scalar_one_or_none(self) -> Any:
+        """
+        Returns:
+            Пользователь
+        """
+        return self.user
+
+
+class FakeDatabase:
+    """Эмуляция БД auth с задержкой запроса."""
+
+    def __init__(self, user: Any, latency: float) -> None:
+        """
+        Args:
+            user: Пользователь API
+            latency: Задержка запроса в секундах
+        """
+        self.user = user
+        self.latency = latency
+        self.queries = 0
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["FakeDatabase"]:
+        """
+        Yields:
+            Сессия (сам объект с методом execute)
+        """
+        yield self
+
+    async def execute(self, _statement: Any) -> FakeResult:
+        """
+        Выполняет запрос пользователя.
+
+        Returns:
+            Результат с пользователем
+        """
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return FakeResult(self.user)
+
+
+class FixedCollector(StatCollector):
+    """Collector с заранее рассчитанным ответом."""
+
+    def __init__(self, response: Any) -> None:
+        """
+        Args:
+            response: Ответ get_stats
+        """
+        self.response = response
+
+    async def get_stats(self, _period: PeriodType) -> Any:
+        """
+        Returns:
+            Заранее рассчитанный ответ
+        """
+        return self.response
+
+
+async def blocking_verify_credentials(
+    request: Request,
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+) -> Any:
+    """
+    Прежняя проверка: запрос к БД и bcrypt в event loop на каждый запрос.
+
+    Args:
+        request: FastAPI Request объект
+        credentials: HTTP Basic Auth credentials
+
+    Returns:
+        ApiUser
+
+    Raises:
+        HTTPException: 401 если credentials невалидны
+    """
+    async with request.app.state.db.session() as session:
+        result = await session.execute(None)
+        user = result.scalar_one_or_none()
+        if not user or not verify_password(credentials.password, user.hashed_password):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        return user
+
+
+@dataclass
+class BenchResult:
+    """Результаты одного режима."""
+
+    name: str
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+    db_queries: int
+    errors: int
+
+
+async def run_mode(
+    name: str, db: FakeDatabase, total: int, concurrent: int, token: str | None = None
+) -> BenchResult:
+    """
+    Выполняет total запросов к /api/v1/stats с concurrent параллельными клиентами.
+
+    Args:
+        name: Название режима
+        db: Эмуляция БД
+        total: Общее количество запросов
+        concurrent: Количество параллельных клиентов
+        token: Access токен (None - Basic Auth)
+
+    Returns:
+        Результаты режима
+    """
+    db.queries = 0
+    credentials_cache.clear()
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    auth = None if token else (USERNAME, PASSWORD)
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", auth=auth, headers=headers
+    ) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get("/api/v1/stats", params={"period": "day"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != status.HTTP_200_OK:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrent)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return BenchResult(
+        name=name,
+        requests_per_second=total / elapsed,
+        p50_ms=statistics.median(latencies) * 1000,
+        p95_ms=latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        db_queries=db.queries,
+        errors=errors,
+    )
+
+
+async def run_benchmark(
+    total: int, concurrent: int, db_latency: float = 0.002
+) -> list[BenchResult]:
+    """
+    Сравнивает прежнюю проверку, bcrypt в пуле потоков, кеш credentials и токены.
+
+    Args:
+        total: Запросов на режим
+        concurrent: Параллельных клиентов
+        db_latency: Задержка запроса к БД в секундах
+
+    Returns:
+        Результаты по режимам
+    """
+    user = ApiUser(username=USERNAME, hashed_password=hash_password(PASSWORD), is_active=True)
+    db = FakeDatabase(user, db_latency)
+    collector = MockStatCollector()
+    app.state.db = db
+    app.state.collector = FixedCollector(await collector.get_stats("day"))
+    # Лимит 10/minute на endpoint не относится к измерению
+    limiter.enabled = False
+
+    results = []
+    cache_enabled = credentials_cache.enabled
+    try:
+        app.dependency_overrides[verify_token_or_credentials] = blocking_verify_credentials
+        results.append(await run_mode("blocking (old)", db, total, concurrent))
+        app.dependency_overrides.clear()
+
+        credentials_cache.enabled = False
+        results.append(await run_mode("threadpool", db, total, concurrent))
+
+        credentials_cache.enabled = True
+        results.append(await run_mode("threadpool + cache", db, total, concurrent))
+
+        token = token_signer.issue(USERNAME)
+        results.append(await run_mode("bearer token", db, total, concurrent, token=token))
+    finally:
+        app.dependency_overrides.clear()
+        credentials_cache.enabled = cache_enabled
+        limiter.enabled = True
+    return results
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк аутентификации на /api/v1/stats")
+    parser.add_argument("--requests", type=int, default=500, help="Запросов на режим")
+    parser.add_argument("--concurrent", type=int, default=20, help="Параллельных клиентов")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=2.0, help="Задержка запроса к БД, мс"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    logging.getLogger("src").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(run_benchmark(args.requests, args.concurrent, args.db_latency_ms / 1000))
+
+    logger.info(f"Requests per mode: {args.requests}, concurrent: {args.concurrent}")
+    logger.info(
+        f"{'mode':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'db queries':>12}{'errors':>8}"
+    )
+    for result in results:
+        logger.info(
+            f"{result.name:<22}{result.requests_per_second:>10,.1f}{result.p50_ms:>10.1f}"
+            f"{result.p95_ms:>10.1f}{result.db_queries:>12}{result.errors:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ from .database import Database
 from .middlewares.rate_limit import limiter
 from .routers import auth, stats
 from .stats.factory import create_stat_collector
+from .stats.real_collector import RealStatCollector
 
 # Настройка логирования
 logging.basicConfig(
@@ -51,6 +52,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     app.state.collector = collector
     app.state.config = config
 
+    # Фоновое обновление почасовых агрегатов и прогрев кеша для Real Collector
+    if isinstance(collector, RealStatCollector):
+        collector.rollups.start()
+        collector.warm_up()
+
     yield
 
     # Cleanup при остановке
@@ -60,6 +66,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await db.close()
     logger.info("Auth database connections closed")
 
+    if isinstance(collector, RealStatCollector):
+        await collector.rollups.stop()
+
     # Закрываем Database если используется Real Collector
     if hasattr(collector, "db"):
         await collector.db.close()
@@ -2,7 +2,7 @@
 
 import logging
 
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 logger = logging.getLogger(__name__)
@@ -35,6 +35,20 @@ class Config(BaseSettings):
     # Cache settings (для Real collector)
     CACHE_TTL: int = Field(default=60, description="Cache TTL in seconds")
     CACHE_MAXSIZE: int = Field(default=100, description="Cache max size")
+    CACHE_STALE_TTL: float = Field(
+        default=300.0, ge=0, description="Serve expired stats while refreshing, seconds"
+    )
+    CACHE_REFRESH_AHEAD: float = Field(
+        default=10.0, ge=0, description="Refresh stats in background before expiry, seconds"
+    )
+
+    # Почасовые агрегаты сообщений (для Real collector)
+    ROLLUP_INTERVAL: float = Field(
+        default=60.0, ge=0, description="Background rollup refresh interval in seconds (0 - off)"
+    )
+    ROLLUP_LAG: float = Field(
+        default=120.0, ge=0, description="Rollup refresh window overlap in seconds"
+    )
 
     # CORS
     CORS_ORIGINS: list[str] = Field(
@@ -55,10 +69,32 @@ class Config(BaseSettings):
         description="Admin token for user registration",
     )
 
+    # Кеш проверенных Basic Auth credentials (0 - проверка bcrypt на каждый запрос)
+    AUTH_CACHE_TTL: int = Field(
+        default=30, ge=0, description="Verified credentials cache TTL in seconds"
+    )
+    AUTH_CACHE_MAXSIZE: int = Field(
+        default=1000, ge=1, description="Verified credentials cache max size"
+    )
+
+    # Токены dashboard (/api/v1/auth/login, /api/v1/auth/refresh)
+    AUTH_TOKEN_SECRET: str = Field(
+        default="",
+        description=(
+            "HMAC key for access/refresh tokens (required for COLLECTOR_MODE=real, "
+            "empty in mock mode - random per process)"
+        ),
+    )
+    ACCESS_TOKEN_TTL: int = Field(default=900, ge=1, description="Access token TTL in seconds")
+    REFRESH_TOKEN_TTL: int = Field(default=86400, ge=1, description="Refresh token TTL in seconds")
+
     # Rate limiting
     STATS_API_RATE_LIMIT: str = Field(
         default="10/minute", description="Rate limit for stats endpoint"
     )
+    AUTH_LOGIN_RATE_LIMIT: str = Field(
+        default="10/minute", description="Rate limit for login endpoint (per client IP)"
+    )
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -81,6 +117,31 @@ class Config(BaseSettings):
             )
         return v
 
+    @model_validator(mode="after")
+    def validate_token_secret(self) -> "Config":
+        """
+        Проверяет ключ подписи токенов.
+
+        Случайный ключ процесса допустим только в mock режиме: токен, выданный
+        одним процессом (worker, реплика), не принимается другими, а перезапуск
+        завершает все сессии dashboard.
+
+        Raises:
+            ValueError: Если AUTH_TOKEN_SECRET не задан в real режиме
+        """
+        if self.AUTH_TOKEN_SECRET:
+            return self
+        if self.COLLECTOR_MODE == "real":
+            raise ValueError(
+                "AUTH_TOKEN_SECRET is required for COLLECTOR_MODE=real "
+                "(generate with: python -c 'import secrets; print(secrets.token_hex(32))')"
+            )
+        logger.warning(
+            "AUTH_TOKEN_SECRET is not set: tokens are signed with a random per-process key "
+            "and are rejected by other workers and after restart"
+        )
+        return self
+
     @property
     def database_url(self) -> str:
         """
@@ -3,7 +3,7 @@
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -64,6 +64,11 @@ class Message(Base):
     deleted_at: Mapped[datetime | None] = mapped_column(
         TIMESTAMP(timezone=True), nullable=True, index=True
     )  # soft delete
+    # Время записи строки по часам БД (created_at может быть задан приложением
+    # задним числом): по нему агрегатор статистики находит новые сообщения
+    inserted_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), index=True
+    )
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="messages")
@@ -104,3 +109,66 @@ class UserSettings(Base):
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="settings")
+
+
+class LLMUsage(Base):
+    """
+    Модель телеметрии запроса к LLM.
+
+    Хранит одну запись на запрос к LLM: назначение (ход диалога или
+    суммаризация), модель, токены, задержку, количество retry и флаг fallback.
+    Записывается ботом пакетами.
+    """
+
+    __tablename__ = "llm_usage"
+
+    id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
+    user_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    model: Mapped[str] = mapped_column(String(100))
+    prompt_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    cached_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer)
+    retries: Mapped[int] = mapped_column(Integer, default=0)
+    is_fallback: Mapped[bool] = mapped_column(Boolean, default=False)
+    success: Mapped[bool] = mapped_column(Boolean, default=True)
+    purpose: Mapped[str] = mapped_column(String(20), default="turn", server_default="turn")
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), index=True
+    )
+
+
+class MessageRollup(Base):
+    """
+    Почасовой агрегат сообщений пользователя для статистики dashboard.
+
+    Одна запись на (час UTC, пользователь) с активными (не удалёнными)
+    сообщениями. Поддерживается инкрементально агрегатором Stats API по
+    watermark (RollupWatermark): запросы статистики читают агрегаты вместо
+    messages, их стоимость не зависит от количества сообщений.
+    """
+
+    __tablename__ = "message_rollups_hourly"
+
+    bucket: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    message_count: Mapped[int] = mapped_column(Integer)
+    chars: Mapped[int] = mapped_column(BigInteger)
+    first_message_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    last_message_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+
+
+class RollupWatermark(Base):
+    """
+    Граница обработанных изменений для инкрементальных агрегатов.
+
+    watermark - время БД, до которого изменения messages (inserted_at,
+    deleted_at) учтены в агрегатах. NULL - агрегаты ещё не построены.
+    """
+
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    watermark: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
@@ -4,6 +4,7 @@ import logging
 import sys
 
 from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.security import HTTPBasicCredentials
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 
@@ -12,7 +13,9 @@ sys.path.insert(0, "/app/shared")
 from models import ApiUser  # type: ignore[import-not-found]  # noqa: E402
 
 from ..config import config
-from ..utils.auth import hash_password
+from ..middlewares.rate_limit import limiter
+from ..utils.auth import hash_password_async, token_signer, verify_credentials
+from ..utils.tokens import ACCESS_TOKEN, REFRESH_TOKEN, TokenError
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,45 @@ class RegisterResponse(BaseModel):
     username: str
 
 
+class LoginRequest(BaseModel):
+    """Запрос на получение токенов."""
+
+    username: str = Field(..., min_length=1, max_length=50, description="Username")
+    password: str = Field(..., min_length=1, max_length=72, description="Password")
+
+
+class RefreshRequest(BaseModel):
+    """Запрос на обновление токенов."""
+
+    refresh_token: str = Field(..., min_length=1, description="Refresh token")
+
+
+class TokenResponse(BaseModel):
+    """Пара токенов для dashboard."""
+
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int = Field(..., description="Access token TTL in seconds")
+
+
+def _issue_tokens(username: str) -> TokenResponse:
+    """
+    Выпускает пару access/refresh токенов.
+
+    Args:
+        username: Имя пользователя API
+
+    Returns:
+        TokenResponse с токенами
+    """
+    return TokenResponse(
+        access_token=token_signer.issue(username, ACCESS_TOKEN),
+        refresh_token=token_signer.issue(username, REFRESH_TOKEN),
+        expires_in=token_signer.access_ttl,
+    )
+
+
 @router.post(
     "/register",
     response_model=RegisterResponse,
@@ -54,7 +96,7 @@ async def register_user(request_data: RegisterRequest, request: Request) -> Regi
     Регистрирует нового пользователя для Stats API.
 
     Требует валидный admin token для создания аккаунта.
-    Пароль хешируется с использованием bcrypt.
+    Пароль хешируется с использованием bcrypt в пуле потоков.
 
     Args:
         request_data: Данные регистрации (username, password, admin_token)
@@ -91,7 +133,7 @@ async def register_user(request_data: RegisterRequest, request: Request) -> Regi
                 )
 
             # Create user
-            hashed_password = hash_password(request_data.password)
+            hashed_password = await hash_password_async(request_data.password)
             new_user = ApiUser(
                 username=request_data.username,
                 hashed_password=hashed_password,
@@ -113,3 +155,92 @@ async def register_user(request_data: RegisterRequest, request: Request) -> Regi
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
         ) from e
+
+
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    summary="Получение токенов доступа",
+    description=(
+        "Проверяет username и password и выдаёт короткоживущий access токен "
+        "(Authorization: Bearer) и refresh токен."
+    ),
+    responses={
+        200: {"description": "Tokens issued"},
+        401: {"description": "Invalid credentials"},
+        429: {"description": "Rate limit exceeded"},
+    },
+)
+@limiter.limit(config.AUTH_LOGIN_RATE_LIMIT)
+async def login(request_data: LoginRequest, request: Request) -> TokenResponse:
+    """
+    Выдаёт токены для dashboard.
+
+    Пароль проверяется один раз при входе: последующие запросы с access
+    токеном проверяются по подписи без bcrypt и запросов к БД. Попытки входа
+    ограничены по IP (подбор пароля, нагрузка bcrypt на пул потоков).
+
+    Args:
+        request_data: Username и password
+        request: FastAPI Request объект
+
+    Returns:
+        TokenResponse с access и refresh токенами
+
+    Raises:
+        HTTPException: 401 при невалидных credentials или неактивном пользователе
+    """
+    credentials = HTTPBasicCredentials(
+        username=request_data.username, password=request_data.password
+    )
+    user = await verify_credentials(request, credentials)
+    logger.info(f"Issued tokens for API user: {user.username}")
+    return _issue_tokens(user.username)
+
+
+@router.post(
+    "/refresh",
+    response_model=TokenResponse,
+    summary="Обновление токенов доступа",
+    description="Выдаёт новую пару токенов по действующему refresh токену.",
+    responses={
+        200: {"description": "Tokens issued"},
+        401: {"description": "Invalid or expired refresh token"},
+    },
+)
+async def refresh(request_data: RefreshRequest, request: Request) -> TokenResponse:
+    """
+    Выдаёт новую пару токенов по refresh токену.
+
+    Проверяет, что пользователь существует и активен: деактивация
+    пользователя вступает в силу не позже истечения access токена.
+
+    Args:
+        request_data: Refresh токен
+        request: FastAPI Request объект
+
+    Returns:
+        TokenResponse с новыми токенами
+
+    Raises:
+        HTTPException: 401 при невалидном токене или неактивном пользователе
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+    )
+    try:
+        claims = token_signer.verify(request_data.refresh_token, REFRESH_TOKEN)
+    except TokenError as e:
+        raise invalid_token from e
+
+    async with request.app.state.db.session() as session:
+        result = await session.execute(select(ApiUser).where(ApiUser.username == claims.username))
+        user = result.scalar_one_or_none()
+
+    if not user or not user.is_active:
+        logger.warning(f"Refresh token rejected for inactive user: {claims.username}")
+        raise invalid_token
+
+    return _issue_tokens(user.username)
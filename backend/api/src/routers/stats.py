@@ -3,11 +3,14 @@
 import logging
 from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from ..middlewares.rate_limit import limiter
-from ..stats.models import StatsResponse
-from ..utils.auth import verify_credentials
+from ..stats.encoding import encode_stats
+from ..stats.models import StatsCacheMetrics, StatsResponse
+from ..stats.real_collector import RealStatCollector
+from ..utils.auth import verify_token_or_credentials
+from ..utils.http_cache import cache_headers, conditional_metrics, is_not_modified
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +21,12 @@ router = APIRouter(prefix="/api/v1", tags=["stats"])
     "/stats",
     response_model=StatsResponse,
     summary="Получить статистику диалогов",
-    description="Возвращает агрегированную статистику диалогов за указанный период (day/week/month)",
-    dependencies=[Depends(verify_credentials)],
+    description=(
+        "Возвращает агрегированную статистику диалогов за указанный период (day/week/month). "
+        "Авторизация: Bearer токен из /api/v1/auth/login или Basic Auth. "
+        "Поддерживает условные запросы: If-None-Match (ETag) и If-Modified-Since"
+    ),
+    dependencies=[Depends(verify_token_or_credentials)],
     responses={
         200: {
             "description": "Успешный ответ",
@@ -58,7 +65,8 @@ router = APIRouter(prefix="/api/v1", tags=["stats"])
                 }
             },
         },
-        401: {"description": "Неправильные credentials"},
+        304: {"description": "Статистика не изменилась с версии клиента (ETag)"},
+        401: {"description": "Неправильные credentials или невалидный токен"},
         422: {"description": "Невалидный параметр period"},
         429: {"description": "Rate limit exceeded"},
         500: {"description": "Внутренняя ошибка сервера"},
@@ -68,18 +76,24 @@ router = APIRouter(prefix="/api/v1", tags=["stats"])
 async def get_stats(
     period: Literal["day", "week", "month"],
     request: Request,
-) -> StatsResponse:
+) -> Response:
     """
     Получить статистику за указанный период.
 
     Автоматически использует Mock или Real Collector на основе конфигурации.
+    Ответ содержит ETag по содержимому статистики: если клиент прислал
+    тот же ETag в If-None-Match, возвращается 304 без тела.
+
+    Тело ответа - JSON, закодированный при загрузке статистики в кеш:
+    запрос не валидирует и не сериализует StatsResponse (response_model
+    используется только для OpenAPI).
 
     Args:
         period: Период для статистики ('day', 'week', 'month')
         request: FastAPI Request объект для доступа к app.state
 
     Returns:
-        StatsResponse с полной статистикой
+        JSON StatsResponse с полной статистикой или 304 Not Modified
 
     Raises:
         HTTPException: При ошибке получения статистики
@@ -88,12 +102,57 @@ async def get_stats(
 
     try:
         logger.info(f"Fetching stats for period={period}")
-        stats: StatsResponse = await collector.get_stats(period)
+        entry = await collector.get_stats_entry(period)
+        headers = cache_headers(entry)
+
+        not_modified = is_not_modified(request, entry)
+        conditional_metrics.record(not_modified)
+        if not_modified:
+            logger.info(f"Stats not modified for period={period} (ETag {entry.etag})")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        # Кеш без encoder хранит только значение: кодируем на запросе
+        body = entry.body or encode_stats(entry.value)
         logger.info(f"Successfully fetched stats for period={period}")
-        return stats
+        return Response(content=body, media_type="application/json", headers=headers)
     except ValueError as e:
         logger.error(f"Invalid period: {e}")
         raise HTTPException(status_code=422, detail=str(e)) from e
     except Exception as e:
         logger.error(f"Error fetching stats: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+@router.get(
+    "/stats/metrics",
+    response_model=StatsCacheMetrics,
+    summary="Метрики кеширования статистики",
+    description="Доля ответов 304 Not Modified и счётчики кеша статистики collector",
+    dependencies=[Depends(verify_token_or_credentials)],
+)
+async def get_stats_metrics(request: Request) -> StatsCacheMetrics:
+    """
+    Получить метрики кеширования статистики.
+
+    Args:
+        request: FastAPI Request объект для доступа к app.state
+
+    Returns:
+        StatsCacheMetrics (счётчики кеша - только для Real Collector)
+    """
+    metrics = StatsCacheMetrics(
+        requests=conditional_metrics.requests,
+        not_modified=conditional_metrics.not_modified,
+        not_modified_ratio=conditional_metrics.not_modified_ratio,
+    )
+
+    collector = request.app.state.collector
+    if isinstance(collector, RealStatCollector):
+        cache = collector.cache
+        metrics.cache_hits = cache.hits
+        metrics.cache_stale_hits = cache.stale_hits
+        metrics.cache_misses = cache.misses
+        metrics.cache_coalesced = cache.coalesced
+        metrics.cache_loads = cache.loads
+        metrics.cache_errors = cache.errors
+    return metrics
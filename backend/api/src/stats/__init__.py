@@ -1,7 +1,15 @@
 """Модуль для сбора и агрегации статистики диалогов."""
 
 from .collector import StatCollector
-from .models import ActivityPoint, RecentDialog, StatsResponse, Summary, TopUser
+from .models import (
+    ActivityPoint,
+    LLMUsageStats,
+    ModelUsage,
+    RecentDialog,
+    StatsResponse,
+    Summary,
+    TopUser,
+)
 
 __all__ = [
     "StatCollector",
@@ -9,5 +17,7 @@ __all__ = [
     "ActivityPoint",
     "RecentDialog",
     "TopUser",
+    "ModelUsage",
+    "LLMUsageStats",
     "StatsResponse",
 ]
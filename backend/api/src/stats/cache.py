@@ -0,0 +1,282 @@
+"""Кеш статистики с single-flight загрузкой и stale-while-revalidate."""
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import partial
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+def content_etag(body: bytes) -> str:
+    """
+    HTTP ETag по содержимому ответа.
+
+    Одинаковое тело даёт одинаковый ETag в любом процессе и после любой загрузки.
+
+    Args:
+        body: Закодированное тело ответа
+
+    Returns:
+        ETag в кавычках (16 hex-символов SHA-256)
+    """
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+@dataclass
+class CacheEntry(Generic[V]):
+    """
+    Значение кеша.
+
+    Attributes:
+        value: Закешированное значение
+        version: Номер загрузки (растёт с каждой загрузкой любого ключа)
+        stored_at: Время загрузки по монотонным часам кеша
+        etag: HTTP ETag значения (по содержимому body, без encoder - по версии)
+        body: Значение, закодированное для ответа (пусто без encoder)
+        updated_at: Время изменения значения (UTC)
+    """
+
+    value: V
+    version: int
+    stored_at: float
+    etag: str
+    body: bytes = b""
+    updated_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class StatsCache(Generic[V]):
+    """
+    Кеш ответов статистики по ключу.
+
+    - Single-flight: одновременные промахи по ключу ждут одну загрузку,
+      а не выполняют запросы к БД параллельно.
+    - Stale-while-revalidate: значение старше ttl, но не старше ttl + stale_ttl,
+      возвращается сразу, а загрузка нового идёт в фоне (одна на ключ).
+    - Refresh-ahead: за refresh_ahead секунд до истечения ttl запрос к ключу
+      запускает фоновую загрузку, и значение обновляется до истечения.
+
+    Ошибка фоновой загрузки не удаляет значение: до истечения stale_ttl
+    возвращается прежнее.
+
+    С encoder ETag вычисляется по телу ответа: загрузка тех же данных
+    (в том числе другим процессом) сохраняет ETag и updated_at.
+
+    Attributes:
+        hits: Запросы, обслуженные свежим значением
+        stale_hits: Запросы, обслуженные устаревшим значением
+        misses: Запросы, ожидавшие загрузку
+        coalesced: Промахи, присоединившиеся к уже идущей загрузке
+        loads: Выполненные загрузки
+        errors: Загрузки, завершившиеся ошибкой
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        maxsize: int = 100,
+        stale_ttl: float = 300.0,
+        refresh_ahead: float = 0.0,
+        encoder: Callable[[V], bytes] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Инициализация кеша.
+
+        Args:
+            ttl: Время свежести значения в секундах (по умолчанию 60.0)
+            maxsize: Максимальное количество ключей (по умолчанию 100)
+            stale_ttl: Сколько секунд после ttl возвращать устаревшее значение
+                во время фоновой загрузки (по умолчанию 300.0, 0 - отключено)
+            refresh_ahead: За сколько секунд до истечения ttl начинать фоновую
+                загрузку (по умолчанию 0.0 - отключено)
+            encoder: Кодирование значения в тело ответа при загрузке
+                (None - без тела)
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.encoder = encoder
+        self.clock = clock
+
+        self._entries: OrderedDict[str, CacheEntry[V]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[CacheEntry[V]]] = {}
+        self._version = 0
+        # Часть ETag без encoder: версии начинаются с 1 после перезапуска
+        self._instance = secrets.token_hex(4)
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        """Количество ключей в кеше."""
+        return len(self._entries)
+
+    def peek(self, key: str) -> CacheEntry[V] | None:
+        """
+        Значение ключа без учёта срока и без загрузки.
+
+        Args:
+            key: Ключ кеша
+
+        Returns:
+            CacheEntry или None
+        """
+        return self._entries.get(key)
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[V]]) -> CacheEntry[V]:
+        """
+        Возвращает значение ключа, при необходимости загружая его.
+
+        Args:
+            key: Ключ кеша
+            loader: Загрузка значения (вызывается не более одного раза одновременно)
+
+        Returns:
+            CacheEntry со значением
+
+        Raises:
+            Exception: Ошибка loader, если возвращать нечего
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self.clock() - entry.stored_at
+            if age < self.ttl:
+                self.hits += 1
+                if age >= self.ttl - self.refresh_ahead:
+                    self.refresh_in_background(key, loader)
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.refresh_in_background(key, loader)
+                return entry
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader)
+        else:
+            self.coalesced += 1
+        # shield: отмена одного запроса не отменяет загрузку для остальных
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: str | None = None) -> None:
+        """
+        Удаляет значение ключа (None - все значения).
+
+        Args:
+            key: Ключ кеша
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def refresh_in_background(self, key: str, loader: Callable[[], Awaitable[V]]) -> None:
+        """
+        Запускает фоновую загрузку, если по ключу нет текущей.
+
+        Используется и для прогрева кеша при старте.
+
+        Args:
+            key: Ключ кеша
+            loader: Загрузка значения
+        """
+        if key in self._inflight:
+            return
+        self._start_load(key, loader, background=True)
+
+    def _start_load(
+        self, key: str, loader: Callable[[], Awaitable[V]], background: bool = False
+    ) -> asyncio.Task[CacheEntry[V]]:
+        """
+        Запускает загрузку ключа и регистрирует её как текущую.
+
+        Args:
+            key: Ключ кеша
+            loader: Загрузка значения
+            background: Загрузка без ожидающих запросов (ошибка только логируется)
+
+        Returns:
+            Task загрузки
+        """
+        task = asyncio.create_task(self._load(key, loader))
+        task.add_done_callback(partial(self._on_load_done, background=background))
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[V]]) -> CacheEntry[V]:
+        """
+        Загружает значение и сохраняет его в кеш.
+
+        Args:
+            key: Ключ кеша
+            loader: Загрузка значения
+
+        Returns:
+            Новый CacheEntry
+        """
+        self.loads += 1
+        try:
+            value = await loader()
+            # Кодирование один раз на загрузку (в фоновой загрузке - вне запроса)
+            body = self.encoder(value) if self.encoder is not None else b""
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self._version += 1
+        if self.encoder is not None:
+            etag = content_etag(body)
+        else:
+            etag = f'"{self._instance}-{self._version}"'
+        entry = CacheEntry(
+            value=value,
+            version=self._version,
+            stored_at=self.clock(),
+            etag=etag,
+            body=body,
+        )
+        # Те же данные: время изменения прежнее (Last-Modified согласован с ETag)
+        previous = self._entries.get(key)
+        if previous is not None and previous.etag == etag:
+            entry.updated_at = previous.updated_at
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _on_load_done(task: asyncio.Task[CacheEntry[V]], background: bool) -> None:
+        """
+        Забирает ошибку загрузки (все ожидающие запросы могли быть отменены).
+
+        Ошибка фоновой загрузки логируется: значение в кеше остаётся прежним.
+
+        Args:
+            task: Завершённая загрузка
+            background: Загрузка без ожидающих запросов
+        """
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and background:
+            logger.warning(f"Background stats cache refresh failed, serving stale value: {error}")
@@ -3,6 +3,8 @@
 from abc import ABC, abstractmethod
 from typing import Literal
 
+from .cache import CacheEntry, content_etag
+from .encoding import encode_stats
 from .models import StatsResponse
 
 PeriodType = Literal["day", "week", "month"]
@@ -36,3 +38,24 @@ class StatCollector(ABC):
             Exception: При ошибке получения данных
         """
         pass
+
+    async def get_stats_entry(self, period: PeriodType) -> CacheEntry[StatsResponse]:
+        """
+        Получить статистику с ETag и временем изменения для условных HTTP запросов.
+
+        Реализация по умолчанию (без кеша) кодирует ответ и вычисляет ETag
+        по его содержимому.
+
+        Args:
+            period: Период для статистики ('day', 'week', 'month')
+
+        Returns:
+            CacheEntry со статистикой
+
+        Raises:
+            ValueError: Если period невалиден
+            Exception: При ошибке получения данных
+        """
+        stats = await self.get_stats(period)
+        body = encode_stats(stats)
+        return CacheEntry(value=stats, version=0, stored_at=0.0, etag=content_etag(body), body=body)
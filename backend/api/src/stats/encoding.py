@@ -0,0 +1,24 @@
+"""Сериализация ответа статистики в JSON (orjson)."""
+
+import orjson
+
+from .models import StatsResponse
+
+# Datetime в UTC как "...Z" (тот же формат, что у FastAPI/pydantic)
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def encode_stats(stats: StatsResponse) -> bytes:
+    """
+    Кодирует статистику в тело JSON ответа.
+
+    Вызывается один раз на загрузку статистики в кеш: запрос к /api/v1/stats
+    отдаёт готовые байты без валидации и сериализации FastAPI.
+
+    Args:
+        stats: Статистика
+
+    Returns:
+        JSON в UTF-8
+    """
+    return orjson.dumps(stats.model_dump(), option=_OPTIONS)
@@ -8,6 +8,7 @@ from src.database import Database
 from .collector import StatCollector
 from .mock_collector import MockStatCollector
 from .real_collector import RealStatCollector
+from .rollups import RollupAggregator
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +39,18 @@ def create_stat_collector(config: Config) -> StatCollector:
             pool_size=config.DB_POOL_SIZE,
             max_overflow=config.DB_MAX_OVERFLOW,
         )
+        rollups = RollupAggregator(
+            database=database,
+            lag=config.ROLLUP_LAG,
+            interval=config.ROLLUP_INTERVAL,
+        )
         return RealStatCollector(
             database=database,
             cache_ttl=config.CACHE_TTL,
             cache_maxsize=config.CACHE_MAXSIZE,
+            rollups=rollups,
+            cache_stale_ttl=config.CACHE_STALE_TTL,
+            cache_refresh_ahead=config.CACHE_REFRESH_AHEAD,
         )
 
     raise ValueError(
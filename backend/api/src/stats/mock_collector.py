@@ -5,7 +5,15 @@ import random
 from datetime import UTC, datetime, timedelta
 
 from .collector import PeriodType, StatCollector
-from .models import ActivityPoint, RecentDialog, StatsResponse, Summary, TopUser
+from .models import (
+    ActivityPoint,
+    LLMUsageStats,
+    ModelUsage,
+    RecentDialog,
+    StatsResponse,
+    Summary,
+    TopUser,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -54,12 +62,14 @@ class MockStatCollector(StatCollector):
         activity_timeline = self._generate_activity_timeline(period)
         recent_dialogs = self._generate_recent_dialogs()
         top_users = self._generate_top_users()
+        llm_usage = self._generate_llm_usage(summary)
 
         return StatsResponse(
             summary=summary,
             activity_timeline=activity_timeline,
             recent_dialogs=recent_dialogs,
             top_users=top_users,
+            llm_usage=llm_usage,
         )
 
     def _generate_summary(self, period: PeriodType) -> Summary:
@@ -184,3 +194,41 @@ class MockStatCollector(StatCollector):
             )
 
         return users
+
+    def _generate_llm_usage(self, summary: Summary) -> LLMUsageStats:
+        """
+        Генерирует статистику запросов к LLM.
+
+        Количество запросов ~ половина сообщений (один ответ ассистента на ход),
+        большая часть запросов обслуживается основной моделью.
+        """
+        total_requests = summary.total_messages // 2
+        fallback_rate = self._random.uniform(0.01, 0.08)
+        fallback_requests = int(total_requests * fallback_rate)
+
+        by_model: list[ModelUsage] = []
+        for model, requests in (
+            ("openai/gpt-4o-mini", total_requests - fallback_requests),
+            ("meta-llama/llama-3.1-8b-instruct:free", fallback_requests),
+        ):
+            prompt_tokens = requests * self._random.randint(600, 1200)
+            by_model.append(
+                ModelUsage(
+                    model=model,
+                    requests=requests,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=requests * self._random.randint(150, 400),
+                    cached_tokens=int(prompt_tokens * self._random.uniform(0.2, 0.5)),
+                )
+            )
+
+        latency_p50 = self._random.randint(1200, 2500)
+        return LLMUsageStats(
+            total_requests=total_requests,
+            latency_p50_ms=latency_p50,
+            latency_p95_ms=int(latency_p50 * self._random.uniform(2.0, 3.0)),
+            latency_p99_ms=int(latency_p50 * self._random.uniform(3.5, 5.0)),
+            fallback_rate=fallback_requests / total_requests if total_requests else 0.0,
+            error_rate=self._random.uniform(0.0, 0.02),
+            by_model=by_model,
+        )
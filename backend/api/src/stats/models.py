@@ -157,6 +157,70 @@ class TopUser(BaseModel):
     )
 
 
+class ModelUsage(BaseModel):
+    """
+    Расход токенов по модели LLM.
+
+    Attributes:
+        model: Идентификатор модели
+        requests: Количество запросов (ходы диалога и фоновая суммаризация)
+        prompt_tokens: Сумма токенов промпта
+        completion_tokens: Сумма токенов ответа
+        cached_tokens: Сумма токенов промпта, прочитанных из кеша провайдера
+    """
+
+    model: str = Field(
+        ..., description="Модель LLM", json_schema_extra={"example": "openai/gpt-4o-mini"}
+    )
+    requests: int = Field(
+        ..., ge=0, description="Количество запросов", json_schema_extra={"example": 1250}
+    )
+    prompt_tokens: int = Field(
+        ..., ge=0, description="Токены промпта", json_schema_extra={"example": 850000}
+    )
+    completion_tokens: int = Field(
+        ..., ge=0, description="Токены ответа", json_schema_extra={"example": 240000}
+    )
+    cached_tokens: int = Field(
+        ..., ge=0, description="Кешированные токены промпта", json_schema_extra={"example": 310000}
+    )
+
+
+class LLMUsageStats(BaseModel):
+    """
+    Статистика запросов к LLM за период.
+
+    Attributes:
+        total_requests: Количество ходов диалога с запросом к LLM
+        latency_p50_ms: Медиана задержки (мс)
+        latency_p95_ms: 95-й перцентиль задержки (мс)
+        latency_p99_ms: 99-й перцентиль задержки (мс)
+        fallback_rate: Доля ходов, обслуженных fallback моделью
+        error_rate: Доля неуспешных ходов
+        by_model: Расход токенов по моделям
+    """
+
+    total_requests: int = Field(
+        ..., ge=0, description="Количество запросов к LLM", json_schema_extra={"example": 1400}
+    )
+    latency_p50_ms: int = Field(
+        ..., ge=0, description="Медиана задержки (мс)", json_schema_extra={"example": 1800}
+    )
+    latency_p95_ms: int = Field(
+        ..., ge=0, description="95-й перцентиль задержки (мс)", json_schema_extra={"example": 5200}
+    )
+    latency_p99_ms: int = Field(
+        ..., ge=0, description="99-й перцентиль задержки (мс)", json_schema_extra={"example": 9100}
+    )
+    fallback_rate: float = Field(
+        ..., ge=0, le=1, description="Доля fallback запросов", json_schema_extra={"example": 0.04}
+    )
+    error_rate: float = Field(
+        ..., ge=0, le=1, description="Доля неуспешных запросов", json_schema_extra={"example": 0.01}
+    )
+    by_model: list[ModelUsage] = Field(..., description="Расход токенов по моделям", min_length=0)
+
+
 class StatsResponse(BaseModel):
     """
     Корневая модель ответа API со статистикой.
@@ -166,6 +230,7 @@ class StatsResponse(BaseModel):
         activity_timeline: График активности по времени
         recent_dialogs: Список недавних диалогов
         top_users: Топ пользователи по активности
+        llm_usage: Статистика запросов к LLM (задержки, токены, fallback)
     """
 
     summary: Summary = Field(..., description="Общая статистика")
@@ -174,6 +239,7 @@ class StatsResponse(BaseModel):
     )
     recent_dialogs: list[RecentDialog] = Field(..., description="Недавние диалоги", min_length=0)
     top_users: list[TopUser] = Field(..., description="Топ пользователи", min_length=0)
+    llm_usage: LLMUsageStats | None = Field(None, description="Статистика запросов к LLM")
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -209,3 +275,32 @@ class StatsResponse(BaseModel):
             }
         }
     )
+
+
+class StatsCacheMetrics(BaseModel):
+    """
+    Метрики кеширования статистики.
+
+    Attributes:
+        requests: Ответы /api/v1/stats (200 и 304)
+        not_modified: Ответы 304 Not Modified
+        not_modified_ratio: Доля ответов 304
+        cache_hits: Запросы, обслуженные свежей статистикой из кеша
+        cache_stale_hits: Запросы, обслуженные устаревшей статистикой во время обновления
+        cache_misses: Запросы, ожидавшие загрузку из БД
+        cache_coalesced: Промахи, присоединившиеся к уже идущей загрузке
+        cache_loads: Загрузки статистики из БД
+        cache_errors: Загрузки, завершившиеся ошибкой
+    """
+
+    requests: int = Field(..., ge=0, description="Ответы статистики (200 и 304)")
+    not_modified: int = Field(..., ge=0, description="Ответы 304 Not Modified")
+    not_modified_ratio: float = Field(..., ge=0, le=1, description="Доля ответов 304")
+    cache_hits: int = Field(default=0, ge=0, description="Свежие попадания в кеш")
+    cache_stale_hits: int = Field(default=0, ge=0, description="Устаревшие попадания в кеш")
+    cache_misses: int = Field(default=0, ge=0, description="Промахи кеша")
+    cache_coalesced: int = Field(
+        default=0, ge=0, description="Промахи, объединённые с идущей загрузкой"
+    )
+    cache_loads: int = Field(default=0, ge=0, description="Загрузки из БД")
+    cache_errors: int = Field(default=0, ge=0, description="Ошибки загрузки")
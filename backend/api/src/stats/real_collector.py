@@ -1,10 +1,13 @@
 """Real реализация сборщика статистики с подключением к PostgreSQL."""
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
 from datetime import UTC, datetime, timedelta
+from functools import partial
+from typing import Any, TypeVar, get_args
 
-from cachetools import TTLCache
-from sqlalchemy import Integer, func, select
+from sqlalchemy import Integer, SQLColumnExpression, case, func, select
 from sqlalchemy.exc import DBAPIError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 from tenacity import (
@@ -15,23 +18,49 @@ from tenacity import (
 )
 
 from src.database import Database
-from src.models import Message, User
+from src.models import LLMUsage, MessageRollup, User
 
+from .cache import CacheEntry, StatsCache
 from .collector import PeriodType, StatCollector
-from .models import ActivityPoint, RecentDialog, StatsResponse, Summary, TopUser
+from .encoding import encode_stats
+from .models import (
+    ActivityPoint,
+    LLMUsageStats,
+    ModelUsage,
+    RecentDialog,
+    StatsResponse,
+    Summary,
+    TopUser,
+)
+from .rollups import RollupAggregator
 
 logger = logging.getLogger(__name__)
 
+# llm_usage.purpose запросов, отвечающих пользователю (ходов диалога)
+PURPOSE_TURN = "turn"
+
+T = TypeVar("T")
+
 
 class RealStatCollector(StatCollector):
     """
     Real реализация сборщика статистики из PostgreSQL.
 
-    Получает данные из таблиц бота: users, messages, user_settings.
-    Использует агрегированные SQL запросы для производительности.
+    Статистика сообщений читается из почасовых агрегатов message_rollups_hourly
+    (поддерживаются RollupAggregator): стоимость запросов пропорциональна
+    количеству часов периода и активных в них пользователей, а не количеству
+    сообщений. Пользователи и LLM статистика читаются из users и llm_usage.
     """
 
-    def __init__(self, database: Database, cache_ttl: int = 60, cache_maxsize: int = 100) -> None:
+    def __init__(
+        self,
+        database: Database,
+        cache_ttl: int = 60,
+        cache_maxsize: int = 100,
+        rollups: RollupAggregator | None = None,
+        cache_stale_ttl: float = 300.0,
+        cache_refresh_ahead: float = 0.0,
+    ) -> None:
         """
         Инициализация Real collector с кешированием.
 
@@ -39,20 +68,34 @@ class RealStatCollector(StatCollector):
             database: Database объект для работы с PostgreSQL
             cache_ttl: Время жизни кеша в секундах (default: 60)
             cache_maxsize: Максимальный размер кеша (default: 100)
+            rollups: Агрегатор почасовых агрегатов (None - агрегатор без фонового обновления)
+            cache_stale_ttl: Сколько секунд после TTL отдавать устаревшую статистику,
+                пока в фоне загружается новая (default: 300.0)
+            cache_refresh_ahead: За сколько секунд до истечения TTL обновлять
+                статистику в фоне (default: 0.0 - отключено)
         """
         self.db = database
-        self.cache: TTLCache[str, StatsResponse] = TTLCache(maxsize=cache_maxsize, ttl=cache_ttl)
+        self.rollups = rollups if rollups is not None else RollupAggregator(database, interval=0)
+        self.cache: StatsCache[StatsResponse] = StatsCache(
+            ttl=cache_ttl,
+            maxsize=cache_maxsize,
+            stale_ttl=cache_stale_ttl,
+            refresh_ahead=cache_refresh_ahead,
+            encoder=encode_stats,
+        )
         logger.info(
             f"RealStatCollector initialized with PostgreSQL backend "
-            f"(cache: TTL={cache_ttl}s, maxsize={cache_maxsize})"
+            f"(cache: TTL={cache_ttl}s, maxsize={cache_maxsize}, stale={cache_stale_ttl}s, "
+            f"refresh_ahead={cache_refresh_ahead}s)"
         )
 
     async def get_stats(self, period: PeriodType) -> StatsResponse:
         """
         Получить статистику за указанный период из БД с кешированием.
 
-        Использует TTL cache для уменьшения нагрузки на БД.
-        Cache key = "stats:{period}"
+        Использует StatsCache для уменьшения нагрузки на БД: одновременные
+        промахи ждут один запрос к БД, устаревшая статистика отдаётся сразу
+        и обновляется в фоне. Cache key = "stats:{period}"
 
         Args:
             period: Период для статистики ('day', 'week', 'month')
@@ -60,6 +103,25 @@ class RealStatCollector(StatCollector):
         Returns:
             StatsResponse с реальными данными из БД или из кеша
 
+        Raises:
+            ValueError: Если period невалиден
+            Exception: При ошибке получения данных из БД
+        """
+        entry = await self.get_stats_entry(period)
+        return entry.value
+
+    async def get_stats_entry(self, period: PeriodType) -> CacheEntry[StatsResponse]:
+        """
+        Получить статистику вместе с записью кеша (версия, ETag, время загрузки).
+
+        ETag вычисляется по содержимому ответа: меняется только при изменении данных.
+
+        Args:
+            period: Период для статистики ('day', 'week', 'month')
+
+        Returns:
+            CacheEntry со статистикой
+
         Raises:
             ValueError: Если period невалиден
             Exception: При ошибке получения данных из БД
@@ -67,23 +129,42 @@ class RealStatCollector(StatCollector):
         if period not in ("day", "week", "month"):
             raise ValueError(f"Invalid period: {period}. Must be 'day', 'week' or 'month'")
 
-        # Проверяем кеш
-        cache_key = f"stats:{period}"
-        cached_value = self.cache.get(cache_key)
-        if cached_value is not None:
-            logger.debug(f"Cache HIT for {cache_key}")
-            return cached_value
+        return await self.cache.get(f"stats:{period}", partial(self._load_stats, period))
+
+    def warm_up(self) -> None:
+        """Загружает статистику всех периодов в кеш в фоне (при старте API)."""
+        for period in get_args(PeriodType):
+            self.cache.refresh_in_background(f"stats:{period}", partial(self._load_stats, period))
+
+    async def _load_stats(self, period: PeriodType) -> StatsResponse:
+        """
+        Загружает статистику из БД (одна загрузка на ключ кеша одновременно).
+
+        Args:
+            period: Период для статистики
+
+        Returns:
+            StatsResponse с данными из БД
+        """
+        logger.info(f"Loading stats from DB (period={period})")
 
-        logger.info(f"Cache MISS for {cache_key}, fetching from DB (period={period})")
+        # Переносим в агрегаты сообщения с последнего обновления
+        await self._refresh_rollups()
 
         # Fetch с retry механизмом
-        response = await self._fetch_stats_from_db(period)
+        return await self._fetch_stats_from_db(period)
 
-        # Сохраняем в кеш
-        self.cache[cache_key] = response
-        logger.debug(f"Cached response for {cache_key}")
+    async def _refresh_rollups(self) -> None:
+        """
+        Обновляет почасовые агрегаты перед запросом статистики.
 
-        return response
+        Ошибка обновления не прерывает запрос: статистика строится по агрегатам
+        на момент последнего успешного обновления.
+        """
+        try:
+            await self.rollups.refresh()
+        except Exception as e:
+            logger.warning(f"Failed to refresh message rollups, serving previous rollups: {e}")
 
     @retry(
         retry=retry_if_exception_type((OperationalError, DBAPIError)),
@@ -95,6 +176,12 @@ class RealStatCollector(StatCollector):
         """
         Внутренний метод для запроса к БД с retry механизмом.
 
+        Группы запросов (summary, timeline, recent dialogs, top users, LLM usage)
+        выполняются одновременно на отдельных соединениях пула: задержка cache miss
+        определяется самым медленным запросом, а не суммой. Каждая группа видит
+        свой snapshot БД, расхождение между ними - миллисекунды. Ошибка одной
+        группы отменяет остальные, и их соединения освобождаются до retry.
+
         Retry логика:
         - Количество попыток: 3
         - Exponential backoff: 1s, 2s, 4s
@@ -113,20 +200,54 @@ class RealStatCollector(StatCollector):
         # Определяем временной диапазон
         time_range = self._get_time_range(period)
 
-        async with self.db.session() as session:
-            # Параллельный запрос всех данных
-            summary = await self._get_summary(session, time_range)
-            activity_timeline = await self._get_activity_timeline(session, period, time_range)
-            recent_dialogs = await self._get_recent_dialogs(session, time_range)
-            top_users = await self._get_top_users(session, time_range)
-
-        return StatsResponse(
-            summary=summary,
-            activity_timeline=activity_timeline,
-            recent_dialogs=recent_dialogs,
-            top_users=top_users,
+        # Параллельный запрос всех данных (отдельная сессия на группу запросов).
+        # TaskGroup при ошибке отменяет остальные группы и дожидается закрытия их
+        # сессий: соединения возвращаются в пул до следующей попытки retry
+        try:
+            async with asyncio.TaskGroup() as group:
+                summary = group.create_task(
+                    self._in_session(lambda session: self._get_summary(session, time_range))
+                )
+                activity_timeline = group.create_task(
+                    self._in_session(
+                        lambda session: self._get_activity_timeline(session, period, time_range)
+                    )
+                )
+                recent_dialogs = group.create_task(
+                    self._in_session(lambda session: self._get_recent_dialogs(session, time_range))
+                )
+                top_users = group.create_task(
+                    self._in_session(lambda session: self._get_top_users(session, time_range))
+                )
+                llm_usage = group.create_task(
+                    self._in_session(lambda session: self._get_llm_usage(session, time_range))
+                )
+        except ExceptionGroup as e:
+            # retry и вызывающий код ожидают исключение БД, а не ExceptionGroup
+            raise e.exceptions[0] from None
+
+        # Строки БД уже имеют типы полей (int, aware datetime): без повторной валидации
+        return StatsResponse.model_construct(
+            summary=summary.result(),
+            activity_timeline=activity_timeline.result(),
+            recent_dialogs=recent_dialogs.result(),
+            top_users=top_users.result(),
+            llm_usage=llm_usage.result(),
         )
 
+    async def _in_session(self, query: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """
+        Выполняет группу запросов в отдельной сессии (своё соединение из пула).
+
+        Args:
+            query: Корутина, получающая AsyncSession
+
+        Returns:
+            Результат query
+        """
+        async with self.db.session() as session:
+            return await query(session)
+
     def _get_time_range(self, period: PeriodType) -> tuple[datetime, datetime]:
         """
         Вычисляет временной диапазон для периода.
@@ -148,6 +269,24 @@ class RealStatCollector(StatCollector):
 
         return start_time, now
 
+    @staticmethod
+    def _rollup_filter(time_range: tuple[datetime, datetime]) -> tuple[Any, ...]:
+        """
+        Условие выборки почасовых агрегатов периода.
+
+        Период расширяется до границ часов: час, в который попадает начало
+        периода, учитывается целиком.
+
+        Args:
+            time_range: Tuple (start_time, end_time)
+
+        Returns:
+            Условия WHERE для MessageRollup
+        """
+        start_time, end_time = time_range
+        start_bucket = start_time.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+        return (MessageRollup.bucket >= start_bucket, MessageRollup.bucket <= end_time)
+
     async def _get_summary(
         self, session: AsyncSession, time_range: tuple[datetime, datetime]
     ) -> Summary:
@@ -156,8 +295,8 @@ class RealStatCollector(StatCollector):
 
         Бизнес-логика:
         - total_users: COUNT(DISTINCT users.id) за весь период
-        - total_messages: COUNT(messages) WHERE deleted_at IS NULL
-        - active_dialogs: COUNT(DISTINCT messages.user_id) WHERE deleted_at IS NULL
+        - total_messages: SUM(message_count) почасовых агрегатов
+        - active_dialogs: COUNT(DISTINCT user_id) почасовых агрегатов
 
         Args:
             session: AsyncSession для запросов
@@ -166,7 +305,7 @@ class RealStatCollector(StatCollector):
         Returns:
             Summary с агрегированными данными
         """
-        start_time, end_time = time_range
+        _, end_time = time_range
 
         # Запрос для total_users (всего пользователей)
         total_users_stmt = select(func.count(func.distinct(User.id))).where(
@@ -178,13 +317,9 @@ class RealStatCollector(StatCollector):
         # Запрос для total_messages и active_dialogs
         # Оптимизация: одним запросом получаем оба значения
         stats_stmt = select(
-            func.count(Message.id).label("total_messages"),
-            func.count(func.distinct(Message.user_id)).label("active_dialogs"),
-        ).where(
-            Message.created_at >= start_time,
-            Message.created_at <= end_time,
-            Message.deleted_at.is_(None),  # Только не удаленные (soft delete)
-        )
+            func.coalesce(func.sum(MessageRollup.message_count), 0).label("total_messages"),
+            func.count(func.distinct(MessageRollup.user_id)).label("active_dialogs"),
+        ).where(*self._rollup_filter(time_range))
         stats_result = await session.execute(stats_stmt)
         stats_row = stats_result.one()
 
@@ -193,7 +328,7 @@ class RealStatCollector(StatCollector):
             f"dialogs={stats_row.active_dialogs}"
         )
 
-        return Summary(
+        return Summary.model_construct(
             total_users=total_users,
             total_messages=stats_row.total_messages,
             active_dialogs=stats_row.active_dialogs,
@@ -218,28 +353,23 @@ class RealStatCollector(StatCollector):
         Returns:
             Список ActivityPoint, отсортированный по timestamp ASC
         """
-        start_time, end_time = time_range
-
         # Определяем функцию группировки по периоду
+        time_bucket: SQLColumnExpression[datetime]
         if period == "day":
-            # Группировка по часам: date_trunc('hour', created_at)
-            time_bucket = func.date_trunc("hour", Message.created_at)
+            # Группировка по часам: агрегаты уже почасовые
+            time_bucket = MessageRollup.bucket
         else:  # week, month
-            # Группировка по дням: date_trunc('day', created_at)
-            time_bucket = func.date_trunc("day", Message.created_at)
+            # Группировка по дням: date_trunc('day', bucket)
+            time_bucket = func.date_trunc("day", MessageRollup.bucket)
 
         # Агрегированный запрос
         stmt = (
             select(
                 time_bucket.label("timestamp"),
-                func.count(Message.id).label("message_count"),
-                func.count(func.distinct(Message.user_id)).label("active_users"),
-            )
-            .where(
-                Message.created_at >= start_time,
-                Message.created_at <= end_time,
-                Message.deleted_at.is_(None),  # Только не удаленные
+                func.sum(MessageRollup.message_count).label("message_count"),
+                func.count(func.distinct(MessageRollup.user_id)).label("active_users"),
             )
+            .where(*self._rollup_filter(time_range))
             .group_by("timestamp")
             .order_by("timestamp")
         )
@@ -249,7 +379,7 @@ class RealStatCollector(StatCollector):
 
         # Преобразуем в список ActivityPoint
         activity_points = [
-            ActivityPoint(
+            ActivityPoint.model_construct(
                 timestamp=row.timestamp,
                 message_count=row.message_count,
                 active_users=row.active_users,
@@ -269,8 +399,8 @@ class RealStatCollector(StatCollector):
 
         Бизнес-логика:
         - Группировка по user_id
-        - last_message_at: MAX(created_at)
-        - message_count: COUNT(*)
+        - last_message_at: MAX(last_message_at) почасовых агрегатов
+        - message_count: SUM(message_count)
         - duration_minutes: разница между первым и последним сообщением
 
         Args:
@@ -280,29 +410,23 @@ class RealStatCollector(StatCollector):
         Returns:
             Список RecentDialog, отсортированный по last_message_at DESC (свежие сверху)
         """
-        start_time, end_time = time_range
-
         # Агрегация по user_id
         stmt = (
             select(
-                Message.user_id,
-                func.count(Message.id).label("message_count"),
-                func.max(Message.created_at).label("last_message_at"),
-                # Вычисляем длительность как разницу между max и min created_at
+                MessageRollup.user_id,
+                func.sum(MessageRollup.message_count).label("message_count"),
+                func.max(MessageRollup.last_message_at).label("last_message_at"),
+                # Вычисляем длительность как разницу между последним и первым сообщением
                 (
-                    func.extract("epoch", func.max(Message.created_at))
-                    - func.extract("epoch", func.min(Message.created_at))
+                    func.extract("epoch", func.max(MessageRollup.last_message_at))
+                    - func.extract("epoch", func.min(MessageRollup.first_message_at))
                 )
                 .cast(Integer)
                 .label("duration_seconds"),
             )
-            .where(
-                Message.created_at >= start_time,
-                Message.created_at <= end_time,
-                Message.deleted_at.is_(None),  # Только не удаленные
-            )
-            .group_by(Message.user_id)
-            .order_by(func.max(Message.created_at).desc())
+            .where(*self._rollup_filter(time_range))
+            .group_by(MessageRollup.user_id)
+            .order_by(func.max(MessageRollup.last_message_at).desc())
             .limit(15)
         )
 
@@ -311,7 +435,7 @@ class RealStatCollector(StatCollector):
 
         # Преобразуем в список RecentDialog
         recent_dialogs = [
-            RecentDialog(
+            RecentDialog.model_construct(
                 user_id=row.user_id,
                 message_count=row.message_count,
                 last_message_at=row.last_message_at,
@@ -331,9 +455,9 @@ class RealStatCollector(StatCollector):
         Получить топ-10 пользователей по количеству сообщений.
 
         Бизнес-логика:
-        - total_messages: COUNT(messages)
+        - total_messages: SUM(message_count) почасовых агрегатов
         - dialog_count: количество отдельных дней с активностью
-        - last_activity: MAX(created_at)
+        - last_activity: MAX(last_message_at)
 
         Args:
             session: AsyncSession для запросов
@@ -342,26 +466,21 @@ class RealStatCollector(StatCollector):
         Returns:
             Список TopUser, отсортированный по total_messages DESC (самые активные сверху)
         """
-        start_time, end_time = time_range
-
         # Агрегация по user_id
+        total_messages = func.sum(MessageRollup.message_count)
         stmt = (
             select(
-                Message.user_id,
-                func.count(Message.id).label("total_messages"),
+                MessageRollup.user_id,
+                total_messages.label("total_messages"),
                 # Для упрощения: dialog_count = количество дней с активностью
-                func.count(func.distinct(func.date_trunc("day", Message.created_at))).label(
+                func.count(func.distinct(func.date_trunc("day", MessageRollup.bucket))).label(
                     "dialog_count"
                 ),
-                func.max(Message.created_at).label("last_activity"),
+                func.max(MessageRollup.last_message_at).label("last_activity"),
             )
-            .where(
-                Message.created_at >= start_time,
-                Message.created_at <= end_time,
-                Message.deleted_at.is_(None),  # Только не удаленные
-            )
-            .group_by(Message.user_id)
-            .order_by(func.count(Message.id).desc())
+            .where(*self._rollup_filter(time_range))
+            .group_by(MessageRollup.user_id)
+            .order_by(total_messages.desc())
             .limit(10)
         )
 
@@ -370,7 +489,7 @@ class RealStatCollector(StatCollector):
 
         # Преобразуем в список TopUser
         top_users = [
-            TopUser(
+            TopUser.model_construct(
                 user_id=row.user_id,
                 total_messages=row.total_messages,
                 dialog_count=row.dialog_count,
@@ -382,3 +501,85 @@ class RealStatCollector(StatCollector):
         logger.debug(f"Top users: {len(top_users)} entries")
 
         return top_users
+
+    async def _get_llm_usage(
+        self, session: AsyncSession, time_range: tuple[datetime, datetime]
+    ) -> LLMUsageStats:
+        """
+        Получить статистику запросов к LLM за период.
+
+        Бизнес-логика:
+        - latency_p50/p95/p99_ms: percentile_cont по latency_ms всех ходов
+        - fallback_rate: доля ходов, обслуженных fallback моделью
+        - error_rate: доля неуспешных ходов
+        - by_model: суммы токенов по моделям (по убыванию количества запросов)
+
+        Показатели ходов считаются только по запросам purpose='turn': фоновая
+        суммаризация не является ответом пользователю. Расход токенов по моделям
+        включает все запросы.
+
+        Args:
+            session: AsyncSession для запросов
+            time_range: Tuple (start_time, end_time)
+
+        Returns:
+            LLMUsageStats с агрегированными данными
+        """
+        start_time, end_time = time_range
+        period_filter = (LLMUsage.created_at >= start_time, LLMUsage.created_at <= end_time)
+
+        # Перцентили и доли одним запросом
+        totals_stmt = select(
+            func.count(LLMUsage.id).label("total_requests"),
+            func.percentile_cont(0.5).within_group(LLMUsage.latency_ms).label("p50"),
+            func.percentile_cont(0.95).within_group(LLMUsage.latency_ms).label("p95"),
+            func.percentile_cont(0.99).within_group(LLMUsage.latency_ms).label("p99"),
+            func.coalesce(func.sum(case((LLMUsage.is_fallback, 1), else_=0)), 0).label(
+                "fallback_count"
+            ),
+            func.coalesce(func.sum(case((LLMUsage.success, 0), else_=1)), 0).label("error_count"),
+        ).where(*period_filter, LLMUsage.purpose == PURPOSE_TURN)
+        totals = (await session.execute(totals_stmt)).one()
+
+        # Расход токенов по моделям
+        by_model_stmt = (
+            select(
+                LLMUsage.model,
+                func.count(LLMUsage.id).label("requests"),
+                func.sum(LLMUsage.prompt_tokens).label("prompt_tokens"),
+                func.sum(LLMUsage.completion_tokens).label("completion_tokens"),
+                func.sum(LLMUsage.cached_tokens).label("cached_tokens"),
+            )
+            .where(*period_filter)
+            .group_by(LLMUsage.model)
+            .order_by(func.count(LLMUsage.id).desc())
+        )
+        by_model_rows = (await session.execute(by_model_stmt)).all()
+
+        total_requests = totals.total_requests
+
+        llm_usage = LLMUsageStats.model_construct(
+            total_requests=total_requests,
+            latency_p50_ms=round(totals.p50 or 0),
+            latency_p95_ms=round(totals.p95 or 0),
+            latency_p99_ms=round(totals.p99 or 0),
+            fallback_rate=totals.fallback_count / total_requests if total_requests else 0.0,
+            error_rate=totals.error_count / total_requests if total_requests else 0.0,
+            by_model=[
+                ModelUsage.model_construct(
+                    model=row.model,
+                    requests=row.requests,
+                    prompt_tokens=row.prompt_tokens or 0,
+                    completion_tokens=row.completion_tokens or 0,
+                    cached_tokens=row.cached_tokens or 0,
+                )
+                for row in by_model_rows
+            ],
+        )
+
+        logger.debug(
+            f"LLM usage: requests={total_requests}, p95={llm_usage.latency_p95_ms}ms, "
+            f"fallback_rate={llm_usage.fallback_rate:.3f}"
+        )
+
+        return llm_usage
@@ -0,0 +1,228 @@
+"""Инкрементальные почасовые агрегаты сообщений для статистики dashboard."""
+
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import Database
+from src.models import RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Имя watermark почасовых агрегатов сообщений в rollup_watermarks
+WATERMARK_NAME = "message_rollups_hourly"
+
+# Начало часа created_at в UTC (не зависит от TimeZone сессии)
+_BUCKET = "date_trunc('hour', {column} AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+
+_UPSERT = """
+    INSERT INTO message_rollups_hourly AS r
+        (bucket, user_id, message_count, chars, first_message_at, last_message_at)
+    SELECT bucket, user_id, message_count, chars, first_message_at, last_message_at
+    FROM {source}
+    ON CONFLICT (bucket, user_id) DO UPDATE SET
+        message_count = EXCLUDED.message_count,
+        chars = EXCLUDED.chars,
+        first_message_at = EXCLUDED.first_message_at,
+        last_message_at = EXCLUDED.last_message_at
+"""
+
+# Пересчёт пар (час, пользователь), затронутых изменениями messages с :since:
+# новыми сообщениями (inserted_at) и soft delete (deleted_at). Каждая пара
+# пересчитывается целиком по индексу (user_id, deleted_at, created_at), поэтому
+# повторная обработка идемпотентна. Пары без активных сообщений удаляются.
+REFRESH_SQL = text(
+    f"""
+    WITH dirty AS (
+        SELECT DISTINCT {_BUCKET.format(column="created_at")} AS bucket, user_id
+        FROM messages
+        WHERE inserted_at >= :since OR deleted_at >= :since
+    ),
+    fresh AS (
+        SELECT d.bucket, d.user_id,
+               count(m.id) AS message_count,
+               coalesce(sum(m.content_length), 0) AS chars,
+               min(m.created_at) AS first_message_at,
+               max(m.created_at) AS last_message_at
+        FROM dirty d
+        LEFT JOIN messages m
+            ON m.user_id = d.user_id
+            AND m.deleted_at IS NULL
+            AND m.created_at >= d.bucket
+            AND m.created_at < d.bucket + INTERVAL '1 hour'
+        GROUP BY d.bucket, d.user_id
+    ),
+    removed AS (
+        DELETE FROM message_rollups_hourly r
+        USING fresh f
+        WHERE r.bucket = f.bucket AND r.user_id = f.user_id AND f.message_count = 0
+    )
+    {_UPSERT.format(source="fresh WHERE message_count > 0")}
+    """
+)
+
+# Полное построение агрегатов по всем активным сообщениям
+REBUILD_SQL = text(
+    f"""
+    WITH fresh AS (
+        SELECT {_BUCKET.format(column="created_at")} AS bucket, user_id,
+               count(id) AS message_count,
+               sum(content_length) AS chars,
+               min(created_at) AS first_message_at,
+               max(created_at) AS last_message_at
+        FROM messages
+        WHERE deleted_at IS NULL
+        GROUP BY 1, user_id
+    )
+    {_UPSERT.format(source="fresh")}
+    """
+)
+
+
+class RollupAggregator:
+    """
+    Поддерживает таблицу message_rollups_hourly по изменениям messages.
+
+    Без триггеров и без изменений в Storage бота: каждое обновление
+    пересчитывает пары (час, пользователь), в которых с прошлого обновления
+    появились или были удалены сообщения. Граница обработанных изменений
+    (watermark) хранится в rollup_watermarks и блокируется на время
+    обновления (SELECT ... FOR UPDATE), поэтому несколько реплик API
+    не обрабатывают изменения одновременно.
+
+    Окно обновления начинается на lag раньше watermark: транзакции бота,
+    начатые до прошлого обновления и закоммиченные после него, и soft delete
+    с deleted_at по часам приложения попадают в следующее обновление.
+
+    Attributes:
+        refreshes: Количество выполненных обновлений
+        last_refreshed_rows: Записей агрегатов, записанных последним обновлением
+    """
+
+    def __init__(self, database: Database, lag: float = 120.0, interval: float = 60.0) -> None:
+        """
+        Инициализация агрегатора.
+
+        Args:
+            database: Database объект для работы с PostgreSQL
+            lag: Перекрытие окна обновления в секундах (по умолчанию 120.0)
+            interval: Период фонового обновления в секундах (по умолчанию 60.0, 0 - отключено)
+        """
+        self.db = database
+        self.lag = timedelta(seconds=lag)
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+        self.refreshes = 0
+        self.last_refreshed_rows = 0
+
+        logger.info(f"RollupAggregator initialized: lag={lag}s, interval={interval}s")
+
+    async def refresh(self) -> int:
+        """
+        Переносит в агрегаты изменения messages с последнего обновления.
+
+        Первое обновление (watermark NULL) строит агрегаты по всей таблице.
+
+        Returns:
+            Количество записанных записей агрегатов
+        """
+        return await self._refresh(full=False)
+
+    async def rebuild(self) -> int:
+        """
+        Перестраивает агрегаты с нуля в одной транзакции.
+
+        Нужно после изменения messages в обход бота (ручное удаление строк,
+        импорт с inserted_at в прошлом).
+
+        Returns:
+            Количество записей агрегатов
+        """
+        return await self._refresh(full=True)
+
+    async def _refresh(self, full: bool) -> int:
+        """
+        Обновляет агрегаты и сдвигает watermark.
+
+        Args:
+            full: Перестроить агрегаты целиком
+
+        Returns:
+            Количество записанных записей агрегатов
+        """
+        async with self.db.session() as session:
+            watermark = await self._lock_watermark(session)
+            # Время начала транзакции: изменения после него попадут в окно следующего обновления
+            now = (await session.execute(select(func.now()))).scalar_one()
+
+            if full or watermark is None:
+                await session.execute(text("DELETE FROM message_rollups_hourly"))
+                result = await session.execute(REBUILD_SQL)
+            else:
+                result = await session.execute(REFRESH_SQL, {"since": watermark - self.lag})
+
+            await session.execute(
+                update(RollupWatermark)
+                .where(RollupWatermark.name == WATERMARK_NAME)
+                .values(watermark=now)
+            )
+
+        rows = int(getattr(result, "rowcount", 0) or 0)
+        self.refreshes += 1
+        self.last_refreshed_rows = rows
+        if full or watermark is None:
+            logger.info(f"Message rollups rebuilt: {rows} rows")
+        else:
+            logger.debug(f"Message rollups refreshed: {rows} rows, watermark={now.isoformat()}")
+        return rows
+
+    async def _lock_watermark(self, session: AsyncSession) -> datetime | None:
+        """
+        Блокирует строку watermark до конца транзакции (создаёт при отсутствии).
+
+        Args:
+            session: AsyncSession текущей транзакции
+
+        Returns:
+            Текущий watermark или None, если агрегаты не построены
+        """
+        await session.execute(
+            insert(RollupWatermark)
+            .values(name=WATERMARK_NAME, watermark=None)
+            .on_conflict_do_nothing(index_elements=[RollupWatermark.name])
+        )
+        result = await session.execute(
+            select(RollupWatermark.watermark)
+            .where(RollupWatermark.name == WATERMARK_NAME)
+            .with_for_update()
+        )
+        return result.scalar_one()
+
+    def start(self) -> None:
+        """Запускает фоновое обновление агрегатов (если interval > 0)."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновое обновление агрегатов."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        """Фоновый цикл: обновление агрегатов каждые interval секунд."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh message rollups: {e}")
+            await asyncio.sleep(self.interval)
@@ -1,11 +1,22 @@
 """Утилиты для аутентификации и авторизации."""
 
+import asyncio
 import hashlib
+import hmac
+import logging
+import secrets
 import sys
-from typing import Annotated
+from typing import Annotated, Any
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, Request, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBasic,
+    HTTPBasicCredentials,
+    HTTPBearer,
+)
 from passlib.context import CryptContext
 from sqlalchemy import select
 
@@ -13,12 +24,24 @@ from sqlalchemy import select
 sys.path.insert(0, "/app/shared")
 from models import ApiUser  # type: ignore[import-not-found]  # noqa: E402
 
+from ..config import config  # noqa: E402
+from .tokens import ACCESS_TOKEN, TokenError, TokenSigner  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # HTTP Basic Auth security scheme
 security = HTTPBasic()
 
+# Схемы для endpoints, принимающих Bearer токен или Basic Auth
+optional_basic = HTTPBasic(auto_error=False)
+optional_bearer = HTTPBearer(auto_error=False)
+
+# Количество блокировок для одновременных проверок одинаковых credentials
+CACHE_LOCK_STRIPES = 64
+
 
 def _prehash_password(password: str) -> bytes:
     """
@@ -70,6 +93,240 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(prehashed, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """
+    Хеширует пароль в пуле потоков.
+
+    bcrypt занимает CPU на десятки-сотни миллисекунд: вызов в event loop
+    блокирует обработку всех остальных запросов.
+
+    Args:
+        password: Открытый пароль
+
+    Returns:
+        Хешированный пароль
+    """
+    return await run_in_threadpool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Проверяет пароль в пуле потоков (не блокирует event loop).
+
+    Args:
+        plain_password: Открытый пароль
+        hashed_password: Хешированный пароль
+
+    Returns:
+        True если пароли совпадают, False иначе
+    """
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
+
+class CredentialsCache:
+    """
+    Кеш успешно проверенных Basic Auth credentials.
+
+    Клиент дашборда отправляет credentials с каждым запросом: без кеша каждый
+    запрос к /api/v1/stats стоит запроса к БД и полной проверки bcrypt.
+    Ключ - HMAC-SHA256 от username и password с секретом процесса: пароли
+    не хранятся в памяти в открытом виде, а ключ нельзя вычислить без секрета.
+
+    Неуспешные проверки не кешируются, запись не живёт дольше ttl.
+    Кеш заменяет только проверку bcrypt: при каждом попадании пользователь
+    перечитывается по первичному ключу, и деактивация или смена пароля
+    (в том числе из другого процесса) действуют со следующего запроса.
+    Одновременные запросы с одинаковыми credentials (дашборд после истечения
+    записи) проверяются один раз: остальные ждут результата под lock().
+
+    Attributes:
+        hits: Количество запросов, проверенных по кешу
+        misses: Количество запросов с полной проверкой
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 1000) -> None:
+        """
+        Инициализация кеша.
+
+        Args:
+            ttl: Время жизни записи в секундах (0 - кеш отключён)
+            maxsize: Максимальное количество записей
+        """
+        self.enabled = ttl > 0
+        self._secret = secrets.token_bytes(32)
+        self._cache: TTLCache[bytes, Any] = TTLCache(maxsize=maxsize, ttl=max(ttl, 1))
+        self._locks = [asyncio.Lock() for _ in range(CACHE_LOCK_STRIPES)]
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, username: str, password: str) -> bytes:
+        """
+        Ключ записи: HMAC от username и password.
+
+        Args:
+            username: Имя пользователя
+            password: Открытый пароль
+
+        Returns:
+            HMAC-SHA256 digest
+        """
+        # Длина username в ключе исключает совпадение разных пар ("ab" + "c" и "a" + "bc")
+        payload = f"{len(username)}:{username}{password}".encode()
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def get(self, username: str, password: str) -> Any | None:
+        """
+        Возвращает пользователя для ранее проверенных credentials.
+
+        Args:
+            username: Имя пользователя
+            password: Открытый пароль
+
+        Returns:
+            ApiUser или None, если credentials не проверялись или запись истекла
+        """
+        if not self.enabled:
+            return None
+        user = self._cache.get(self._key(username, password))
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def lock(self, username: str, password: str) -> asyncio.Lock:
+        """
+        Блокировка для полной проверки credentials.
+
+        Args:
+            username: Имя пользователя
+            password: Открытый пароль
+
+        Returns:
+            asyncio.Lock, общий для одинаковых credentials
+        """
+        return self._locks[self._key(username, password)[0] % len(self._locks)]
+
+    def put(self, username: str, password: str, user: Any) -> None:
+        """
+        Сохраняет успешно проверенные credentials.
+
+        Args:
+            username: Имя пользователя
+            password: Открытый пароль
+            user: Проверенный ApiUser
+        """
+        if self.enabled:
+            self._cache[self._key(username, password)] = user
+
+    def invalidate(self, username: str) -> int:
+        """
+        Удаляет записи пользователя (деактивация, смена пароля).
+
+        Args:
+            username: Имя пользователя
+
+        Returns:
+            Количество удалённых записей
+        """
+        keys = [key for key, user in self._cache.items() if user.username == username]
+        for key in keys:
+            self._cache.pop(key, None)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached credentials for user: {username}")
+        return len(keys)
+
+    def clear(self) -> None:
+        """Очищает кеш и счётчики."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Кеш проверенных credentials (общий для всех запросов процесса)
+credentials_cache = CredentialsCache(ttl=config.AUTH_CACHE_TTL, maxsize=config.AUTH_CACHE_MAXSIZE)
+
+# Подпись токенов dashboard
+token_signer = TokenSigner(
+    secret=config.AUTH_TOKEN_SECRET or None,
+    access_ttl=config.ACCESS_TOKEN_TTL,
+    refresh_ttl=config.REFRESH_TOKEN_TTL,
+)
+
+
+def _unauthorized() -> HTTPException:
+    """
+    Ошибка 401 для Basic Auth.
+
+    Returns:
+        HTTPException с заголовком WWW-Authenticate
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Basic"},
+    )
+
+
+async def _authenticate(request: Request, credentials: HTTPBasicCredentials) -> ApiUser:
+    """
+    Полная проверка credentials: пользователь из БД и bcrypt в пуле потоков.
+
+    Args:
+        request: FastAPI Request объект
+        credentials: HTTP Basic Auth credentials
+
+    Returns:
+        ApiUser объект для авторизованного пользователя
+
+    Raises:
+        HTTPException: 401 если credentials невалидны или пользователь неактивен
+    """
+    async with request.app.state.db.session() as session:
+        result = await session.execute(
+            select(ApiUser).where(ApiUser.username == credentials.username)
+        )
+        user = result.scalar_one_or_none()
+
+    if not user or not user.is_active:
+        # Пользователь удалён или деактивирован: записи кеша больше не действительны
+        credentials_cache.invalidate(credentials.username)
+        raise _unauthorized()
+
+    # Соединение с БД возвращено в пул до проверки bcrypt
+    if not await verify_password_async(credentials.password, user.hashed_password):
+        raise _unauthorized()
+
+    return user
+
+
+async def _check_cached(request: Request, cached_user: Any) -> ApiUser:
+    """
+    Проверяет, что пользователь из кеша credentials активен и пароль не менялся.
+
+    Запрос по первичному ключу без проверки bcrypt.
+
+    Args:
+        request: FastAPI Request объект
+        cached_user: ApiUser из кеша credentials
+
+    Returns:
+        Актуальный ApiUser
+
+    Raises:
+        HTTPException: 401 если пользователь удалён, деактивирован или сменил пароль
+    """
+    async with request.app.state.db.session() as session:
+        result = await session.execute(select(ApiUser).where(ApiUser.id == cached_user.id))
+        user = result.scalar_one_or_none()
+
+    if not user or not user.is_active or user.hashed_password != cached_user.hashed_password:
+        credentials_cache.invalidate(cached_user.username)
+        raise _unauthorized()
+
+    return user
+
+
 async def verify_credentials(
     request: Request,
     credentials: Annotated[HTTPBasicCredentials, Depends(security)],
@@ -78,7 +335,9 @@ async def verify_credentials(
     Проверяет Basic Auth credentials против базы данных.
 
     Dependency для защиты endpoints через Basic Authentication.
-    Проверяет username и password пользователя в БД.
+    Проверяет username и password пользователя в БД. Успешно проверенные
+    credentials кешируются на AUTH_CACHE_TTL секунд (при попадании проверяется
+    только активность пользователя, без bcrypt), bcrypt выполняется в пуле потоков.
 
     Args:
         credentials: HTTP Basic Auth credentials
@@ -90,24 +349,60 @@ async def verify_credentials(
     Raises:
         HTTPException: 401 если credentials невалидны или пользователь неактивен
     """
-    async with request.app.state.db.session() as session:
-        result = await session.execute(
-            select(ApiUser).where(ApiUser.username == credentials.username)
-        )
-        user = result.scalar_one_or_none()
+    if not credentials_cache.enabled:
+        return await _authenticate(request, credentials)
 
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-                headers={"WWW-Authenticate": "Basic"},
-            )
+    username, password = credentials.username, credentials.password
+    cached_user = credentials_cache.get(username, password)
+    if cached_user is not None:
+        return await _check_cached(request, cached_user)
+
+    async with credentials_cache.lock(username, password):
+        # Пока ждали lock, те же credentials мог проверить другой запрос
+        cached_user = credentials_cache.get(username, password)
+        if cached_user is not None:
+            return await _check_cached(request, cached_user)
+
+        user = await _authenticate(request, credentials)
+        credentials_cache.put(username, password, user)
+        return user
+
+
+async def verify_token_or_credentials(
+    request: Request,
+    bearer: Annotated[HTTPAuthorizationCredentials | None, Depends(optional_bearer)],
+    basic: Annotated[HTTPBasicCredentials | None, Depends(optional_basic)],
+) -> str:
+    """
+    Проверяет access токен (Bearer) или Basic Auth credentials.
+
+    Bearer токен проверяется по подписи без обращения к БД и bcrypt.
+    Basic Auth проверяется как в verify_credentials.
 
-        if not verify_password(credentials.password, user.hashed_password):
+    Args:
+        request: FastAPI Request объект
+        bearer: Bearer токен из заголовка Authorization
+        basic: HTTP Basic Auth credentials из заголовка Authorization
+
+    Returns:
+        Имя авторизованного пользователя
+
+    Raises:
+        HTTPException: 401 если токен или credentials невалидны или отсутствуют
+    """
+    if bearer is not None:
+        try:
+            claims = token_signer.verify(bearer.credentials, ACCESS_TOKEN)
+        except TokenError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-                headers={"WWW-Authenticate": "Basic"},
-            )
+                detail="Invalid token",
+                headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+            ) from e
+        return claims.username
 
-        return user
+    if basic is not None:
+        user = await verify_credentials(request, basic)
+        return str(user.username)
+
+    raise _unauthorized()
@@ -0,0 +1,143 @@
+"""Условные HTTP запросы (ETag, Last-Modified) для ответов статистики."""
+
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request
+
+from ..stats.cache import CacheEntry
+
+# Ответ зависит от пользователя API: хранить может только браузер,
+# и перед использованием он обязан проверить актуальность (If-None-Match)
+CACHE_CONTROL = "private, no-cache"
+
+
+class ConditionalRequestMetrics:
+    """
+    Счётчики условных запросов статистики.
+
+    Attributes:
+        requests: Ответы статистики (200 и 304)
+        not_modified: Ответы 304 Not Modified
+    """
+
+    def __init__(self) -> None:
+        """Инициализация счётчиков."""
+        self.requests = 0
+        self.not_modified = 0
+
+    @property
+    def not_modified_ratio(self) -> float:
+        """Доля ответов 304 среди ответов статистики."""
+        return self.not_modified / self.requests if self.requests else 0.0
+
+    def record(self, not_modified: bool) -> None:
+        """
+        Учитывает ответ.
+
+        Args:
+            not_modified: Ответ 304 Not Modified
+        """
+        self.requests += 1
+        if not_modified:
+            self.not_modified += 1
+
+    def reset(self) -> None:
+        """Сбрасывает счётчики."""
+        self.requests = 0
+        self.not_modified = 0
+
+
+# Глобальные счётчики условных запросов
+conditional_metrics = ConditionalRequestMetrics()
+
+
+def _opaque_tag(tag: str) -> str:
+    """
+    ETag без признака слабой проверки (W/) для сравнения по RFC 9110.
+
+    Args:
+        tag: ETag из заголовка
+
+    Returns:
+        ETag без префикса W/
+    """
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Проверяет If-None-Match (список ETag или "*") против текущего ETag.
+
+    Args:
+        if_none_match: Значение заголовка If-None-Match
+        etag: Текущий ETag ответа
+
+    Returns:
+        True если клиент уже имеет текущую версию
+    """
+    if if_none_match.strip() == "*":
+        return True
+    current = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == current for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """
+    Проверяет If-Modified-Since (точность HTTP даты - секунда).
+
+    Args:
+        if_modified_since: Значение заголовка If-Modified-Since
+        last_modified: Время изменения ответа
+
+    Returns:
+        True если ответ не менялся с указанного времени (False если дата невалидна)
+    """
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, entry: CacheEntry[Any]) -> bool:
+    """
+    Проверяет условные заголовки запроса против записи кеша.
+
+    If-None-Match имеет приоритет: If-Modified-Since учитывается только без него.
+
+    Args:
+        request: FastAPI Request объект
+        entry: Запись кеша со статистикой
+
+    Returns:
+        True если можно ответить 304 Not Modified
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, entry.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return not_modified_since(if_modified_since, entry.updated_at)
+    return False
+
+
+def cache_headers(entry: CacheEntry[Any]) -> dict[str, str]:
+    """
+    Заголовки кеширования ответа (для 200 и 304).
+
+    Args:
+        entry: Запись кеша со статистикой
+
+    Returns:
+        ETag, Last-Modified и Cache-Control
+    """
+    return {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.updated_at.astimezone(UTC), usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
@@ -0,0 +1,163 @@
+"""Подписанные токены доступа (HMAC-SHA256) для dashboard API."""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+class TokenError(Exception):
+    """Токен невалиден: повреждён, подписан другим ключом, истёк или другого типа."""
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """Содержимое проверенного токена."""
+
+    username: str
+    token_type: str
+    issued_at: int
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    """
+    Base64url без padding.
+
+    Args:
+        data: Данные
+
+    Returns:
+        Закодированная строка
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    """
+    Декодирует base64url без padding.
+
+    Args:
+        data: Закодированная строка
+
+    Returns:
+        Данные
+
+    Raises:
+        TokenError: Если строка не в формате base64url
+    """
+    try:
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError) as e:
+        raise TokenError("Malformed token") from e
+
+
+class TokenSigner:
+    """
+    Выпуск и проверка токенов без обращения к БД.
+
+    Токен - "<payload>.<signature>": payload в base64url JSON
+    (sub, typ, iat, exp), подпись - HMAC-SHA256 от payload. Проверка стоит
+    микросекунды CPU: одна HMAC и разбор JSON вместо bcrypt и запроса к БД.
+
+    Access токен короткоживущий и принимается stats API. Refresh токен
+    используется только для выпуска новой пары в /api/v1/auth/refresh.
+    """
+
+    def __init__(
+        self,
+        secret: str | None = None,
+        access_ttl: int = 900,
+        refresh_ttl: int = 86400,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Инициализация подписи токенов.
+
+        Args:
+            secret: Ключ подписи (None - случайный ключ процесса, токены
+                недействительны после перезапуска и в других репликах)
+            access_ttl: Время жизни access токена в секундах (по умолчанию 900)
+            refresh_ttl: Время жизни refresh токена в секундах (по умолчанию 86400)
+            clock: Источник времени Unix (для тестов)
+        """
+        key = secret if secret else secrets.token_hex(32)
+        self._key = key.encode("utf-8")
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.clock = clock
+
+    def _sign(self, payload: str) -> str:
+        """
+        Подпись payload.
+
+        Args:
+            payload: Закодированный payload
+
+        Returns:
+            Подпись в base64url
+        """
+        return _b64encode(hmac.new(self._key, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username: str, token_type: str = ACCESS_TOKEN) -> str:
+        """
+        Выпускает токен.
+
+        Args:
+            username: Имя пользователя API
+            token_type: ACCESS_TOKEN или REFRESH_TOKEN
+
+        Returns:
+            Подписанный токен
+        """
+        ttl = self.access_ttl if token_type == ACCESS_TOKEN else self.refresh_ttl
+        now = int(self.clock())
+        claims = {"sub": username, "typ": token_type, "iat": now, "exp": now + ttl}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: str, token_type: str = ACCESS_TOKEN) -> TokenClaims:
+        """
+        Проверяет подпись, тип и срок действия токена.
+
+        Args:
+            token: Токен
+            token_type: Ожидаемый тип токена
+
+        Returns:
+            Содержимое токена
+
+        Raises:
+            TokenError: Если токен невалиден
+        """
+        payload, _, signature = token.partition(".")
+        # Токен - только base64url: не-ASCII символы ломают encode("ascii") и compare_digest
+        if not payload or not signature or not token.isascii():
+            raise TokenError("Malformed token")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise TokenError("Invalid signature")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+            result = TokenClaims(
+                username=str(claims["sub"]),
+                token_type=str(claims["typ"]),
+                issued_at=int(claims["iat"]),
+                expires_at=int(claims["exp"]),
+            )
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            raise TokenError("Malformed token") from e
+
+        if result.token_type != token_type:
+            raise TokenError(f"Expected {token_type} token")
+        if result.expires_at <= self.clock():
+            raise TokenError("Token expired")
+        return result
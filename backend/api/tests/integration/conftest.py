@@ -16,7 +16,15 @@ from sqlalchemy.orm import sessionmaker
 
 from src.config import Config
 from src.database import Database
-from src.models import Base, Message, User, UserSettings
+from src.models import (
+    Base,
+    LLMUsage,
+    Message,
+    MessageRollup,
+    RollupWatermark,
+    User,
+    UserSettings,
+)
 
 # Windows fix: psycopg требует SelectorEventLoop вместо ProactorEventLoop
 if sys.platform == "win32":
@@ -52,8 +60,12 @@ async def test_db_engine() -> AsyncGenerator[AsyncEngine, None]:
         await conn.run_sync(Base.metadata.create_all)
 
     # Cleanup перед тестами: удаляем тестовые данные (user_id >= 900000)
+    # и watermark агрегатов (первое обновление в тесте строит их с нуля)
     async with engine.begin() as conn:
+        await conn.execute(delete(RollupWatermark))
         await conn.execute(delete(Message).where(Message.user_id >= 900000))
+        await conn.execute(delete(MessageRollup).where(MessageRollup.user_id >= 900000))
+        await conn.execute(delete(LLMUsage).where(LLMUsage.user_id >= 900000))
         await conn.execute(delete(UserSettings).where(UserSettings.user_id >= 900000))
         await conn.execute(delete(User).where(User.id >= 900000))
         await conn.commit()
@@ -63,6 +75,8 @@ async def test_db_engine() -> AsyncGenerator[AsyncEngine, None]:
     # Cleanup после тестов: удаляем тестовые данные (user_id >= 900000)
     async with engine.begin() as conn:
         await conn.execute(delete(Message).where(Message.user_id >= 900000))
+        await conn.execute(delete(MessageRollup).where(MessageRollup.user_id >= 900000))
+        await conn.execute(delete(LLMUsage).where(LLMUsage.user_id >= 900000))
         await conn.execute(delete(UserSettings).where(UserSettings.user_id >= 900000))
         await conn.execute(delete(User).where(User.id >= 900000))
         await conn.commit()
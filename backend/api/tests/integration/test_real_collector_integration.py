@@ -12,7 +12,7 @@ from uuid import uuid4
 import pytest
 
 from src.database import Database
-from src.models import Message, User
+from src.models import LLMUsage, Message, User
 from src.stats.real_collector import RealStatCollector
 
 
@@ -35,6 +35,9 @@ async def test_real_collector_with_empty_database(integration_database: Database
     assert len(stats.activity_timeline) == 0
     assert len(stats.recent_dialogs) == 0
     assert len(stats.top_users) == 0
+    assert stats.llm_usage is not None
+    assert stats.llm_usage.total_requests == 0
+    assert stats.llm_usage.fallback_rate == 0.0
 
 
 @pytest.mark.asyncio
@@ -342,3 +345,74 @@ async def test_real_collector_concurrent_requests(integration_database: Database
     for result in results[1:]:
         assert result.summary.total_users == results[0].summary.total_users
         assert result.summary.total_messages == results[0].summary.total_messages
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_real_collector_llm_usage(integration_database: Database) -> None:
+    """
+    Тест статистики запросов к LLM.
+
+    Проверяет перцентили задержки, долю fallback и расход токенов по моделям.
+    Запрос суммаризации учитывается только в расходе токенов.
+    """
+    now = datetime.now(UTC)
+
+    async with integration_database.session() as session:
+        # 100 ходов с задержкой 1..100 мс, каждый 10-й через fallback модель
+        for i in range(1, 101):
+            is_fallback = i % 10 == 0
+            session.add(
+                LLMUsage(
+                    id=uuid4(),
+                    user_id=900050,
+                    model="fallback/model" if is_fallback else "primary/model",
+                    prompt_tokens=100,
+                    completion_tokens=20,
+                    cached_tokens=50,
+                    latency_ms=i,
+                    retries=3 if is_fallback else 0,
+                    is_fallback=is_fallback,
+                    success=i != 100,
+                    created_at=now - timedelta(minutes=i),
+                )
+            )
+        # Долгая неуспешная суммаризация не влияет на показатели ходов
+        session.add(
+            LLMUsage(
+                id=uuid4(),
+                user_id=900050,
+                model="summary/model",
+                prompt_tokens=5000,
+                completion_tokens=300,
+                cached_tokens=0,
+                latency_ms=60000,
+                retries=0,
+                is_fallback=False,
+                success=False,
+                purpose="summary",
+                created_at=now - timedelta(minutes=5),
+            )
+        )
+        await session.commit()
+
+    collector = RealStatCollector(integration_database, cache_ttl=1, cache_maxsize=10)
+
+    stats = await collector.get_stats("day")
+
+    assert stats.llm_usage is not None
+    assert stats.llm_usage.total_requests == 100
+    assert stats.llm_usage.latency_p50_ms == 50
+    assert stats.llm_usage.latency_p95_ms == 95
+    assert stats.llm_usage.latency_p99_ms == 99
+    assert stats.llm_usage.fallback_rate == pytest.approx(0.1)
+    assert stats.llm_usage.error_rate == pytest.approx(0.01)
+
+    by_model = {usage.model: usage for usage in stats.llm_usage.by_model}
+    assert by_model["primary/model"].requests == 90
+    assert by_model["primary/model"].prompt_tokens == 9000
+    assert by_model["fallback/model"].completion_tokens == 200
+    assert by_model["fallback/model"].cached_tokens == 500
+    assert by_model["summary/model"].prompt_tokens == 5000
+    # Сортировка по количеству запросов
+    assert stats.llm_usage.by_model[0].model == "primary/model"
@@ -0,0 +1,150 @@
+"""Integration тесты для RollupAggregator с PostgreSQL.
+
+Требуется запущенный PostgreSQL (docker-compose up -d postgres).
+"""
+
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select, update
+
+from src.database import Database
+from src.models import Message, MessageRollup, User
+from src.stats.real_collector import RealStatCollector
+from src.stats.rollups import RollupAggregator
+
+USER_ID = 900050
+
+
+def _message(created_at: datetime, content: str = "Hello") -> Message:
+    """
+    Создаёт активное сообщение тестового пользователя.
+
+    Args:
+        created_at: Время сообщения
+        content: Текст сообщения
+
+    Returns:
+        Message
+    """
+    return Message(
+        id=uuid4(),
+        user_id=USER_ID,
+        role="user",
+        content=content,
+        content_length=len(content),
+        created_at=created_at,
+        deleted_at=None,
+    )
+
+
+async def _rollups(database: Database) -> list[MessageRollup]:
+    """
+    Агрегаты тестового пользователя по возрастанию часа.
+
+    Args:
+        database: Database объект
+
+    Returns:
+        Список MessageRollup
+    """
+    async with database.session() as session:
+        result = await session.execute(
+            select(MessageRollup)
+            .where(MessageRollup.user_id == USER_ID)
+            .order_by(MessageRollup.bucket)
+        )
+        return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_rollups_built_per_hour(integration_database: Database) -> None:
+    """
+    Тест первого обновления: агрегаты по часам с количеством и символами.
+    """
+    hour = datetime.now(UTC).replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    async with integration_database.session() as session:
+        session.add(User(id=USER_ID))
+        await session.flush()
+        session.add(_message(hour + timedelta(minutes=5), "abc"))
+        session.add(_message(hour + timedelta(minutes=50), "defgh"))
+        session.add(_message(hour + timedelta(hours=1, minutes=10), "ij"))
+
+    await RollupAggregator(integration_database).refresh()
+
+    rollups = await _rollups(integration_database)
+    assert [(r.bucket, r.message_count, r.chars) for r in rollups] == [
+        (hour, 2, 8),
+        (hour + timedelta(hours=1), 1, 2),
+    ]
+    assert rollups[0].first_message_at == hour + timedelta(minutes=5)
+    assert rollups[0].last_message_at == hour + timedelta(minutes=50)
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_rollups_incremental_refresh(integration_database: Database) -> None:
+    """
+    Тест инкрементального обновления: новые сообщения (в том числе задним
+    числом) и soft delete попадают в агрегаты, пустые часы удаляются.
+    """
+    now = datetime.now(UTC)
+    hour = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    aggregator = RollupAggregator(integration_database)
+
+    async with integration_database.session() as session:
+        session.add(User(id=USER_ID))
+        await session.flush()
+        session.add(_message(hour + timedelta(minutes=1)))
+    await aggregator.refresh()
+
+    async with integration_database.session() as session:
+        # Сообщение с created_at в прошлом (как summary бота)
+        session.add(_message(hour + timedelta(minutes=30)))
+        session.add(_message(hour + timedelta(hours=2)))
+    await aggregator.refresh()
+
+    rollups = await _rollups(integration_database)
+    assert [(r.bucket, r.message_count) for r in rollups] == [
+        (hour, 2),
+        (hour + timedelta(hours=2), 1),
+    ]
+
+    async with integration_database.session() as session:
+        await session.execute(
+            update(Message)
+            .where(Message.user_id == USER_ID, Message.created_at >= hour + timedelta(hours=1))
+            .values(deleted_at=datetime.now(UTC))
+        )
+    await aggregator.refresh()
+
+    rollups = await _rollups(integration_database)
+    assert [(r.bucket, r.message_count) for r in rollups] == [(hour, 2)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_collector_reads_fresh_rollups(integration_database: Database) -> None:
+    """
+    Тест: cache miss collector обновляет агрегаты перед запросом статистики.
+    """
+    now = datetime.now(UTC)
+    collector = RealStatCollector(integration_database, cache_ttl=1, cache_maxsize=10)
+
+    async with integration_database.session() as session:
+        session.add(User(id=USER_ID))
+        await session.flush()
+        for i in range(4):
+            session.add(_message(now - timedelta(hours=30) + timedelta(hours=i * 8)))
+
+    stats = await collector.get_stats("week")
+
+    assert stats.summary.total_messages == 4
+    assert stats.summary.active_dialogs == 1
+    assert sum(point.message_count for point in stats.activity_timeline) == 4
+    assert stats.top_users[0].user_id == USER_ID
+    assert stats.top_users[0].total_messages == 4
+    assert stats.recent_dialogs[0].message_count == 4
@@ -1,5 +1,6 @@
 """Тесты для auth endpoints."""
 
+import asyncio
 import sys
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -12,12 +13,14 @@ class MockApiUser:
     """Mock ApiUser class for testing."""
 
     # Class attributes (SQLAlchemy column descriptors)
+    id = MagicMock()  # noqa: F811
     username = MagicMock()  # noqa: F811
     hashed_password = MagicMock()  # noqa: F811
     is_active = MagicMock()  # noqa: F811
 
     def __init__(self, username: str, hashed_password: str, is_active: bool = True):
         """Initialize mock user with credentials."""
+        self.id = 1  # noqa: F811
         self.username = username  # noqa: F811
         self.hashed_password = hashed_password  # noqa: F811
         self.is_active = is_active  # noqa: F811
@@ -30,7 +33,28 @@ mock_models.ApiUser = MockApiUser
 sys.modules["models"] = mock_models
 
 from src.app import app  # noqa: E402
-from src.utils.auth import hash_password, verify_password  # noqa: E402
+from src.middlewares.rate_limit import limiter  # noqa: E402
+from src.stats.collector import StatCollector  # noqa: E402
+from src.stats.models import StatsResponse  # noqa: E402
+from src.utils.auth import (  # noqa: E402
+    CredentialsCache,
+    credentials_cache,
+    hash_password,
+    hash_password_async,
+    token_signer,
+    verify_password,
+    verify_password_async,
+)
+from src.utils.tokens import REFRESH_TOKEN  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_credentials_cache():
+    """Очищает кеш credentials и счётчики rate limit между тестами."""
+    credentials_cache.clear()
+    yield
+    credentials_cache.clear()
+    limiter.reset()
 
 
 @pytest.fixture
@@ -218,15 +242,13 @@ async def test_stats_endpoint_with_valid_credentials(mock_app_state, mock_db_ses
     mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
 
     # Mock collector in app state
-    mock_collector = MagicMock()
     mock_stats_response = {
         "summary": {"total_users": 10, "total_messages": 100, "active_dialogs": 5},
         "activity_timeline": [],
         "recent_dialogs": [],
         "top_users": [],
     }
-    mock_collector.get_stats = AsyncMock(return_value=mock_stats_response)
-    app.state.collector = mock_collector
+    app.state.collector = _stats_collector(mock_stats_response)
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.get(
@@ -279,3 +301,242 @@ async def test_stats_endpoint_with_inactive_user(mock_app_state, mock_db_session
 
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert response.json()["detail"] == "Invalid credentials"
+
+
+@pytest.mark.asyncio
+async def test_password_helpers_async():
+    """Тест хеширования и проверки пароля в пуле потоков."""
+    hashed = await hash_password_async("testpassword123")
+
+    assert hashed.startswith("$2b$")
+    assert await verify_password_async("testpassword123", hashed) is True
+    assert await verify_password_async("wrongpassword", hashed) is False
+
+
+def test_credentials_cache_keys():
+    """Тест кеша credentials: ключ зависит от username и password, TTL 0 отключает кеш."""
+    cache = CredentialsCache(ttl=30, maxsize=10)
+    user = MockApiUser("ab", "hash")
+    cache.put("ab", "cdpassword", user)
+
+    assert cache.get("ab", "cdpassword") is user
+    assert cache.get("ab", "wrong") is None
+    # Та же конкатенация username + password, другая пара
+    assert cache.get("abc", "dpassword") is None
+    assert cache.invalidate("ab") == 1
+    assert cache.get("ab", "cdpassword") is None
+
+    disabled = CredentialsCache(ttl=0)
+    disabled.put("ab", "cdpassword", user)
+    assert disabled.get("ab", "cdpassword") is None
+
+
+@pytest.mark.asyncio
+async def test_stats_endpoint_caches_verified_credentials(mock_app_state, mock_db_session):
+    """Тест: повторные запросы с теми же credentials не проверяют bcrypt."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+
+    app.state.collector = _stats_collector()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        with patch("src.utils.auth.verify_password", wraps=verify_password) as verify:
+            for _ in range(3):
+                response = await client.get(
+                    "/api/v1/stats?period=day", auth=("testuser", "testpassword123")
+                )
+                assert response.status_code == status.HTTP_200_OK
+
+            # Неверный пароль не попадает в кеш и проверяется полностью
+            response = await client.get(
+                "/api/v1/stats?period=day", auth=("testuser", "wrongpassword")
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    assert verify.call_count == 2
+    # Полные проверки (2) и проверки активности при попаданиях в кеш (2)
+    assert mock_db_session.execute.await_count == 4
+    assert credentials_cache.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_user_deactivated(mock_app_state, mock_db_session):
+    """Тест: деактивация пользователя действует на закешированные credentials."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+    app.state.collector = _stats_collector()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            "/api/v1/stats?period=day", auth=("testuser", "testpassword123")
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        # Пользователь деактивирован в БД (например, другим процессом)
+        deactivated = MockApiUser("testuser", test_user.hashed_password, is_active=False)
+        mock_db_session.execute.return_value = mock_db_session.create_mock_result(deactivated)
+        with patch("src.utils.auth.verify_password") as verify:
+            response = await client.get(
+                "/api/v1/stats?period=day", auth=("testuser", "testpassword123")
+            )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    verify.assert_not_called()
+    assert credentials_cache.get("testuser", "testpassword123") is None
+
+
+@pytest.mark.asyncio
+async def test_cached_credentials_after_password_change(mock_app_state, mock_db_session):
+    """Тест: после смены пароля старый пароль из кеша не принимается."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    credentials_cache.put("testuser", "testpassword123", test_user)
+    changed = MockApiUser("testuser", hash_password("newpassword456"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(changed)
+    app.state.collector = _stats_collector()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            "/api/v1/stats?period=day", auth=("testuser", "testpassword123")
+        )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_deactivated_user_invalidates_cache(mock_app_state, mock_db_session):
+    """Тест: деактивированный пользователь удаляется из кеша credentials."""
+    test_user = MockApiUser("testuser", "hash", is_active=False)
+    credentials_cache.put("testuser", "testpassword123", test_user)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+
+    # Запись с другим паролем - промах кеша, проверка по БД удаляет все записи пользователя
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/stats?period=day", auth=("testuser", "otherpass"))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert credentials_cache.get("testuser", "testpassword123") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_verify_once(mock_app_state, mock_db_session):
+    """Тест: одновременные запросы с одинаковыми credentials проверяются bcrypt один раз."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+
+    app.state.collector = _stats_collector()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        with patch("src.utils.auth.verify_password", wraps=verify_password) as verify:
+            responses = await asyncio.gather(
+                *(
+                    client.get("/api/v1/stats?period=day", auth=("testuser", "testpassword123"))
+                    for _ in range(5)
+                )
+            )
+
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+    assert verify.call_count == 1
+
+
+class FixedStatCollector(StatCollector):
+    """Collector с фиксированным ответом статистики."""
+
+    def __init__(self, stats: dict):
+        """Initialize collector with response data."""
+        self.stats = StatsResponse.model_validate(stats)
+        self.calls = 0
+
+    async def get_stats(self, period):
+        """Фиксированный ответ."""
+        self.calls += 1
+        return self.stats
+
+
+def _stats_collector(stats: dict | None = None):
+    """Collector с минимальным ответом статистики."""
+    return FixedStatCollector(
+        stats
+        or {
+            "summary": {"total_users": 1, "total_messages": 1, "active_dialogs": 1},
+            "activity_timeline": [],
+            "recent_dialogs": [],
+            "top_users": [],
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_issues_tokens_for_stats(mock_app_state, mock_db_session):
+    """Тест: токен из /login даёт доступ к /stats без БД и bcrypt."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+    app.state.collector = _stats_collector()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/auth/login", json={"username": "testuser", "password": "testpassword123"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        tokens = response.json()
+        assert tokens["token_type"] == "bearer"
+        assert tokens["expires_in"] > 0
+
+        mock_db_session.execute.reset_mock()
+        with patch("src.utils.auth.verify_password") as verify:
+            response = await client.get(
+                "/api/v1/stats?period=day",
+                headers={"Authorization": f"Bearer {tokens['access_token']}"},
+            )
+
+    assert response.status_code == status.HTTP_200_OK
+    verify.assert_not_called()
+    mock_db_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_login_with_invalid_password(mock_app_state, mock_db_session):
+    """Тест: /login с неправильным паролем возвращает 401."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/auth/login", json={"username": "testuser", "password": "wrongpassword"}
+        )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_stats_rejects_invalid_tokens(mock_app_state):
+    """Тест: /stats отклоняет поддельный токен и refresh токен вместо access."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for token in ("garbage", token_signer.issue("testuser", REFRESH_TOKEN)):
+            response = await client.get(
+                "/api/v1/stats?period=day", headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+            assert response.json()["detail"] == "Invalid token"
+
+
+@pytest.mark.asyncio
+async def test_refresh_issues_new_tokens(mock_app_state, mock_db_session):
+    """Тест: /refresh выдаёт новые токены активному пользователю и отклоняет неактивного."""
+    refresh_token = token_signer.issue("testuser", REFRESH_TOKEN)
+    active_user = MockApiUser("testuser", "hash", is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(active_user)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == status.HTTP_200_OK
+        assert token_signer.verify(response.json()["access_token"]).username == "testuser"
+
+        # Access токен не принимается как refresh
+        response = await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": token_signer.issue("testuser")}
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        active_user.is_active = False
+        response = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
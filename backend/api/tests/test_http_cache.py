@@ -0,0 +1,234 @@
+"""Тесты условных HTTP запросов к /api/v1/stats (ETag, Last-Modified, 304)."""
+
+import sys
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+
+# Mock models module for initial import
+sys.path.insert(0, "/app/shared")
+if "models" not in sys.modules:
+    sys.modules["models"] = MagicMock()
+
+from src.app import app  # noqa: E402
+from src.middlewares.rate_limit import limiter  # noqa: E402
+from src.stats.cache import CacheEntry, StatsCache  # noqa: E402
+from src.stats.collector import StatCollector  # noqa: E402
+from src.stats.encoding import encode_stats  # noqa: E402
+from src.stats.models import (  # noqa: E402
+    ActivityPoint,
+    RecentDialog,
+    StatsResponse,
+    Summary,
+)
+from src.utils.auth import token_signer  # noqa: E402
+from src.utils.http_cache import (  # noqa: E402
+    conditional_metrics,
+    etag_matches,
+    not_modified_since,
+)
+
+
+class CachedStatCollector(StatCollector):
+    """Collector с версиями из StatsCache (как RealStatCollector)."""
+
+    def __init__(self) -> None:
+        """Инициализация кеша и счётчика загрузок."""
+        self.cache: StatsCache[StatsResponse] = StatsCache(ttl=60, encoder=encode_stats)
+        self.loads = 0
+
+    async def _load(self) -> StatsResponse:
+        """Новая статистика при каждой загрузке."""
+        self.loads += 1
+        return StatsResponse(
+            summary=Summary(total_users=1, total_messages=self.loads, active_dialogs=1),
+            activity_timeline=[],
+            recent_dialogs=[],
+            top_users=[],
+        )
+
+    async def get_stats(self, period):
+        """Статистика из кеша."""
+        return (await self.get_stats_entry(period)).value
+
+    async def get_stats_entry(self, period):
+        """Запись кеша со статистикой."""
+        return await self.cache.get(f"stats:{period}", self._load)
+
+
+@pytest.fixture
+def collector():
+    """Collector с кешем в app state и сброс счётчиков."""
+    collector = CachedStatCollector()
+    app.state.collector = collector
+    conditional_metrics.reset()
+    limiter.reset()
+    yield collector
+    limiter.reset()
+    if hasattr(app.state, "collector"):
+        delattr(app.state, "collector")
+
+
+@pytest.fixture
+def auth_headers():
+    """Bearer токен доступа (без БД)."""
+    return {"Authorization": f"Bearer {token_signer.issue('testuser')}"}
+
+
+def test_etag_matches_list_weak_and_wildcard():
+    """Тест: If-None-Match со списком, слабыми ETag и "*"."""
+    assert etag_matches('"a-1"', '"a-1"')
+    assert etag_matches('"x", W/"a-1"', '"a-1"')
+    assert etag_matches("*", '"a-1"')
+    assert not etag_matches('"a-2"', '"a-1"')
+
+
+def test_not_modified_since_second_precision():
+    """Тест: If-Modified-Since сравнивается с точностью до секунды."""
+    last_modified = datetime(2026, 10, 19, 12, 0, 0, 500000, tzinfo=UTC)
+
+    assert not_modified_since("Mon, 19 Oct 2026 12:00:00 GMT", last_modified)
+    assert not not_modified_since("Mon, 19 Oct 2026 11:59:59 GMT", last_modified)
+    assert not not_modified_since("not a date", last_modified)
+
+
+@pytest.mark.asyncio
+async def test_stats_response_has_cache_headers(collector, auth_headers):
+    """Тест: 200 ответ содержит ETag по содержимому, Last-Modified и Cache-Control."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+
+    entry = collector.cache.peek("stats:day")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == entry.etag
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert "last-modified" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_stats_response_body_from_cache(collector, auth_headers):
+    """Тест: тело ответа - байты, закодированные при загрузке в кеш."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+        second = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+
+    entry = collector.cache.peek("stats:day")
+    assert first.headers["content-type"] == "application/json"
+    assert first.content == entry.body
+    assert second.content == entry.body
+    assert first.json()["summary"]["total_messages"] == 1
+
+
+def test_encode_stats_matches_pydantic_json():
+    """Тест: orjson кодирует так же, как pydantic (datetime UTC с "Z")."""
+    moment = datetime(2026, 10, 19, 12, 30, 0, 250000, tzinfo=UTC)
+    stats = StatsResponse(
+        summary=Summary(total_users=2, total_messages=5, active_dialogs=1),
+        activity_timeline=[ActivityPoint(timestamp=moment, message_count=5, active_users=1)],
+        recent_dialogs=[
+            RecentDialog(user_id=123, message_count=5, last_message_at=moment, duration_minutes=3)
+        ],
+        top_users=[],
+    )
+
+    body = encode_stats(stats)
+
+    assert b'"2026-10-19T12:30:00.250000Z"' in body
+    assert StatsResponse.model_validate_json(body) == stats
+    assert body == stats.model_dump_json().encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_returns_304(collector, auth_headers):
+    """Тест: If-None-Match с текущим ETag - 304 без тела, 304 учтён в метриках."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+        etag = first.headers["etag"]
+
+        second = await client.get(
+            "/api/v1/stats?period=day", headers={**auth_headers, "If-None-Match": etag}
+        )
+        metrics = await client.get("/api/v1/stats/metrics", headers=auth_headers)
+
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert collector.loads == 1
+
+    data = metrics.json()
+    assert data["requests"] == 2
+    assert data["not_modified"] == 1
+    assert data["not_modified_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_new_cache_version_returns_200(collector, auth_headers):
+    """Тест: после загрузки новой статистики старый ETag не совпадает."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+        collector.cache.invalidate()
+
+        second = await client.get(
+            "/api/v1/stats?period=day",
+            headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+        )
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["summary"]["total_messages"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reload_with_same_data_returns_304(collector, auth_headers, monkeypatch):
+    """Тест: ETag по содержимому - повторная загрузка тех же данных отдаёт 304."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+        collector.cache.invalidate()
+        # Данные в БД не изменились
+        monkeypatch.setattr(collector, "loads", 0)
+
+        second = await client.get(
+            "/api/v1/stats?period=day",
+            headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+        )
+
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["last-modified"] == first.headers["last-modified"]
+
+
+@pytest.mark.asyncio
+async def test_if_modified_since_without_etag(collector, auth_headers):
+    """Тест: без If-None-Match учитывается If-Modified-Since."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/v1/stats?period=day", headers=auth_headers)
+
+        second = await client.get(
+            "/api/v1/stats?period=day",
+            headers={**auth_headers, "If-Modified-Since": first.headers["last-modified"]},
+        )
+
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_default_etag_from_content():
+    """Тест: collector без кеша получает ETag по содержимому ответа."""
+
+    class FixedCollector(StatCollector):
+        async def get_stats(self, period):
+            return StatsResponse(
+                summary=Summary(total_users=1, total_messages=1, active_dialogs=1),
+                activity_timeline=[],
+                recent_dialogs=[],
+                top_users=[],
+            )
+
+    fixed = FixedCollector()
+    first: CacheEntry[StatsResponse] = await fixed.get_stats_entry("day")
+    second = await fixed.get_stats_entry("day")
+
+    assert first.etag == second.etag
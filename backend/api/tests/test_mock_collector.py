@@ -170,3 +170,15 @@ class TestMockStatCollector:
         # Десериализация работает
         deserialized = StatsResponse.model_validate_json(json_data)
         assert deserialized.summary.total_users == result.summary.total_users
+
+    @pytest.mark.asyncio
+    async def test_llm_usage(self, collector: MockStatCollector) -> None:
+        """Тест: генерация статистики запросов к LLM."""
+        result = await collector.get_stats("day")
+
+        assert result.llm_usage is not None
+        usage = result.llm_usage
+        assert usage.total_requests == sum(model.requests for model in usage.by_model)
+        assert usage.latency_p50_ms <= usage.latency_p95_ms <= usage.latency_p99_ms
+        assert 0 <= usage.fallback_rate <= 1
+        assert 0 <= usage.error_rate <= 1
@@ -12,12 +12,14 @@ class MockApiUser:
     """Mock ApiUser class for testing."""
 
     # Class attributes (SQLAlchemy column descriptors)
+    id = MagicMock()  # noqa: F811
     username = MagicMock()  # noqa: F811
     hashed_password = MagicMock()  # noqa: F811
     is_active = MagicMock()  # noqa: F811
 
     def __init__(self, username: str, hashed_password: str, is_active: bool = True):
         """Initialize mock user with credentials."""
+        self.id = 1  # noqa: F811
         self.username = username  # noqa: F811
         self.hashed_password = hashed_password  # noqa: F811
         self.is_active = is_active  # noqa: F811
@@ -30,7 +32,9 @@ mock_models.ApiUser = MockApiUser
 sys.modules["models"] = mock_models
 
 from src.app import app  # noqa: E402
-from src.utils.auth import hash_password  # noqa: E402
+from src.middlewares.rate_limit import limiter  # noqa: E402
+from src.stats.mock_collector import MockStatCollector  # noqa: E402
+from src.utils.auth import hash_password, verify_password  # noqa: E402
 
 
 @pytest.fixture
@@ -76,15 +80,7 @@ def mock_app_state(mock_db_session, mock_api_user_model):
     app.state.db = mock_db
 
     # Mock collector
-    mock_collector = MagicMock()
-    mock_stats_response = {
-        "summary": {"total_users": 10, "total_messages": 100, "active_dialogs": 5},
-        "activity_timeline": [],
-        "recent_dialogs": [],
-        "top_users": [],
-    }
-    mock_collector.get_stats = AsyncMock(return_value=mock_stats_response)
-    app.state.collector = mock_collector
+    app.state.collector = MockStatCollector(seed=42)
 
     # Mock config
     mock_config = MagicMock()
@@ -179,3 +175,30 @@ async def test_rate_limit_response_format(mock_app_state, mock_db_session):
                 data = response.json()
                 assert "detail" in data or "error" in data
                 break
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limited(mock_app_state, mock_db_session):
+    """Тест: попытки входа ограничены, после лимита bcrypt не выполняется."""
+    test_user = MockApiUser("testuser", hash_password("testpassword123"), is_active=True)
+    mock_db_session.execute.return_value = mock_db_session.create_mock_result(test_user)
+    limiter.reset()
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            with patch("src.utils.auth.verify_password", wraps=verify_password) as verify:
+                codes = [
+                    (
+                        await client.post(
+                            "/api/v1/auth/login",
+                            json={"username": "testuser", "password": f"guess-{i}"},
+                        )
+                    ).status_code
+                    for i in range(12)
+                ]
+    finally:
+        limiter.reset()
+
+    assert codes[:10] == [status.HTTP_401_UNAUTHORIZED] * 10
+    assert codes[10:] == [status.HTTP_429_TOO_MANY_REQUESTS] * 2
+    assert verify.call_count == 10
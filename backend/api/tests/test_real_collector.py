@@ -0,0 +1,165 @@
+"""Тесты для RealStatCollector без PostgreSQL (запросы подменены)."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.stats.models import LLMUsageStats, Summary
+from src.stats.real_collector import RealStatCollector
+
+QUERY_LATENCY = 0.1
+
+
+class FakeDatabase:
+    """Database, выдающая отдельную сессию на каждый вызов session()."""
+
+    def __init__(self) -> None:
+        """Инициализация счётчиков."""
+        self.sessions: list[Any] = []
+        self.open_sessions = 0
+        self.peak_open_sessions = 0
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Any]:
+        """Отдельная сессия (соединение пула)."""
+        session = MagicMock()
+        self.sessions.append(session)
+        self.open_sessions += 1
+        self.peak_open_sessions = max(self.peak_open_sessions, self.open_sessions)
+        try:
+            yield session
+        finally:
+            self.open_sessions -= 1
+
+
+class TestRealStatCollector:
+    """Тесты выполнения запросов RealStatCollector."""
+
+    @pytest.fixture
+    def collector(self, monkeypatch: pytest.MonkeyPatch) -> RealStatCollector:
+        """Фикстура: collector с запросами, каждый из которых длится QUERY_LATENCY."""
+        collector = RealStatCollector(FakeDatabase())  # type: ignore[arg-type]
+        monkeypatch.setattr(collector.rollups, "refresh", AsyncMock(return_value=0))
+        results: dict[str, Any] = {
+            "_get_summary": Summary(total_users=1, total_messages=2, active_dialogs=1),
+            "_get_activity_timeline": [],
+            "_get_recent_dialogs": [],
+            "_get_top_users": [],
+            "_get_llm_usage": LLMUsageStats(
+                total_requests=0,
+                latency_p50_ms=0,
+                latency_p95_ms=0,
+                latency_p99_ms=0,
+                fallback_rate=0.0,
+                error_rate=0.0,
+                by_model=[],
+            ),
+        }
+        for name, result in results.items():
+
+            async def query(session: Any, *args: Any, _result: Any = result) -> Any:
+                assert session is not None
+                await asyncio.sleep(QUERY_LATENCY)
+                return _result
+
+            monkeypatch.setattr(collector, name, query)
+        return collector
+
+    @pytest.mark.asyncio
+    async def test_queries_run_concurrently(self, collector: RealStatCollector) -> None:
+        """Тест: задержка cache miss - самый медленный запрос, а не сумма."""
+        start = time.perf_counter()
+        result = await collector.get_stats("month")
+        elapsed = time.perf_counter() - start
+
+        assert result.summary.total_messages == 2
+        assert elapsed < QUERY_LATENCY * 2.5
+        # Каждая группа запросов - на своём соединении
+        db = collector.db
+        assert len(db.sessions) == 5  # type: ignore[attr-defined]
+        assert db.peak_open_sessions == 5  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_rollups_refreshed_on_cache_miss_only(self, collector: RealStatCollector) -> None:
+        """Тест: агрегаты обновляются перед запросом к БД, cache hit их не трогает."""
+        refresh = collector.rollups.refresh
+
+        await collector.get_stats("day")
+        await collector.get_stats("day")
+
+        refresh.assert_awaited_once()  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_rollup_refresh_failure_serves_previous_rollups(
+        self, collector: RealStatCollector, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Тест: ошибка обновления агрегатов не прерывает запрос статистики."""
+        monkeypatch.setattr(
+            collector.rollups, "refresh", AsyncMock(side_effect=ConnectionError("db down"))
+        )
+
+        result = await collector.get_stats("week")
+
+        assert result.summary.total_messages == 2
+
+    def test_rollup_filter_includes_whole_start_hour(self) -> None:
+        """Тест: период расширяется до начала часа, в который попадает start_time."""
+        start = datetime(2026, 10, 19, 13, 45, 12, tzinfo=UTC)
+        end = datetime(2026, 10, 20, 13, 45, 12, tzinfo=UTC)
+
+        lower, upper = RealStatCollector._rollup_filter((start, end))
+
+        assert lower.right.value == datetime(2026, 10, 19, 13, 0, tzinfo=UTC)
+        assert upper.right.value == end
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self, collector: RealStatCollector) -> None:
+        """Тест: одновременные промахи по периоду выполняют один запрос к БД."""
+        results = await asyncio.gather(*(collector.get_stats("day") for _ in range(20)))
+
+        assert len({id(result) for result in results}) == 1
+        assert len(collector.db.sessions) == 5  # type: ignore[attr-defined]
+        collector.rollups.refresh.assert_awaited_once()  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_failed_query_cancels_others_before_retry(
+        self, collector: RealStatCollector, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Тест: ошибка одной группы отменяет остальные и освобождает их соединения."""
+        db = collector.db
+        cancelled: list[str] = []
+        open_on_failure: list[int] = []
+
+        async def failing(session: Any, *args: Any) -> Any:
+            await asyncio.sleep(QUERY_LATENCY / 10)
+            raise OperationalError("SELECT 1", {}, ConnectionError("db down"))
+
+        async def slow(session: Any, *args: Any) -> Any:
+            try:
+                await asyncio.sleep(QUERY_LATENCY * 10)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        fetch = collector._fetch_stats_from_db.retry_with(  # type: ignore[attr-defined]
+            wait=lambda _: 0,
+            after=lambda _: open_on_failure.append(db.open_sessions),  # type: ignore[attr-defined]
+        )
+        monkeypatch.setattr(collector, "_get_summary", failing)
+        monkeypatch.setattr(collector, "_get_top_users", slow)
+
+        with pytest.raises(OperationalError):
+            await fetch(collector, "day")
+
+        # Каждая из 3 попыток отменила медленный запрос и закрыла все сессии
+        assert cancelled == ["slow"] * 3
+        assert open_on_failure == [0, 0, 0]
+        assert db.open_sessions == 0  # type: ignore[attr-defined]
+        assert len(db.sessions) == 15  # type: ignore[attr-defined]
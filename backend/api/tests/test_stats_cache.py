@@ -0,0 +1,292 @@
+"""Тесты для StatsCache (single-flight, stale-while-revalidate, refresh-ahead)."""
+
+import asyncio
+
+import pytest
+
+from src.stats.cache import StatsCache, content_etag
+
+
+class FakeClock:
+    """Управляемые монотонные часы."""
+
+    def __init__(self) -> None:
+        """Инициализация времени."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Текущее время."""
+        return self.now
+
+
+class Loader:
+    """Загрузка значения с задержкой и счётчиком вызовов."""
+
+    def __init__(self, latency: float = 0.01) -> None:
+        """
+        Args:
+            latency: Задержка загрузки в секундах
+        """
+        self.latency = latency
+        self.calls = 0
+        self.error: Exception | None = None
+
+    async def __call__(self) -> int:
+        """Загружает следующее значение."""
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return self.calls
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Фикстура: управляемые часы."""
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock: FakeClock) -> StatsCache[int]:
+    """Фикстура: кеш с TTL 60s, stale 300s и refresh-ahead 10s."""
+    return StatsCache(ttl=60, maxsize=10, stale_ttl=300, refresh_ahead=10, clock=clock)
+
+
+async def _settle() -> None:
+    """Даёт завершиться фоновым загрузкам."""
+    await asyncio.sleep(0.05)
+
+
+class TestSingleFlight:
+    """Тесты объединения одновременных промахов."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self, cache: StatsCache[int]) -> None:
+        """Тест: 50 одновременных промахов - одна загрузка."""
+        loader = Loader()
+
+        entries = await asyncio.gather(*(cache.get("stats:day", loader) for _ in range(50)))
+
+        assert loader.calls == 1
+        assert {entry.value for entry in entries} == {1}
+        assert cache.misses == 50
+        assert cache.coalesced == 49
+
+    @pytest.mark.asyncio
+    async def test_keys_load_independently(self, cache: StatsCache[int]) -> None:
+        """Тест: разные ключи загружаются отдельно."""
+        day, week = Loader(), Loader()
+
+        await asyncio.gather(cache.get("stats:day", day), cache.get("stats:week", week))
+
+        assert day.calls == 1
+        assert week.calls == 1
+        assert len(cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_error_propagates_to_all_waiters(self, cache: StatsCache[int]) -> None:
+        """Тест: ошибка загрузки без значения в кеше получают все ожидающие."""
+        loader = Loader()
+        loader.error = ConnectionError("db down")
+
+        results = await asyncio.gather(
+            *(cache.get("stats:day", loader) for _ in range(3)), return_exceptions=True
+        )
+
+        assert loader.calls == 1
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert cache.errors == 1
+        assert cache.peek("stats:day") is None
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_load(self, cache: StatsCache[int]) -> None:
+        """Тест: отмена одного запроса не отменяет загрузку для остальных."""
+        loader = Loader(latency=0.05)
+        first = asyncio.create_task(cache.get("stats:day", loader))
+        second = asyncio.create_task(cache.get("stats:day", loader))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        entry = await second
+
+        assert entry.value == 1
+        assert loader.calls == 1
+
+
+class TestStaleWhileRevalidate:
+    """Тесты отдачи устаревшего значения с фоновой загрузкой."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_value_served_without_load(
+        self, cache: StatsCache[int], clock: FakeClock
+    ) -> None:
+        """Тест: до refresh-ahead значение отдаётся без загрузки."""
+        loader = Loader()
+        await cache.get("stats:day", loader)
+
+        clock.now = 30
+        entry = await cache.get("stats:day", loader)
+        await _settle()
+
+        assert entry.value == 1
+        assert loader.calls == 1
+        assert cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(
+        self, cache: StatsCache[int], clock: FakeClock
+    ) -> None:
+        """Тест: после TTL запросы сразу получают старое значение, загрузка одна."""
+        loader = Loader()
+        first = await cache.get("stats:day", loader)
+
+        clock.now = 100
+        stale = await asyncio.gather(*(cache.get("stats:day", loader) for _ in range(10)))
+        await _settle()
+
+        assert {entry.value for entry in stale} == {1}
+        assert cache.stale_hits == 10
+        assert loader.calls == 2
+
+        fresh = await cache.get("stats:day", loader)
+        assert fresh.value == 2
+        assert fresh.version > first.version
+
+    @pytest.mark.asyncio
+    async def test_refresh_ahead_before_expiry(
+        self, cache: StatsCache[int], clock: FakeClock
+    ) -> None:
+        """Тест: за refresh_ahead до истечения TTL значение обновляется в фоне."""
+        loader = Loader()
+        await cache.get("stats:day", loader)
+
+        clock.now = 55
+        entry = await cache.get("stats:day", loader)
+        await _settle()
+
+        assert entry.value == 1
+        assert cache.hits == 1
+        assert loader.calls == 2
+        assert cache.peek("stats:day").value == 2  # type: ignore[union-attr]
+
+    @pytest.mark.asyncio
+    async def test_background_error_keeps_stale_value(
+        self, cache: StatsCache[int], clock: FakeClock
+    ) -> None:
+        """Тест: ошибка фоновой загрузки не удаляет значение."""
+        loader = Loader()
+        await cache.get("stats:day", loader)
+
+        loader.error = ConnectionError("db down")
+        clock.now = 100
+        entry = await cache.get("stats:day", loader)
+        await _settle()
+
+        assert entry.value == 1
+        assert cache.errors == 1
+        assert (await cache.get("stats:day", loader)).value == 1
+
+    @pytest.mark.asyncio
+    async def test_value_older_than_stale_ttl_is_reloaded(
+        self, cache: StatsCache[int], clock: FakeClock
+    ) -> None:
+        """Тест: после TTL + stale_ttl запрос ждёт загрузку."""
+        loader = Loader()
+        await cache.get("stats:day", loader)
+
+        clock.now = 400
+        entry = await cache.get("stats:day", loader)
+
+        assert entry.value == 2
+        assert cache.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_in_background(self, cache: StatsCache[int]) -> None:
+        """Тест: прогрев загружает значение, первый запрос получает его без ожидания."""
+        loader = Loader()
+
+        cache.refresh_in_background("stats:day", loader)
+        await _settle()
+        entry = await cache.get("stats:day", loader)
+
+        assert entry.value == 1
+        assert loader.calls == 1
+        assert cache.hits == 1
+
+
+class TestEncoder:
+    """Тесты кодирования значения при загрузке."""
+
+    @pytest.mark.asyncio
+    async def test_body_encoded_once_per_load(self, clock: FakeClock) -> None:
+        """Тест: encoder вызывается на загрузку, попадания отдают те же байты."""
+        encoded: list[int] = []
+
+        def encoder(value: int) -> bytes:
+            encoded.append(value)
+            return str(value).encode()
+
+        cache: StatsCache[int] = StatsCache(ttl=60, encoder=encoder, clock=clock)
+        loader = Loader(latency=0)
+
+        first = await cache.get("stats:day", loader)
+        second = await cache.get("stats:day", loader)
+
+        assert encoded == [1]
+        assert first.body == b"1"
+        assert second.body is first.body
+
+    @pytest.mark.asyncio
+    async def test_encoder_error_counts_as_load_error(self, clock: FakeClock) -> None:
+        """Тест: ошибка encoder - ошибка загрузки, значение не сохраняется."""
+
+        def encoder(value: int) -> bytes:
+            raise TypeError("not serializable")
+
+        cache: StatsCache[int] = StatsCache(ttl=60, encoder=encoder, clock=clock)
+
+        with pytest.raises(TypeError):
+            await cache.get("stats:day", Loader(latency=0))
+
+        assert cache.errors == 1
+        assert cache.peek("stats:day") is None
+
+    @pytest.mark.asyncio
+    async def test_etag_from_body_stable_across_reloads(self, clock: FakeClock) -> None:
+        """Тест: ETag по телу ответа - те же данные сохраняют ETag и время изменения."""
+        values = iter([1, 1, 2])
+
+        async def loader() -> int:
+            return next(values)
+
+        cache: StatsCache[int] = StatsCache(ttl=60, encoder=lambda v: str(v).encode(), clock=clock)
+        other: StatsCache[int] = StatsCache(ttl=60, encoder=lambda v: str(v).encode(), clock=clock)
+
+        first = await cache.get("stats:day", loader)
+        cache.invalidate()
+        same = await cache.get("stats:day", loader)
+        cache.invalidate()
+        changed = await cache.get("stats:day", loader)
+        # Другой процесс (экземпляр кеша) с теми же данными
+        elsewhere = await other.get("stats:day", lambda: asyncio.sleep(0, result=1))
+
+        assert same.version > first.version
+        assert same.etag == first.etag == content_etag(b"1")
+        assert elsewhere.etag == first.etag
+        assert changed.etag != first.etag
+        assert changed.updated_at >= first.updated_at
+
+
+class TestEviction:
+    """Тесты ограничения размера."""
+
+    @pytest.mark.asyncio
+    async def test_oldest_key_evicted(self, clock: FakeClock) -> None:
+        """Тест: при превышении maxsize удаляется самый давно загруженный ключ."""
+        cache: StatsCache[int] = StatsCache(ttl=60, maxsize=2, clock=clock)
+
+        for key in ("a", "b", "c"):
+            await cache.get(key, Loader(latency=0))
+
+        assert len(cache) == 2
+        assert cache.peek("a") is None
@@ -0,0 +1,161 @@
+"""Тесты для подписанных токенов доступа."""
+
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+from pydantic import ValidationError
+
+# Mock models module for initial import
+sys.path.insert(0, "/app/shared")
+if "models" not in sys.modules:
+    sys.modules["models"] = MagicMock()
+
+from src.app import app  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.middlewares.rate_limit import limiter  # noqa: E402
+from src.utils.tokens import (  # noqa: E402
+    ACCESS_TOKEN,
+    REFRESH_TOKEN,
+    TokenError,
+    TokenSigner,
+    _b64encode,
+)
+
+# Токены с не-ASCII символами в payload и в подписи
+NON_ASCII_TOKENS = ("ébc.def", "abc.d\xe9f", "abc.d€f")
+
+
+class FakeClock:
+    """Управляемые часы Unix."""
+
+    def __init__(self) -> None:
+        """Инициализация часов."""
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        """Текущее время."""
+        return self.now
+
+
+def test_issue_and_verify():
+    """Тест выпуска и проверки access токена."""
+    clock = FakeClock()
+    signer = TokenSigner(secret="secret", access_ttl=900, clock=clock)
+
+    claims = signer.verify(signer.issue("testuser"))
+
+    assert claims.username == "testuser"
+    assert claims.token_type == ACCESS_TOKEN
+    assert claims.expires_at == int(clock.now) + 900
+
+
+def test_expired_token_rejected():
+    """Тест: истёкший токен отклоняется."""
+    clock = FakeClock()
+    signer = TokenSigner(secret="secret", access_ttl=900, clock=clock)
+    token = signer.issue("testuser")
+
+    clock.now += 900
+
+    with pytest.raises(TokenError, match="expired"):
+        signer.verify(token)
+
+
+def test_token_type_checked():
+    """Тест: refresh токен не принимается как access и наоборот."""
+    signer = TokenSigner(secret="secret")
+
+    with pytest.raises(TokenError):
+        signer.verify(signer.issue("testuser", REFRESH_TOKEN), ACCESS_TOKEN)
+    with pytest.raises(TokenError):
+        signer.verify(signer.issue("testuser", ACCESS_TOKEN), REFRESH_TOKEN)
+    assert signer.verify(signer.issue("testuser", REFRESH_TOKEN), REFRESH_TOKEN)
+
+
+def test_tampered_token_rejected():
+    """Тест: изменённый payload и подпись другим ключом отклоняются."""
+    signer = TokenSigner(secret="secret")
+    other = TokenSigner(secret="other-secret")
+    payload, _, signature = signer.issue("testuser").partition(".")
+    forged_payload = other.issue("admin").partition(".")[0]
+
+    with pytest.raises(TokenError):
+        signer.verify(f"{forged_payload}.{signature}")
+    with pytest.raises(TokenError):
+        signer.verify(other.issue("testuser"))
+    for malformed in ("", "abc", f"{payload}.", f".{signature}", "a.b.c"):
+        with pytest.raises(TokenError):
+            signer.verify(malformed)
+
+
+def test_random_secret_per_signer():
+    """Тест: без секрета токены одного signer не принимаются другим."""
+    first = TokenSigner()
+    second = TokenSigner()
+
+    with pytest.raises(TokenError):
+        second.verify(first.issue("testuser"))
+
+
+def test_non_ascii_token_rejected():
+    """Тест: токен с не-ASCII символами - TokenError, а не UnicodeEncodeError/TypeError."""
+    signer = TokenSigner(secret="secret")
+
+    for token in NON_ASCII_TOKENS:
+        with pytest.raises(TokenError, match="Malformed"):
+            signer.verify(token)
+
+
+def test_signed_malformed_claims_rejected():
+    """Тест: подписанный payload с невалидным содержимым - TokenError."""
+    signer = TokenSigner(secret="secret")
+
+    for raw in (b"[]", b"\xff\xfe", b'{"sub":"a","typ":"access","iat":1e400,"exp":1}'):
+        payload = _b64encode(raw)
+        with pytest.raises(TokenError, match="Malformed"):
+            signer.verify(f"{payload}.{signer._sign(payload)}")
+
+
+@pytest.fixture
+def reset_limiter():
+    """Сброс счётчиков rate limit до и после теста."""
+    limiter.reset()
+    yield
+    limiter.reset()
+
+
+@pytest.mark.asyncio
+async def test_refresh_with_non_ascii_token_returns_401(reset_limiter):
+    """Тест: /auth/refresh с не-ASCII токеном возвращает 401."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for token in NON_ASCII_TOKENS:
+            response = await client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_stats_with_non_ascii_bearer_returns_401(reset_limiter):
+    """Тест: /stats с не-ASCII Bearer токеном возвращает 401."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # Заголовок передаётся байтами latin-1 (как от произвольного клиента)
+        response = await client.get(
+            "/api/v1/stats?period=day",
+            headers={"Authorization": "Bearer abc.d\xe9f".encode("latin-1")},
+        )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Invalid token"
+
+
+def test_real_mode_requires_token_secret():
+    """Тест: в real режиме без AUTH_TOKEN_SECRET конфигурация не загружается."""
+    with pytest.raises(ValidationError, match="AUTH_TOKEN_SECRET"):
+        Config(_env_file=None, COLLECTOR_MODE="real", AUTH_TOKEN_SECRET="")
+
+    assert Config(_env_file=None, COLLECTOR_MODE="real", AUTH_TOKEN_SECRET="key").AUTH_TOKEN_SECRET
+    assert (
+        Config(_env_file=None, COLLECTOR_MODE="mock", AUTH_TOKEN_SECRET="").COLLECTOR_MODE == "mock"
+    )
@@ -0,0 +1,66 @@
+"""Add hourly message rollups, rollup watermarks and messages.inserted_at
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f7a8b9c0d1"
+down_revision: str | Sequence[str] | None = "d5e6f7a8b9c0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() вычисляется один раз для существующих строк: ADD COLUMN без перезаписи таблицы
+    op.add_column(
+        "messages",
+        sa.Column(
+            "inserted_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_index(op.f("ix_messages_inserted_at"), "messages", ["inserted_at"], unique=False)
+    op.create_table(
+        "message_rollups_hourly",
+        sa.Column("bucket", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("chars", sa.BigInteger(), nullable=False),
+        sa.Column("first_message_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_message_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bucket", "user_id"),
+    )
+    op.create_index(
+        op.f("ix_message_rollups_hourly_user_id"),
+        "message_rollups_hourly",
+        ["user_id"],
+        unique=False,
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("watermark", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rollup_watermarks")
+    op.drop_index(op.f("ix_message_rollups_hourly_user_id"), table_name="message_rollups_hourly")
+    op.drop_table("message_rollups_hourly")
+    op.drop_index(op.f("ix_messages_inserted_at"), table_name="messages")
+    op.drop_column("messages", "inserted_at")
@@ -0,0 +1 @@
+"""Скрипты для локального тестирования бота."""
@@ -0,0 +1,226 @@
+"""Бенчмарк RateLimitMiddleware (GCRA) на большом количестве пользователей.
+
+Сравнивает GCRA с прежним алгоритмом (список timestamps на пользователя):
+пропускная способность проверки, память на пользователя и удаление
+состояния неактивных пользователей.
+
+Запуск:
+    python -m scripts.bench_rate_limit --users 1000000
+"""
+
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.middlewares.rate_limit import RateLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingLogLimiter:
+    """Прежний алгоритм: список timestamps на пользователя, без удаления пользователей."""
+
+    def __init__(self, rate: int, per: float) -> None:
+        """
+        Args:
+            rate: Максимальное количество запросов
+            per: Период времени в секундах
+        """
+        self.rate = rate
+        self.per = per
+        self.user_requests: dict[int, list[float]] = defaultdict(list)
+
+    def check(self, user_id: int, now: float) -> float:
+        """
+        Проверяет лимит и учитывает запрос.
+
+        Args:
+            user_id: ID пользователя
+            now: Текущее время
+
+        Returns:
+            0.0 если запрос разрешён, иначе время ожидания
+        """
+        timestamps = self.user_requests[user_id]
+        timestamps[:] = [ts for ts in timestamps if now - ts < self.per]
+        if len(timestamps) >= self.rate:
+            return self.per - (now - timestamps[0])
+        timestamps.append(now)
+        return 0.0
+
+    def __len__(self) -> int:
+        """Количество пользователей в памяти."""
+        return len(self.user_requests)
+
+
+class GCRALimiter:
+    """Адаптер RateLimitMiddleware с управляемыми часами."""
+
+    def __init__(self, rate: int, per: float) -> None:
+        """
+        Args:
+            rate: Максимальное количество запросов
+            per: Период времени в секундах
+        """
+        self.now = 0.0
+        self.middleware = RateLimitMiddleware(rate=rate, per=per, clock=lambda: self.now)
+
+    def check(self, user_id: int, now: float) -> float:
+        """
+        Проверяет лимит и учитывает запрос.
+
+        Args:
+            user_id: ID пользователя
+            now: Текущее время
+
+        Returns:
+            0.0 если запрос разрешён, иначе время ожидания
+        """
+        self.now = now
+        return self.middleware.check(user_id, now)
+
+    def __len__(self) -> int:
+        """Количество пользователей в памяти."""
+        return len(self.middleware.user_tat)
+
+
+@dataclass
+class BenchResult:
+    """Результаты бенчмарка одного алгоритма."""
+
+    name: str
+    checks_per_second: float
+    bytes_per_user: float
+    users_after_first_wave: int
+    users_after_second_wave: int
+    hot_user_checks_per_second: float
+
+
+def run_waves(limiter: GCRALimiter | SlidingLogLimiter, users: int, per: float) -> float:
+    """
+    Две волны по users различных пользователей с интервалом больше периода.
+
+    Args:
+        limiter: Проверяемый limiter
+        users: Количество пользователей в волне
+        per: Период лимита
+
+    Returns:
+        Время первой волны в секундах
+    """
+    check = limiter.check
+    # Волна растянута на половину периода (пользователи приходят постепенно)
+    step = per / 2 / users
+
+    start = time.perf_counter()
+    for user_id in range(users):
+        check(user_id, user_id * step)
+    elapsed = time.perf_counter() - start
+
+    offset = per * 2
+    for user_id in range(users, 2 * users):
+        check(user_id, offset + (user_id - users) * step)
+    return elapsed
+
+
+def measure(
+    name: str,
+    factory: Callable[[], GCRALimiter | SlidingLogLimiter],
+    users: int,
+    per: float,
+) -> BenchResult:
+    """
+    Измеряет скорость, память и удаление неактивных пользователей.
+
+    Args:
+        name: Название алгоритма
+        factory: Создание limiter
+        users: Количество пользователей в волне
+        per: Период лимита
+
+    Returns:
+        Результаты бенчмарка
+    """
+    limiter = factory()
+    elapsed = run_waves(limiter, users, per)
+    after_second = len(limiter)
+
+    # Память первой волны (отдельный прогон: tracemalloc замедляет выполнение)
+    limiter = factory()
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    step = per / 2 / users
+    for user_id in range(users):
+        limiter.check(user_id, user_id * step)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after_first = len(limiter)
+
+    # Один пользователь, отправляющий сообщения непрерывно (спам)
+    hot = factory()
+    hot_checks = min(users, 200_000)
+    start = time.perf_counter()
+    for index in range(hot_checks):
+        hot.check(1, index * 0.001)
+    hot_elapsed = time.perf_counter() - start
+
+    return BenchResult(
+        name=name,
+        checks_per_second=users / elapsed,
+        bytes_per_user=(after - before) / users,
+        users_after_first_wave=after_first,
+        users_after_second_wave=after_second,
+        hot_user_checks_per_second=hot_checks / hot_elapsed,
+    )
+
+
+def run_benchmark(users: int, rate: int = 10, per: float = 60.0) -> list[BenchResult]:
+    """
+    Запускает бенчмарк GCRA и прежнего алгоритма.
+
+    Args:
+        users: Количество различных пользователей в волне
+        rate: Лимит запросов
+        per: Период лимита в секундах
+
+    Returns:
+        Результаты для каждого алгоритма
+    """
+    return [
+        measure("gcra", lambda: GCRALimiter(rate, per), users, per),
+        measure("sliding-log (old)", lambda: SlidingLogLimiter(rate, per), users, per),
+    ]
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк rate limiter")
+    parser.add_argument("--users", type=int, default=1_000_000, help="Пользователей в волне")
+    parser.add_argument("--rate", type=int, default=10, help="Запросов на период")
+    parser.add_argument("--per", type=float, default=60.0, help="Период в секундах")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Лог инициализации middleware не нужен в отчёте
+    logging.getLogger("src.middlewares.rate_limit").setLevel(logging.WARNING)
+
+    logger.info(f"Users per wave: {args.users:,}, limit: {args.rate}/{args.per}s")
+    logger.info(
+        f"{'algorithm':<20}{'checks/s':>14}{'bytes/user':>12}"
+        f"{'users@1':>12}{'users@2':>12}{'hot checks/s':>15}"
+    )
+    for result in run_benchmark(args.users, args.rate, args.per):
+        logger.info(
+            f"{result.name:<20}{result.checks_per_second:>14,.0f}"
+            f"{result.bytes_per_user:>12.0f}{result.users_after_first_wave:>12,}"
+            f"{result.users_after_second_wave:>12,}{result.hot_user_checks_per_second:>15,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""Локальный OpenAI-совместимый mock LLM сервер для нагрузочного тестирования.
+
+Эмулирует POST /v1/chat/completions (обычный и streaming ответ) с настраиваемым
+распределением задержки, скоростью генерации токенов и инъекцией ошибок
+(429 с Retry-After, 500, зависание до timeout клиента).
+
+Запуск:
+    python -m scripts.mock_llm_server --port 8080 --latency-ms 800 --error-429-rate 0.05
+
+Бот направляется на сервер через OPENROUTER_BASE_URL=http://localhost:8080/v1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Заголовок для принудительной ошибки в конкретном запросе (429, 500, timeout)
+FAULT_HEADER = "X-Mock-Fault"
+
+
+@dataclass
+class MockLLMSettings:
+    """
+    Настройки поведения mock сервера.
+
+    Attributes:
+        latency_distribution: Распределение задержки до первого токена
+        latency_ms: Базовая задержка (среднее/медиана) в миллисекундах
+        latency_jitter_ms: Разброс задержки (ширина для uniform, sigma для normal)
+        model_latency_ms: Базовая задержка для отдельных моделей
+        tokens_per_second: Скорость генерации токенов ответа
+        completion_tokens: Количество токенов в ответе
+        error_429_rate: Доля ответов 429 (rate limit)
+        error_500_rate: Доля ответов 500 (ошибка провайдера)
+        timeout_rate: Доля запросов, зависающих на hang_seconds
+        retry_after: Значение заголовка Retry-After для 429 (секунды)
+        hang_seconds: Длительность зависания при инъекции timeout
+        seed: Seed генератора случайных чисел (для воспроизводимости)
+    """
+
+    latency_distribution: str = "fixed"
+    latency_ms: float = 500.0
+    latency_jitter_ms: float = 100.0
+    model_latency_ms: dict[str, float] = field(default_factory=dict)
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 50
+    error_429_rate: float = 0.0
+    error_500_rate: float = 0.0
+    timeout_rate: float = 0.0
+    retry_after: float = 1.0
+    hang_seconds: float = 120.0
+    seed: int | None = None
+
+
+@dataclass
+class MockLLMStats:
+    """Счётчики обработанных сервером запросов."""
+
+    requests: int = 0
+    streamed: int = 0
+    errors_429: int = 0
+    errors_500: int = 0
+    timeouts: int = 0
+    by_model: dict[str, int] = field(default_factory=dict)
+
+
+class MockLLMServer:
+    """
+    OpenAI-совместимый mock сервер chat completions.
+
+    Отвечает за:
+    - Генерацию ответов в формате chat.completion и chat.completion.chunk (SSE)
+    - Эмуляцию задержки по заданному распределению и скорости генерации токенов
+    - Инъекцию ошибок 429/500/timeout (случайно по долям или по заголовку запроса)
+    - Подсчёт запросов для проверок в тестах
+    """
+
+    def __init__(self, settings: MockLLMSettings | None = None) -> None:
+        """
+        Инициализация mock сервера.
+
+        Args:
+            settings: Настройки поведения (по умолчанию MockLLMSettings())
+        """
+        self.settings = settings or MockLLMSettings()
+        if self.settings.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Invalid latency distribution: {self.settings.latency_distribution}. "
+                f"Must be one of {LATENCY_DISTRIBUTIONS}"
+            )
+        self.stats = MockLLMStats()
+        self._random = random.Random(self.settings.seed)
+
+    def create_app(self) -> web.Application:
+        """
+        Создаёт aiohttp приложение с маршрутами OpenAI API.
+
+        Returns:
+            aiohttp Application
+        """
+        app = web.Application()
+        for prefix in ("/v1", "/api/v1"):
+            app.router.add_post(f"{prefix}/chat/completions", self.handle_chat_completions)
+            app.router.add_get(f"{prefix}/models", self.handle_models)
+        app.router.add_get("/mock/stats", self.handle_stats)
+        return app
+
+    def sample_latency(self, model: str) -> float:
+        """
+        Возвращает задержку до первого токена по заданному распределению.
+
+        Args:
+            model: Модель из запроса (для задержки конкретной модели)
+
+        Returns:
+            Задержка в секундах (не отрицательная)
+        """
+        base = self.settings.model_latency_ms.get(model, self.settings.latency_ms)
+        jitter = self.settings.latency_jitter_ms
+        distribution = self.settings.latency_distribution
+
+        if distribution == "uniform":
+            latency_ms = self._random.uniform(base - jitter / 2, base + jitter / 2)
+        elif distribution == "normal":
+            latency_ms = self._random.gauss(base, jitter)
+        elif distribution == "lognormal":
+            # Медиана = base, длинный хвост как у реальных LLM API
+            sigma = math.log1p(jitter / base) if base > 0 else 0.0
+            latency_ms = base * self._random.lognormvariate(0.0, sigma)
+        elif distribution == "exponential":
+            latency_ms = self._random.expovariate(1 / base) if base > 0 else 0.0
+        else:
+            latency_ms = base
+
+        return max(0.0, latency_ms) / 1000
+
+    def _pick_fault(self, request: web.Request) -> str | None:
+        """
+        Определяет, нужно ли инъецировать ошибку в запрос.
+
+        Args:
+            request: HTTP запрос
+
+        Returns:
+            "429", "500", "timeout" или None
+        """
+        forced = request.headers.get(FAULT_HEADER)
+        if forced:
+            return forced
+
+        roll = self._random.random()
+        for fault, rate in (
+            ("429", self.settings.error_429_rate),
+            ("500", self.settings.error_500_rate),
+            ("timeout", self.settings.timeout_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    async def handle_chat_completions(self, request: web.Request) -> web.StreamResponse:
+        """
+        Обработчик POST /v1/chat/completions.
+
+        Args:
+            request: HTTP запрос в формате OpenAI chat completions
+
+        Returns:
+            JSON ответ, SSE поток или ответ с ошибкой
+        """
+        body = await request.json()
+        model = body.get("model", "mock/model")
+        messages = body.get("messages", [])
+        stream = bool(body.get("stream", False))
+
+        self.stats.requests += 1
+        self.stats.by_model[model] = self.stats.by_model.get(model, 0) + 1
+
+        fault = self._pick_fault(request)
+        if fault == "429":
+            self.stats.errors_429 += 1
+            return web.json_response(
+                {
+                    "error": {
+                        "message": "Rate limit exceeded (mock)",
+                        "type": "rate_limit",
+                        "code": 429,
+                    }
+                },
+                status=429,
+                headers={"Retry-After": f"{self.settings.retry_after:g}"},
+            )
+        if fault == "500":
+            self.stats.errors_500 += 1
+            return web.json_response(
+                {"error": {"message": "Internal server error (mock)", "type": "server_error"}},
+                status=500,
+            )
+        if fault == "timeout":
+            self.stats.timeouts += 1
+            await asyncio.sleep(self.settings.hang_seconds)
+            return web.json_response({"error": {"message": "Timed out (mock)"}}, status=504)
+
+        await asyncio.sleep(self.sample_latency(model))
+
+        prompt_tokens = self._count_prompt_tokens(messages)
+        completion_tokens = self.settings.completion_tokens
+
+        if stream:
+            self.stats.streamed += 1
+            return await self._stream_response(request, body, model, prompt_tokens)
+
+        # Без streaming ответ отдаётся целиком после генерации всех токенов
+        await asyncio.sleep(completion_tokens / self.settings.tokens_per_second)
+
+        return web.json_response(
+            {
+                "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": self._content(completion_tokens),
+                        },
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def _stream_response(
+        self, request: web.Request, body: dict[str, Any], model: str, prompt_tokens: int
+    ) -> web.StreamResponse:
+        """
+        Отправляет ответ потоком SSE (chat.completion.chunk) с заданной скоростью.
+
+        Args:
+            request: HTTP запрос
+            body: Тело запроса
+            model: Модель из запроса
+            prompt_tokens: Оценка токенов промпта
+
+        Returns:
+            Завершённый SSE поток
+        """
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        completion_tokens = self.settings.completion_tokens
+        token_interval = 1 / self.settings.tokens_per_second
+
+        async def send(delta: dict[str, Any], finish_reason: str | None = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        await send({"role": "assistant", "content": ""})
+        for i in range(completion_tokens):
+            await send({"content": f"tok{i} "})
+            await asyncio.sleep(token_interval)
+        await send({}, finish_reason="stop")
+
+        if body.get("stream_options", {}).get("include_usage"):
+            usage_chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+            await response.write(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def handle_models(self, _request: web.Request) -> web.Response:
+        """
+        Обработчик GET /v1/models.
+
+        Returns:
+            Список моделей, для которых настроена задержка
+        """
+        models = list(self.settings.model_latency_ms) or ["mock/model"]
+        return web.json_response(
+            {"object": "list", "data": [{"id": model, "object": "model"} for model in models]}
+        )
+
+    async def handle_stats(self, _request: web.Request) -> web.Response:
+        """
+        Обработчик GET /mock/stats (счётчики запросов).
+
+        Returns:
+            JSON со статистикой сервера
+        """
+        return web.json_response(self.stats.__dict__)
+
+    @staticmethod
+    def _count_prompt_tokens(messages: list[dict[str, Any]]) -> int:
+        """
+        Оценивает токены промпта (~4 символа на токен).
+
+        Args:
+            messages: Сообщения из запроса
+
+        Returns:
+            Оценка количества токенов
+        """
+        chars = 0
+        for message in messages:
+            content = message.get("content", "")
+            if isinstance(content, list):
+                chars += sum(len(part.get("text", "")) for part in content)
+            else:
+                chars += len(str(content))
+        return max(1, chars // 4)
+
+    @staticmethod
+    def _content(completion_tokens: int) -> str:
+        """
+        Генерирует текст ответа из заданного количества токенов.
+
+        Args:
+            completion_tokens: Количество токенов
+
+        Returns:
+            Текст ответа
+        """
+        return " ".join(f"tok{i}" for i in range(completion_tokens))
+
+
+def parse_model_latency(values: list[str]) -> dict[str, float]:
+    """
+    Разбирает аргументы --model-latency вида "model=ms".
+
+    Args:
+        values: Значения аргумента
+
+    Returns:
+        Словарь {модель: задержка в мс}
+    """
+    result: dict[str, float] = {}
+    for value in values:
+        model, _, latency = value.rpartition("=")
+        if not model:
+            raise argparse.ArgumentTypeError(f"Invalid --model-latency value: {value}")
+        result[model] = float(latency)
+    return result
+
+
+def main() -> None:
+    """Главная функция для запуска mock сервера."""
+    parser = argparse.ArgumentParser(description="OpenAI-совместимый mock LLM сервер")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Адрес (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Порт (default: 8080)")
+    parser.add_argument(
+        "--latency-distribution",
+        type=str,
+        default="fixed",
+        choices=LATENCY_DISTRIBUTIONS,
+        help="Распределение задержки до первого токена (default: fixed)",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=500.0, help="Базовая задержка, мс (default: 500)"
+    )
+    parser.add_argument(
+        "--latency-jitter-ms", type=float, default=100.0, help="Разброс задержки, мс (default: 100)"
+    )
+    parser.add_argument(
+        "--model-latency",
+        action="append",
+        default=[],
+        metavar="MODEL=MS",
+        help="Базовая задержка для модели (можно указать несколько раз)",
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=50.0, help="Скорость генерации (default: 50)"
+    )
+    parser.add_argument(
+        "--completion-tokens", type=int, default=50, help="Токенов в ответе (default: 50)"
+    )
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--error-500-rate", type=float, default=0.0, help="Доля ответов 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Доля зависших запросов")
+    parser.add_argument(
+        "--retry-after", type=float, default=1.0, help="Retry-After для 429, секунды (default: 1)"
+    )
+    parser.add_argument(
+        "--hang-seconds", type=float, default=120.0, help="Длительность зависания (default: 120)"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed для воспроизводимости")
+
+    args = parser.parse_args()
+
+    settings = MockLLMSettings(
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        model_latency_ms=parse_model_latency(args.model_latency),
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+        timeout_rate=args.timeout_rate,
+        retry_after=args.retry_after,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed,
+    )
+    server = MockLLMServer(settings)
+
+    logger.info(f"Mock LLM server: http://{args.host}:{args.port}/v1 ({settings})")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Супервизор фоновых задач бота (работа после ответа пользователю)."""
+
+import asyncio
+import logging
+from collections.abc import Coroutine, Hashable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    Супервизор фоновых задач.
+
+    Отвечает за:
+    - Запуск работы вне критического пути ответа (например, сохранение истории)
+    - Последовательное выполнение задач с одинаковым ключом (порядок записи
+      истории одного пользователя сохраняется)
+    - Логирование ошибок фоновых задач (исключения не теряются)
+    - Ожидание завершения задач при graceful shutdown
+    """
+
+    def __init__(self) -> None:
+        """Инициализация супервизора."""
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Последняя задача для ключа (следующая задача с тем же ключом ждёт её)
+        self._last_by_key: dict[Hashable, asyncio.Task[None]] = {}
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        """Количество незавершённых фоновых задач."""
+        return len(self._tasks)
+
+    def spawn(
+        self, name: str, coro: Coroutine[Any, Any, Any], key: Hashable | None = None
+    ) -> asyncio.Task[None]:
+        """
+        Запускает фоновую задачу под наблюдением супервизора.
+
+        Args:
+            name: Название задачи (для логов)
+            coro: Корутина для выполнения
+            key: Ключ упорядочивания (задачи с одним ключом выполняются по очереди)
+
+        Returns:
+            Созданная задача
+        """
+        previous = self._last_by_key.get(key) if key is not None else None
+        task = asyncio.create_task(self._run(name, coro, previous), name=name)
+        self._tasks.add(task)
+
+        if key is not None:
+            self._last_by_key[key] = task
+
+        def _done(finished: asyncio.Task[None]) -> None:
+            self._tasks.discard(finished)
+            if key is not None and self._last_by_key.get(key) is finished:
+                del self._last_by_key[key]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _run(
+        self,
+        name: str,
+        coro: Coroutine[Any, Any, Any],
+        previous: asyncio.Task[None] | None,
+    ) -> None:
+        """
+        Выполняет корутину после предыдущей задачи с тем же ключом.
+
+        Args:
+            name: Название задачи
+            coro: Корутина для выполнения
+            previous: Предыдущая задача с тем же ключом (опционально)
+        """
+        try:
+            if previous is not None:
+                await asyncio.wait({previous})
+            await coro
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background task {name} failed: {e}", exc_info=True)
+
+    async def wait_key(self, key: Hashable) -> None:
+        """
+        Ожидает завершения фоновых задач с ключом (например, перед чтением истории).
+
+        Args:
+            key: Ключ упорядочивания
+        """
+        task = self._last_by_key.get(key)
+        if task is not None:
+            await asyncio.wait({task})
+
+    async def wait_pending(self, timeout: float) -> int:
+        """
+        Ожидает завершения фоновых задач (для graceful shutdown).
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Количество задач, отменённых по timeout
+        """
+        if not self._tasks:
+            return 0
+
+        logger.info(f"Waiting for {len(self._tasks)} background tasks...")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Дожидаемся отмены, чтобы задачи не обращались к уже закрытым ресурсам
+            await asyncio.wait(pending)
+            logger.warning(f"Cancelled {len(pending)} unfinished background tasks")
+        return len(pending)
@@ -1,23 +1,65 @@
 """Основной класс Telegram-бота."""
 
 import asyncio
+import contextlib
 import logging
+from dataclasses import dataclass, field
 from functools import partial
 
 from aiogram import Bot as AiogramBot
 from aiogram import Dispatcher
 from aiogram.filters import Command
 
+from src.background import BackgroundTasks
 from src.config import Config
+from src.context_builder import ContextBuilder
 from src.database import Database
+from src.deadline import Deadline
 from src.handlers import commands, messages
 from src.llm_client import LLMClient
-from src.middlewares import RateLimitMiddleware
+from src.middlewares import (
+    ConcurrencyLimitMiddleware,
+    InFlightMiddleware,
+    RateLimitMiddleware,
+    TokenRateLimitMiddleware,
+)
+from src.outbound import OutboundQueue
+from src.shared_rate_limit import PostgresRateLimitBackend
 from src.storage import Storage
+from src.summarizer import ConversationSummarizer
+from src.telemetry import UsageRecorder
+from src.webhook import WebhookServer
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ShutdownReport:
+    """Работа, не завершённая за отведённое на остановку время."""
+
+    # Webhook обновления, принятые, но не обработанные
+    updates_abandoned: int = 0
+    # Обновления, обработка которых отменена (описания для логов)
+    handlers_abandoned: list[str] = field(default_factory=list)
+    # Сообщения, оставшиеся в очереди отправки
+    messages_unsent: int = 0
+    # Фоновые задачи сохранения истории
+    background_abandoned: int = 0
+    # Фоновые задачи сжатия диалогов
+    summaries_abandoned: int = 0
+
+    @property
+    def clean(self) -> bool:
+        """True если вся принятая работа завершена."""
+        return not (
+            self.updates_abandoned
+            or self.handlers_abandoned
+            or self.messages_unsent
+            or self.background_abandoned
+            or self.summaries_abandoned
+        )
+
+
 class Bot:
     """
     Основной класс Telegram-бота.
@@ -25,7 +67,7 @@ class Bot:
     Отвечает за:
     - Инициализацию aiogram Bot и Dispatcher
     - Регистрацию обработчиков команд и сообщений
-    - Запуск polling
+    - Запуск polling или webhook сервера
     """
 
     def __init__(self, config: Config) -> None:
@@ -39,30 +81,85 @@ class Bot:
         self.bot = AiogramBot(token=config.telegram_token)
         self.dp = Dispatcher()
         self.database = Database(config)
-        self.llm_client = LLMClient(config)
+        self.usage_recorder = UsageRecorder(self.database, config)
+        self.llm_client = LLMClient(config, usage_recorder=self.usage_recorder)
         self.storage = Storage(self.database, config)
+        self.context_builder = ContextBuilder(config)
+        self.background = BackgroundTasks()
+        self.outbound = OutboundQueue(config)
+        self.summarizer = ConversationSummarizer(
+            self.llm_client, self.storage, self.context_builder, config, self.background
+        )
+        self.handler_pool = ConcurrencyLimitMiddleware(
+            limit=config.handler_concurrency,
+            queue_size=config.handler_queue_size,
+            queue_timeout=config.handler_queue_timeout,
+            enabled=config.handler_limit_enabled,
+        )
+        self.webhook: WebhookServer | None = None
+        if config.bot_mode == "webhook":
+            self.webhook = WebhookServer(self.dp, self.bot, config)
+        self.in_flight = InFlightMiddleware()
+        self._cleanup_task: asyncio.Task[None] | None = None
+        self._stats_task: asyncio.Task[None] | None = None
         self._is_shutting_down = False
-        self._active_handlers = 0
         self._register_middlewares()
         self._register_handlers()
         logger.info("Bot initialized")
 
     def _register_middlewares(self) -> None:
         """Регистрация middleware."""
-        # Rate limiting middleware
-        rate_limiter = RateLimitMiddleware(
+        # Учёт выполняемых обновлений (все типы) для graceful shutdown
+        self.dp.update.outer_middleware(self.in_flight)
+
+        # Очередь исходящих сообщений в данных обновления: ответы middleware
+        # ("перегружен", "лимит") отправляются с теми же лимитами Telegram
+        self.dp["outbound"] = self.outbound
+
+        # Rate limiting middleware (общий лимит для реплик - в PostgreSQL)
+        self.rate_limit_backend: PostgresRateLimitBackend | None = None
+        if self.config.rate_limit_backend == "postgres":
+            self.rate_limit_backend = PostgresRateLimitBackend(
+                self.database,
+                rate=self.config.rate_limit_requests,
+                per=self.config.rate_limit_period,
+                batch_window=self.config.rate_limit_batch_window,
+                timeout=self.config.rate_limit_backend_timeout,
+                retry_after=self.config.rate_limit_backend_retry,
+            )
+        self.rate_limiter = RateLimitMiddleware(
             rate=self.config.rate_limit_requests,
             per=self.config.rate_limit_period,
             enabled=self.config.rate_limit_enabled,
+            backend=self.rate_limit_backend,
+        )
+        self.dp.message.middleware(self.rate_limiter)
+
+        # Token rate limiting: оценка до вызова LLM, фактический usage от LLMClient
+        self.token_limiter = TokenRateLimitMiddleware(
+            tokens=self.config.token_rate_limit_tokens,
+            per=self.config.token_rate_limit_period,
+            chars_per_token=self.config.context_chars_per_token,
+            completion_reserve=self.config.llm_max_tokens,
+            enabled=self.config.token_rate_limit_enabled,
         )
-        self.dp.message.middleware(rate_limiter)
+        self.dp.message.middleware(self.token_limiter)
+        self.llm_client.add_usage_listener(self.token_limiter.record_usage)
+
+        # Ограниченный пул handlers: после проверок лимитов, чтобы отклонённые
+        # сообщения не занимали место в очереди
+        self.dp.message.middleware(self.handler_pool)
         logger.info("Middlewares registered")
 
     def _register_handlers(self) -> None:
         """Регистрация обработчиков команд и сообщений."""
-        # Команды без зависимостей
-        self.dp.message.register(commands.handle_start, Command("start"))
-        self.dp.message.register(commands.handle_help, Command("help"))
+        # Команды без зависимостей (кроме очереди исходящих сообщений)
+        self.dp.message.register(
+            partial(commands.handle_start, outbound=self.outbound), Command("start")
+        )
+        self.dp.message.register(
+            partial(commands.handle_help, outbound=self.outbound), Command("help")
+        )
 
         # Команды с зависимостями (используем partial для передачи аргументов)
         self.dp.message.register(
@@ -71,6 +168,8 @@ class Bot:
                 bot=self.bot,
                 storage=self.storage,
                 config=self.config,
+                background=self.background,
+                outbound=self.outbound,
             ),
             Command("role"),
         )
@@ -80,6 +179,7 @@ class Bot:
                 bot=self.bot,
                 storage=self.storage,
                 config=self.config,
+                outbound=self.outbound,
             ),
             Command("status"),
         )
@@ -89,6 +189,8 @@ class Bot:
                 bot=self.bot,
                 storage=self.storage,
                 config=self.config,
+                background=self.background,
+                outbound=self.outbound,
             ),
             Command("reset"),
         )
@@ -101,71 +203,146 @@ class Bot:
                 llm_client=self.llm_client,
                 storage=self.storage,
                 config=self.config,
+                context_builder=self.context_builder,
+                summarizer=self.summarizer,
+                background=self.background,
+                outbound=self.outbound,
             )
         )
 
         logger.info("Handlers registered")
 
     async def start(self) -> None:
-        """Запуск бота в режиме polling."""
-        logger.info("Starting bot polling...")
+        """Запуск бота в режиме polling или webhook (config.bot_mode)."""
+        logger.info(f"Starting bot in {self.config.bot_mode} mode...")
+        self.usage_recorder.start()
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        if self.config.load_stats_interval > 0:
+            self._stats_task = asyncio.create_task(self._stats_loop())
+        await self.llm_client.warmup()
         try:
-            await self.dp.start_polling(self.bot)
+            if self.webhook is not None:
+                await self.webhook.serve()
+            else:
+                # Сессию закрывает stop(): в момент остановки polling handlers
+                # ещё отправляют ответы
+                await self.dp.start_polling(self.bot, close_bot_session=False)
         except Exception as e:
-            logger.error(f"Error during polling: {e}", exc_info=True)
+            logger.error(f"Error during {self.config.bot_mode}: {e}", exc_info=True)
             raise
 
-    async def _wait_for_pending_handlers(self, timeout: float = 30.0) -> None:
-        """
-        Ожидание завершения активных handlers с timeout.
+    async def _cleanup_loop(self) -> None:
+        """Периодическое удаление состояния неактивных пользователей из rate limiters."""
+        while True:
+            await asyncio.sleep(self.config.rate_limit_cleanup_interval)
+            self.rate_limiter.cleanup_old_records()
+            self.token_limiter.cleanup_old_records()
+            if self.rate_limit_backend is not None:
+                await self.rate_limit_backend.cleanup()
 
-        Args:
-            timeout: Максимальное время ожидания в секундах
-        """
-        if self._active_handlers == 0:
-            logger.info("No active handlers to wait for")
-            return
+    async def _stats_loop(self) -> None:
+        """Периодический вывод метрик нагрузки."""
+        while True:
+            await asyncio.sleep(self.config.load_stats_interval)
+            self.log_load_stats()
 
-        logger.info(f"Waiting for {self._active_handlers} active handlers to complete...")
+    def log_load_stats(self) -> None:
+        """
+        Логирует метрики нагрузки.
 
-        start_time = asyncio.get_event_loop().time()
+        Пул handlers (выполняемые, глубина очереди, отклонённые сообщения),
+        обновления в обработке и глубина очереди исходящих сообщений.
+        """
+        logger.info(
+            f"Load stats: handler_pool={self.handler_pool.stats()}, "
+            f"in_flight={self.in_flight.active}, outbound_queue={self.outbound.depth}"
+        )
 
-        while self._active_handlers > 0:
-            # Проверяем timeout
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed >= timeout:
-                logger.warning(
-                    f"Graceful shutdown timeout after {timeout}s. "
-                    f"{self._active_handlers} handlers still active"
-                )
-                break
+    async def _wait_for_pending_handlers(self, timeout: float = 30.0) -> list[str]:
+        """
+        Ожидание завершения активных handlers с timeout.
 
-            # Ждём немного перед следующей проверкой
-            await asyncio.sleep(0.1)
+        Args:
+            timeout: Максимальное время ожидания в секундах
 
-        if self._active_handlers == 0:
-            logger.info("All handlers completed successfully")
+        Returns:
+            Описания обновлений, обработка которых отменена по timeout
+        """
+        return await self.in_flight.drain(timeout)
 
-    async def stop(self) -> None:
+    async def stop(self) -> ShutdownReport:
         """
         Остановка бота с graceful shutdown.
 
-        Ожидает завершения активных handlers с timeout 30 секунд,
-        затем закрывает ресурсы (БД, HTTP сессии).
+        Прекращает приём обновлений, ожидает завершения принятых (deadline
+        shutdown_timeout), досылает ответы и фоновые сохранения, затем
+        закрывает ресурсы (БД, HTTP сессии).
+
+        Returns:
+            Отчёт о работе, не завершённой при остановке
         """
         logger.info("Initiating graceful shutdown...")
+        report = ShutdownReport()
+        deadline = Deadline(self.config.shutdown_timeout)
 
         # Устанавливаем флаг остановки
         self._is_shutting_down = True
 
+        # Прекращаем приём обновлений: webhook отвечает 503 (Telegram повторит
+        # доставку другому процессу) и дообрабатывает принятые
+        if self.webhook is not None:
+            report.updates_abandoned = await self.webhook.stop(
+                timeout=min(self.config.webhook_drain_timeout, deadline.remaining())
+            )
+        else:
+            # Polling уже остановлен, если остановка инициирована сигналом
+            with contextlib.suppress(RuntimeError):
+                await self.dp.stop_polling()
+
         # Ждём завершения активных handlers
-        await self._wait_for_pending_handlers(timeout=30.0)
+        report.handlers_abandoned = await self._wait_for_pending_handlers(
+            timeout=deadline.remaining()
+        )
+        self.log_load_stats()
+
+        # Досылаем сообщения из очереди исходящих (до закрытия bot session)
+        report.messages_unsent = await self.outbound.stop(
+            timeout=self.config.outbound_shutdown_timeout
+        )
+
+        # Ждём фоновое сохранение истории (до сжатия и закрытия БД)
+        report.background_abandoned = await self.background.wait_pending(
+            timeout=self.config.background_shutdown_timeout
+        )
+
+        # Ждём фоновые задачи сжатия диалогов (используют БД)
+        report.summaries_abandoned = await self.summarizer.wait_pending(
+            timeout=self.config.summary_shutdown_timeout
+        )
+
+        for task in (self._cleanup_task, self._stats_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._cleanup_task = None
+        self._stats_task = None
+
+        # Записываем остаток телеметрии LLM до закрытия БД
+        await self.usage_recorder.stop()
 
         # Закрываем ресурсы
+        logger.info("Closing LLM client...")
+        await self.llm_client.close()
+
         logger.info("Closing database connection...")
         await self.database.close()
 
         logger.info("Closing bot session...")
         await self.bot.session.close()
 
-        logger.info("Bot stopped gracefully")
+        if report.clean:
+            logger.info("Bot stopped gracefully: all accepted work completed")
+        else:
+            logger.warning(f"Bot stopped with abandoned work: {report}")
+        return report
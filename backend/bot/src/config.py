@@ -1,8 +1,12 @@
 """Конфигурация приложения."""
 
-from pydantic import Field
+import logging
+
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 
+logger = logging.getLogger(__name__)
+
 
 class Config(BaseSettings):
     """
@@ -17,6 +21,49 @@ class Config(BaseSettings):
     # Telegram Bot
     telegram_token: str = Field(..., description="Telegram Bot API token")
 
+    # Update Ingestion (polling / webhook)
+    bot_mode: str = Field(
+        default="polling",
+        pattern="^(polling|webhook)$",
+        description="How updates are received: long polling or webhook",
+    )
+    webhook_host: str = Field(default="0.0.0.0", description="Webhook server bind address")
+    webhook_port: int = Field(default=8080, ge=1, le=65535, description="Webhook server port")
+    webhook_path: str = Field(default="/webhook", pattern="^/", description="Webhook endpoint path")
+    webhook_url: str | None = Field(
+        default=None,
+        description="Public base URL for setWebhook (None = webhook is registered externally)",
+    )
+    webhook_secret: str | None = Field(
+        default=None,
+        pattern="^[A-Za-z0-9_-]{1,256}$",
+        description="Secret token checked in X-Telegram-Bot-Api-Secret-Token header",
+    )
+    webhook_drain_timeout: float = Field(
+        default=30.0, ge=0.0, description="Time to finish accepted updates on shutdown"
+    )
+    scale_workers: int = Field(
+        default=1,
+        ge=1,
+        le=64,
+        description="Worker processes in webhook mode (>1 = updates sharded by user_id)",
+    )
+    worker_host: str = Field(default="127.0.0.1", description="Bind address of worker processes")
+    worker_base_port: int = Field(
+        default=8090, ge=1, le=65535, description="Port of the first worker (next ones are +1)"
+    )
+    worker_check_interval: float = Field(
+        default=1.0, gt=0.0, description="Interval for checking that worker processes are alive"
+    )
+    worker_max_restarts: int = Field(
+        default=5,
+        ge=0,
+        description="Restarts of a crashed worker within worker_restart_window before exiting",
+    )
+    worker_restart_window: float = Field(
+        default=300.0, gt=0.0, description="Window for counting worker restarts in seconds"
+    )
+
     # OpenRouter LLM
     openrouter_api_key: str = Field(..., description="OpenRouter API key")
     openrouter_base_url: str = Field(
@@ -29,6 +76,69 @@ class Config(BaseSettings):
         default=None, description="Fallback LLM model to use when primary model fails"
     )
 
+    # Model Routing
+    llm_model_pool: dict[str, float] = Field(
+        default_factory=dict,
+        description=(
+            "Ordered model pool {model: weight} for routing and failover "
+            "(weight 0 = failover only; default: primary + fallback model)"
+        ),
+    )
+    llm_router_ewma_alpha: float = Field(
+        default=0.2, gt=0.0, le=1.0, description="EWMA smoothing factor for model latency/errors"
+    )
+    llm_router_error_penalty: float = Field(
+        default=5.0, ge=0.0, description="Routing cost multiplier per unit of model error rate"
+    )
+
+    # LLM HTTP Transport
+    llm_http2: bool = Field(
+        default=True, description="Use HTTP/2 for LLM API (requires httpx[http2])"
+    )
+    llm_max_connections: int = Field(
+        default=20, ge=1, description="Maximum concurrent connections to LLM API"
+    )
+    llm_max_keepalive_connections: int = Field(
+        default=10, ge=0, description="Maximum idle keep-alive connections to LLM API"
+    )
+    llm_keepalive_expiry: float = Field(
+        default=60.0, ge=0.0, description="Idle keep-alive connection lifetime in seconds"
+    )
+    llm_connect_timeout: float = Field(
+        default=5.0, gt=0.0, description="LLM API connect timeout (TCP + TLS) in seconds"
+    )
+    llm_read_timeout: float = Field(
+        default=60.0, gt=0.0, description="LLM API read timeout (between response chunks)"
+    )
+    llm_write_timeout: float = Field(
+        default=10.0, gt=0.0, description="LLM API write timeout in seconds"
+    )
+    llm_pool_timeout: float = Field(
+        default=5.0, gt=0.0, description="Timeout waiting for a free connection in the pool"
+    )
+    llm_warmup_enabled: bool = Field(
+        default=True, description="Pre-establish LLM API connections at bot startup"
+    )
+    llm_warmup_connections: int = Field(
+        default=2,
+        ge=1,
+        description="Number of connections warmed up at startup (HTTP/1.1 only, 1 with HTTP/2)",
+    )
+
+    # Prompt Caching
+    prompt_cache_enabled: bool = Field(
+        default=True, description="Mark stable prompt prefix for provider-side prompt caching"
+    )
+    prompt_cache_min_chars: int = Field(
+        default=2000,
+        ge=0,
+        description="Minimum system prefix length (chars) to add cache-control markers",
+    )
+    prompt_cache_model_prefixes: list[str] = Field(
+        default=["anthropic/", "google/gemini"],
+        description="Model prefixes that require explicit cache-control markers (JSON list)",
+    )
+
     # System Prompt
     system_prompt: str = Field(
         default="Ты полезный ассистент. Отвечай на вопросы пользователей четко и по делу.",
@@ -51,6 +161,46 @@ class Config(BaseSettings):
     retry_delay: float = Field(
         default=1.0, ge=0.1, description="Delay between retry attempts in seconds"
     )
+    retry_jitter: float = Field(
+        default=0.25, ge=0.0, le=1.0, description="Random extra delay fraction added to retries"
+    )
+    retry_after_max: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Maximum provider Retry-After to wait for (longer means fail over instead)",
+    )
+    retry_budget_ratio: float = Field(
+        default=0.2,
+        ge=0.0,
+        le=1.0,
+        description="Process-wide retries allowed as a fraction of recent LLM requests",
+    )
+    retry_budget_min_retries: int = Field(
+        default=10, ge=0, description="Retries always allowed per budget window (low traffic)"
+    )
+    retry_budget_window: float = Field(
+        default=60.0, ge=1.0, description="Sliding window for the retry budget in seconds"
+    )
+    reply_deadline: float = Field(
+        default=90.0,
+        ge=1.0,
+        description="Time budget for producing one reply (LLM requests, retries, fallback)",
+    )
+    typing_interval: float = Field(
+        default=4.0,
+        gt=0.0,
+        description="Interval for refreshing the typing indicator during long LLM calls",
+    )
+    background_shutdown_timeout: float = Field(
+        default=10.0,
+        ge=0.0,
+        description="Time to wait for background tasks (history saving) on shutdown",
+    )
+    shutdown_timeout: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Deadline for in-flight updates (handlers, webhook drain) on shutdown",
+    )
 
     # Rate Limiting
     rate_limit_enabled: bool = Field(
@@ -62,6 +212,74 @@ class Config(BaseSettings):
     rate_limit_period: float = Field(
         default=60.0, ge=1.0, description="Rate limit period in seconds"
     )
+    token_rate_limit_enabled: bool = Field(
+        default=False, description="Enable per-user rate limiting by LLM tokens"
+    )
+    token_rate_limit_tokens: int = Field(
+        default=100000, ge=1, description="Maximum LLM tokens (prompt + completion) per period"
+    )
+    token_rate_limit_period: float = Field(
+        default=3600.0, ge=1.0, description="Token rate limit period in seconds"
+    )
+    rate_limit_cleanup_interval: float = Field(
+        default=300.0, gt=0.0, description="Interval for purging idle users from rate limiters"
+    )
+    rate_limit_backend: str = Field(
+        default="local",
+        pattern="^(local|postgres)$",
+        description="Where request rate limits live: per process or shared across replicas",
+    )
+    rate_limit_batch_window: float = Field(
+        default=0.005, ge=0.0, description="Time to batch shared rate limit checks (seconds)"
+    )
+    rate_limit_backend_timeout: float = Field(
+        default=0.5, gt=0.0, description="Timeout of a shared rate limit query (seconds)"
+    )
+    rate_limit_backend_retry: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Local-only rate limiting period after a shared backend failure (seconds)",
+    )
+
+    # Handler Concurrency
+    handler_limit_enabled: bool = Field(
+        default=True, description="Limit concurrently processed messages (bounded handler pool)"
+    )
+    handler_concurrency: int = Field(
+        default=32, ge=1, description="Maximum number of concurrently running message handlers"
+    )
+    handler_queue_size: int = Field(
+        default=256, ge=0, description="Maximum messages waiting for a free handler"
+    )
+    handler_queue_timeout: float = Field(
+        default=20.0, gt=0.0, description="Maximum wait for a free handler before a busy reply"
+    )
+    load_stats_interval: float = Field(
+        default=60.0,
+        ge=0.0,
+        description="Interval for logging handler pool and outbound queue load (0 = shutdown only)",
+    )
+
+    # Telegram Outbound
+    outbound_global_rate: float = Field(
+        default=30.0, gt=0.0, description="Global Telegram send rate (messages per second)"
+    )
+    outbound_global_burst: int = Field(
+        default=30, ge=1, description="Global Telegram send burst size"
+    )
+    outbound_chat_rate: float = Field(
+        default=1.0, gt=0.0, description="Per private chat send rate (messages per second)"
+    )
+    outbound_group_rate: float = Field(
+        default=20 / 60, gt=0.0, description="Per group chat send rate (messages per second)"
+    )
+    outbound_chat_burst: int = Field(default=3, ge=1, description="Per chat send burst size")
+    outbound_max_flood_retries: int = Field(
+        default=3, ge=0, description="Retries of a send after Telegram flood control (429)"
+    )
+    outbound_shutdown_timeout: float = Field(
+        default=10.0, ge=0.0, description="Time to send queued messages on shutdown"
+    )
 
     # Caching
     cache_ttl: int = Field(
@@ -73,9 +291,41 @@ class Config(BaseSettings):
 
     # Context Management
     max_context_messages: int = Field(
-        default=20,
+        default=50,
         ge=1,
-        description="Maximum number of messages to load for LLM context (default 20)",
+        description="Maximum number of messages to load for LLM context (default 50)",
+    )
+    context_token_budget: int = Field(
+        default=4000,
+        ge=100,
+        description="Token budget for LLM context (system prompt + recent messages)",
+    )
+    context_chars_per_token: float = Field(
+        default=3.0,
+        gt=0.0,
+        description="Average characters per token for context size estimation",
+    )
+
+    # Conversation Summarization
+    summary_enabled: bool = Field(
+        default=False, description="Enable background summarization of old dialog turns"
+    )
+    summary_trigger_tokens: int = Field(
+        default=3000,
+        ge=100,
+        description="Dialog size in tokens (estimated) that triggers summarization",
+    )
+    summary_keep_messages: int = Field(
+        default=6, ge=2, description="Number of newest messages kept verbatim after summarization"
+    )
+    summary_model: str | None = Field(
+        default=None,
+        description="Model for summarization (default: fallback model, then primary model)",
+    )
+    summary_shutdown_timeout: float = Field(
+        default=10.0,
+        ge=0.0,
+        description="Time to wait for background summarization tasks on shutdown",
     )
 
     # Error Recovery
@@ -88,6 +338,22 @@ class Config(BaseSettings):
         description="Base delay between save retries in seconds (exponential backoff)",
     )
 
+    # LLM Telemetry
+    telemetry_enabled: bool = Field(
+        default=True, description="Persist per-turn LLM usage and latency to llm_usage table"
+    )
+    telemetry_batch_size: int = Field(
+        default=50, ge=1, description="Number of telemetry records per batch write"
+    )
+    telemetry_flush_interval: float = Field(
+        default=10.0, gt=0.0, description="Interval between telemetry batch writes in seconds"
+    )
+    telemetry_max_buffer: int = Field(
+        default=10000,
+        ge=1,
+        description="Maximum buffered telemetry records (oldest dropped when DB is unavailable)",
+    )
+
     # Directories
     data_dir: str = Field(default="data", description="Directory for storing dialog history files")
     logs_dir: str = Field(default="logs", description="Directory for storing log files")
@@ -111,6 +377,21 @@ class Config(BaseSettings):
         default="INFO", description="Logging level (DEBUG, INFO, WARNING, ERROR)"
     )
 
+    @model_validator(mode="after")
+    def warn_webhook_without_secret(self) -> "Config":
+        """
+        Предупреждает о webhook без секретного токена.
+
+        Без WEBHOOK_SECRET сервер принимает обновления от любого отправителя,
+        знающего адрес webhook.
+        """
+        if self.bot_mode == "webhook" and not self.webhook_secret:
+            logger.warning(
+                "WEBHOOK_SECRET is not set: webhook accepts updates from any caller "
+                "(set a random secret, it is passed to setWebhook and checked on every update)"
+            )
+        return self
+
     @property
     def database_url(self) -> str:
         """
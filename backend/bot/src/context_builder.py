@@ -0,0 +1,136 @@
+"""Сборка контекста для LLM с учётом бюджета токенов."""
+
+import logging
+import math
+
+from cachetools import LRUCache
+
+from src.config import Config
+from src.models import SUMMARY_ROLE
+
+logger = logging.getLogger(__name__)
+
+# Служебные токены на каждое сообщение (роль, разделители формата chat completions)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Префикс для summary-сообщения при передаче в LLM (как системного сообщения)
+SUMMARY_PREFIX = "Краткое содержание предыдущей части диалога:\n"
+
+
+class ContextBuilder:
+    """
+    Сборщик контекста диалога для LLM.
+
+    Отвечает за:
+    - Оценку количества токенов в сообщениях (эвристика по символам)
+    - Кеширование оценок по ID сообщения
+    - Упаковку системного промпта, summary и последних сообщений в бюджет токенов
+    """
+
+    def __init__(self, config: Config) -> None:
+        """
+        Инициализация сборщика контекста.
+
+        Args:
+            config: Конфигурация приложения
+        """
+        self.config = config
+        self.token_budget = config.context_token_budget
+        self.chars_per_token = config.context_chars_per_token
+
+        # Кеш оценок токенов: message_id -> tokens
+        self.token_cache: LRUCache[str, int] = LRUCache(maxsize=config.cache_max_size * 10)
+
+        logger.info(
+            f"ContextBuilder initialized: budget={self.token_budget} tokens, "
+            f"chars_per_token={self.chars_per_token}"
+        )
+
+    def estimate_tokens(self, message: dict[str, str]) -> int:
+        """
+        Оценивает количество токенов в сообщении.
+
+        Для сообщений с ID оценка кешируется, так как содержимое
+        сохранённых сообщений не меняется между запросами.
+
+        Args:
+            message: Сообщение в формате {"role": ..., "content": ..., "id": ...}
+
+        Returns:
+            Оценка количества токенов (включая служебные)
+        """
+        message_id = message.get("id")
+        if message_id:
+            cached = self.token_cache.get(message_id)
+            if cached is not None:
+                return cached
+
+        content = message.get("content") or ""
+        tokens = math.ceil(len(content) / self.chars_per_token) + MESSAGE_TOKEN_OVERHEAD
+
+        if message_id:
+            self.token_cache[message_id] = tokens
+
+        return tokens
+
+    def build(
+        self, history: list[dict[str, str]], system_prompt: str | None = None
+    ) -> list[dict[str, str]]:
+        """
+        Собирает контекст для LLM в пределах бюджета токенов.
+
+        Системный промпт и последнее summary включаются всегда (summary передаётся
+        в LLM как системное сообщение). Остальные сообщения добавляются
+        от новых к старым, пока помещаются в бюджет; последнее сообщение
+        включается всегда, даже если превышает бюджет.
+
+        Args:
+            history: История диалога в хронологическом порядке
+            system_prompt: Системный промпт, если его нет в начале истории
+
+        Returns:
+            Список сообщений для LLM в хронологическом порядке
+        """
+        system_message: dict[str, str] | None = None
+        dialog = history
+
+        if history and history[0]["role"] == "system":
+            system_message = history[0]
+            dialog = history[1:]
+        elif system_prompt:
+            system_message = {"role": "system", "content": system_prompt}
+
+        pinned: list[dict[str, str]] = [system_message] if system_message else []
+        used_tokens = self.estimate_tokens(system_message) if system_message else 0
+
+        # Всё, что старше последнего summary, уже сжато в нём
+        summary_index = next(
+            (i for i in range(len(dialog) - 1, -1, -1) if dialog[i]["role"] == SUMMARY_ROLE),
+            None,
+        )
+        if summary_index is not None:
+            summary_message = dialog[summary_index]
+            pinned.append(
+                {"role": "system", "content": SUMMARY_PREFIX + summary_message["content"]}
+            )
+            used_tokens += self.estimate_tokens(summary_message)
+            dialog = dialog[summary_index + 1 :]
+
+        selected: list[dict[str, str]] = []
+        for msg in reversed(dialog):
+            tokens = self.estimate_tokens(msg)
+            if selected and used_tokens + tokens > self.token_budget:
+                break
+            selected.append(msg)
+            used_tokens += tokens
+
+        selected.reverse()
+        context = [*pinned, *selected]
+
+        dropped = len(dialog) - len(selected)
+        logger.debug(
+            f"Context built: {len(context)} messages, ~{used_tokens} tokens "
+            f"(budget={self.token_budget}, dropped={dropped})"
+        )
+
+        return context
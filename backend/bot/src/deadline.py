@@ -0,0 +1,80 @@
+"""Бюджет времени (deadline) на обработку одного сообщения пользователя."""
+
+import time
+
+
+class DeadlineExceededError(Exception):
+    """Исключение при исчерпании бюджета времени на ответ."""
+
+    pass
+
+
+class Deadline:
+    """
+    Абсолютный срок завершения операции на монотонных часах.
+
+    Создаётся один раз на ход диалога и передаётся во все этапы обработки
+    (запросы к LLM, задержки между retry, переход на fallback, сохранение),
+    чтобы суммарное время ответа не превышало заданный бюджет.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        """
+        Инициализация deadline.
+
+        Args:
+            timeout: Бюджет времени в секундах от текущего момента
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """
+        Возвращает оставшееся время.
+
+        Returns:
+            Оставшееся время в секундах (0.0 если бюджет исчерпан)
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """True если бюджет времени исчерпан."""
+        return self.remaining() <= 0.0
+
+    def elapsed(self) -> float:
+        """
+        Возвращает время, прошедшее с создания deadline.
+
+        Returns:
+            Прошедшее время в секундах
+        """
+        return self.timeout - (self.expires_at - time.monotonic())
+
+    def check(self, operation: str) -> None:
+        """
+        Проверяет, что бюджет времени не исчерпан.
+
+        Args:
+            operation: Название операции (для сообщения об ошибке)
+
+        Raises:
+            DeadlineExceededError: Если бюджет времени исчерпан
+        """
+        if self.expired:
+            raise DeadlineExceededError(
+                f"Deadline of {self.timeout:.1f}s exceeded before {operation} "
+                f"(elapsed {self.elapsed():.1f}s)"
+            )
+
+    def allows(self, delay: float) -> bool:
+        """
+        Проверяет, останется ли время после ожидания.
+
+        Args:
+            delay: Планируемая задержка в секундах
+
+        Returns:
+            True если после задержки бюджет ещё не будет исчерпан
+        """
+        return delay < self.remaining()
@@ -8,7 +8,9 @@ from aiogram import Bot
 from aiogram.enums import ChatAction
 from aiogram.types import Message
 
+from src.background import BackgroundTasks
 from src.config import Config
+from src.outbound import OutboundQueue, answer
 from src.storage import Storage
 
 logger = logging.getLogger(__name__)
@@ -28,12 +30,13 @@ def get_bot_version() -> str:
         return "unknown"
 
 
-async def handle_start(message: Message) -> None:
+async def handle_start(message: Message, outbound: OutboundQueue | None = None) -> None:
     """
     Обработчик команды /start.
 
     Args:
         message: Входящее сообщение от пользователя
+        outbound: Очередь исходящих сообщений (опционально)
     """
     user_id = message.from_user.id if message.from_user else "unknown"
     logger.info(f"User {user_id}: /start command")
@@ -52,15 +55,16 @@ async def handle_start(message: Message) -> None:
         "Просто отправь мне сообщение, и я отвечу!"
     )
 
-    await message.answer(welcome_text)
+    await answer(message, welcome_text, outbound)
 
 
-async def handle_help(message: Message) -> None:
+async def handle_help(message: Message, outbound: OutboundQueue | None = None) -> None:
     """
     Обработчик команды /help.
 
     Args:
         message: Входящее сообщение от пользователя
+        outbound: Очередь исходящих сообщений (опционально)
     """
     user_id = message.from_user.id if message.from_user else "unknown"
     logger.info(f"User {user_id}: /help command")
@@ -77,10 +81,17 @@ async def handle_help(message: Message) -> None:
         "Я запоминаю контекст разговора для более точных ответов."
     )
 
-    await message.answer(help_text)
+    await answer(message, help_text, outbound)
 
 
-async def handle_role(message: Message, bot: Bot, storage: Storage, config: Config) -> None:
+async def handle_role(
+    message: Message,
+    bot: Bot,
+    storage: Storage,
+    config: Config,
+    background: BackgroundTasks | None = None,
+    outbound: OutboundQueue | None = None,
+) -> None:
     """
     Обработчик команды /role.
 
@@ -95,19 +106,23 @@ async def handle_role(message: Message, bot: Bot, storage: Storage, config: Conf
         bot: Экземпляр бота для отправки действий
         storage: Storage для сохранения промпта
         config: Конфигурация с дефолтным промптом
+        background: Супервизор фоновых задач (ожидание сохранения истории)
+        outbound: Очередь исходящих сообщений (опционально)
     """
     user_id = message.from_user.id if message.from_user else 0
     logger.info(f"User {user_id}: /role command")
 
     # Извлекаем аргументы команды
     if not message.text:
-        await message.answer(
+        await answer(
+            message,
             "❌ Неправильное использование команды!\n\n"
             "Используйте:\n"
             "• /role <текст> — установить кастомную роль\n"
             "• /role default — вернуться к роли по умолчанию\n\n"
             "Пример:\n"
-            "/role Ты опытный Python разработчик. Помогаешь с кодом и архитектурой."
+            "/role Ты опытный Python разработчик. Помогаешь с кодом и архитектурой.",
+            outbound,
         )
         return
 
@@ -115,13 +130,15 @@ async def handle_role(message: Message, bot: Bot, storage: Storage, config: Conf
     args = message.text.split(maxsplit=1)
 
     if len(args) < 2:
-        await message.answer(
+        await answer(
+            message,
             "❌ Неправильное использование команды!\n\n"
             "Используйте:\n"
             "• /role <текст> — установить кастомную роль\n"
             "• /role default — вернуться к роли по умолчанию\n\n"
             "Пример:\n"
-            "/role Ты опытный Python разработчик. Помогаешь с кодом и архитектурой."
+            "/role Ты опытный Python разработчик. Помогаешь с кодом и архитектурой.",
+            outbound,
         )
         return
 
@@ -131,6 +148,10 @@ async def handle_role(message: Message, bot: Bot, storage: Storage, config: Conf
         # Показываем индикатор обработки
         await bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.TYPING)
 
+        # Фоновое сохранение предыдущего ответа не должно восстановить очищенную историю
+        if background is not None:
+            await background.wait_key(user_id)
+
         # Проверяем - default или кастомный промпт
         if role_text.lower() == "default":
             system_prompt = config.system_prompt
@@ -141,11 +162,13 @@ async def handle_role(message: Message, bot: Bot, storage: Storage, config: Conf
             if len(system_prompt) > 100:
                 prompt_preview += "..."
 
-            await message.answer(
+            await answer(
+                message,
                 "✅ Роль успешно изменена!\n\n"
                 "🔄 Установлена роль по умолчанию\n"
                 "🗑️ История диалога очищена\n\n"
-                f"📝 Новая роль:\n{prompt_preview}"
+                f"📝 Новая роль:\n{prompt_preview}",
+                outbound,
             )
             logger.info(f"User {user_id}: role reset to default")
         else:
@@ -157,23 +180,33 @@ async def handle_role(message: Message, bot: Bot, storage: Storage, config: Conf
             if len(role_text) > 100:
                 prompt_preview += "..."
 
-            await message.answer(
+            await answer(
+                message,
                 "✅ Роль успешно изменена!\n\n"
                 "🎭 Установлена кастомная роль\n"
                 "🗑️ История диалога очищена\n\n"
-                f"📝 Новая роль:\n{prompt_preview}"
+                f"📝 Новая роль:\n{prompt_preview}",
+                outbound,
             )
             logger.info(f"User {user_id}: custom role set ({len(role_text)} chars)")
 
     except Exception as e:
         logger.error(f"User {user_id}: Failed to set role: {e}", exc_info=True)
-        await message.answer(
+        await answer(
+            message,
             "❌ Не удалось изменить роль!\n\n"
-            "⚠️ Произошла ошибка при сохранении. Попробуйте позже или обратитесь к администратору."
+            "⚠️ Произошла ошибка при сохранении. Попробуйте позже или обратитесь к администратору.",
+            outbound,
         )
 
 
-async def handle_status(message: Message, bot: Bot, storage: Storage, config: Config) -> None:
+async def handle_status(
+    message: Message,
+    bot: Bot,
+    storage: Storage,
+    config: Config,
+    outbound: OutboundQueue | None = None,
+) -> None:
     """
     Обработчик команды /status.
 
@@ -188,6 +221,7 @@ async def handle_status(message: Message, bot: Bot, storage: Storage, config: Co
         bot: Экземпляр бота для отправки действий
         storage: Storage для получения информации о диалоге
         config: Конфигурация с настройками модели
+        outbound: Очередь исходящих сообщений (опционально)
     """
     user_id = message.from_user.id if message.from_user else 0
     logger.info(f"User {user_id}: /status command")
@@ -235,18 +269,27 @@ async def handle_status(message: Message, bot: Bot, storage: Storage, config: Co
             f"📝 Текущая роль:\n{prompt_preview}"
         )
 
-        await message.answer(status_text)
+        await answer(message, status_text, outbound)
         logger.info(f"User {user_id}: status sent")
 
     except Exception as e:
         logger.error(f"User {user_id}: Failed to get status: {e}", exc_info=True)
-        await message.answer(
+        await answer(
+            message,
             "❌ Не удалось получить статус!\n\n"
-            "⚠️ Произошла ошибка при загрузке данных. Попробуйте позже."
+            "⚠️ Произошла ошибка при загрузке данных. Попробуйте позже.",
+            outbound,
         )
 
 
-async def handle_reset(message: Message, bot: Bot, storage: Storage, config: Config) -> None:
+async def handle_reset(
+    message: Message,
+    bot: Bot,
+    storage: Storage,
+    config: Config,
+    background: BackgroundTasks | None = None,
+    outbound: OutboundQueue | None = None,
+) -> None:
     """
     Обработчик команды /reset.
 
@@ -257,6 +300,8 @@ async def handle_reset(message: Message, bot: Bot, storage: Storage, config: Con
         bot: Экземпляр бота для отправки действий
         storage: Storage для очистки истории
         config: Конфигурация с дефолтным промптом
+        background: Супервизор фоновых задач (ожидание сохранения истории)
+        outbound: Очередь исходящих сообщений (опционально)
     """
     user_id = message.from_user.id if message.from_user else 0
     logger.info(f"User {user_id}: /reset command")
@@ -265,6 +310,10 @@ async def handle_reset(message: Message, bot: Bot, storage: Storage, config: Con
         # Показываем индикатор обработки
         await bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.TYPING)
 
+        # Фоновое сохранение предыдущего ответа не должно восстановить очищенную историю
+        if background is not None:
+            await background.wait_key(user_id)
+
         # Получаем текущий системный промпт перед очисткой
         custom_prompt = await storage.get_system_prompt(user_id)
 
@@ -281,17 +330,21 @@ async def handle_reset(message: Message, bot: Bot, storage: Storage, config: Con
         # Устанавливаем промпт заново (это очистит историю)
         await storage.set_system_prompt(user_id, system_prompt)
 
-        await message.answer(
+        await answer(
+            message,
             "✅ История успешно очищена!\n\n"
             f"🗑️ Все сообщения удалены\n"
             f"{role_type} {role_status}\n\n"
-            "Начинаем диалог с чистого листа!"
+            "Начинаем диалог с чистого листа!",
+            outbound,
         )
         logger.info(f"User {user_id}: history reset, role preserved")
 
     except Exception as e:
         logger.error(f"User {user_id}: Failed to reset history: {e}", exc_info=True)
-        await message.answer(
+        await answer(
+            message,
             "❌ Не удалось очистить историю!\n\n"
-            "⚠️ Произошла ошибка при сохранении. Попробуйте позже."
+            "⚠️ Произошла ошибка при сохранении. Попробуйте позже.",
+            outbound,
         )
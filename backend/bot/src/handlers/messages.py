@@ -8,9 +8,14 @@ from aiogram import Bot
 from aiogram.enums import ChatAction
 from aiogram.types import Message
 
+from src.background import BackgroundTasks
 from src.config import Config
+from src.context_builder import ContextBuilder
+from src.deadline import Deadline
 from src.llm_client import LLMAPIError, LLMClient
+from src.outbound import PRIORITY_CONTINUATION, PRIORITY_REPLY, OutboundQueue, answer
 from src.storage import Storage
+from src.summarizer import ConversationSummarizer
 from src.utils import get_error_message, sanitize_content, split_message
 
 logger = logging.getLogger(__name__)
@@ -22,11 +27,20 @@ async def handle_message(
     llm_client: LLMClient,
     storage: Storage,
     config: Config,
+    context_builder: ContextBuilder,
+    summarizer: ConversationSummarizer | None = None,
+    background: BackgroundTasks | None = None,
+    outbound: OutboundQueue | None = None,
 ) -> None:
     """
     Обработчик текстовых сообщений пользователя.
 
-    Загружает историю диалога, отправляет в LLM и сохраняет обновленную историю.
+    Загружает историю диалога, отправляет в LLM, отвечает пользователю и затем
+    сохраняет обновленную историю. Запрос к LLM ограничен бюджетом времени
+    (reply_deadline): запросы, retry и переход на fallback не выходят за его пределы.
+    Сохранение без супервизора background использует тот же бюджет. При наличии
+    background сохранение выполняется в фоне после ответа с собственным бюджетом
+    reply_deadline на retry.
 
     Args:
         message: Входящее сообщение от пользователя
@@ -34,6 +48,10 @@ async def handle_message(
         llm_client: Клиент для работы с LLM
         storage: Storage для загрузки/сохранения истории
         config: Конфигурация с системным промптом
+        context_builder: Сборщик контекста с бюджетом токенов (общий для всех сообщений)
+        summarizer: Фоновый summarizer длинных диалогов (опционально)
+        background: Супервизор фоновых задач для сохранения истории (опционально)
+        outbound: Очередь исходящих сообщений с лимитами Telegram (опционально)
     """
     if not message.text:
         return
@@ -42,12 +60,27 @@ async def handle_message(
     sanitized_text = sanitize_content(message.text, show_content=config.log_message_content)
     logger.info(f"User {user_id}: received message - {sanitized_text}")
 
+    deadline = Deadline(config.reply_deadline)
+    typing_task: asyncio.Task[None] | None = None
+
     try:
-        # Показываем индикатор "печатает..."
-        await bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.TYPING)
+        # Сохранение предыдущего хода могло ещё не завершиться в фоне
+        if background is not None:
+            await background.wait_key(user_id)
+
+        # 1. Индикатор "печатает..." параллельно с загрузкой последних N сообщений
+        _, history = await asyncio.gather(
+            _send_typing(bot, message.chat.id),
+            storage.load_recent_history(user_id, limit=config.max_context_messages),
+        )
+
+        # Поддерживаем индикатор на время долгого запроса к LLM
+        typing_task = asyncio.create_task(
+            _keep_typing(bot, message.chat.id, config.typing_interval)
+        )
 
-        # 1. Загружаем последние N сообщений (для оптимизации контекста LLM)
-        history = await storage.load_recent_history(user_id, limit=config.max_context_messages)
+        # Системный промпт для контекста, если он не попал в загруженное окно истории
+        context_system_prompt: str | None = None
 
         # 2. Если истории нет - инициализируем новый диалог с системным промптом
         if not history:
@@ -72,6 +105,9 @@ async def handle_message(
                 f"User {user_id}: initialized new dialog with "
                 f"{'custom' if custom_prompt else 'default'} system prompt"
             )
+        elif history[0]["role"] != "system":
+            custom_prompt = await storage.get_system_prompt(user_id)
+            context_system_prompt = custom_prompt if custom_prompt else config.system_prompt
 
         # 3. Добавляем сообщение пользователя
         history.append(
@@ -82,8 +118,12 @@ async def handle_message(
             }
         )
 
-        # 4. Получаем ответ от LLM
-        response = await llm_client.generate_response(messages=history, user_id=user_id)
+        # 4. Собираем контекст в пределах бюджета токенов и получаем ответ от LLM
+        context = context_builder.build(history, system_prompt=context_system_prompt)
+        response = await llm_client.generate_response(
+            messages=context, user_id=user_id, deadline=deadline
+        )
+        typing_task.cancel()
 
         # 5. Добавляем ответ ассистента в историю
         history.append(
@@ -94,44 +134,106 @@ async def handle_message(
             }
         )
 
-        # 6. Сохраняем обновленную историю
-        await storage.save_history(user_id, history)
-
-        # 7. Отправляем ответ пользователю (с разбивкой если нужно)
-        # Разбиваем длинные сообщения на части
-        message_parts = split_message(response)
-
-        if len(message_parts) == 1:
-            # Короткое сообщение - отправляем как есть
-            await message.answer(response)
-            logger.debug(f"User {user_id}: response sent ({len(response)} chars)")
-        else:
-            # Длинное сообщение - отправляем по частям
-            logger.info(
-                f"User {user_id}: splitting long response into {len(message_parts)} parts "
-                f"(total {len(response)} chars)"
-            )
-
-            for i, part in enumerate(message_parts, 1):
-                # Добавляем индикатор части
-                part_indicator = f"📄 Часть {i}/{len(message_parts)}\n\n"
-                part_with_indicator = part_indicator + part
-
-                await message.answer(part_with_indicator)
-
-                # Небольшая задержка между частями для лучшей читаемости
-                if i < len(message_parts):
-                    await asyncio.sleep(0.5)
-
-            logger.debug(f"User {user_id}: all {len(message_parts)} parts sent successfully")
+        # 6. Отправляем ответ пользователю (с разбивкой если нужно), затем сохраняем
+        try:
+            await _send_response(message, response, user_id, outbound)
+        finally:
+            if background is not None:
+                # Сохранение вне критического пути: медленная БД не задерживает ответ.
+                # Ход уже завершён, поэтому у фонового сохранения свой бюджет на retry
+                save = storage.save_history(
+                    user_id, history, deadline=Deadline(config.reply_deadline)
+                )
+                background.spawn(f"save_history:{user_id}", save, key=user_id)
+            else:
+                await storage.save_history(user_id, history, deadline=deadline)
+
+        # 7. Сжимаем старую часть длинного диалога в фоне (после ответа пользователю)
+        if summarizer is not None:
+            summarizer.schedule(user_id, history)
 
     except LLMAPIError as e:
         logger.error(f"User {user_id}: LLM API error: {e}")
 
         # Отправляем понятное сообщение об ошибке
         error_message = get_error_message(str(e))
-        await message.answer(error_message)
+        await answer(message, error_message, outbound)
 
     except Exception as e:
         logger.error(f"User {user_id}: Unexpected error: {e}", exc_info=True)
-        await message.answer("⚠️ Произошла ошибка при обработке запроса. Попробуйте позже.")
+        await answer(
+            message, "⚠️ Произошла ошибка при обработке запроса. Попробуйте позже.", outbound
+        )
+
+    finally:
+        if typing_task is not None:
+            typing_task.cancel()
+
+
+async def _send_response(
+    message: Message, response: str, user_id: int, outbound: OutboundQueue | None = None
+) -> None:
+    """
+    Отправляет ответ LLM пользователю, разбивая длинные ответы на части.
+
+    Темп отправки частей определяет очередь исходящих сообщений (лимит на чат),
+    продолжения длинного ответа уступают первым частям ответов других пользователей.
+
+    Args:
+        message: Входящее сообщение пользователя
+        response: Текст ответа LLM
+        user_id: ID пользователя для логирования
+        outbound: Очередь исходящих сообщений (опционально)
+    """
+    message_parts = split_message(response)
+
+    if len(message_parts) == 1:
+        # Короткое сообщение - отправляем как есть
+        await answer(message, response, outbound)
+        logger.debug(f"User {user_id}: response sent ({len(response)} chars)")
+        return
+
+    # Длинное сообщение - отправляем по частям
+    logger.info(
+        f"User {user_id}: splitting long response into {len(message_parts)} parts "
+        f"(total {len(response)} chars)"
+    )
+
+    for i, part in enumerate(message_parts, 1):
+        # Добавляем индикатор части
+        part_indicator = f"📄 Часть {i}/{len(message_parts)}\n\n"
+        priority = PRIORITY_REPLY if i == 1 else PRIORITY_CONTINUATION
+        await answer(message, part_indicator + part, outbound, priority)
+
+    logger.debug(f"User {user_id}: all {len(message_parts)} parts sent successfully")
+
+
+async def _send_typing(bot: Bot, chat_id: int) -> None:
+    """
+    Отправляет индикатор "печатает...", не прерывая обработку при ошибке.
+
+    Args:
+        bot: Экземпляр бота
+        chat_id: ID чата
+    """
+    try:
+        await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+    except Exception as e:
+        logger.debug(f"Chat {chat_id}: failed to send typing action: {e}")
+
+
+async def _keep_typing(bot: Bot, chat_id: int, interval: float) -> None:
+    """
+    Повторяет индикатор "печатает..." до отмены задачи.
+
+    Telegram показывает индикатор около 5 секунд, поэтому во время долгого
+    запроса к LLM его нужно периодически обновлять.
+
+    Args:
+        bot: Экземпляр бота
+        chat_id: ID чата
+        interval: Интервал повтора в секундах
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await _send_typing(bot, chat_id)
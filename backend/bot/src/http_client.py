@@ -0,0 +1,127 @@
+"""HTTP транспорт для клиента LLM API с учётом переиспользования соединений."""
+
+import importlib.util
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Событие httpcore trace, означающее открытие нового TCP соединения
+NEW_CONNECTION_EVENT = "connection.connect_tcp.complete"
+
+# Как часто логировать статистику соединений (в запросах)
+CONNECTION_STATS_LOG_EVERY = 100
+
+
+@dataclass
+class ConnectionStats:
+    """
+    Статистика переиспользования соединений HTTP клиента.
+
+    Attributes:
+        requests: Количество отправленных запросов
+        new_connections: Количество открытых TCP соединений
+    """
+
+    requests: int = 0
+    new_connections: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        """
+        Доля запросов, выполненных по уже открытому соединению.
+
+        Returns:
+            Значение от 0.0 до 1.0 (0.0 если запросов ещё не было)
+        """
+        if self.requests == 0:
+            return 0.0
+        return max(0.0, 1.0 - self.new_connections / self.requests)
+
+    async def on_request(self, request: httpx.Request) -> None:
+        """
+        Event hook httpx: учитывает запрос и подключает trace соединений.
+
+        Args:
+            request: Исходящий HTTP запрос
+        """
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+        if self.requests % CONNECTION_STATS_LOG_EVERY == 0:
+            logger.info(
+                f"LLM HTTP connections: requests={self.requests}, "
+                f"new_connections={self.new_connections}, reuse_rate={self.reuse_rate:.2%}"
+            )
+
+    async def _trace(self, event_name: str, _info: dict[str, Any]) -> None:
+        """
+        Trace callback httpcore: считает новые TCP соединения.
+
+        Args:
+            event_name: Имя события (например, connection.connect_tcp.complete)
+            _info: Данные события (не используются)
+        """
+        if event_name == NEW_CONNECTION_EVENT:
+            self.new_connections += 1
+
+
+def http2_available(config: Config) -> bool:
+    """
+    Проверяет, будет ли клиент LLM API использовать HTTP/2.
+
+    Args:
+        config: Конфигурация приложения
+
+    Returns:
+        True если HTTP/2 включён в конфигурации и установлен пакет h2
+    """
+    return config.llm_http2 and importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(config: Config, stats: ConnectionStats) -> httpx.AsyncClient:
+    """
+    Создаёт httpx клиент для LLM API с настройками пула, таймаутов и HTTP/2.
+
+    HTTP/2 включается только если установлен пакет h2 (httpx[http2]),
+    иначе используется HTTP/1.1 с предупреждением в логе.
+
+    Args:
+        config: Конфигурация приложения
+        stats: Статистика соединений (подключается через event hook)
+
+    Returns:
+        Настроенный httpx.AsyncClient
+    """
+    http2 = http2_available(config)
+    if config.llm_http2 and not http2:
+        logger.warning("HTTP/2 requested but 'h2' package is not installed, using HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=config.llm_max_connections,
+        max_keepalive_connections=config.llm_max_keepalive_connections,
+        keepalive_expiry=config.llm_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        connect=config.llm_connect_timeout,
+        read=config.llm_read_timeout,
+        write=config.llm_write_timeout,
+        pool=config.llm_pool_timeout,
+    )
+
+    logger.info(
+        f"LLM HTTP client: http2={http2}, max_connections={config.llm_max_connections}, "
+        f"keepalive={config.llm_max_keepalive_connections}, read_timeout={config.llm_read_timeout}s"
+    )
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=timeout,
+        event_hooks={"request": [stats.on_request]},
+    )
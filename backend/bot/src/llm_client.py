@@ -1,11 +1,23 @@
 """Клиент для работы с LLM через OpenRouter API."""
 
+import asyncio
 import logging
+import random
 import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any
 
+import httpx
 from openai import APIConnectionError, APIError, APITimeoutError, AsyncOpenAI, RateLimitError
 
 from src.config import Config
+from src.deadline import Deadline, DeadlineExceededError
+from src.http_client import ConnectionStats, create_http_client, http2_available
+from src.model_router import ModelRouter
+from src.retry_budget import RetryBudget
+from src.telemetry import PURPOSE_TURN, UsageRecord, UsageRecorder
 
 logger = logging.getLogger(__name__)
 
@@ -22,293 +34,581 @@ class LLMClient:
 
     Отвечает за:
     - Отправку запросов к LLM
-    - Retry механизм при сбоях
+    - Retry механизм при сбоях (Retry-After, jitter, глобальный бюджет retry)
     - Обработку ошибок API
-    - Логирование использования токенов
+    - Разметку стабильного префикса промпта для кеширования у провайдера
+    - Логирование использования токенов (включая кешированные)
+    - Запись телеметрии каждого хода (модель, токены, задержка, retry, fallback)
+    - Прогрев и переиспользование HTTP соединений с API
+    - Выбор модели из пула и переход на другие модели при сбоях (через ModelRouter)
+    - Уведомление подписчиков о фактическом usage хода (например, token rate limiter)
     """
 
-    def __init__(self, config: Config) -> None:
+    def __init__(self, config: Config, usage_recorder: UsageRecorder | None = None) -> None:
         """
         Инициализация LLM клиента.
 
         Args:
             config: Конфигурация приложения
+            usage_recorder: Recorder телеметрии LLM (опционально)
         """
         self.config = config
+        self.usage_recorder = usage_recorder
+        self.usage_listeners: list[Callable[[UsageRecord], None]] = []
+        self.router = ModelRouter(config)
+        self.retry_budget = RetryBudget(config)
+        self.connection_stats = ConnectionStats()
+        self.http_client = create_http_client(config, self.connection_stats)
         self.client = AsyncOpenAI(
-            base_url=config.openrouter_base_url, api_key=config.openrouter_api_key
+            base_url=config.openrouter_base_url,
+            api_key=config.openrouter_api_key,
+            http_client=self.http_client,
+            # Повторы выполняет LLMClient (с бюджетом retry), а не SDK
+            max_retries=0,
         )
         logger.info(
             f"LLMClient initialized: model={config.openrouter_model}, "
             f"temperature={config.llm_temperature}, max_tokens={config.llm_max_tokens}"
         )
 
-    async def generate_response(self, messages: list[dict[str, str]], user_id: int) -> str:
+    def add_usage_listener(self, listener: Callable[[UsageRecord], None]) -> None:
+        """
+        Подписывает listener на фактический usage каждого хода.
+
+        Listener вызывается синхронно после завершения generate_response
+        (в том числе неуспешного) и не должен выполнять блокирующих операций.
+
+        Args:
+            listener: Функция, принимающая телеметрию хода
+        """
+        self.usage_listeners.append(listener)
+
+    async def warmup(self) -> None:
+        """
+        Заранее устанавливает соединения с LLM API (TCP + TLS).
+
+        Выполняет несколько параллельных лёгких запросов, чтобы первые
+        запросы пользователей не платили за установку соединения.
+        По HTTP/2 параллельные запросы мультиплексируются в одном соединении,
+        поэтому прогревается одно соединение (llm_warmup_connections - только HTTP/1.1).
+        Ошибки прогрева логируются и не прерывают запуск бота.
+        """
+        if not self.config.llm_warmup_enabled:
+            return
+
+        count = 1 if http2_available(self.config) else self.config.llm_warmup_connections
+        start_time = time.time()
+        results = await asyncio.gather(
+            *(self.http_client.head(self.config.openrouter_base_url) for _ in range(count)),
+            return_exceptions=True,
+        )
+        elapsed = time.time() - start_time
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.warning(f"LLM warm-up: {len(errors)}/{count} requests failed: {errors[0]}")
+
+        logger.info(
+            f"LLM warm-up completed in {elapsed:.2f}s: "
+            f"{count - len(errors)}/{count} requests, "
+            f"{self.connection_stats.new_connections} connections opened"
+        )
+
+    async def close(self) -> None:
+        """Закрывает HTTP соединения и логирует статистику переиспользования."""
+        stats = self.connection_stats
+        logger.info(
+            f"LLM HTTP connections: requests={stats.requests}, "
+            f"new_connections={stats.new_connections}, reuse_rate={stats.reuse_rate:.2%}"
+        )
+        await self.client.close()
+
+    async def generate_response(
+        self,
+        messages: list[dict[str, str]],
+        user_id: int,
+        model: str | None = None,
+        deadline: Deadline | None = None,
+        purpose: str = PURPOSE_TURN,
+    ) -> str:
         """
         Генерирует ответ LLM на основе истории диалога.
 
+        Модель выбирается маршрутизатором по пулу моделей; при сбое запрос
+        переходит на следующие модели пула (failover).
+
         Args:
             messages: История диалога в формате OpenAI (включая системный промпт)
                       [{"role": "system"|"user"|"assistant", "content": "..."}]
             user_id: ID пользователя для логирования
+            model: Модель для первой попытки (по умолчанию выбирается маршрутизатором)
+            deadline: Бюджет времени хода (ограничивает запросы, retry и failover)
+            purpose: Назначение запроса для телеметрии (PURPOSE_TURN или PURPOSE_SUMMARY)
 
         Returns:
             Текст ответа от LLM
 
         Raises:
-            LLMAPIError: При ошибке API после всех retry попыток
+            LLMAPIError: При ошибке API после всех retry попыток или исчерпании deadline
         """
         # Фильтруем сообщения для LLM API (оставляем только role и content)
         api_messages = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+        models = self.router.route(model)
 
         logger.info(
-            f"LLM request for user {user_id}: "
-            f"model={self.config.openrouter_model}, messages={len(api_messages)}"
+            f"LLM request for user {user_id}: model={models[0]}, messages={len(api_messages)}"
         )
 
-        # Выполняем запрос с retry механизмом
-        for attempt in range(self.config.retry_attempts):
-            try:
-                start_time = time.time()
+        turn = UsageRecord(user_id=user_id, model=models[0], latency_ms=0, purpose=purpose)
+        turn_start = time.monotonic()
+
+        try:
+            return await self._generate_with_failover(api_messages, user_id, models, turn, deadline)
+        except DeadlineExceededError as e:
+            turn.success = False
+            logger.warning(f"LLM request for user {user_id} stopped: {e}")
+            raise LLMAPIError(f"Reply deadline exceeded: {e}") from e
+        except LLMAPIError:
+            turn.success = False
+            raise
+        finally:
+            turn.latency_ms = int((time.monotonic() - turn_start) * 1000)
+            if self.usage_recorder is not None:
+                self.usage_recorder.record(turn)
+            for listener in self.usage_listeners:
+                listener(turn)
+
+    async def _generate_with_failover(
+        self,
+        api_messages: list[dict[str, str]],
+        user_id: int,
+        models: list[str],
+        turn: UsageRecord,
+        deadline: Deadline | None = None,
+    ) -> str:
+        """
+        Выполняет запрос, переходя по списку моделей при сбоях.
 
-                response = await self.client.chat.completions.create(
-                    model=self.config.openrouter_model,
-                    messages=api_messages,  # type: ignore[arg-type]
-                    temperature=self.config.llm_temperature,
-                    max_tokens=self.config.llm_max_tokens,
-                )
+        Args:
+            api_messages: Сообщения для отправки
+            user_id: ID пользователя
+            models: Модели в порядке попыток
+            turn: Телеметрия текущего хода (заполняется по ходу запроса)
+            deadline: Бюджет времени хода (опционально)
 
-                elapsed_time = time.time() - start_time
+        Returns:
+            Текст ответа от LLM
 
-                # Валидируем структуру ответа
-                if not response.choices:
-                    logger.error(
-                        f"Invalid response structure for user {user_id}: "
-                        f"response.choices is {'None' if response.choices is None else 'empty'}. "
-                        f"Full response: {response}"
-                    )
-                    raise LLMAPIError("Invalid response from LLM API: no choices in response")
+        Raises:
+            LLMAPIError: Если все модели провалились или ошибка не допускает failover
+            DeadlineExceededError: Если бюджет времени исчерпан
+        """
+        failures: list[tuple[str, LLMAPIError]] = []
 
-                if not response.choices[0].message:
-                    logger.error(
-                        f"Invalid response structure for user {user_id}: "
-                        f"response.choices[0].message is None. Full response: {response}"
-                    )
-                    raise LLMAPIError("Invalid response from LLM API: no message in choice")
+        for index, model in enumerate(models):
+            if index > 0:
+                failed_model, failed_error = failures[-1]
+                logger.warning(
+                    f"Model {failed_model} failed for user {user_id}: {failed_error}. "
+                    f"Trying fallback model: {model}"
+                )
+                turn.model = model
+                turn.is_fallback = True
 
-                # Извлекаем ответ
-                assistant_message = response.choices[0].message.content
+            try:
+                return await self._generate_with_retries(
+                    api_messages,
+                    user_id,
+                    model,
+                    turn,
+                    retries_before=index * self.config.retry_attempts,
+                    deadline=deadline,
+                )
+            except (RateLimitError, APITimeoutError, APIConnectionError, APIError) as e:
+                failures.append((model, self._to_llm_error(e)))
+                if index < len(models) - 1 and self._should_try_fallback(e):
+                    continue
+                break
+
+        if len(failures) == 1:
+            model, error = failures[0]
+            raise error from error.__cause__
+
+        summary = ". ".join(f"{model}: {error}" for model, error in failures)
+        logger.error(f"All models failed for user {user_id}. {summary}")
+        raise LLMAPIError(f"All models failed. {summary}") from failures[-1][1].__cause__
+
+    async def _generate_with_retries(
+        self,
+        api_messages: list[dict[str, str]],
+        user_id: int,
+        model: str,
+        turn: UsageRecord,
+        retries_before: int = 0,
+        deadline: Deadline | None = None,
+    ) -> str:
+        """
+        Выполняет запрос к одной модели с retry механизмом.
 
-                # Логируем использование токенов
-                if response.usage:
-                    prompt_tokens = response.usage.prompt_tokens
-                    completion_tokens = response.usage.completion_tokens
-                    total_tokens = response.usage.total_tokens
+        Args:
+            api_messages: Сообщения для отправки
+            user_id: ID пользователя
+            model: Модель для запроса
+            turn: Телеметрия текущего хода
+            retries_before: Количество попыток, уже сделанных к другим моделям
+            deadline: Бюджет времени хода (опционально)
 
-                    logger.info(
-                        f"LLM response for user {user_id}: "
-                        f"tokens(prompt={prompt_tokens}, completion={completion_tokens}, total={total_tokens}), "
-                        f"time={elapsed_time:.2f}s"
-                    )
-                else:
-                    logger.info(f"LLM response for user {user_id}: time={elapsed_time:.2f}s")
+        Returns:
+            Текст ответа от LLM
 
-                return assistant_message or ""
+        Raises:
+            RateLimitError, APITimeoutError, APIConnectionError, APIError:
+                Ошибка API после всех retry попыток
+            LLMAPIError: При некорректном ответе или непредвиденной ошибке
+            DeadlineExceededError: Если бюджет времени исчерпан
+        """
+        for attempt in range(self.config.retry_attempts):
+            if deadline is not None:
+                deadline.check(f"LLM request to {model}")
 
-            except RateLimitError as e:
-                logger.warning(
-                    f"Rate limit error for user {user_id} (attempt {attempt + 1}/{self.config.retry_attempts}): {e}"
-                )
-                if attempt < self.config.retry_attempts - 1:
-                    await self._retry_delay(attempt)
-                else:
-                    # Проверяем нужен ли fallback
-                    if self._should_try_fallback(e):
-                        return await self._try_fallback_model(api_messages, user_id, e)
-                    raise LLMAPIError("Rate limit exceeded") from e
-
-            except APITimeoutError as e:
-                logger.warning(
-                    f"Timeout error for user {user_id} (attempt {attempt + 1}/{self.config.retry_attempts}): {e}"
-                )
-                if attempt < self.config.retry_attempts - 1:
-                    await self._retry_delay(attempt)
-                else:
-                    raise LLMAPIError("Request timeout") from e
+            if attempt == 0:
+                self.retry_budget.record_request()
 
-            except APIConnectionError as e:
+            turn.retries = retries_before + attempt
+            start_time = time.time()
+            try:
+                response_text = await self._request(api_messages, user_id, model, turn, deadline)
+            except (RateLimitError, APITimeoutError, APIConnectionError, APIError) as e:
+                self.router.record_failure(model)
                 logger.warning(
-                    f"Connection error for user {user_id} (attempt {attempt + 1}/{self.config.retry_attempts}): {e}"
-                )
-                if attempt < self.config.retry_attempts - 1:
-                    await self._retry_delay(attempt)
-                else:
-                    raise LLMAPIError("Connection error") from e
-
-            except APIError as e:
-                logger.error(
-                    f"API error for user {user_id} (attempt {attempt + 1}/{self.config.retry_attempts}): {e}",
-                    exc_info=True,
+                    f"{self._error_kind(e)} for user {user_id}, model={model} "
+                    f"(attempt {attempt + 1}/{self.config.retry_attempts}): {e}"
                 )
-                if attempt < self.config.retry_attempts - 1:
-                    await self._retry_delay(attempt)
-                else:
-                    # Проверяем нужен ли fallback
-                    if self._should_try_fallback(e):
-                        return await self._try_fallback_model(api_messages, user_id, e)
-                    raise LLMAPIError(f"API error: {str(e)}") from e
-
+                if attempt == self.config.retry_attempts - 1:
+                    raise
+
+                retry_after = self._get_retry_after(e)
+                if retry_after is not None and retry_after > self.config.retry_after_max:
+                    logger.warning(
+                        f"Model {model} asks to retry after {retry_after:.1f}s "
+                        f"(max {self.config.retry_after_max}s), not retrying"
+                    )
+                    raise
+                if not self.retry_budget.try_acquire():
+                    raise
+
+                await self._retry_delay(attempt, deadline, retry_after)
+            except (LLMAPIError, DeadlineExceededError):
+                self.router.record_failure(model)
+                raise
             except Exception as e:
                 logger.error(f"Unexpected error for user {user_id}: {e}", exc_info=True)
                 raise LLMAPIError(f"Unexpected error: {str(e)}") from e
+            else:
+                self.router.record_success(model, time.time() - start_time)
+                return response_text
 
         # На случай, если цикл завершился без return (не должно происходить)
         raise LLMAPIError("Failed to get LLM response after all retries")
 
-    async def _retry_delay(self, attempt: int) -> None:
+    async def _request(
+        self,
+        api_messages: list[dict[str, str]],
+        user_id: int,
+        model: str,
+        turn: UsageRecord,
+        deadline: Deadline | None = None,
+    ) -> str:
         """
-        Задержка перед повторной попыткой с экспоненциальным backoff.
+        Выполняет один запрос к модели, валидирует и логирует ответ.
 
         Args:
-            attempt: Номер попытки (начиная с 0)
-        """
-        import asyncio
+            api_messages: Сообщения для отправки
+            user_id: ID пользователя
+            model: Модель для запроса
+            turn: Телеметрия текущего хода
+            deadline: Бюджет времени хода (ограничивает длительность запроса)
 
-        delay = self.config.retry_delay * (2**attempt)
-        logger.debug(f"Waiting {delay:.2f}s before retry...")
-        await asyncio.sleep(delay)
+        Returns:
+            Текст ответа от LLM
 
-    def _should_try_fallback(self, error: Exception) -> bool:
+        Raises:
+            LLMAPIError: При некорректной структуре ответа
+            DeadlineExceededError: Если запрос не уложился в оставшийся бюджет
         """
-        Определяет нужно ли пробовать fallback модель.
+        start_time = time.time()
 
-        Fallback используется только для:
-        - RateLimitError (429) - превышен лимит запросов
-        - APIError - серверные ошибки (500, 503)
+        try:
+            async with asyncio.timeout(deadline.remaining() if deadline else None):
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=self._prepare_messages(api_messages, model),  # type: ignore[arg-type]
+                    temperature=self.config.llm_temperature,
+                    max_tokens=self.config.llm_max_tokens,
+                )
+        except TimeoutError as e:
+            if deadline is None:
+                raise
+            raise DeadlineExceededError(
+                f"Deadline of {deadline.timeout:.1f}s exceeded during LLM request to {model}"
+            ) from e
+
+        elapsed_time = time.time() - start_time
+
+        # Валидируем структуру ответа
+        if not response.choices:
+            logger.error(
+                f"Invalid response structure for user {user_id}, model={model}: "
+                f"response.choices is {'None' if response.choices is None else 'empty'}. "
+                f"Full response: {response}"
+            )
+            raise LLMAPIError("Invalid response from LLM API: no choices in response")
+
+        if not response.choices[0].message:
+            logger.error(
+                f"Invalid response structure for user {user_id}, model={model}: "
+                f"response.choices[0].message is None. Full response: {response}"
+            )
+            raise LLMAPIError("Invalid response from LLM API: no message in choice")
+
+        # Извлекаем ответ
+        assistant_message = response.choices[0].message.content
+
+        # Логируем использование токенов
+        if response.usage:
+            prompt_tokens = response.usage.prompt_tokens
+            completion_tokens = response.usage.completion_tokens
+            total_tokens = response.usage.total_tokens
+            cached_tokens = self._get_cached_tokens(response.usage)
+            self._record_usage(turn, prompt_tokens, completion_tokens, cached_tokens)
+
+            logger.info(
+                f"LLM response for user {user_id}: model={model}, "
+                f"tokens(prompt={prompt_tokens}, completion={completion_tokens}, total={total_tokens}, "
+                f"cached={cached_tokens}, uncached={prompt_tokens - cached_tokens}), "
+                f"time={elapsed_time:.2f}s"
+            )
+        else:
+            logger.info(f"LLM response for user {user_id}: model={model}, time={elapsed_time:.2f}s")
+
+        return assistant_message or ""
+
+    @staticmethod
+    def _error_kind(error: Exception) -> str:
+        """
+        Возвращает название типа ошибки API для логов.
 
-        НЕ используется для:
-        - APITimeoutError - timeout проблема сети
-        - APIConnectionError - проблема соединения
+        Args:
+            error: Исключение API
+
+        Returns:
+            Название типа ошибки
+        """
+        if isinstance(error, RateLimitError):
+            return "Rate limit error"
+        if isinstance(error, APITimeoutError):
+            return "Timeout error"
+        if isinstance(error, APIConnectionError):
+            return "Connection error"
+        return "API error"
+
+    @staticmethod
+    def _to_llm_error(error: Exception) -> LLMAPIError:
+        """
+        Преобразует ошибку API в LLMAPIError с понятным сообщением.
 
         Args:
-            error: Исключение которое произошло
+            error: Исключение API
 
         Returns:
-            True если нужно попробовать fallback модель, False иначе
+            LLMAPIError (исходная ошибка сохраняется в __cause__)
         """
-        # Если fallback модель не настроена - не пытаемся
-        if not self.config.openrouter_fallback_model:
-            return False
+        if isinstance(error, RateLimitError):
+            llm_error = LLMAPIError("Rate limit exceeded")
+        elif isinstance(error, APITimeoutError):
+            llm_error = LLMAPIError("Request timeout")
+        elif isinstance(error, APIConnectionError):
+            llm_error = LLMAPIError("Connection error")
+        else:
+            llm_error = LLMAPIError(f"API error: {str(error)}")
+        llm_error.__cause__ = error
+        return llm_error
+
+    def _prepare_messages(
+        self, api_messages: list[dict[str, str]], model: str
+    ) -> list[dict[str, Any]]:
+        """
+        Размечает стабильный префикс промпта для кеширования у провайдера.
 
-        # Timeout и Connection errors НЕ триггерят fallback (проверяем первыми)
-        if isinstance(error, APITimeoutError | APIConnectionError):
-            return False
+        Провайдеры OpenAI/DeepSeek кешируют префикс автоматически, а для
+        Anthropic и Gemini через OpenRouter нужен явный маркер cache_control.
+        Маркер ставится на последнее сообщение начального блока системных
+        сообщений (системный промпт и summary), если префикс достаточно длинный.
 
-        # RateLimitError и APIError триггерят fallback
-        return isinstance(error, RateLimitError | APIError)
+        Args:
+            api_messages: Сообщения для отправки
+            model: Модель, к которой выполняется запрос
 
-    async def _try_fallback_model(
-        self, api_messages: list[dict[str, str]], user_id: int, primary_error: Exception
-    ) -> str:
+        Returns:
+            Сообщения для API (с маркером cache_control, если он применим)
+        """
+        if not self.config.prompt_cache_enabled or not model.startswith(
+            tuple(self.config.prompt_cache_model_prefixes)
+        ):
+            return list(api_messages)
+
+        prefix_end = 0
+        while prefix_end < len(api_messages) and api_messages[prefix_end]["role"] == "system":
+            prefix_end += 1
+
+        prefix_chars = sum(len(msg["content"]) for msg in api_messages[:prefix_end])
+        if prefix_end == 0 or prefix_chars < self.config.prompt_cache_min_chars:
+            return list(api_messages)
+
+        prepared: list[dict[str, Any]] = list(api_messages)
+        breakpoint_msg = api_messages[prefix_end - 1]
+        prepared[prefix_end - 1] = {
+            "role": breakpoint_msg["role"],
+            "content": [
+                {
+                    "type": "text",
+                    "text": breakpoint_msg["content"],
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+        return prepared
+
+    @staticmethod
+    def _record_usage(
+        turn: UsageRecord, prompt_tokens: int, completion_tokens: int, cached_tokens: int
+    ) -> None:
         """
-        Попытка запроса к fallback модели с retry механизмом.
+        Сохраняет токены из ответа API в телеметрию хода.
 
         Args:
-            api_messages: Сообщения для отправки
-            user_id: ID пользователя
-            primary_error: Ошибка от основной модели
+            turn: Телеметрия текущего хода
+            prompt_tokens: Токены промпта
+            completion_tokens: Токены ответа
+            cached_tokens: Токены промпта, прочитанные из кеша
+        """
+        turn.prompt_tokens = prompt_tokens
+        turn.completion_tokens = completion_tokens
+        turn.cached_tokens = cached_tokens
+
+    @staticmethod
+    def _get_cached_tokens(usage: Any) -> int:
+        """
+        Извлекает количество кешированных токенов промпта из usage.
+
+        Args:
+            usage: Объект usage из ответа API
 
         Returns:
-            Ответ от fallback модели
+            Количество токенов, прочитанных из кеша провайдера (0 если нет данных)
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        return cached_tokens if isinstance(cached_tokens, int) else 0
 
-        Raises:
-            LLMAPIError: Если fallback модель также провалилась
+    async def _retry_delay(
+        self, attempt: int, deadline: Deadline | None = None, retry_after: float | None = None
+    ) -> None:
         """
-        fallback_model = self.config.openrouter_fallback_model
+        Задержка перед повторной попыткой.
+
+        Используется задержка из Retry-After провайдера, а при её отсутствии -
+        экспоненциальный backoff. К задержке добавляется случайный jitter,
+        чтобы повторы разных запросов не приходили к провайдеру одновременно.
 
-        # Гарантируем что fallback модель настроена (для type checker)
-        if not fallback_model:
-            raise LLMAPIError("Fallback model not configured")
+        Args:
+            attempt: Номер попытки (начиная с 0)
+            deadline: Бюджет времени хода (опционально)
+            retry_after: Задержка, запрошенная провайдером (секунды, опционально)
 
-        logger.warning(
-            f"Primary model failed for user {user_id}: {primary_error}. "
-            f"Trying fallback model: {fallback_model}"
+        Raises:
+            DeadlineExceededError: Если после задержки не останется времени на запрос
+        """
+        base_delay = (
+            retry_after if retry_after is not None else self.config.retry_delay * (2**attempt)
         )
+        delay = base_delay * (1 + random.uniform(0, self.config.retry_jitter))
+        if deadline is not None and not deadline.allows(delay):
+            raise DeadlineExceededError(
+                f"Deadline of {deadline.timeout:.1f}s leaves no time for retry in {delay:.2f}s"
+            )
 
-        # Retry механизм для fallback модели
-        for attempt in range(self.config.retry_attempts):
-            try:
-                start_time = time.time()
+        logger.debug(f"Waiting {delay:.2f}s before retry...")
+        await asyncio.sleep(delay)
 
-                response = await self.client.chat.completions.create(
-                    model=fallback_model,
-                    messages=api_messages,  # type: ignore[arg-type]
-                    temperature=self.config.llm_temperature,
-                    max_tokens=self.config.llm_max_tokens,
-                )
+    @staticmethod
+    def _get_retry_after(error: Exception) -> float | None:
+        """
+        Извлекает задержку из заголовков Retry-After ответа провайдера.
 
-                elapsed_time = time.time() - start_time
+        Поддерживаются retry-after-ms, retry-after в секундах и в формате HTTP-date.
 
-                # Валидируем структуру ответа
-                if not response.choices:
-                    logger.error(
-                        f"Invalid fallback response structure for user {user_id}: "
-                        f"response.choices is {'None' if response.choices is None else 'empty'}. "
-                        f"Full response: {response}"
-                    )
-                    raise LLMAPIError(
-                        "Invalid response from fallback LLM API: no choices in response"
-                    )
+        Args:
+            error: Исключение API
 
-                if not response.choices[0].message:
-                    logger.error(
-                        f"Invalid fallback response structure for user {user_id}: "
-                        f"response.choices[0].message is None. Full response: {response}"
-                    )
-                    raise LLMAPIError(
-                        "Invalid response from fallback LLM API: no message in choice"
-                    )
+        Returns:
+            Задержка в секундах или None, если провайдер её не указал
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not isinstance(headers, httpx.Headers):
+            return None
 
-                # Извлекаем ответ
-                assistant_message = response.choices[0].message.content
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return max(0.0, float(retry_after_ms) / 1000)
+            except ValueError:
+                pass
+
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        # Зона "-0000" даёт naive datetime: время в HTTP-date всегда UTC
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=UTC)
+        return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
 
-                # Логируем успешный fallback
-                if response.usage:
-                    prompt_tokens = response.usage.prompt_tokens
-                    completion_tokens = response.usage.completion_tokens
-                    total_tokens = response.usage.total_tokens
+    def _should_try_fallback(self, error: Exception) -> bool:
+        """
+        Определяет нужно ли переходить на следующую модель пула.
 
-                    logger.info(
-                        f"Fallback model succeeded for user {user_id}: "
-                        f"model={fallback_model}, "
-                        f"tokens(prompt={prompt_tokens}, completion={completion_tokens}, total={total_tokens}), "
-                        f"time={elapsed_time:.2f}s"
-                    )
-                else:
-                    logger.info(
-                        f"Fallback model succeeded for user {user_id}: "
-                        f"model={fallback_model}, time={elapsed_time:.2f}s"
-                    )
+        Fallback используется только для:
+        - RateLimitError (429) - превышен лимит запросов
+        - APIError - серверные ошибки (500, 503)
 
-                return assistant_message or ""
+        НЕ используется для:
+        - APITimeoutError - timeout проблема сети
+        - APIConnectionError - проблема соединения
 
-            except Exception as e:
-                logger.warning(
-                    f"Fallback model error for user {user_id} "
-                    f"(attempt {attempt + 1}/{self.config.retry_attempts}): {e}"
-                )
-                if attempt < self.config.retry_attempts - 1:
-                    await self._retry_delay(attempt)
-                else:
-                    # Fallback тоже провалился
-                    logger.error(
-                        f"Both models failed for user {user_id}. "
-                        f"Primary: {primary_error}. Fallback: {e}"
-                    )
-                    raise LLMAPIError(
-                        f"Both primary and fallback models failed. "
-                        f"Primary: {str(primary_error)}. Fallback: {str(e)}"
-                    ) from e
+        Args:
+            error: Исключение которое произошло
 
-        # На случай, если цикл завершился без return (не должно происходить)
-        raise LLMAPIError("Fallback model failed after all retries")
+        Returns:
+            True если нужно попробовать следующую модель, False иначе
+        """
+        # Если в пуле нет других моделей - не пытаемся
+        if len(self.router.models) < 2:
+            return False
+
+        # Timeout и Connection errors НЕ триггерят fallback (проверяем первыми)
+        if isinstance(error, APITimeoutError | APIConnectionError):
+            return False
+
+        # RateLimitError и APIError триггерят fallback
+        return isinstance(error, RateLimitError | APIError)
@@ -4,14 +4,19 @@ import argparse
 import asyncio
 import contextlib
 import logging
+import multiprocessing
+import signal
 import sys
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
+from typing import Any
 
+from aiogram import Bot as AiogramBot
 from dotenv import load_dotenv
 
 from src.bot import Bot
 from src.config import Config
+from src.sharding import ShardRouter, WorkerPool, worker_config, worker_urls
 
 
 def parse_args() -> argparse.Namespace:
@@ -28,10 +33,23 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Путь к .env файлу с конфигурацией (опционально, если не указан - используются переменные окружения)",
     )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["polling", "webhook"],
+        default=None,
+        help="Режим получения обновлений (переопределяет BOT_MODE)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Количество worker процессов в режиме webhook (переопределяет SCALE_WORKERS)",
+    )
     return parser.parse_args()
 
 
-def setup_logging(config: Config) -> None:
+def setup_logging(config: Config, log_name: str = "bot.log") -> None:
     """
     Настройка системы логирования.
 
@@ -39,6 +57,7 @@ def setup_logging(config: Config) -> None:
 
     Args:
         config: Конфигурация приложения
+        log_name: Имя файла лога (у каждого worker процесса свой файл)
     """
     # Создаём директорию для логов, если её нет
     logs_dir = Path(config.logs_dir)
@@ -60,7 +79,7 @@ def setup_logging(config: Config) -> None:
     root_logger.addHandler(console_handler)
 
     # Файловый handler с ротацией
-    log_file = logs_dir / "bot.log"
+    log_file = logs_dir / log_name
     file_handler = RotatingFileHandler(
         log_file,
         maxBytes=10 * 1024 * 1024,  # 10 MB
@@ -77,34 +96,15 @@ def setup_logging(config: Config) -> None:
     logging.info("Logging configured successfully")
 
 
-async def main_async(env_file: Path | None) -> None:
+async def run_bot(config: Config) -> None:
     """
-    Асинхронная главная функция.
+    Запускает бота и останавливает его с graceful shutdown.
 
     Args:
-        env_file: Путь к .env файлу (опционально)
+        config: Конфигурация приложения
     """
     logger = logging.getLogger(__name__)
 
-    # Загрузка .env файла если указан
-    if env_file:
-        load_dotenv(dotenv_path=env_file, override=True)
-        logger.info(f"Loaded environment from {env_file.absolute()}")
-
-    # Загрузка конфигурации
-    try:
-        config = Config()
-        if env_file:
-            logger.info(f"Configuration loaded from {env_file.absolute()}")
-        else:
-            logger.info("Configuration loaded from environment variables")
-
-        logger.info(f"Log level: {config.log_level}")
-        logger.info(f"Model: {config.openrouter_model}")
-    except Exception as e:
-        logger.error(f"Failed to load configuration: {e}", exc_info=True)
-        sys.exit(1)
-
     # Инициализация бота
     try:
         bot = Bot(config)
@@ -130,6 +130,122 @@ async def main_async(env_file: Path | None) -> None:
         logger.info("Bot shutdown complete")
 
 
+def run_worker(config: Config, index: int) -> None:
+    """
+    Точка входа worker процесса (режим scale-out).
+
+    Args:
+        config: Конфигурация роутера
+        index: Номер worker
+    """
+    # Ctrl+C получает вся группа процессов; worker останавливается супервизором
+    # (SIGTERM) после того, как роутер переслал принятые обновления
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    config = worker_config(config, index)
+    setup_logging(config, log_name=f"bot-worker-{index}.log")
+    logging.getLogger(__name__).info(
+        f"Worker {index} starting on {config.webhook_host}:{config.webhook_port}"
+    )
+    asyncio.run(run_bot(config))
+
+
+async def run_sharded(config: Config) -> None:
+    """
+    Запускает worker процессы и роутер, распределяющий обновления по user_id.
+
+    Упавшие worker перезапускаются. Если worker падает слишком часто, роутер
+    останавливается и процесс завершается с кодом 1 (сервис перезапускает супервизор).
+
+    Args:
+        config: Конфигурация приложения
+    """
+    logger = logging.getLogger(__name__)
+
+    context = multiprocessing.get_context("spawn")
+    workers = WorkerPool(
+        lambda index: context.Process(
+            target=run_worker, args=(config, index), name=f"bot-worker-{index}"
+        ),
+        config.scale_workers,
+        check_interval=config.worker_check_interval,
+        max_restarts=config.worker_max_restarts,
+        restart_window=config.worker_restart_window,
+    )
+    workers.start()
+
+    bot = AiogramBot(token=config.telegram_token)
+    router = ShardRouter(bot, config, worker_urls(config))
+    serve_task = asyncio.create_task(router.serve())
+    watchdog_task = asyncio.create_task(workers.watch())
+    crashed = False
+    try:
+        done, _ = await asyncio.wait(
+            {serve_task, watchdog_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        crashed = watchdog_task in done
+        if serve_task in done and (error := serve_task.exception()) is not None:
+            logger.error(f"Unexpected error: {error}", exc_info=error)
+    finally:
+        watchdog_task.cancel()
+        serve_task.cancel()
+        await asyncio.gather(watchdog_task, serve_task, return_exceptions=True)
+
+        await router.stop()
+        await bot.session.close()
+        await workers.stop(timeout=config.webhook_drain_timeout + 60.0)
+        logger.info("Router shutdown complete")
+
+    if crashed:
+        logger.error("Worker crash loop: exiting for supervisor restart")
+        sys.exit(1)
+
+
+async def main_async(
+    env_file: Path | None, mode: str | None = None, workers: int | None = None
+) -> None:
+    """
+    Асинхронная главная функция.
+
+    Args:
+        env_file: Путь к .env файлу (опционально)
+        mode: Режим получения обновлений polling/webhook (опционально, иначе из Config)
+        workers: Количество worker процессов (опционально, иначе из Config)
+    """
+    logger = logging.getLogger(__name__)
+
+    # Загрузка .env файла если указан
+    if env_file:
+        load_dotenv(dotenv_path=env_file, override=True)
+        logger.info(f"Loaded environment from {env_file.absolute()}")
+
+    # Загрузка конфигурации
+    try:
+        # Аргументы командной строки проходят ту же валидацию, что и переменные окружения
+        overrides: dict[str, Any] = {}
+        if mode is not None:
+            overrides["bot_mode"] = mode
+        if workers is not None:
+            overrides["scale_workers"] = workers
+        config = Config(**overrides)
+        if env_file:
+            logger.info(f"Configuration loaded from {env_file.absolute()}")
+        else:
+            logger.info("Configuration loaded from environment variables")
+
+        logger.info(f"Log level: {config.log_level}")
+        logger.info(f"Model: {config.openrouter_model}")
+        logger.info(f"Update mode: {config.bot_mode}, workers: {config.scale_workers}")
+    except Exception as e:
+        logger.error(f"Failed to load configuration: {e}", exc_info=True)
+        sys.exit(1)
+
+    if config.bot_mode == "webhook" and config.scale_workers > 1:
+        await run_sharded(config)
+    else:
+        await run_bot(config)
+
+
 def main() -> None:
     """Главная функция приложения."""
     # Проверка версии Python
@@ -170,7 +286,7 @@ def main() -> None:
 
     # Запуск асинхронного event loop
     with contextlib.suppress(KeyboardInterrupt):
-        asyncio.run(main_async(env_file))
+        asyncio.run(main_async(env_file, args.mode, args.workers))
 
 
 if __name__ == "__main__":
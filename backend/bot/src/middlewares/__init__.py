@@ -1,5 +1,13 @@
 """Middleware для Telegram бота."""
 
+from src.middlewares.concurrency import ConcurrencyLimitMiddleware
+from src.middlewares.inflight import InFlightMiddleware
 from src.middlewares.rate_limit import RateLimitMiddleware
+from src.middlewares.token_limit import TokenRateLimitMiddleware
 
-__all__ = ["RateLimitMiddleware"]
+__all__ = [
+    "ConcurrencyLimitMiddleware",
+    "InFlightMiddleware",
+    "RateLimitMiddleware",
+    "TokenRateLimitMiddleware",
+]
@@ -0,0 +1,181 @@
+"""Ограничение количества одновременно обрабатываемых сообщений (backpressure)."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from src.outbound import answer
+
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGE = (
+    "⏳ Бот сейчас перегружен и не может обработать ваше сообщение.\n\n"
+    "Пожалуйста, повторите запрос через минуту."
+)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Middleware с ограниченным пулом обработчиков и очередью ожидания.
+
+    aiogram запускает каждое обновление отдельной задачей без общего лимита:
+    всплеск сообщений порождает тысячи одновременных handlers, которые
+    конкурируют за соединения БД и LLM. Middleware пропускает не более limit
+    handlers одновременно, остальные ждут в очереди (FIFO). Если очередь
+    заполнена или ожидание дольше queue_timeout - пользователь получает
+    ответ "бот перегружен", сообщение не обрабатывается.
+
+    Attributes:
+        limit: Максимум одновременно выполняемых handlers
+        queue_size: Максимум сообщений в очереди ожидания
+        queue_timeout: Максимальное время ожидания в очереди (секунды)
+        active: Количество выполняемых handlers
+        waiting: Текущая глубина очереди
+    """
+
+    def __init__(
+        self,
+        limit: int = 32,
+        queue_size: int = 256,
+        queue_timeout: float = 20.0,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Инициализация пула.
+
+        Args:
+            limit: Максимум одновременно выполняемых handlers (по умолчанию 32)
+            queue_size: Максимум сообщений в очереди (по умолчанию 256)
+            queue_timeout: Максимальное ожидание в очереди в секундах (по умолчанию 20.0)
+            enabled: Включено ли ограничение (по умолчанию True)
+        """
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+        self._semaphore = asyncio.Semaphore(limit)
+
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.processed = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+        logger.info(
+            f"ConcurrencyLimitMiddleware initialized: limit={limit}, "
+            f"queue_size={queue_size}, queue_timeout={queue_timeout}s, enabled={enabled}"
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """
+        Выполняет handler, когда в пуле есть свободное место.
+
+        Args:
+            handler: Следующий обработчик в цепочке
+            event: Событие Telegram (обычно Message)
+            data: Дополнительные данные
+
+        Returns:
+            Результат обработки или None, если сообщение отклонено
+        """
+        if not self.enabled or not isinstance(event, Message):
+            return await handler(event, data)
+
+        message: Message = event
+
+        if not self._semaphore.locked():
+            # Есть свободное место: acquire завершается без ожидания
+            await self._semaphore.acquire()
+        elif self.waiting >= self.queue_size:
+            self.shed += 1
+            logger.warning(
+                f"Handler pool full: active={self.active}, queue={self.waiting}, "
+                f"message from chat {message.chat.id} shed"
+            )
+            await self._reply_busy(message, data)
+            return None
+        elif not await self._wait_for_slot(message, data):
+            return None
+
+        self.active += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            self.processed += 1
+            self._semaphore.release()
+
+    async def _wait_for_slot(self, message: Message, data: dict[str, Any]) -> bool:
+        """
+        Ожидает места в пуле в очереди (не дольше queue_timeout).
+
+        Args:
+            message: Сообщение в очереди
+            data: Данные обновления (очередь исходящих сообщений "outbound")
+
+        Returns:
+            True если место получено, False если ожидание превысило timeout
+        """
+        self.queued += 1
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except TimeoutError:
+            self.timed_out += 1
+            logger.warning(
+                f"Message from chat {message.chat.id} waited {self.queue_timeout}s "
+                f"in handler queue, dropped"
+            )
+            await self._reply_busy(message, data)
+            return False
+        finally:
+            self.waiting -= 1
+            self.total_wait += time.monotonic() - start_time
+        return True
+
+    async def _reply_busy(self, message: Message, data: dict[str, Any]) -> None:
+        """
+        Сообщает пользователю о перегрузке (через очередь исходящих сообщений).
+
+        Args:
+            message: Отклонённое сообщение
+            data: Данные обновления (очередь исходящих сообщений "outbound")
+        """
+        try:
+            await answer(message, BUSY_MESSAGE, data.get("outbound"), parse_mode=None)
+        except Exception as e:
+            logger.error(f"Failed to send busy reply to chat {message.chat.id}: {e}")
+
+    def stats(self) -> dict[str, float]:
+        """
+        Возвращает метрики пула.
+
+        Returns:
+            Выполняемые handlers, глубина очереди (текущая и пиковая),
+            счётчики отклонённых сообщений и среднее время в очереди
+        """
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "processed": self.processed,
+            "queued": self.queued,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "avg_queue_wait": self.total_wait / self.queued if self.queued else 0.0,
+        }
@@ -0,0 +1,128 @@
+"""Учёт выполняемых handlers для graceful shutdown."""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+logger = logging.getLogger(__name__)
+
+# Время на завершение отменённых handlers (освобождение ресурсов в finally)
+CANCEL_GRACE = 1.0
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Outer middleware, отслеживающий обработку каждого обновления.
+
+    Регистрируется на dp.update, поэтому учитывает все обновления (команды,
+    сообщения в очереди пула handlers). При остановке бота drain() ждёт
+    завершения обработки до deadline и отменяет то, что не успело завершиться.
+
+    Attributes:
+        completed: Количество завершённых обработок
+        abandoned: Количество обработок, отменённых при остановке
+    """
+
+    def __init__(self) -> None:
+        """Инициализация учёта."""
+        # Задача обработки -> описание обновления (для отчёта о потерянной работе)
+        self._in_flight: dict[asyncio.Task[Any], str] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.completed = 0
+        self.abandoned = 0
+
+    @property
+    def active(self) -> int:
+        """Количество обновлений в обработке."""
+        return len(self._in_flight)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """
+        Выполняет обработку обновления с учётом в списке выполняемых.
+
+        Args:
+            handler: Следующий обработчик в цепочке
+            event: Обновление Telegram
+            data: Дополнительные данные
+
+        Returns:
+            Результат обработки
+        """
+        task = asyncio.current_task()
+        if task is None:
+            return await handler(event, data)
+
+        self._in_flight[task] = self._describe(event, data)
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.pop(task, None)
+            self.completed += 1
+            if not self._in_flight:
+                self._idle.set()
+
+    @staticmethod
+    def _describe(event: TelegramObject, data: dict[str, Any]) -> str:
+        """
+        Описание обновления для логов.
+
+        Args:
+            event: Обновление Telegram
+            data: Данные middleware (event_from_user)
+
+        Returns:
+            Строка вида "update 123 (user 42)"
+        """
+        update_id = event.update_id if isinstance(event, Update) else "?"
+        user = data.get("event_from_user")
+        if isinstance(user, User):
+            return f"update {update_id} (user {user.id})"
+        return f"update {update_id}"
+
+    async def drain(self, timeout: float) -> list[str]:
+        """
+        Ожидает завершения выполняемых handlers, по timeout отменяет оставшиеся.
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Описания обновлений, обработка которых отменена
+        """
+        if not self._in_flight:
+            logger.info("No active handlers to wait for")
+            return []
+
+        logger.info(f"Waiting for {len(self._in_flight)} active handlers to complete...")
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+
+        if not self._in_flight:
+            logger.info("All handlers completed successfully")
+            return []
+
+        abandoned = list(self._in_flight.values())
+        tasks = list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        # Дожидаемся отмены, чтобы handlers не обращались к закрытым ресурсам
+        await asyncio.wait(tasks, timeout=CANCEL_GRACE)
+
+        self.abandoned += len(abandoned)
+        logger.warning(
+            f"Graceful shutdown timeout after {timeout:.1f}s: "
+            f"{len(abandoned)} handlers abandoned: {', '.join(abandoned)}"
+        )
+        return abandoned
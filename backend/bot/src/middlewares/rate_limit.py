@@ -1,31 +1,73 @@
 """Rate limiting middleware для защиты от спама."""
 
 import logging
+import math
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
-from typing import Any
+from typing import Any, Protocol
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message, TelegramObject
 
+from src.outbound import answer
+
 logger = logging.getLogger(__name__)
 
+# Максимум записей, проверяемых на истечение за один запрос (амортизированное O(1))
+EXPIRE_BATCH = 8
+
+
+class RateLimitBackend(Protocol):
+    """Общее для реплик бота хранилище лимитов (проверка после локальной)."""
+
+    async def acquire(self, user_id: int) -> float:
+        """
+        Учитывает запрос пользователя в общем лимите.
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            0.0 если запрос разрешён, иначе время ожидания
+        """
+        ...
+
 
 class RateLimitMiddleware(BaseMiddleware):
     """
     Middleware для ограничения частоты запросов пользователей.
 
-    Защищает от спама и злоупотреблений, отслеживая количество запросов
-    каждого пользователя в заданный период времени.
+    Защищает от спама и злоупотреблений по алгоритму GCRA (Generic Cell Rate
+    Algorithm, эквивалент token bucket): для пользователя хранится одно число -
+    теоретическое время следующего запроса (TAT). Проверка выполняется за O(1),
+    память - одна запись на пользователя, активного в последний период.
+
+    Допускается всплеск до rate запросов, затем не чаще одного запроса
+    в per / rate секунд. Записи пользователей с восстановленным лимитом
+    удаляются при обработке следующих запросов (самые старые первыми)
+    и в cleanup_old_records().
+
+    С backend (несколько реплик бота) запрос, разрешённый локально, проверяется
+    также по общему лимиту. Локальная проверка и кеш уведомлений отсекают
+    заблокированных пользователей без обращения к backend.
 
     Attributes:
         rate: Максимальное количество запросов
         per: Период времени в секундах
-        user_requests: Словарь с timestamps запросов для каждого пользователя
+        user_tat: TAT пользователей (упорядочены по времени последнего запроса)
+        blocked: Количество заблокированных запросов
+        suppressed: Количество блокировок без повторного уведомления пользователя
     """
 
-    def __init__(self, rate: int = 10, per: float = 60.0, enabled: bool = True) -> None:
+    def __init__(
+        self,
+        rate: int = 10,
+        per: float = 60.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+        backend: RateLimitBackend | None = None,
+    ) -> None:
         """
         Инициализация rate limiter.
 
@@ -33,13 +75,29 @@ class RateLimitMiddleware(BaseMiddleware):
             rate: Максимальное количество запросов (по умолчанию 10)
             per: Период времени в секундах (по умолчанию 60.0)
             enabled: Включен ли rate limiting (по умолчанию True)
+            clock: Источник монотонного времени (для тестов и бенчмарков)
+            backend: Общее хранилище лимитов для нескольких реплик (опционально)
         """
         self.rate = rate
         self.per = per
         self.enabled = enabled
-        self.user_requests: dict[int, list[float]] = defaultdict(list)
+        self.clock = clock
+        self.backend = backend
+
+        # Интервал между запросами и допустимое опережение (всплеск rate запросов)
+        self.emission_interval = per / rate
+        self.tolerance = per - self.emission_interval
 
-        logger.info(f"RateLimitMiddleware initialized: rate={rate}, per={per}s, enabled={enabled}")
+        self.user_tat: OrderedDict[int, float] = OrderedDict()
+        # Пользователь уже уведомлён о блокировке до указанного времени
+        self._notified_until: dict[int, float] = {}
+        self.blocked = 0
+        self.suppressed = 0
+
+        logger.info(
+            f"RateLimitMiddleware initialized: rate={rate}, per={per}s, enabled={enabled}, "
+            f"shared={backend is not None}"
+        )
 
     async def __call__(
         self,
@@ -74,61 +132,115 @@ class RateLimitMiddleware(BaseMiddleware):
             logger.warning("Message without user_id, skipping rate limit check")
             return await handler(event, data)
 
-        current_time = time.time()
-
-        # Получаем timestamps запросов пользователя
-        user_timestamps = self.user_requests[user_id]
+        now = self.clock()
 
-        # Удаляем старые timestamps (вышедшие за пределы периода)
-        user_timestamps[:] = [ts for ts in user_timestamps if current_time - ts < self.per]
+        # Одно уведомление на период блокировки: повторные сообщения
+        # игнорируются без запросов к Telegram и backend
+        if self._notified_until.get(user_id, 0.0) > now:
+            self.blocked += 1
+            self.suppressed += 1
+            return None
 
-        # Проверяем лимит
-        if len(user_timestamps) >= self.rate:
-            # Вычисляем время до следующего доступного запроса
-            oldest_timestamp = user_timestamps[0]
-            wait_time = int(self.per - (current_time - oldest_timestamp)) + 1
+        wait_time = self.check(user_id, now)
+        if wait_time == 0 and self.backend is not None:
+            wait_time = await self.backend.acquire(user_id)
+            if wait_time > 0:
+                # Запрос не прошёл общий лимит: возвращаем локальный лимит
+                self._refund(user_id)
+                self.blocked += 1
 
+        if wait_time > 0:
+            self._notified_until[user_id] = now + wait_time
             logger.warning(
-                f"User {user_id}: rate limit exceeded "
-                f"({len(user_timestamps)}/{self.rate} requests in {self.per}s)"
+                f"User {user_id}: rate limit exceeded ({self.rate} requests in {self.per}s)"
             )
 
             # Отправляем сообщение пользователю
-            await message.answer(
+            await answer(
+                message,
                 f"⚠️ Слишком много запросов.\n\n"
-                f"Пожалуйста, подождите {wait_time} секунд перед следующим сообщением.",
+                f"Пожалуйста, подождите {math.ceil(wait_time)} секунд "
+                f"перед следующим сообщением.",
+                data.get("outbound"),
                 parse_mode=None,
             )
 
             # Не вызываем handler - блокируем запрос
             return None
 
-        # Добавляем текущий timestamp
-        user_timestamps.append(current_time)
-
         # Вызываем следующий handler
         return await handler(event, data)
 
-    def cleanup_old_records(self) -> None:
+    def check(self, user_id: int, now: float) -> float:
         """
-        Очищает старые записи для экономии памяти.
+        Проверяет лимит и учитывает запрос (GCRA).
 
-        Можно вызывать периодически в фоновой задаче.
+        Args:
+            user_id: ID пользователя
+            now: Текущее монотонное время
+
+        Returns:
+            0.0 если запрос разрешён, иначе время до следующего разрешённого запроса
+        """
+        self._expire_oldest(now)
+
+        tat = max(self.user_tat.get(user_id, now), now)
+        wait_time = tat - self.tolerance - now
+        if wait_time > 0:
+            self.blocked += 1
+            return wait_time
+
+        self.user_tat[user_id] = tat + self.emission_interval
+        self.user_tat.move_to_end(user_id)
+        self._notified_until.pop(user_id, None)
+        return 0.0
+
+    def _refund(self, user_id: int) -> None:
+        """
+        Отменяет учёт запроса, разрешённого локально, но заблокированного backend.
+
+        Args:
+            user_id: ID пользователя
         """
-        current_time = time.time()
-        users_to_remove = []
+        if user_id in self.user_tat:
+            self.user_tat[user_id] -= self.emission_interval
 
-        for user_id, timestamps in self.user_requests.items():
-            # Удаляем старые timestamps
-            timestamps[:] = [ts for ts in timestamps if current_time - ts < self.per]
+    def _expire_oldest(self, now: float) -> None:
+        """
+        Удаляет записи с восстановленным лимитом из начала очереди.
+
+        Проверяется не больше EXPIRE_BATCH самых давних пользователей: стоимость
+        запроса остаётся O(1), а записи неактивных пользователей удаляются
+        не позже чем через per после их последнего запроса.
+
+        Args:
+            now: Текущее монотонное время
+        """
+        for _ in range(EXPIRE_BATCH):
+            if not self.user_tat:
+                return
+            user_id, tat = next(iter(self.user_tat.items()))
+            if tat > now:
+                return
+            del self.user_tat[user_id]
 
-            # Если у пользователя не осталось активных timestamps, помечаем на удаление
-            if not timestamps:
-                users_to_remove.append(user_id)
+    def cleanup_old_records(self) -> None:
+        """
+        Очищает записи пользователей с восстановленным лимитом.
+
+        Вызывается периодически из фоновой задачи бота.
+        """
+        now = self.clock()
+        users_to_remove = [user_id for user_id, tat in self.user_tat.items() if tat <= now]
 
-        # Удаляем пользователей без активных запросов
         for user_id in users_to_remove:
-            del self.user_requests[user_id]
+            del self.user_tat[user_id]
+
+        expired_notices = [
+            user_id for user_id, until in self._notified_until.items() if until <= now
+        ]
+        for user_id in expired_notices:
+            del self._notified_until[user_id]
 
         if users_to_remove:
             logger.debug(f"Cleaned up {len(users_to_remove)} users from rate limiter")
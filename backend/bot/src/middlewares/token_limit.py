@@ -0,0 +1,256 @@
+"""Rate limiting по токенам LLM для справедливого распределения пропускной способности."""
+
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from src.outbound import answer
+from src.telemetry import PURPOSE_TURN, UsageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRateLimitMiddleware(BaseMiddleware):
+    """
+    Middleware для ограничения расхода токенов LLM на пользователя.
+
+    Перед вызовом handler оценивает стоимость запроса (токены нового сообщения,
+    промпт предыдущего хода и максимальный ответ) и резервирует её. После ответа
+    LLMClient сообщает фактический usage (record_usage), который учитывается в
+    скользящем окне, а резерв снимается.
+
+    Attributes:
+        tokens: Максимальное количество токенов за период
+        per: Период времени в секундах
+        user_usage: Фактический расход токенов пользователя [(timestamp, tokens)]
+        reserved: Зарезервированные токены выполняющихся запросов пользователя
+        blocked: Количество заблокированных запросов
+        suppressed: Количество блокировок без повторного уведомления пользователя
+    """
+
+    def __init__(
+        self,
+        tokens: int = 100000,
+        per: float = 3600.0,
+        chars_per_token: float = 3.0,
+        completion_reserve: int = 1000,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Инициализация token rate limiter.
+
+        Args:
+            tokens: Максимальное количество токенов за период (по умолчанию 100000)
+            per: Период времени в секундах (по умолчанию 3600.0)
+            chars_per_token: Среднее количество символов на токен для оценки
+            completion_reserve: Резерв токенов на ответ LLM (обычно llm_max_tokens)
+            enabled: Включен ли token rate limiting (по умолчанию True)
+        """
+        self.tokens = tokens
+        self.per = per
+        self.chars_per_token = chars_per_token
+        self.completion_reserve = completion_reserve
+        self.enabled = enabled
+        self.user_usage: dict[int, deque[tuple[float, int]]] = defaultdict(deque)
+        self.user_totals: dict[int, int] = defaultdict(int)
+        self.reserved: dict[int, int] = defaultdict(int)
+        self.last_prompt_tokens: dict[int, int] = {}
+        # Пользователь уже уведомлён о блокировке до указанного времени
+        self._notified_until: dict[int, float] = {}
+        self.blocked = 0
+        self.suppressed = 0
+
+        logger.info(
+            f"TokenRateLimitMiddleware initialized: tokens={tokens}, per={per}s, enabled={enabled}"
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """
+        Обрабатывает входящее событие с проверкой лимита токенов.
+
+        Args:
+            handler: Следующий обработчик в цепочке
+            event: Событие Telegram (обычно Message)
+            data: Дополнительные данные
+
+        Returns:
+            Результат обработки или None при превышении лимита
+        """
+        if not self.enabled:
+            return await handler(event, data)
+
+        # Ограничиваем только текстовые сообщения, уходящие в LLM (не команды)
+        if not isinstance(event, Message) or not event.text or event.text.startswith("/"):
+            return await handler(event, data)
+
+        message: Message = event
+        user_id = message.from_user.id if message.from_user else None
+
+        if user_id is None:
+            logger.warning("Message without user_id, skipping token limit check")
+            return await handler(event, data)
+
+        current_time = time.time()
+        estimate = self.estimate_tokens(user_id, message.text or "")
+        used = self._expire(user_id, current_time) + self.reserved.get(user_id, 0)
+
+        # Первый запрос в пустом окне пропускаем всегда, даже если оценка выше лимита
+        if used > 0 and used + estimate > self.tokens:
+            self.blocked += 1
+
+            # Одно уведомление на период блокировки: повторные сообщения
+            # отклоняются без запросов к Telegram
+            if self._notified_until.get(user_id, 0.0) > current_time:
+                self.suppressed += 1
+                return None
+
+            wait_time = self._wait_time(user_id, current_time, estimate)
+            self._notified_until[user_id] = current_time + wait_time
+
+            logger.warning(
+                f"User {user_id}: token limit exceeded "
+                f"({used}+{estimate}/{self.tokens} tokens in {self.per}s)"
+            )
+
+            await answer(
+                message,
+                f"⚠️ Превышен лимит использования.\n\n"
+                f"Пожалуйста, подождите {wait_time} секунд перед следующим сообщением.",
+                data.get("outbound"),
+                parse_mode=None,
+            )
+            return None
+
+        self._notified_until.pop(user_id, None)
+
+        # Резервируем оценку до получения фактического usage от LLMClient
+        self.reserved[user_id] += estimate
+        try:
+            return await handler(event, data)
+        finally:
+            self.reserved[user_id] -= estimate
+            if self.reserved[user_id] <= 0:
+                del self.reserved[user_id]
+
+    def estimate_tokens(self, user_id: int, text: str) -> int:
+        """
+        Оценивает стоимость запроса в токенах до вызова LLM.
+
+        Args:
+            user_id: ID пользователя
+            text: Текст нового сообщения
+
+        Returns:
+            Промпт предыдущего хода + токены сообщения + резерв на ответ
+        """
+        text_tokens = math.ceil(len(text) / self.chars_per_token)
+        return self.last_prompt_tokens.get(user_id, 0) + text_tokens + self.completion_reserve
+
+    def record_usage(self, record: UsageRecord) -> None:
+        """
+        Учитывает фактический расход токенов (listener LLMClient).
+
+        Фоновая суммаризация не учитывается: её запускает бот, а промпт
+        суммаризации не отражает размер контекста следующего хода.
+
+        Args:
+            record: Телеметрия хода диалога с фактическим usage
+        """
+        if record.purpose != PURPOSE_TURN:
+            return
+
+        total = record.prompt_tokens + record.completion_tokens
+        if total <= 0:
+            return
+
+        self.user_usage[record.user_id].append((time.time(), total))
+        self.user_totals[record.user_id] += total
+        self.last_prompt_tokens[record.user_id] = record.prompt_tokens
+
+    def _expire(self, user_id: int, current_time: float) -> int:
+        """
+        Удаляет записи расхода, вышедшие за пределы периода.
+
+        Args:
+            user_id: ID пользователя
+            current_time: Текущее время
+
+        Returns:
+            Расход токенов пользователя в текущем окне
+        """
+        usage = self.user_usage.get(user_id)
+        if not usage:
+            return 0
+
+        while usage and current_time - usage[0][0] >= self.per:
+            _, tokens = usage.popleft()
+            self.user_totals[user_id] -= tokens
+
+        if not usage:
+            self._forget(user_id)
+            return 0
+        return self.user_totals[user_id]
+
+    def _wait_time(self, user_id: int, current_time: float, estimate: int) -> int:
+        """
+        Вычисляет время до освобождения достаточного количества токенов.
+
+        Args:
+            user_id: ID пользователя
+            current_time: Текущее время
+            estimate: Оценка стоимости запроса
+
+        Returns:
+            Время ожидания в секундах
+        """
+        excess = self.user_totals.get(user_id, 0) + self.reserved.get(user_id, 0) + estimate
+        excess -= self.tokens
+        for timestamp, tokens in self.user_usage.get(user_id, ()):
+            excess -= tokens
+            if excess <= 0:
+                return int(self.per - (current_time - timestamp)) + 1
+        return int(self.per) + 1
+
+    def _forget(self, user_id: int) -> None:
+        """
+        Удаляет состояние пользователя без расхода в окне.
+
+        Args:
+            user_id: ID пользователя
+        """
+        self.user_usage.pop(user_id, None)
+        self.user_totals.pop(user_id, None)
+        self.last_prompt_tokens.pop(user_id, None)
+
+    def cleanup_old_records(self) -> None:
+        """
+        Очищает старые записи для экономии памяти.
+
+        Можно вызывать периодически в фоновой задаче.
+        """
+        current_time = time.time()
+        users = list(self.user_usage)
+
+        for user_id in users:
+            self._expire(user_id, current_time)
+
+        expired_notices = [
+            user_id for user_id, until in self._notified_until.items() if until <= current_time
+        ]
+        for user_id in expired_notices:
+            del self._notified_until[user_id]
+
+        removed = len(users) - len(self.user_usage)
+        if removed:
+            logger.debug(f"Cleaned up {removed} users from token rate limiter")
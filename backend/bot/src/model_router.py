@@ -0,0 +1,144 @@
+"""Маршрутизация запросов по пулу LLM моделей с учётом задержки и ошибок."""
+
+import logging
+import random
+from dataclasses import dataclass
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelStats:
+    """
+    Скользящая статистика модели (EWMA).
+
+    Attributes:
+        latency: EWMA задержки успешных запросов в секундах (None до первого замера)
+        error_rate: EWMA доли неуспешных запросов (0.0 - 1.0)
+    """
+
+    latency: float | None = None
+    error_rate: float = 0.0
+
+
+class ModelRouter:
+    """
+    Маршрутизатор запросов по пулу моделей.
+
+    Отвечает за:
+    - Хранение пула моделей с весами (порядок в пуле = порядок failover)
+    - Учёт EWMA задержки и доли ошибок каждой модели
+    - Выбор модели для запроса (взвешенно, с уклонением от медленных и сбойных)
+    - Порядок перехода на следующие модели при сбое
+    """
+
+    def __init__(self, config: Config, rng: random.Random | None = None) -> None:
+        """
+        Инициализация маршрутизатора.
+
+        Если llm_model_pool не задан, пул строится из основной модели (вес 1)
+        и fallback модели (вес 0 - только для failover).
+
+        Args:
+            config: Конфигурация приложения
+            rng: Генератор случайных чисел (для воспроизводимости в тестах)
+        """
+        self.config = config
+        self.alpha = config.llm_router_ewma_alpha
+        self.error_penalty = config.llm_router_error_penalty
+        self._random = rng or random.Random()
+
+        if config.llm_model_pool:
+            self.weights = dict(config.llm_model_pool)
+        else:
+            self.weights = {config.openrouter_model: 1.0}
+            fallback_model = config.openrouter_fallback_model
+            if fallback_model and fallback_model != config.openrouter_model:
+                self.weights[fallback_model] = 0.0
+
+        self.models = list(self.weights)
+        self.stats = {model: ModelStats() for model in self.models}
+
+        logger.info(f"ModelRouter initialized: pool={self.weights}, alpha={self.alpha}")
+
+    def _cost(self, model: str) -> float:
+        """
+        Оценивает стоимость запроса к модели (меньше - лучше).
+
+        Args:
+            model: Идентификатор модели
+
+        Returns:
+            EWMA задержки с штрафом за долю ошибок
+        """
+        stats = self.stats[model]
+        if stats.latency is None:
+            # Модель без замеров оцениваем как лучшую из известных, чтобы получить замер
+            measured = [s.latency for s in self.stats.values() if s.latency is not None]
+            latency = min(measured) if measured else 1.0
+        else:
+            latency = stats.latency
+        return max(latency, 1e-3) * (1.0 + self.error_penalty * stats.error_rate)
+
+    def route(self, model: str | None = None) -> list[str]:
+        """
+        Определяет порядок моделей для запроса.
+
+        Первая модель выбирается случайно среди моделей с весом > 0 с вероятностью,
+        пропорциональной weight / cost. Остальные модели идут далее в порядке пула
+        (failover). Явно указанная модель ставится первой.
+
+        Args:
+            model: Явно запрошенная модель (опционально)
+
+        Returns:
+            Список моделей в порядке попыток
+        """
+        if model is not None:
+            return [model, *(m for m in self.models if m != model)]
+
+        candidates = [m for m in self.models if self.weights[m] > 0]
+        if not candidates:
+            return list(self.models)
+
+        if len(candidates) == 1:
+            first = candidates[0]
+        else:
+            scores = [self.weights[m] / self._cost(m) for m in candidates]
+            first = self._random.choices(candidates, weights=scores)[0]
+
+        return [first, *(m for m in self.models if m != first)]
+
+    def record_success(self, model: str, latency: float) -> None:
+        """
+        Учитывает успешный запрос к модели.
+
+        Args:
+            model: Идентификатор модели
+            latency: Задержка запроса в секундах
+        """
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+
+        if stats.latency is None:
+            stats.latency = latency
+        else:
+            stats.latency = self.alpha * latency + (1 - self.alpha) * stats.latency
+        stats.error_rate = (1 - self.alpha) * stats.error_rate
+
+    def record_failure(self, model: str) -> None:
+        """
+        Учитывает неуспешный запрос к модели.
+
+        Args:
+            model: Идентификатор модели
+        """
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+
+        stats.error_rate = self.alpha + (1 - self.alpha) * stats.error_rate
+        logger.debug(f"Model {model}: error_rate={stats.error_rate:.2f}")
@@ -0,0 +1,401 @@
+"""Очередь исходящих сообщений Telegram с учётом лимитов Bot API."""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты отправки (меньше - раньше)
+PRIORITY_REPLY = 0  # Первая часть ответа и сообщения об ошибках
+PRIORITY_CONTINUATION = 1  # Продолжение длинного ответа
+PRIORITY_BACKGROUND = 2  # Уведомления, не ожидаемые пользователем прямо сейчас
+
+
+class TokenBucket:
+    """
+    Token bucket: не более rate операций в секунду с допустимым всплеском burst.
+
+    Attributes:
+        rate: Скорость пополнения (токенов в секунду)
+        burst: Ёмкость (максимальный всплеск)
+        tokens: Текущее количество токенов
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        Инициализация bucket (заполненного).
+
+        Args:
+            rate: Скорость пополнения (токенов в секунду)
+            burst: Ёмкость bucket
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """
+        Пополняет токены за прошедшее время.
+
+        Args:
+            now: Текущее монотонное время
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Возвращает время до появления одного токена.
+
+        Args:
+            now: Текущее монотонное время
+
+        Returns:
+            Задержка в секундах (0.0 если токен доступен)
+        """
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        """
+        Забирает один токен (вызывать после delay() == 0).
+
+        Args:
+            now: Текущее монотонное время
+        """
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def is_full(self, now: float) -> bool:
+        """
+        Проверяет, восстановился ли bucket полностью (состояние можно удалить).
+
+        Args:
+            now: Текущее монотонное время
+
+        Returns:
+            True если bucket заполнен
+        """
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+@dataclass(order=True)
+class _SendJob:
+    """Задание на отправку (сортируется по приоритету и порядку постановки)."""
+
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    call: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future[Any] = field(compare=False)
+    flood_retries: int = field(default=0, compare=False)
+
+
+@dataclass
+class _ChatState:
+    """Состояние отправки в чат."""
+
+    bucket: TokenBucket
+    # Монотонное время, до которого чат заблокирован flood control (429)
+    paused_until: float = 0.0
+    # В чат уже отправляется сообщение (сохраняем порядок частей ответа)
+    busy: bool = False
+
+
+class OutboundQueue:
+    """
+    Центральная очередь исходящих запросов к Telegram.
+
+    Отвечает за:
+    - Глобальный лимит отправки (~30 сообщений в секунду на бота)
+    - Лимит на чат (личные чаты ~1 в секунду, группы ~20 в минуту)
+    - Порядок сообщений внутри чата (не более одной отправки в чат одновременно)
+    - Приоритеты (первые части ответов обгоняют продолжения длинных ответов)
+    - Обработку flood control (429 retry_after) с повторной отправкой
+    """
+
+    def __init__(self, config: Config) -> None:
+        """
+        Инициализация очереди.
+
+        Args:
+            config: Конфигурация приложения
+        """
+        self.config = config
+        self.global_bucket = TokenBucket(config.outbound_global_rate, config.outbound_global_burst)
+        self.max_flood_retries = config.outbound_max_flood_retries
+
+        self._heap: list[_SendJob] = []
+        self._seq = itertools.count()
+        self._chats: dict[int, _ChatState] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task[None] | None = None
+        self._in_flight: set[asyncio.Task[None]] = set()
+
+        self.sent = 0
+        self.flood_waits = 0
+
+        logger.info(
+            f"OutboundQueue initialized: global={config.outbound_global_rate}/s, "
+            f"chat={config.outbound_chat_rate}/s, group={config.outbound_group_rate}/s"
+        )
+
+    @property
+    def depth(self) -> int:
+        """Количество сообщений, ожидающих отправки."""
+        return len(self._heap)
+
+    async def send(
+        self,
+        chat_id: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_REPLY,
+    ) -> Any:
+        """
+        Ставит отправку в очередь и ожидает её выполнения.
+
+        Args:
+            chat_id: ID чата (для лимита на чат и порядка сообщений)
+            call: Функция, выполняющая запрос (например, lambda: message.answer(text))
+            priority: Приоритет отправки (PRIORITY_*)
+
+        Returns:
+            Результат запроса к Telegram
+
+        Raises:
+            TelegramRetryAfter: Если flood control не снят после всех повторов
+            Exception: Ошибка запроса к Telegram
+        """
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, _SendJob(priority, next(self._seq), chat_id, call, future))
+        self._ensure_started()
+        self._wakeup.set()
+        return await future
+
+    def _ensure_started(self) -> None:
+        """Запускает dispatcher при первой отправке."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def _chat(self, chat_id: int) -> _ChatState:
+        """
+        Возвращает состояние чата, создавая его при необходимости.
+
+        Args:
+            chat_id: ID чата (отрицательный - группа/канал)
+
+        Returns:
+            Состояние чата
+        """
+        state = self._chats.get(chat_id)
+        if state is None:
+            if chat_id < 0:
+                bucket = TokenBucket(
+                    self.config.outbound_group_rate, self.config.outbound_chat_burst
+                )
+            else:
+                bucket = TokenBucket(
+                    self.config.outbound_chat_rate, self.config.outbound_chat_burst
+                )
+            state = _ChatState(bucket=bucket)
+            self._chats[chat_id] = state
+        return state
+
+    def _next_job(self, now: float) -> tuple[_SendJob | None, float]:
+        """
+        Выбирает задание с наивысшим приоритетом, чат которого готов к отправке.
+
+        Задания чата, который ещё не готов, пропускаются вместе с более поздними
+        заданиями того же чата (сохраняется порядок сообщений в чате).
+
+        Args:
+            now: Текущее монотонное время
+
+        Returns:
+            (задание или None, задержка до готовности ближайшего чата)
+        """
+        skipped: list[_SendJob] = []
+        blocked: set[int] = set()
+        wait = float("inf")
+        job: _SendJob | None = None
+
+        while self._heap:
+            candidate = heapq.heappop(self._heap)
+            if candidate.future.done():
+                # Отправитель отменил ожидание
+                continue
+            if candidate.chat_id in blocked:
+                skipped.append(candidate)
+                continue
+
+            state = self._chat(candidate.chat_id)
+            if state.busy:
+                blocked.add(candidate.chat_id)
+                skipped.append(candidate)
+                continue
+
+            delay = max(state.paused_until - now, state.bucket.delay(now))
+            if delay > 0:
+                blocked.add(candidate.chat_id)
+                skipped.append(candidate)
+                wait = min(wait, delay)
+                continue
+
+            job = candidate
+            break
+
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return job, wait
+
+    async def _dispatch_loop(self) -> None:
+        """Отправляет задания из очереди с соблюдением лимитов."""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+
+            global_delay = self.global_bucket.delay(now)
+            if global_delay > 0 and self._heap:
+                await asyncio.sleep(global_delay)
+                continue
+
+            job, wait = self._next_job(now)
+            if job is None:
+                if not self._heap:
+                    self._cleanup(now)
+                timeout = None if wait == float("inf") else wait
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue
+
+            self.global_bucket.consume(now)
+            state = self._chat(job.chat_id)
+            state.bucket.consume(now)
+            state.busy = True
+
+            task = asyncio.create_task(self._execute(job, state))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _execute(self, job: _SendJob, state: _ChatState) -> None:
+        """
+        Выполняет запрос и обрабатывает flood control.
+
+        Args:
+            job: Задание на отправку
+            state: Состояние чата
+        """
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            self.flood_waits += 1
+            state.paused_until = time.monotonic() + e.retry_after
+            if job.flood_retries < self.max_flood_retries and not job.future.done():
+                logger.warning(
+                    f"Chat {job.chat_id}: flood control, retry in {e.retry_after}s "
+                    f"(attempt {job.flood_retries + 1}/{self.max_flood_retries})"
+                )
+                job.flood_retries += 1
+                # Возвращаем с тем же seq: порядок сообщений в чате сохраняется
+                heapq.heappush(self._heap, job)
+            else:
+                logger.error(f"Chat {job.chat_id}: flood control, giving up: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            state.busy = False
+            self._wakeup.set()
+
+    def _cleanup(self, now: float) -> None:
+        """
+        Удаляет состояние чатов с восстановленным лимитом (экономия памяти).
+
+        Args:
+            now: Текущее монотонное время
+        """
+        idle = [
+            chat_id
+            for chat_id, state in self._chats.items()
+            if not state.busy and state.paused_until <= now and state.bucket.is_full(now)
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    async def stop(self, timeout: float = 10.0) -> int:
+        """
+        Дожидается отправки очереди и останавливает dispatcher.
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Количество сообщений, не отправленных за timeout
+        """
+        deadline = time.monotonic() + timeout
+        while (self._heap or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        unsent = len(self._heap)
+        if self._heap:
+            logger.warning(f"OutboundQueue stopped with {unsent} unsent messages")
+            for job in self._heap:
+                if not job.future.done():
+                    job.future.cancel()
+            self._heap.clear()
+
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        logger.info(f"OutboundQueue stopped: sent={self.sent}, flood_waits={self.flood_waits}")
+        return unsent
+
+
+async def answer(
+    message: Message,
+    text: str,
+    outbound: OutboundQueue | None = None,
+    priority: int = PRIORITY_REPLY,
+    **kwargs: Any,
+) -> None:
+    """
+    Отправляет ответ в чат через очередь исходящих сообщений (если задана).
+
+    Используется для всех ответов бота (handlers и middleware), чтобы отправки
+    учитывали глобальный лимит, лимит на чат и flood control.
+
+    Args:
+        message: Входящее сообщение пользователя
+        text: Текст ответа
+        outbound: Очередь исходящих сообщений (None - отправка напрямую)
+        priority: Приоритет отправки в очереди
+        **kwargs: Дополнительные параметры message.answer (например, parse_mode)
+    """
+    if outbound is None:
+        await message.answer(text, **kwargs)
+        return
+    await outbound.send(message.chat.id, lambda: message.answer(text, **kwargs), priority=priority)
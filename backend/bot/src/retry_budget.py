@@ -0,0 +1,88 @@
+"""Глобальный бюджет повторных запросов (защита от retry storm)."""
+
+import logging
+import time
+from collections import deque
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """
+    Бюджет retry на процесс в скользящем окне.
+
+    Повторные запросы разрешены, пока их количество в окне не превышает
+    retry_budget_ratio от количества исходных запросов (но не меньше
+    retry_budget_min_retries). Во время сбоя провайдера это ограничивает
+    дополнительную нагрузку долей от обычного трафика вместо умножения
+    трафика на retry_attempts.
+
+    Статистика хранится посекундными корзинами, поэтому операции O(1)
+    (амортизированно) и память ограничена размером окна.
+    """
+
+    def __init__(self, config: Config) -> None:
+        """
+        Инициализация бюджета.
+
+        Args:
+            config: Конфигурация приложения
+        """
+        self.ratio = config.retry_budget_ratio
+        self.min_retries = config.retry_budget_min_retries
+        self.window = config.retry_budget_window
+
+        # Корзины [секунда, запросы, retry] в хронологическом порядке
+        self._buckets: deque[list[int]] = deque()
+        self._requests = 0
+        self._retries = 0
+
+        logger.info(
+            f"RetryBudget initialized: ratio={self.ratio}, min_retries={self.min_retries}, "
+            f"window={self.window}s"
+        )
+
+    def _bucket(self) -> list[int]:
+        """
+        Возвращает корзину текущей секунды, удаляя устаревшие.
+
+        Returns:
+            Корзина [секунда, запросы, retry]
+        """
+        now = int(time.monotonic())
+
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            _, requests, retries = self._buckets.popleft()
+            self._requests -= requests
+            self._retries -= retries
+
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self) -> None:
+        """Учитывает исходный (не повторный) запрос."""
+        self._bucket()[1] += 1
+        self._requests += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Пытается получить разрешение на повторный запрос.
+
+        Returns:
+            True если retry укладывается в бюджет (и учтён), False иначе
+        """
+        bucket = self._bucket()
+        allowed = max(self.min_retries, int(self._requests * self.ratio))
+        if self._retries >= allowed:
+            logger.warning(
+                f"Retry budget exhausted: {self._retries} retries for "
+                f"{self._requests} requests in last {self.window}s"
+            )
+            return False
+
+        bucket[2] += 1
+        self._retries += 1
+        return True
@@ -0,0 +1,396 @@
+"""Горизонтальное масштабирование: распределение обновлений по worker процессам."""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from typing import Any, Protocol
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+
+from src.config import Config
+from src.webhook import SECRET_TOKEN_HEADER, WebhookServer, extract_user_id
+
+logger = logging.getLogger(__name__)
+
+# Виртуальных узлов на worker (равномерность распределения пользователей)
+RING_REPLICAS = 128
+
+# Повторы пересылки обновления worker процессу (worker запускается или перезапускается)
+FORWARD_ATTEMPTS = 5
+FORWARD_RETRY_DELAY = 0.5
+FORWARD_TIMEOUT = 10.0
+
+
+class HashRing:
+    """
+    Consistent hashing кольцо.
+
+    Ключ (user_id) всегда попадает на один узел; при изменении количества
+    узлов переезжает только ~1/N ключей (кеши Storage остальных пользователей
+    остаются актуальными).
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = RING_REPLICAS) -> None:
+        """
+        Инициализация кольца.
+
+        Args:
+            nodes: Узлы (например, URL worker процессов)
+            replicas: Количество виртуальных узлов на узел
+
+        Raises:
+            ValueError: Если список узлов пуст
+        """
+        if not nodes:
+            raise ValueError("HashRing requires at least one node")
+
+        self.nodes = list(nodes)
+        points = sorted(
+            (self._hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """
+        Стабильный хеш (не зависит от PYTHONHASHSEED процесса).
+
+        Args:
+            value: Строка для хеширования
+
+        Returns:
+            64-битный хеш
+        """
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def node_for(self, key: int | str) -> str:
+        """
+        Возвращает узел для ключа.
+
+        Args:
+            key: Ключ (user_id)
+
+        Returns:
+            Узел, владеющий ключом
+        """
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._points)
+        return self._owners[index]
+
+
+def worker_urls(config: Config) -> list[str]:
+    """
+    Возвращает адреса worker процессов.
+
+    Args:
+        config: Конфигурация приложения
+
+    Returns:
+        Базовые URL worker процессов
+    """
+    return [
+        f"http://{config.worker_host}:{config.worker_base_port + index}"
+        for index in range(config.scale_workers)
+    ]
+
+
+def worker_config(config: Config, index: int) -> Config:
+    """
+    Конфигурация worker процесса.
+
+    Worker принимает обновления от роутера на локальном порту и не регистрирует
+    webhook. Глобальный лимит отправки Telegram (на бота) делится между worker.
+
+    Args:
+        config: Конфигурация роутера
+        index: Номер worker (0..scale_workers-1)
+
+    Returns:
+        Конфигурация worker
+    """
+    workers = config.scale_workers
+    return config.model_copy(
+        update={
+            "bot_mode": "webhook",
+            "scale_workers": 1,
+            "webhook_host": config.worker_host,
+            "webhook_port": config.worker_base_port + index,
+            "webhook_url": None,
+            "outbound_global_rate": config.outbound_global_rate / workers,
+            "outbound_global_burst": max(1, config.outbound_global_burst // workers),
+        }
+    )
+
+
+class WorkerProcess(Protocol):
+    """Процесс worker (интерфейс multiprocessing.Process, используемый WorkerPool)."""
+
+    @property
+    def name(self) -> str:
+        """Имя процесса."""
+        ...
+
+    @property
+    def exitcode(self) -> int | None:
+        """Код завершения (None пока процесс работает)."""
+        ...
+
+    def start(self) -> None:
+        """Запускает процесс."""
+        ...
+
+    def is_alive(self) -> bool:
+        """True пока процесс работает."""
+        ...
+
+    def terminate(self) -> None:
+        """Отправляет SIGTERM."""
+        ...
+
+    def kill(self) -> None:
+        """Отправляет SIGKILL."""
+        ...
+
+    def join(self, timeout: float | None = None) -> None:
+        """Ожидает завершения процесса."""
+        ...
+
+
+class WorkerPool:
+    """
+    Worker процессы роутера с перезапуском упавших (watchdog).
+
+    Без перезапуска пользователи упавшего worker (его часть hash ring) получали бы
+    только ошибки пересылки до перезапуска всего сервиса. Worker, упавший больше
+    max_restarts раз за restart_window, не перезапускается: watch() завершается,
+    роутер останавливается, и сервис целиком перезапускает супервизор.
+
+    Attributes:
+        processes: Текущие процессы worker (по номеру worker)
+        restarts: Количество перезапусков
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[int], WorkerProcess],
+        count: int,
+        check_interval: float = 1.0,
+        max_restarts: int = 5,
+        restart_window: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Инициализация пула.
+
+        Args:
+            factory: Создание (не запущенного) процесса worker по номеру
+            count: Количество worker
+            check_interval: Интервал проверки процессов в секундах
+            max_restarts: Максимум перезапусков worker за restart_window
+            restart_window: Окно подсчёта перезапусков в секундах
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.factory = factory
+        self.count = count
+        self.check_interval = check_interval
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.clock = clock
+
+        self.processes: list[WorkerProcess] = []
+        self.restarts = 0
+        self._restart_times: list[deque[float]] = [deque() for _ in range(count)]
+
+    def start(self) -> None:
+        """Запускает все worker процессы."""
+        self.processes = [self._spawn(index) for index in range(self.count)]
+        logger.info(f"Started {self.count} worker processes")
+
+    def _spawn(self, index: int) -> WorkerProcess:
+        """
+        Создаёт и запускает процесс worker.
+
+        Args:
+            index: Номер worker
+
+        Returns:
+            Запущенный процесс
+        """
+        process = self.factory(index)
+        process.start()
+        return process
+
+    def check(self) -> bool:
+        """
+        Перезапускает завершившиеся worker процессы.
+
+        Returns:
+            False если worker падает слишком часто (перезапуск прекращён)
+        """
+        now = self.clock()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+
+            history = self._restart_times[index]
+            while history and now - history[0] >= self.restart_window:
+                history.popleft()
+            if len(history) >= self.max_restarts:
+                logger.error(
+                    f"Worker {process.name} exited with code {process.exitcode}, "
+                    f"{len(history)} restarts in {self.restart_window:.0f}s, giving up"
+                )
+                return False
+
+            logger.warning(f"Worker {process.name} exited with code {process.exitcode}, restarting")
+            history.append(now)
+            self.restarts += 1
+            self.processes[index] = self._spawn(index)
+        return True
+
+    async def watch(self) -> None:
+        """Проверяет worker процессы, пока перезапуск не прекращён."""
+        while self.check():
+            await asyncio.sleep(self.check_interval)
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Останавливает worker процессы (SIGTERM, затем SIGKILL по timeout).
+
+        Worker дообрабатывают принятые обновления (graceful shutdown по SIGTERM).
+
+        Args:
+            timeout: Время ожидания каждого процесса в секундах
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {process.name} did not stop in time, killing")
+                process.kill()
+
+
+class ShardRouter(WebhookServer):
+    """
+    Webhook роутер: принимает обновления Telegram и пересылает их worker процессам.
+
+    Отвечает за:
+    - Выбор worker по consistent hashing от user_id (пользователь всегда
+      обрабатывается одним процессом, кеши Storage согласованы)
+    - Порядок обновлений пользователя (пересылка по очереди, как в WebhookServer)
+    - Повтор пересылки, пока worker запускается
+    """
+
+    def __init__(self, bot: Bot, config: Config, urls: Sequence[str]) -> None:
+        """
+        Инициализация роутера.
+
+        Args:
+            bot: Экземпляр aiogram Bot (для регистрации webhook)
+            config: Конфигурация приложения
+            urls: Базовые URL worker процессов
+        """
+        # Handlers роутеру не нужны: обновления обрабатываются в worker процессах
+        super().__init__(Dispatcher(), bot, config)
+        self.ring = HashRing(urls)
+        self.forwarded = dict.fromkeys(self.ring.nodes, 0)
+        self.dropped = 0
+        self._client: aiohttp.ClientSession | None = None
+
+        logger.info(f"ShardRouter initialized: {len(self.ring.nodes)} workers")
+
+    def worker_for(self, update: dict[str, Any]) -> str:
+        """
+        Выбирает worker для обновления.
+
+        Args:
+            update: Обновление Telegram (JSON)
+
+        Returns:
+            Базовый URL worker
+        """
+        user_id = extract_user_id(update)
+        return self.ring.node_for(user_id if user_id is not None else update.get("update_id", 0))
+
+    def _allowed_updates(self) -> list[str] | None:
+        """
+        Типы обновлений для setWebhook.
+
+        Returns:
+            None (набор по умолчанию Telegram: handlers зарегистрированы в worker)
+        """
+        return None
+
+    def _session(self) -> aiohttp.ClientSession:
+        """
+        Возвращает HTTP сессию для пересылки (keep-alive соединения к worker).
+
+        Returns:
+            aiohttp ClientSession
+        """
+        if self._client is None or self._client.closed:
+            self._client = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=FORWARD_TIMEOUT)
+            )
+        return self._client
+
+    async def _process(self, update: dict[str, Any]) -> None:
+        """
+        Пересылает обновление worker процессу.
+
+        Args:
+            update: Обновление Telegram (JSON)
+        """
+        url = self.worker_for(update)
+        headers = {SECRET_TOKEN_HEADER: self.config.webhook_secret or ""}
+        error = ""
+
+        for attempt in range(FORWARD_ATTEMPTS):
+            try:
+                async with self._session().post(
+                    url + self.config.webhook_path, json=update, headers=headers
+                ) as response:
+                    if response.status == 200:
+                        self.forwarded[url] += 1
+                        return
+                    error = f"HTTP {response.status}"
+                    # Повторяем только пока worker недоступен (запуск/остановка)
+                    if response.status != 503:
+                        break
+            except (aiohttp.ClientError, TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+            if attempt < FORWARD_ATTEMPTS - 1:
+                await asyncio.sleep(FORWARD_RETRY_DELAY * 2**attempt)
+
+        self.dropped += 1
+        logger.error(f"Update {update.get('update_id')} not delivered to worker {url}: {error}")
+
+    async def stop(self, timeout: float | None = None) -> int:
+        """
+        Останавливает приём, дожидается пересылки принятых обновлений.
+
+        Args:
+            timeout: Время на пересылку (по умолчанию webhook_drain_timeout)
+
+        Returns:
+            Количество обновлений, не пересланных за timeout
+        """
+        abandoned = await super().stop(timeout)
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+        logger.info(f"ShardRouter stopped: forwarded={self.forwarded}, dropped={self.dropped}")
+        return abandoned
@@ -0,0 +1,268 @@
+"""Общее состояние rate limit для нескольких реплик бота (PostgreSQL)."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import text
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Максимум пользователей в одном запросе к БД
+MAX_BATCH = 500
+
+# Текущее время PostgreSQL в секундах epoch (одно значение на весь запрос)
+_NOW = "EXTRACT(EPOCH FROM statement_timestamp())::float8"
+
+# Параметры запроса с явными типами (asyncpg не приводит float к integer)
+_INTERVAL = "CAST(:interval AS float8)"
+_TOLERANCE = "CAST(:tolerance AS float8) + CAST(:epsilon AS float8)"
+_BURST = "CAST(:burst AS integer)"
+
+# Сколько запросов из пакета пользователя помещается в лимит (GCRA):
+# FLOOR((now + tolerance - max(tat, now)) / interval) + 1, но не больше запрошенного
+_ALLOWED = (
+    f"GREATEST(0, LEAST(EXCLUDED.allowed, "
+    f"FLOOR(({_NOW} + {_TOLERANCE} - GREATEST(rl.tat, {_NOW})) / {_INTERVAL})::integer + 1))"
+)
+
+# Атомарное обновление лимитов пакета пользователей одним запросом.
+# Новый пользователь получает всплеск до burst запросов; для существующего
+# количество разрешённых запросов и новый TAT считаются от строки под блокировкой,
+# поэтому одновременные обновления из разных реплик не теряются.
+UPSERT_SQL = text(
+    f"""
+    INSERT INTO rate_limits AS rl (user_id, tat, allowed)
+    SELECT batch.user_id,
+           {_NOW} + LEAST(batch.hits, {_BURST}) * {_INTERVAL},
+           LEAST(batch.hits, {_BURST})
+    FROM unnest(CAST(:user_ids AS bigint[]), CAST(:hits AS integer[])) AS batch(user_id, hits)
+    ON CONFLICT (user_id) DO UPDATE SET
+        allowed = {_ALLOWED},
+        tat = GREATEST(rl.tat, {_NOW}) + {_ALLOWED} * {_INTERVAL}
+    RETURNING rl.user_id, rl.tat, rl.allowed, {_NOW} AS now
+    """
+)
+
+CLEANUP_SQL = text(f"DELETE FROM rate_limits WHERE tat <= {_NOW}")
+
+# Минимальное время ожидания для заблокированного запроса (погрешность float)
+MIN_WAIT = 0.001
+
+
+class PostgresRateLimitBackend:
+    """
+    Общий для реплик бота rate limiter (GCRA) в таблице rate_limits.
+
+    Локальный RateLimitMiddleware ограничивает пользователя только в своём
+    процессе: N реплик дают пользователю N-кратный лимит. Backend хранит TAT
+    пользователя в PostgreSQL и обновляет его атомарным upsert.
+
+    Запросы накапливаются batch_window секунд и отправляются одним запросом
+    для всех пользователей пакета: не больше одного обращения к БД на сообщение,
+    под нагрузкой - одно на пакет. Если БД недоступна или отвечает дольше
+    timeout, решение принимает локальный limiter, а backend не используется
+    retry_after секунд.
+
+    Attributes:
+        rate: Максимальное количество запросов
+        per: Период времени в секундах
+        round_trips: Количество запросов к БД
+        degraded: Количество проверок, решённых локально из-за недоступности БД
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        rate: int = 10,
+        per: float = 60.0,
+        batch_window: float = 0.005,
+        timeout: float = 0.5,
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Инициализация backend.
+
+        Args:
+            database: Объект Database
+            rate: Максимальное количество запросов (по умолчанию 10)
+            per: Период времени в секундах (по умолчанию 60.0)
+            batch_window: Время накопления пакета в секундах (по умолчанию 0.005)
+            timeout: Максимальное время запроса к БД в секундах (по умолчанию 0.5)
+            retry_after: Пауза после ошибки БД в секундах (по умолчанию 30.0)
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.db = database
+        self.rate = rate
+        self.per = per
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.clock = clock
+
+        self.emission_interval = per / rate
+        self.tolerance = per - self.emission_interval
+
+        # Ожидающие решения запросы: пользователь -> futures в порядке поступления
+        self._pending: dict[int, list[asyncio.Future[float]]] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+        self._unavailable_until = 0.0
+
+        self.round_trips = 0
+        self.degraded = 0
+
+        logger.info(
+            f"PostgresRateLimitBackend initialized: rate={rate}, per={per}s, "
+            f"batch_window={batch_window}s, timeout={timeout}s"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Используется ли backend (нет паузы после ошибки БД)."""
+        return self.clock() >= self._unavailable_until
+
+    async def acquire(self, user_id: int) -> float:
+        """
+        Учитывает запрос пользователя в общем лимите.
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            0.0 если запрос разрешён (или БД недоступна), иначе время ожидания
+        """
+        if not self.available:
+            self.degraded += 1
+            return 0.0
+
+        future: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(user_id, []).append(future)
+
+        if len(self._pending) >= MAX_BATCH:
+            self._schedule_flush(delay=0.0)
+        elif self._flush_task is None:
+            self._schedule_flush(delay=self.batch_window)
+
+        return await future
+
+    def _schedule_flush(self, delay: float) -> None:
+        """
+        Запускает отправку текущего пакета.
+
+        Args:
+            delay: Задержка перед отправкой в секундах
+        """
+        batch = self._pending if delay == 0.0 else None
+        if batch is not None:
+            # Пакет заполнен: следующие запросы собираются в новый
+            self._pending = {}
+        self._flush_task = asyncio.create_task(self._flush(delay, batch))
+
+    async def _flush(
+        self, delay: float, batch: dict[int, list[asyncio.Future[float]]] | None
+    ) -> None:
+        """
+        Отправляет пакет запросов одним upsert и разрешает ожидающие futures.
+
+        Args:
+            delay: Задержка перед отправкой в секундах
+            batch: Пакет для отправки (None - накопленный к моменту отправки)
+        """
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if batch is None:
+            batch = self._pending
+            self._pending = {}
+        if self._flush_task is asyncio.current_task():
+            self._flush_task = None
+        if not batch:
+            return
+
+        try:
+            rows = await asyncio.wait_for(self._upsert(batch), timeout=self.timeout)
+        except Exception as e:
+            self._unavailable_until = self.clock() + self.retry_after
+            self.degraded += sum(len(futures) for futures in batch.values())
+            logger.warning(
+                f"Shared rate limit backend unavailable ({type(e).__name__}: {e}), "
+                f"falling back to local limits for {self.retry_after}s"
+            )
+            for futures in batch.values():
+                self._resolve(futures, allowed=len(futures), wait_time=0.0)
+            return
+
+        for user_id, tat, allowed, now in rows:
+            futures = batch.pop(user_id, [])
+            wait_time = max(tat - self.tolerance - now, MIN_WAIT)
+            self._resolve(futures, allowed=allowed, wait_time=wait_time)
+
+        # Пользователи без строки в ответе (не должно происходить): решение локальное
+        for futures in batch.values():
+            self._resolve(futures, allowed=len(futures), wait_time=0.0)
+
+    async def _upsert(self, batch: dict[int, list[asyncio.Future[float]]]) -> list[Any]:
+        """
+        Выполняет upsert лимитов пакета.
+
+        Args:
+            batch: Пакет запросов (пользователь -> futures)
+
+        Returns:
+            Строки (user_id, tat, allowed, now)
+        """
+        self.round_trips += 1
+        async with self.db.session() as session:
+            result = await session.execute(
+                UPSERT_SQL,
+                {
+                    "user_ids": list(batch),
+                    "hits": [len(futures) for futures in batch.values()],
+                    "burst": self.rate,
+                    "interval": self.emission_interval,
+                    "tolerance": self.tolerance,
+                    "epsilon": 1e-9,
+                },
+            )
+            return list(result.all())
+
+    @staticmethod
+    def _resolve(futures: list[asyncio.Future[float]], allowed: int, wait_time: float) -> None:
+        """
+        Разрешает первые allowed запросов, остальным возвращает время ожидания.
+
+        Args:
+            futures: Запросы пользователя в порядке поступления
+            allowed: Количество разрешённых запросов
+            wait_time: Время ожидания для заблокированных запросов
+        """
+        for index, future in enumerate(futures):
+            if not future.done():
+                future.set_result(0.0 if index < allowed else wait_time)
+
+    async def cleanup(self) -> int:
+        """
+        Удаляет записи пользователей с восстановленным лимитом.
+
+        Вызывается периодически из фоновой задачи бота.
+
+        Returns:
+            Количество удалённых записей
+        """
+        if not self.available:
+            return 0
+        try:
+            async with self.db.session() as session:
+                result = await session.execute(CLEANUP_SQL)
+        except Exception as e:
+            logger.warning(f"Failed to clean up shared rate limits: {e}")
+            return 0
+
+        removed = int(getattr(result, "rowcount", 0) or 0)
+        if removed:
+            logger.debug(f"Cleaned up {removed} users from shared rate limits")
+        return removed
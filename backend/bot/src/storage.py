@@ -12,7 +12,8 @@ from sqlalchemy.dialects.postgresql import insert
 
 from src.config import Config
 from src.database import Database
-from src.models import Message, User, UserSettings
+from src.deadline import Deadline
+from src.models import SUMMARY_ROLE, Message, User, UserSettings
 
 logger = logging.getLogger(__name__)
 
@@ -191,7 +192,9 @@ class Storage:
             )
             return []
 
-    async def save_history(self, user_id: int, messages: list[dict[str, str]]) -> None:
+    async def save_history(
+        self, user_id: int, messages: list[dict[str, str]], deadline: Deadline | None = None
+    ) -> None:
         """
         Сохраняет историю диалога пользователя в БД (инкрементально) с retry механизмом.
 
@@ -203,10 +206,12 @@ class Storage:
         - Делает несколько попыток (save_retry_attempts) при ошибках
         - Использует экспоненциальную задержку между попытками
         - Логирует все попытки восстановления
+        - Не делает повторных попыток, если они не укладываются в deadline
 
         Args:
             user_id: ID пользователя Telegram
             messages: Список сообщений для сохранения (с полем "id" для существующих)
+            deadline: Бюджет времени хода (ограничивает retry, опционально)
 
         Raises:
             Exception: После всех неудачных попыток retry
@@ -232,6 +237,12 @@ class Storage:
                 if attempt < self.config.save_retry_attempts:
                     # Exponential backoff
                     delay = self.config.save_retry_delay * (2 ** (attempt - 1))
+                    if deadline is not None and not deadline.allows(delay):
+                        logger.error(
+                            f"User {user_id}: save_history retry skipped, "
+                            f"reply deadline leaves {deadline.remaining():.2f}s"
+                        )
+                        break
                     logger.debug(f"User {user_id}: retrying save_history in {delay}s...")
                     await asyncio.sleep(delay)
                 else:
@@ -282,7 +293,14 @@ class Storage:
                 for msg in messages:
                     msg_id_str = msg.get("id")
 
-                    if msg_id_str and msg_id_str in existing_uuids:
+                    if msg_id_str and msg_id_str not in existing_uuids:
+                        # Сообщение уже удалено (сжато в summary или /reset) - не воскрешаем
+                        logger.debug(
+                            f"User {user_id}: skipping message {msg_id_str} deleted concurrently"
+                        )
+                        continue
+
+                    if msg_id_str:
                         # ОБНОВЛЯЕМ существующее сообщение
                         msg_uuid = UUID(msg_id_str)
                         update_stmt = (
@@ -324,13 +342,13 @@ class Storage:
                 if total_active_count > max_messages:
                     to_delete_count = total_active_count - max_messages
 
-                    # Получаем самые старые сообщения (исключая system промпт)
+                    # Получаем самые старые сообщения (исключая system промпт и summary)
                     old_messages_stmt = (
                         select(Message)
                         .where(
                             Message.user_id == user_id,
                             Message.deleted_at.is_(None),
-                            Message.role != "system",
+                            Message.role.notin_(("system", SUMMARY_ROLE)),
                         )
                         .order_by(Message.created_at)
                         .limit(to_delete_count)
@@ -360,6 +378,76 @@ class Storage:
             logger.error(f"User {user_id}: failed to save history: {e}", exc_info=True)
             raise
 
+    async def save_summary(
+        self,
+        user_id: int,
+        summarized_ids: list[str],
+        summary: str,
+        created_at: datetime,
+    ) -> int:
+        """
+        Заменяет старые сообщения диалога одним summary-сообщением.
+
+        Сжатые сообщения помечаются удалёнными (soft delete) в той же транзакции,
+        в которой создаётся summary. Сообщения, уже удалённые к этому моменту
+        (например, через /reset), не учитываются.
+
+        Args:
+            user_id: ID пользователя Telegram
+            summarized_ids: UUID сообщений, вошедших в summary
+            summary: Текст summary
+            created_at: Время summary (время последнего сжатого сообщения)
+
+        Returns:
+            Количество сообщений, заменённых summary (0 если замена не выполнена)
+        """
+        if not summarized_ids:
+            return 0
+
+        try:
+            async with self.db.session() as session:
+                soft_delete_stmt = (
+                    update(Message)
+                    .where(
+                        Message.user_id == user_id,
+                        Message.id.in_([UUID(msg_id) for msg_id in summarized_ids]),
+                        Message.deleted_at.is_(None),
+                    )
+                    .values(deleted_at=datetime.now(UTC))
+                )
+                result = await session.execute(soft_delete_stmt)
+                replaced_count = result.rowcount or 0  # type: ignore[attr-defined]
+
+                # История изменилась параллельно (например, /reset) - summary не нужен
+                if replaced_count != len(summarized_ids):
+                    await session.rollback()
+                    logger.info(
+                        f"User {user_id}: summary skipped, history changed concurrently "
+                        f"({replaced_count}/{len(summarized_ids)} messages active)"
+                    )
+                    return 0
+
+                session.add(
+                    Message(
+                        id=uuid4(),
+                        user_id=user_id,
+                        role=SUMMARY_ROLE,
+                        content=summary,
+                        content_length=len(summary),
+                        created_at=created_at,
+                    )
+                )
+
+            logger.info(
+                f"User {user_id}: {replaced_count} messages replaced with summary "
+                f"({len(summary)} chars)"
+            )
+            return replaced_count
+
+        except Exception as e:
+            logger.error(f"User {user_id}: failed to save summary: {e}", exc_info=True)
+            raise
+
     async def clear_history(self, user_id: int) -> None:
         """
         Очищает историю диалога пользователя (soft delete).
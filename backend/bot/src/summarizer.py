@@ -0,0 +1,202 @@
+"""Фоновое сжатие старой части диалога в summary."""
+
+import asyncio
+import logging
+from datetime import UTC, datetime
+
+from src.background import BackgroundTasks
+from src.config import Config
+from src.context_builder import ContextBuilder
+from src.llm_client import LLMClient
+from src.models import SUMMARY_ROLE
+from src.storage import Storage
+from src.telemetry import PURPOSE_SUMMARY
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTION = (
+    "Сожми переписку пользователя с ассистентом в краткое содержание. "
+    "Сохрани факты о пользователе, его цели, принятые решения и открытые вопросы. "
+    "Пиши от третьего лица, без вступлений, не длиннее 15 предложений."
+)
+
+ROLE_LABELS = {"user": "Пользователь", "assistant": "Ассистент", SUMMARY_ROLE: "Ранее"}
+
+
+class ConversationSummarizer:
+    """
+    Фоновый summarizer длинных диалогов.
+
+    Отвечает за:
+    - Проверку размера диалога после ответа пользователю
+    - Запуск сжатия старых сообщений в фоне (вне критического пути)
+    - Сохранение summary вместо сжатых сообщений
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        storage: Storage,
+        context_builder: ContextBuilder,
+        config: Config,
+        background: BackgroundTasks | None = None,
+    ) -> None:
+        """
+        Инициализация summarizer.
+
+        Args:
+            llm_client: Клиент для работы с LLM
+            storage: Storage для загрузки истории и сохранения summary
+            context_builder: Сборщик контекста (для оценки токенов)
+            config: Конфигурация приложения
+            background: Супервизор фонового сохранения истории (ожидание перед
+                загрузкой и заменой сообщений, опционально)
+        """
+        self.llm_client = llm_client
+        self.storage = storage
+        self.context_builder = context_builder
+        self.config = config
+        self.background = background
+        self.model = (
+            config.summary_model or config.openrouter_fallback_model or config.openrouter_model
+        )
+
+        # Пользователи, для которых summary уже строится
+        self._in_progress: set[int] = set()
+        # Ссылки на фоновые задачи (чтобы их не собрал GC)
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        logger.info(
+            f"ConversationSummarizer initialized: enabled={config.summary_enabled}, "
+            f"trigger={config.summary_trigger_tokens} tokens, model={self.model}"
+        )
+
+    def needs_summary(self, history: list[dict[str, str]]) -> bool:
+        """
+        Проверяет, превышает ли диалог порог для сжатия.
+
+        Args:
+            history: История диалога
+
+        Returns:
+            True если диалог (без системного промпта) больше порога
+        """
+        dialog = [msg for msg in history if msg["role"] != "system"]
+        if len(dialog) <= self.config.summary_keep_messages:
+            return False
+
+        tokens = sum(self.context_builder.estimate_tokens(msg) for msg in dialog)
+        return tokens > self.config.summary_trigger_tokens
+
+    def schedule(self, user_id: int, history: list[dict[str, str]]) -> None:
+        """
+        Запускает фоновое сжатие диалога, если оно нужно.
+
+        Не блокирует вызывающий код: сжатие выполняется в отдельной задаче,
+        не более одной задачи на пользователя одновременно.
+
+        Args:
+            user_id: ID пользователя Telegram
+            history: Текущая история диалога (для проверки порога)
+        """
+        if not self.config.summary_enabled or user_id in self._in_progress:
+            return
+
+        if not self.needs_summary(history):
+            return
+
+        self._in_progress.add(user_id)
+        task = asyncio.create_task(self._summarize(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.debug(f"User {user_id}: summarization scheduled")
+
+    async def _summarize(self, user_id: int) -> None:
+        """
+        Сжимает старые сообщения пользователя в summary.
+
+        Args:
+            user_id: ID пользователя Telegram
+        """
+        try:
+            # Сохранение хода, после которого запущено сжатие, может ещё выполняться:
+            # без ожидания summary построится без последнего хода
+            await self._wait_for_save(user_id)
+            history = await self.storage.load_recent_history(
+                user_id, limit=self.config.max_history_messages
+            )
+            dialog = [msg for msg in history if msg["role"] != "system"]
+            to_summarize = dialog[: -self.config.summary_keep_messages]
+
+            if len(to_summarize) < 2:
+                return
+
+            transcript = "\n\n".join(
+                f"{ROLE_LABELS.get(msg['role'], msg['role'])}: {msg['content']}"
+                for msg in to_summarize
+            )
+            summary = await self.llm_client.generate_response(
+                messages=[
+                    {"role": "system", "content": SUMMARY_INSTRUCTION},
+                    {"role": "user", "content": transcript},
+                ],
+                user_id=user_id,
+                model=self.model,
+                purpose=PURPOSE_SUMMARY,
+            )
+
+            if not summary.strip():
+                logger.warning(f"User {user_id}: empty summary from LLM, skipping")
+                return
+
+            try:
+                created_at = datetime.fromisoformat(to_summarize[-1]["timestamp"])
+            except (KeyError, ValueError):
+                created_at = datetime.now(UTC)
+
+            # Сохранение следующего хода, начатое во время запроса к LLM, завершается
+            # до замены сообщений summary
+            await self._wait_for_save(user_id)
+            await self.storage.save_summary(
+                user_id,
+                [msg["id"] for msg in to_summarize],
+                summary.strip(),
+                created_at=created_at,
+            )
+
+        except Exception as e:
+            logger.error(f"User {user_id}: summarization failed: {e}", exc_info=True)
+        finally:
+            self._in_progress.discard(user_id)
+
+    async def _wait_for_save(self, user_id: int) -> None:
+        """
+        Ожидает фоновое сохранение истории пользователя (если есть).
+
+        Args:
+            user_id: ID пользователя Telegram
+        """
+        if self.background is not None:
+            await self.background.wait_key(user_id)
+
+    async def wait_pending(self, timeout: float) -> int:
+        """
+        Ожидает завершения фоновых задач сжатия (для graceful shutdown).
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Количество задач, отменённых по timeout
+        """
+        if not self._tasks:
+            return 0
+
+        logger.info(f"Waiting for {len(self._tasks)} summarization tasks...")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} unfinished summarization tasks")
+        return len(pending)
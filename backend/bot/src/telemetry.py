@@ -0,0 +1,176 @@
+"""Телеметрия запросов к LLM с пакетной записью в БД."""
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from src.config import Config
+from src.database import Database
+from src.models import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+# Назначение запроса к LLM: ответ пользователю (ход диалога)
+PURPOSE_TURN = "turn"
+# Назначение запроса к LLM: фоновая суммаризация истории
+PURPOSE_SUMMARY = "summary"
+
+
+@dataclass
+class UsageRecord:
+    """Телеметрия одного вызова generate_response (хода диалога или суммаризации)."""
+
+    user_id: int
+    model: str
+    latency_ms: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    is_fallback: bool = False
+    success: bool = True
+    purpose: str = PURPOSE_TURN
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class UsageRecorder:
+    """
+    Буферизованная запись телеметрии LLM в таблицу llm_usage.
+
+    Отвечает за:
+    - Накопление записей в памяти без обращения к БД на горячем пути
+    - Пакетную запись (по размеру пакета или по интервалу)
+    - Ограничение буфера при недоступности БД
+    - Паузу записи по размеру пакета после ошибки БД (повтор - по интервалу)
+    """
+
+    def __init__(self, database: Database, config: Config) -> None:
+        """
+        Инициализация recorder.
+
+        Args:
+            database: Объект Database для записи телеметрии
+            config: Конфигурация приложения
+        """
+        self.db = database
+        self.config = config
+        self.enabled = config.telemetry_enabled
+        self.batch_size = config.telemetry_batch_size
+        self.flush_interval = config.telemetry_flush_interval
+        self.max_buffer = config.telemetry_max_buffer
+
+        self._buffer: list[UsageRecord] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+        self._pending_flushes: set[asyncio.Task[int]] = set()
+        # До этого момента (monotonic) запись по размеру пакета не запускается
+        self._retry_at = 0.0
+        # Записи, удалённые при переполнении буфера
+        self.dropped = 0
+
+        logger.info(
+            f"UsageRecorder initialized: enabled={self.enabled}, "
+            f"batch_size={self.batch_size}, flush_interval={self.flush_interval}s"
+        )
+
+    def record(self, record: UsageRecord) -> None:
+        """
+        Добавляет запись телеметрии в буфер.
+
+        При заполнении пакета запускает фоновую запись в БД, если запись
+        ещё не запущена и после ошибки БД прошло flush_interval секунд.
+
+        Args:
+            record: Телеметрия хода диалога
+        """
+        if not self.enabled:
+            return
+
+        self._buffer.append(record)
+
+        # Защита от неограниченного роста при недоступности БД
+        self._trim()
+
+        if (
+            len(self._buffer) >= self.batch_size
+            and not self._pending_flushes
+            and time.monotonic() >= self._retry_at
+        ):
+            task = asyncio.create_task(self.flush())
+            self._pending_flushes.add(task)
+            task.add_done_callback(self._pending_flushes.discard)
+
+    def _trim(self) -> None:
+        """Удаляет самые старые записи сверх max_buffer (учитываются в dropped)."""
+        if len(self._buffer) <= self.max_buffer:
+            return
+        dropped = len(self._buffer) - self.max_buffer
+        del self._buffer[:dropped]
+        self.dropped += dropped
+        logger.warning(
+            f"Telemetry buffer overflow, dropped {dropped} oldest records ({self.dropped} total)"
+        )
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные записи в БД одним пакетом.
+
+        При ошибке записи возвращает записи в буфер для следующей попытки
+        (не больше max_buffer, самые старые удаляются) и приостанавливает
+        запись по размеру пакета на flush_interval секунд.
+
+        Returns:
+            Количество записанных записей
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+
+            batch = self._buffer
+            self._buffer = []
+
+            try:
+                async with self.db.session() as session:
+                    await session.execute(
+                        insert(LLMUsage), [{"id": uuid4(), **asdict(item)} for item in batch]
+                    )
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} telemetry records: {e}")
+                self._buffer = batch + self._buffer
+                self._trim()
+                self._retry_at = time.monotonic() + self.flush_interval
+                return 0
+
+            self._retry_at = 0.0
+            logger.debug(f"Flushed {len(batch)} telemetry records")
+            return len(batch)
+
+    async def _flush_loop(self) -> None:
+        """Периодическая запись буфера в БД."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Запускает периодическую запись телеметрии."""
+        if self.enabled and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Останавливает периодическую запись и сбрасывает остаток буфера."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+
+        if self._pending_flushes:
+            await asyncio.gather(*self._pending_flushes, return_exceptions=True)
+
+        await self.flush()
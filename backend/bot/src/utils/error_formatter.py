@@ -13,6 +13,8 @@ def get_error_message(error: str) -> str:
     """
     error_lower = error.lower()
 
+    if "deadline" in error_lower:
+        return "⏱️ Не удалось подготовить ответ за отведённое время. Попробуйте ещё раз."
     if "rate limit" in error_lower:
         return "⏳ Превышен лимит запросов. Попробуйте через минуту."
     if "timeout" in error_lower:
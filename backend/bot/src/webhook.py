@@ -0,0 +1,286 @@
+"""Получение обновлений Telegram через webhook (aiohttp сервер)."""
+
+import asyncio
+import contextlib
+import logging
+import secrets
+import signal
+import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Заголовок с секретным токеном, заданным при setWebhook
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def extract_user_id(update: dict[str, Any]) -> int | None:
+    """
+    Извлекает ID пользователя из обновления Telegram (без разбора в модели aiogram).
+
+    Args:
+        update: Обновление Telegram (JSON)
+
+    Returns:
+        ID пользователя (from/user), ID чата если пользователя нет, иначе None
+    """
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        for field in ("from", "user"):
+            user = payload.get(field)
+            if isinstance(user, dict) and "id" in user:
+                return int(user["id"])
+        chat = payload.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+    return None
+
+
+class WebhookServer:
+    """
+    HTTP сервер для приёма обновлений Telegram через webhook.
+
+    Отвечает за:
+    - Приём обновлений на webhook_path с проверкой секретного токена
+    - Обработку обновлений в фоне (Telegram сразу получает ответ 200)
+    - Порядок обработки: обновления одного пользователя обрабатываются по очереди
+    - Health check для балансировщика (/health)
+    - Регистрацию webhook в Telegram (если задан webhook_url)
+    - Graceful drain: при остановке новые обновления отклоняются (503, Telegram
+      повторит доставку другому процессу), принятые - дообрабатываются
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, config: Config, **data: object) -> None:
+        """
+        Инициализация webhook сервера.
+
+        Args:
+            dispatcher: Dispatcher aiogram с зарегистрированными handlers
+            bot: Экземпляр aiogram Bot
+            config: Конфигурация приложения
+            **data: Дополнительные данные для handlers (передаются в dispatcher)
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.config = config
+        self.data = data
+        self.accepting = True
+        self.received = 0
+        self.rejected = 0
+
+        self._runner: web.AppRunner | None = None
+        self._stop_event = asyncio.Event()
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Последнее обновление пользователя (следующее обновление ждёт его обработки)
+        self._last_by_user: dict[int, asyncio.Task[None]] = {}
+
+        logger.info(
+            f"WebhookServer initialized: {config.webhook_host}:{config.webhook_port}"
+            f"{config.webhook_path}, secret={'set' if config.webhook_secret else 'not set'}"
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Количество принятых, но ещё не обработанных обновлений."""
+        return len(self._tasks)
+
+    def create_app(self) -> web.Application:
+        """
+        Создаёт aiohttp приложение с маршрутами webhook и health check.
+
+        Returns:
+            aiohttp Application
+        """
+        app = web.Application()
+        app.router.add_post(self.config.webhook_path, self.handle_update)
+        app.router.add_get("/health", self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """
+        Принимает обновление Telegram.
+
+        Args:
+            request: HTTP запрос от Telegram
+
+        Returns:
+            200 (принято), 400 (некорректное тело), 401 (неверный секрет)
+            или 503 (сервер останавливается)
+        """
+        if not self.accepting:
+            self.rejected += 1
+            return web.Response(status=503, text="Shutting down")
+
+        secret = self.config.webhook_secret
+        if secret and not secrets.compare_digest(
+            request.headers.get(SECRET_TOKEN_HEADER, ""), secret
+        ):
+            logger.warning(f"Webhook request with invalid secret token from {request.remote}")
+            return web.Response(status=401, text="Unauthorized")
+
+        # Некорректное тело - ошибка отправителя: 500 Telegram повторял бы бесконечно
+        try:
+            update = await request.json(loads=self.bot.session.json_loads)
+        except ValueError as e:
+            logger.warning(f"Webhook request with malformed JSON from {request.remote}: {e}")
+            return web.Response(status=400, text="Malformed update")
+        if not isinstance(update, dict):
+            logger.warning(f"Webhook request with non-object update from {request.remote}")
+            return web.Response(status=400, text="Malformed update")
+        self.received += 1
+
+        # Отвечаем Telegram сразу, обновление обрабатывается в фоне
+        self.submit(update)
+        return web.json_response({})
+
+    def submit(self, update: dict[str, Any]) -> asyncio.Task[None]:
+        """
+        Запускает обработку обновления после предыдущих обновлений того же пользователя.
+
+        Args:
+            update: Обновление Telegram (JSON)
+
+        Returns:
+            Задача обработки обновления
+        """
+        user_id = extract_user_id(update)
+        previous = self._last_by_user.get(user_id) if user_id is not None else None
+        task = asyncio.create_task(self._run(update, previous))
+        self._tasks.add(task)
+
+        if user_id is not None:
+            self._last_by_user[user_id] = task
+
+        def _done(finished: asyncio.Task[None]) -> None:
+            self._tasks.discard(finished)
+            if user_id is not None and self._last_by_user.get(user_id) is finished:
+                del self._last_by_user[user_id]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _run(self, update: dict[str, Any], previous: asyncio.Task[None] | None) -> None:
+        """
+        Обрабатывает обновление после предыдущего обновления пользователя.
+
+        Args:
+            update: Обновление Telegram (JSON)
+            previous: Предыдущее обновление того же пользователя (опционально)
+        """
+        if previous is not None:
+            await asyncio.wait({previous})
+        await self._process(update)
+
+    async def _process(self, update: dict[str, Any]) -> None:
+        """
+        Передаёт обновление в dispatcher.
+
+        Args:
+            update: Обновление Telegram (JSON)
+        """
+        try:
+            await self.dispatcher.feed_raw_update(bot=self.bot, update=update, **self.data)
+        except Exception as e:
+            logger.error(f"Failed to process update {update.get('update_id')}: {e}", exc_info=True)
+
+    async def handle_health(self, _request: web.Request) -> web.Response:
+        """
+        Health check для балансировщика.
+
+        Returns:
+            200 пока сервер принимает обновления, 503 во время остановки
+        """
+        status = 200 if self.accepting else 503
+        return web.json_response(
+            {"accepting": self.accepting, "in_flight": self.in_flight}, status=status
+        )
+
+    def _allowed_updates(self) -> list[str] | None:
+        """
+        Типы обновлений для setWebhook.
+
+        Returns:
+            Типы обновлений, для которых зарегистрированы handlers
+        """
+        return self.dispatcher.resolve_used_update_types()
+
+    async def start(self) -> None:
+        """Запускает HTTP сервер и регистрирует webhook в Telegram (если задан URL)."""
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.webhook_host, self.config.webhook_port)
+        await site.start()
+
+        if self.config.webhook_url:
+            url = self.config.webhook_url.rstrip("/") + self.config.webhook_path
+            await self.bot.set_webhook(
+                url=url,
+                secret_token=self.config.webhook_secret,
+                allowed_updates=self._allowed_updates(),
+            )
+            logger.info(f"Webhook registered: {url}")
+
+        logger.info(
+            f"Webhook server listening on {self.config.webhook_host}:{self.config.webhook_port}"
+        )
+
+    async def serve(self) -> None:
+        """
+        Запускает сервер и ожидает сигнала остановки (SIGINT/SIGTERM или stop()).
+
+        Игнорируемые процессом сигналы не перехватываются (worker процессы
+        останавливаются супервизором по SIGTERM, а не по Ctrl+C).
+        """
+        await self.start()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            if signal.getsignal(sig) is signal.SIG_IGN:
+                continue
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self._stop_event.set)
+
+        await self._stop_event.wait()
+        logger.info("Webhook server stop requested")
+
+    async def stop(self, timeout: float | None = None) -> int:
+        """
+        Останавливает приём обновлений и дообрабатывает принятые.
+
+        Args:
+            timeout: Время на обработку принятых обновлений (по умолчанию webhook_drain_timeout)
+
+        Returns:
+            Количество обновлений, не обработанных за timeout (отменены)
+        """
+        self.accepting = False
+        self._stop_event.set()
+        timeout = self.config.webhook_drain_timeout if timeout is None else timeout
+
+        tasks = set(self._tasks)
+        abandoned = 0
+        if tasks:
+            logger.info(f"Draining {len(tasks)} in-flight webhook updates...")
+            start_time = time.monotonic()
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            abandoned = len(pending)
+            if abandoned:
+                await asyncio.wait(pending)
+                logger.warning(f"Webhook drain timeout: {abandoned} updates abandoned")
+            else:
+                logger.info(f"Webhook drained in {time.monotonic() - start_time:.2f}s")
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+        logger.info(f"Webhook server stopped: received={self.received}, rejected={self.rejected}")
+        return abandoned
@@ -1,11 +1,15 @@
 """Интеграционные тесты для handlers."""
 
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
 
+from src.background import BackgroundTasks
 from src.config import Config
+from src.context_builder import ContextBuilder
 from src.database import Database
+from src.deadline import Deadline
 from src.handlers.commands import (
     handle_help,
     handle_reset,
@@ -15,6 +19,7 @@ from src.handlers.commands import (
 )
 from src.handlers.messages import handle_message
 from src.llm_client import LLMAPIError
+from src.outbound import OutboundQueue
 
 
 @pytest.mark.asyncio
@@ -51,6 +56,22 @@ async def test_handle_help_command(mock_message: AsyncMock) -> None:
     assert "/status" in call_args
 
 
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_command_replies_go_through_outbound_queue(
+    mock_message: AsyncMock, test_config: Config
+) -> None:
+    """Тест: ответы команд учитываются очередью исходящих сообщений."""
+    outbound = OutboundQueue(test_config)
+
+    await handle_start(mock_message, outbound=outbound)
+    await handle_help(mock_message, outbound=outbound)
+    await outbound.stop()
+
+    assert outbound.sent == 2
+    assert mock_message.answer.call_count == 2
+
+
 @pytest.mark.asyncio
 @pytest.mark.integration
 async def test_handle_role_without_args(
@@ -162,7 +183,14 @@ async def test_handle_message_full_cycle(
     mock_llm_client.generate_response.return_value = "Отлично, спасибо!"
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     mock_storage.load_recent_history.assert_called_once()
@@ -196,7 +224,14 @@ async def test_handle_message_with_existing_history(
     mock_llm_client.generate_response.return_value = "Да, продолжаем!"
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     # История должна была загрузиться
@@ -234,7 +269,14 @@ async def test_handle_message_llm_error(
     mock_llm_client.generate_response.side_effect = LLMAPIError("Rate limit exceeded")
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     # Должно быть отправлено сообщение об ошибке
@@ -263,7 +305,14 @@ async def test_handle_message_long_response(
     mock_llm_client.generate_response.return_value = long_response
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     # Должно быть несколько вызовов answer (для разных частей)
@@ -292,7 +341,14 @@ async def test_handle_message_custom_system_prompt(
     mock_llm_client.generate_response.return_value = "Ответ"
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     # LLM должен был получить кастомный промпт
@@ -320,7 +376,14 @@ async def test_handle_message_chat_action(
     mock_llm_client.generate_response.return_value = "Ответ"
 
     # Execute
-    await handle_message(mock_message, mock_bot, mock_llm_client, mock_storage, test_config)
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
 
     # Assert
     # Должен был быть вызван send_chat_action
@@ -384,7 +447,9 @@ class TestHandlersFallbackIntegration:
         # Act: вызываем handler
         from src.handlers.messages import handle_message
 
-        await handle_message(mock_message, mock_bot, llm_client, storage, test_config)
+        await handle_message(
+            mock_message, mock_bot, llm_client, storage, test_config, ContextBuilder(test_config)
+        )
 
         # Assert: пользователь получил ответ от fallback модели
         mock_message.answer.assert_called_once_with("Ответ от fallback модели")
@@ -439,7 +504,9 @@ class TestHandlersFallbackIntegration:
         # Act
         from src.handlers.messages import handle_message
 
-        await handle_message(mock_message, mock_bot, llm_client, storage, test_config)
+        await handle_message(
+            mock_message, mock_bot, llm_client, storage, test_config, ContextBuilder(test_config)
+        )
 
         # Assert: пользователь получил сообщение об ошибке
         mock_message.answer.assert_called_once()
@@ -504,7 +571,9 @@ class TestHandlersFallbackIntegration:
         # Act: полный флоу через handler
         from src.handlers.messages import handle_message
 
-        await handle_message(mock_message, mock_bot, llm_client, storage, test_config)
+        await handle_message(
+            mock_message, mock_bot, llm_client, storage, test_config, ContextBuilder(test_config)
+        )
 
         # Assert: история сохранена с fallback ответом
         history = await storage.load_history(user_id)
@@ -588,7 +657,9 @@ class TestHandlersFallbackIntegration:
         # Act
         from src.handlers.messages import handle_message
 
-        await handle_message(mock_message, mock_bot, llm_client, storage, test_config)
+        await handle_message(
+            mock_message, mock_bot, llm_client, storage, test_config, ContextBuilder(test_config)
+        )
 
         # Assert: контекст сохранён
         history = await storage.load_history(user_id)
@@ -658,7 +729,9 @@ class TestHandlersFallbackIntegration:
         # Act
         from src.handlers.messages import handle_message
 
-        await handle_message(mock_message, mock_bot, llm_client, storage, test_config)
+        await handle_message(
+            mock_message, mock_bot, llm_client, storage, test_config, ContextBuilder(test_config)
+        )
 
         # Assert: ответ НЕ содержит технических деталей
         mock_message.answer.assert_called_once()
@@ -672,3 +745,351 @@ class TestHandlersFallbackIntegration:
         assert "резерв" not in response_text.lower()
         assert "основная модель" not in response_text.lower()
         assert "попытка" not in response_text.lower()
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_handle_message_context_token_budget(
+    mock_message: AsyncMock,
+    mock_bot: AsyncMock,
+    mock_llm_client: AsyncMock,
+    mock_storage: AsyncMock,
+    test_config: Config,
+) -> None:
+    """Тест: в LLM отправляется только контекст в пределах бюджета токенов."""
+    # Setup
+    test_config.context_token_budget = 200
+    test_config.context_chars_per_token = 1.0
+    mock_message.text = "Новый вопрос"
+    existing_history = [
+        {"role": "user", "content": "x" * 1000, "timestamp": "2024-01-01T00:00:01+00:00"},
+        {"role": "assistant", "content": "Ответ", "timestamp": "2024-01-01T00:00:02+00:00"},
+    ]
+    mock_storage.load_recent_history.return_value = existing_history
+    mock_storage.get_system_prompt.return_value = None
+    mock_llm_client.generate_response.return_value = "Ответ на новый вопрос"
+
+    # Execute
+    await handle_message(
+        mock_message,
+        mock_bot,
+        mock_llm_client,
+        mock_storage,
+        test_config,
+        ContextBuilder(test_config),
+    )
+
+    # Assert
+    # Системный промпт добавлен, длинное старое сообщение отброшено
+    messages = mock_llm_client.generate_response.call_args.kwargs["messages"]
+    assert messages[0] == {"role": "system", "content": test_config.system_prompt}
+    assert [msg["content"] for msg in messages[1:]] == ["Ответ", "Новый вопрос"]
+
+    # В историю сохраняются все сообщения (без системного промпта для контекста)
+    saved_history = mock_storage.save_history.call_args[0][1]
+    assert len(saved_history) == 4
+    assert saved_history[0]["content"] == "x" * 1000
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_handle_message_reuses_context_builder_cache(
+    mock_message: AsyncMock,
+    mock_bot: AsyncMock,
+    mock_llm_client: AsyncMock,
+    mock_storage: AsyncMock,
+    test_config: Config,
+) -> None:
+    """Тест: оценки токенов сохранённых сообщений кешируются между сообщениями."""
+    mock_message.text = "Вопрос"
+    mock_storage.load_recent_history.return_value = [
+        {"id": "m1", "role": "system", "content": "Ты помощник", "timestamp": "2024-01-01"},
+        {"id": "m2", "role": "user", "content": "Привет", "timestamp": "2024-01-01"},
+    ]
+    context_builder = ContextBuilder(test_config)
+
+    for _ in range(2):
+        await handle_message(
+            mock_message, mock_bot, mock_llm_client, mock_storage, test_config, context_builder
+        )
+
+    assert set(context_builder.token_cache) == {"m1", "m2"}
+
+
+@pytest.mark.integration
+class TestHandleMessagePipeline:
+    """Интеграционные тесты конвейера обработки сообщения (фоновое сохранение)."""
+
+    @pytest.mark.asyncio
+    async def test_reply_sent_before_slow_save(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: медленное сохранение истории не задерживает ответ пользователю.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        mock_message.text = "Привет"
+        mock_storage.load_recent_history.return_value = []
+        save_started = asyncio.Event()
+        release_save = asyncio.Event()
+
+        async def slow_save(*_args: object, **_kwargs: object) -> None:
+            save_started.set()
+            await release_save.wait()
+
+        mock_storage.save_history.side_effect = slow_save
+        background = BackgroundTasks()
+
+        await asyncio.wait_for(
+            handle_message(
+                mock_message,
+                mock_bot,
+                mock_llm_client,
+                mock_storage,
+                test_config,
+                ContextBuilder(test_config),
+                background=background,
+            ),
+            timeout=1.0,
+        )
+
+        # Ответ отправлен, сохранение ещё выполняется в фоне
+        mock_message.answer.assert_called_once_with("Mock LLM response")
+        await asyncio.wait_for(save_started.wait(), timeout=1.0)
+        assert background.pending == 1
+
+        release_save.set()
+        await background.wait_pending(timeout=1.0)
+        assert background.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_save_bounded_by_deadline(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: сохранение получает deadline хода, фоновое - собственный бюджет.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        mock_message.text = "Привет"
+        mock_storage.load_recent_history.return_value = []
+        builder = ContextBuilder(test_config)
+
+        await handle_message(
+            mock_message, mock_bot, mock_llm_client, mock_storage, test_config, builder
+        )
+        inline_deadline = mock_storage.save_history.call_args.kwargs["deadline"]
+        assert inline_deadline is mock_llm_client.generate_response.call_args.kwargs["deadline"]
+
+        mock_storage.save_history.reset_mock()
+        background = BackgroundTasks()
+        await handle_message(
+            mock_message,
+            mock_bot,
+            mock_llm_client,
+            mock_storage,
+            test_config,
+            builder,
+            background=background,
+        )
+        await background.wait_pending(timeout=1.0)
+
+        background_deadline = mock_storage.save_history.call_args.kwargs["deadline"]
+        assert isinstance(background_deadline, Deadline)
+        assert background_deadline.timeout == test_config.reply_deadline
+        assert (
+            background_deadline
+            is not mock_llm_client.generate_response.call_args.kwargs["deadline"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_next_message_waits_for_pending_save(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: следующее сообщение пользователя загружает историю после сохранения предыдущей.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        mock_message.text = "Привет"
+        events: list[str] = []
+
+        async def slow_save(*_args: object, **_kwargs: object) -> None:
+            await asyncio.sleep(0.05)
+            events.append("save")
+
+        async def load(*_args: object, **_kwargs: object) -> list[dict[str, str]]:
+            events.append("load")
+            return []
+
+        mock_storage.save_history.side_effect = slow_save
+        mock_storage.load_recent_history.side_effect = load
+        background = BackgroundTasks()
+
+        for _ in range(2):
+            await handle_message(
+                mock_message,
+                mock_bot,
+                mock_llm_client,
+                mock_storage,
+                test_config,
+                ContextBuilder(test_config),
+                background=background,
+            )
+        await background.wait_pending(timeout=1.0)
+
+        assert events == ["load", "save", "load", "save"]
+
+    @pytest.mark.asyncio
+    async def test_save_error_does_not_reach_user(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: ошибка фонового сохранения логируется, пользователь получает только ответ.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        mock_message.text = "Привет"
+        mock_storage.load_recent_history.return_value = []
+        mock_storage.save_history.side_effect = RuntimeError("db down")
+        background = BackgroundTasks()
+
+        await handle_message(
+            mock_message,
+            mock_bot,
+            mock_llm_client,
+            mock_storage,
+            test_config,
+            ContextBuilder(test_config),
+            background=background,
+        )
+        await background.wait_pending(timeout=1.0)
+
+        mock_message.answer.assert_called_once_with("Mock LLM response")
+        assert background.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_typing_kept_alive_during_long_llm_call(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: индикатор "печатает..." обновляется во время долгого запроса к LLM.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        test_config.typing_interval = 0.02
+        mock_message.text = "Привет"
+        mock_storage.load_recent_history.return_value = []
+
+        async def slow_llm(*_args: object, **_kwargs: object) -> str:
+            await asyncio.sleep(0.1)
+            return "Ответ"
+
+        mock_llm_client.generate_response.side_effect = slow_llm
+
+        await handle_message(
+            mock_message,
+            mock_bot,
+            mock_llm_client,
+            mock_storage,
+            test_config,
+            ContextBuilder(test_config),
+        )
+        calls_after_reply = mock_bot.send_chat_action.call_count
+        await asyncio.sleep(0.05)
+
+        assert calls_after_reply >= 3
+        # После ответа индикатор больше не отправляется
+        assert mock_bot.send_chat_action.call_count == calls_after_reply
+
+    @pytest.mark.asyncio
+    async def test_long_response_sent_through_outbound(
+        self,
+        mock_message: AsyncMock,
+        mock_bot: AsyncMock,
+        mock_llm_client: AsyncMock,
+        mock_storage: AsyncMock,
+        test_config: Config,
+    ) -> None:
+        """
+        Тест: части длинного ответа отправляются через очередь исходящих по порядку.
+
+        Args:
+            mock_message: Mock сообщения
+            mock_bot: Mock бота
+            mock_llm_client: Mock LLM клиента
+            mock_storage: Mock Storage
+            test_config: Тестовая конфигурация
+        """
+        mock_message.text = "Расскажи много"
+        mock_storage.load_recent_history.return_value = []
+        mock_llm_client.generate_response.return_value = "a" * 5000
+        outbound = OutboundQueue(test_config.model_copy(update={"outbound_chat_rate": 100.0}))
+
+        await handle_message(
+            mock_message,
+            mock_bot,
+            mock_llm_client,
+            mock_storage,
+            test_config,
+            ContextBuilder(test_config),
+            outbound=outbound,
+        )
+        await outbound.stop()
+
+        parts = [call.args[0] for call in mock_message.answer.call_args_list]
+        assert len(parts) == 2
+        assert parts[0].startswith("📄 Часть 1/2")
+        assert parts[1].startswith("📄 Часть 2/2")
+        assert outbound.sent == 2
@@ -301,3 +301,79 @@ async def test_dialog_info_with_real_db(integration_storage: Storage) -> None:
     assert dialog_info["max_history_messages"] == storage.config.max_history_messages
     assert "created_at" in dialog_info
     assert "updated_at" in dialog_info
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_save_summary_replaces_old_messages(integration_storage: Storage) -> None:
+    """
+    Тест замены старых сообщений summary-сообщением.
+
+    Args:
+        integration_storage: Storage с реальной БД
+    """
+    user_id = 890123
+    storage = integration_storage
+
+    base_time = datetime(2024, 1, 1, tzinfo=UTC)
+    messages = [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}",
+            "timestamp": base_time.replace(minute=i).isoformat(),
+        }
+        for i in range(6)
+    ]
+    await storage.save_history(user_id, messages)
+    history = await storage.load_history(user_id)
+
+    # Сжимаем первые 4 сообщения
+    old_messages = history[:4]
+    replaced = await storage.save_summary(
+        user_id,
+        [msg["id"] for msg in old_messages],
+        "Краткое содержание",
+        created_at=datetime.fromisoformat(old_messages[-1]["timestamp"]),
+    )
+
+    assert replaced == 4
+    new_history = await storage.load_history(user_id)
+    assert [msg["content"] for msg in new_history] == [
+        "Краткое содержание",
+        "Message 4",
+        "Message 5",
+    ]
+    assert new_history[0]["role"] == "summary"
+
+    # Повторное сохранение старой истории не воскрешает сжатые сообщения
+    await storage.save_history(user_id, history)
+    assert len(await storage.load_history(user_id)) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.integration
+async def test_save_summary_skipped_after_reset(integration_storage: Storage) -> None:
+    """
+    Тест: summary не сохраняется, если история была очищена параллельно.
+
+    Args:
+        integration_storage: Storage с реальной БД
+    """
+    user_id = 901234
+    storage = integration_storage
+
+    messages = [
+        {"role": "user", "content": f"Message {i}", "timestamp": datetime.now(UTC).isoformat()}
+        for i in range(3)
+    ]
+    await storage.save_history(user_id, messages)
+    history = await storage.load_history(user_id)
+
+    await storage.clear_history(user_id)
+
+    replaced = await storage.save_summary(
+        user_id, [msg["id"] for msg in history], "Summary", created_at=datetime.now(UTC)
+    )
+
+    assert replaced == 0
+    assert await storage.load_history(user_id) == []
@@ -0,0 +1,98 @@
+"""Тесты для супервизора фоновых задач."""
+
+import asyncio
+
+import pytest
+
+from src.background import BackgroundTasks
+
+
+class TestBackgroundTasks:
+    """Тесты класса BackgroundTasks."""
+
+    @pytest.mark.asyncio
+    async def test_spawn_runs_task(self) -> None:
+        """Тест: задача выполняется в фоне и удаляется из pending после завершения."""
+        background = BackgroundTasks()
+        done = asyncio.Event()
+
+        async def work() -> None:
+            done.set()
+
+        task = background.spawn("work", work())
+        assert background.pending == 1
+
+        await task
+
+        assert done.is_set()
+        assert background.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_same_key_runs_sequentially(self) -> None:
+        """Тест: задачи с одинаковым ключом выполняются по очереди."""
+        background = BackgroundTasks()
+        order: list[str] = []
+
+        async def work(name: str, delay: float) -> None:
+            order.append(f"{name}:start")
+            await asyncio.sleep(delay)
+            order.append(f"{name}:end")
+
+        background.spawn("first", work("first", 0.05), key=1)
+        background.spawn("second", work("second", 0), key=1)
+        await background.wait_key(1)
+
+        assert order == ["first:start", "first:end", "second:start", "second:end"]
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_concurrently(self) -> None:
+        """Тест: задачи с разными ключами не ждут друг друга."""
+        background = BackgroundTasks()
+        order: list[str] = []
+
+        async def work(name: str, delay: float) -> None:
+            await asyncio.sleep(delay)
+            order.append(name)
+
+        background.spawn("slow", work("slow", 0.05), key=1)
+        background.spawn("fast", work("fast", 0), key=2)
+        await background.wait_pending(timeout=1.0)
+
+        assert order == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_failure_logged_and_does_not_block_next(self) -> None:
+        """Тест: ошибка задачи учитывается и не мешает следующей задаче с тем же ключом."""
+        background = BackgroundTasks()
+        completed = asyncio.Event()
+
+        async def fail() -> None:
+            raise RuntimeError("db down")
+
+        async def work() -> None:
+            completed.set()
+
+        background.spawn("fail", fail(), key=1)
+        background.spawn("work", work(), key=1)
+        await background.wait_key(1)
+
+        assert background.failed == 1
+        assert completed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_wait_key_without_tasks(self) -> None:
+        """Тест: wait_key без задач возвращается сразу."""
+        background = BackgroundTasks()
+
+        await asyncio.wait_for(background.wait_key(42), timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_wait_pending_cancels_after_timeout(self) -> None:
+        """Тест: незавершённые за timeout задачи отменяются."""
+        background = BackgroundTasks()
+
+        task = background.spawn("hang", asyncio.sleep(10))
+        await background.wait_pending(timeout=0.05)
+
+        assert task.cancelled()
+        assert background.pending == 0
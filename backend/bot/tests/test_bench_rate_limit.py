@@ -0,0 +1,16 @@
+"""Тесты для бенчмарка rate limiter."""
+
+from scripts.bench_rate_limit import run_benchmark
+
+
+class TestBenchRateLimit:
+    """Тесты бенчмарка rate limiter."""
+
+    def test_gcra_does_not_accumulate_idle_users(self) -> None:
+        """Тест: GCRA не накапливает пользователей между волнами, прежний алгоритм - да."""
+        gcra, old = run_benchmark(users=2000)
+
+        assert gcra.users_after_second_wave <= gcra.users_after_first_wave
+        assert gcra.users_after_first_wave < 2000
+        assert old.users_after_second_wave == 4000
+        assert gcra.checks_per_second > 0
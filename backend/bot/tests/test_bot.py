@@ -1,14 +1,58 @@
 """Тесты для класса Bot."""
 
 import asyncio
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from aiogram.types import Update, User
 
 from src.bot import Bot
 from src.config import Config
 
 
+def start_handler(bot: Bot, duration: float | None, update_id: int = 1) -> asyncio.Task[Any]:
+    """
+    Запускает обработку обновления через учёт выполняемых handlers.
+
+    Args:
+        bot: Экземпляр бота
+        duration: Длительность обработки (None - не завершается сама)
+        update_id: ID обновления
+
+    Returns:
+        Задача обработки
+    """
+
+    async def handler(_event: Any, _data: dict[str, Any]) -> str:
+        if duration is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(duration or 0)
+        return "done"
+
+    user = User(id=42, is_bot=False, first_name="User")
+    return asyncio.create_task(
+        bot.in_flight(handler, Update(update_id=update_id), {"event_from_user": user})
+    )
+
+
+def make_bot(config: Config) -> Bot:
+    """
+    Создаёт бота с замоканными БД и сессией Telegram.
+
+    Args:
+        config: Тестовая конфигурация
+
+    Returns:
+        Экземпляр бота
+    """
+    bot = Bot(config)
+    bot.database.close = AsyncMock()
+    bot.bot.session = MagicMock()
+    bot.bot.session.close = AsyncMock()
+    return bot
+
+
 class TestBotGracefulShutdown:
     """Тесты graceful shutdown для Bot."""
 
@@ -46,27 +90,19 @@ class TestBotGracefulShutdown:
             test_config: Тестовая конфигурация
         """
         with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
-            bot = Bot(test_config)
-            bot.database.close = AsyncMock()
-            bot.bot.session = MagicMock()
-            bot.bot.session.close = AsyncMock()
+            bot = make_bot(test_config)
 
-            # Имитируем активные handlers
-            bot._active_handlers = 2
+            # Handlers, которые завершатся через 0.2 секунды
+            tasks = [start_handler(bot, 0.2, update_id=i) for i in range(2)]
+            await asyncio.sleep(0)
+            assert bot.in_flight.active == 2
 
-            # Создаём задачу которая через 0.2 секунды "завершит" handlers
-            async def complete_handlers():
-                await asyncio.sleep(0.2)
-                bot._active_handlers = 0
+            report = await bot.stop()
 
-            # Запускаем задачу завершения handlers
-            asyncio.create_task(complete_handlers())
-
-            # Останавливаем бот
-            await bot.stop()
-
-            # Проверяем что все handlers завершились
-            assert bot._active_handlers == 0
+            # Все handlers завершились до закрытия ресурсов
+            assert all(task.done() and task.result() == "done" for task in tasks)
+            assert bot.in_flight.active == 0
+            assert report.clean
             assert bot._is_shutting_down is True
 
             # Проверяем что ресурсы закрыты
@@ -82,31 +118,51 @@ class TestBotGracefulShutdown:
             test_config: Тестовая конфигурация
         """
         with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
-            bot = Bot(test_config)
-            bot.database.close = AsyncMock()
-            bot.bot.session = MagicMock()
-            bot.bot.session.close = AsyncMock()
-
-            # Имитируем handlers которые не завершаются
-            bot._active_handlers = 3
+            bot = make_bot(test_config.model_copy(update={"shutdown_timeout": 0.3}))
 
-            # Останавливаем бот с очень коротким timeout
-            async def stop_with_short_timeout():
-                bot._is_shutting_down = True
-                await bot._wait_for_pending_handlers(timeout=0.3)
-                await bot.database.close()
-                await bot.bot.session.close()
+            # Handlers которые не завершаются
+            tasks = [start_handler(bot, None, update_id=i) for i in range(3)]
+            await asyncio.sleep(0)
 
-            await stop_with_short_timeout()
+            report = await bot.stop()
 
-            # Handlers всё ещё активны (не завершились)
-            assert bot._active_handlers == 3
-            assert bot._is_shutting_down is True
+            # Handlers отменены и перечислены в отчёте
+            assert all(task.cancelled() for task in tasks)
+            assert sorted(report.handlers_abandoned) == [
+                "update 0 (user 42)",
+                "update 1 (user 42)",
+                "update 2 (user 42)",
+            ]
+            assert not report.clean
+            assert bot.in_flight.active == 0
 
             # Но ресурсы всё равно закрыты (force shutdown)
             bot.database.close.assert_awaited_once()
             bot.bot.session.close.assert_awaited_once()
 
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_background_save(self, test_config: Config) -> None:
+        """
+        Тест: фоновое сохранение истории завершается до закрытия БД.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
+            bot = make_bot(test_config)
+            saved: list[bool] = []
+
+            async def save() -> None:
+                await asyncio.sleep(0.1)
+                saved.append(bot.database.close.await_count == 0)
+
+            bot.background.spawn("save_history", save(), key=42)
+
+            report = await bot.stop()
+
+            assert saved == [True]
+            assert report.background_abandoned == 0
+
     @pytest.mark.asyncio
     async def test_wait_for_pending_handlers_no_handlers(self, test_config: Config) -> None:
         """
@@ -118,14 +174,11 @@ class TestBotGracefulShutdown:
         with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
             bot = Bot(test_config)
 
-            # Нет активных handlers
-            bot._active_handlers = 0
-
             # Ожидание должно завершиться мгновенно
-            await bot._wait_for_pending_handlers(timeout=1.0)
+            abandoned = await asyncio.wait_for(bot._wait_for_pending_handlers(timeout=1.0), 0.1)
 
-            # Проверка что счётчик всё ещё 0
-            assert bot._active_handlers == 0
+            assert abandoned == []
+            assert bot.in_flight.active == 0
 
     @pytest.mark.asyncio
     async def test_wait_for_pending_handlers_with_completion(self, test_config: Config) -> None:
@@ -137,22 +190,88 @@ class TestBotGracefulShutdown:
         """
         with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
             bot = Bot(test_config)
-            bot._active_handlers = 5
 
-            # Создаём задачу которая постепенно "завершает" handlers
-            async def complete_handlers_gradually():
-                await asyncio.sleep(0.1)
-                bot._active_handlers = 3
-                await asyncio.sleep(0.1)
-                bot._active_handlers = 1
-                await asyncio.sleep(0.1)
-                bot._active_handlers = 0
-
-            # Запускаем задачу
-            asyncio.create_task(complete_handlers_gradually())
+            # Handlers завершаются постепенно
+            for i, duration in enumerate((0.1, 0.1, 0.2, 0.2, 0.3)):
+                start_handler(bot, duration, update_id=i)
+            await asyncio.sleep(0)
+            assert bot.in_flight.active == 5
 
             # Ожидаем завершения
-            await bot._wait_for_pending_handlers(timeout=2.0)
+            abandoned = await bot._wait_for_pending_handlers(timeout=2.0)
 
             # Все handlers должны завершиться
-            assert bot._active_handlers == 0
+            assert abandoned == []
+            assert bot.in_flight.active == 0
+            assert bot.in_flight.completed == 5
+
+    @pytest.mark.asyncio
+    async def test_in_flight_tracks_dispatched_updates(self, test_config: Config) -> None:
+        """
+        Тест: обновления, проходящие через dispatcher, учитываются как выполняемые.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
+            bot = Bot(test_config)
+            release = asyncio.Event()
+            active: list[int] = []
+
+            @bot.dp.edited_message()
+            async def slow(_message: Any) -> None:
+                active.append(bot.in_flight.active)
+                await release.wait()
+
+            update = Update.model_validate(
+                {
+                    "update_id": 1,
+                    "edited_message": {
+                        "message_id": 1,
+                        "date": 0,
+                        "chat": {"id": 42, "type": "private"},
+                        "from": {"id": 42, "is_bot": False, "first_name": "User"},
+                        "text": "Привет",
+                    },
+                }
+            )
+            task = asyncio.create_task(bot.dp.feed_update(bot.bot, update))
+            await asyncio.sleep(0.01)
+
+            assert active == [1]
+            release.set()
+            await task
+            assert bot.in_flight.active == 0
+
+
+class TestBotLoadStats:
+    """Тесты периодических метрик нагрузки."""
+
+    @pytest.mark.asyncio
+    async def test_load_stats_logged_periodically(
+        self, test_config: Config, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """
+        Тест: метрики пула handlers и очереди отправки логируются во время работы.
+
+        Args:
+            test_config: Тестовая конфигурация
+            caplog: Fixture для перехвата логов
+        """
+        test_config.load_stats_interval = 0.02
+        with patch("src.bot.Database"), patch("src.bot.AiogramBot"):
+            bot = make_bot(test_config)
+            handler = start_handler(bot, duration=None)
+
+            with caplog.at_level("INFO", logger="src.bot"):
+                task = asyncio.create_task(bot._stats_loop())
+                await asyncio.sleep(0.07)
+                task.cancel()
+
+            reports = [r.message for r in caplog.records if r.message.startswith("Load stats")]
+            assert len(reports) >= 2
+            assert "queue_depth" in reports[0]
+            assert "in_flight=1" in reports[0]
+            assert "outbound_queue=0" in reports[0]
+
+            handler.cancel()
@@ -0,0 +1,173 @@
+"""Тесты для ConcurrencyLimitMiddleware."""
+
+import asyncio
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import Message
+
+from src.middlewares.concurrency import BUSY_MESSAGE, ConcurrencyLimitMiddleware
+
+
+def make_message(chat_id: int = 12345) -> MagicMock:
+    """
+    Создаёт мок сообщения.
+
+    Args:
+        chat_id: ID чата
+
+    Returns:
+        Мок Message
+    """
+    message = MagicMock(spec=Message)
+    message.chat = MagicMock()
+    message.chat.id = chat_id
+    message.answer = AsyncMock()
+    return message
+
+
+class SlowHandler:
+    """Handler, который ждёт события и считает одновременные вызовы."""
+
+    def __init__(self) -> None:
+        """Инициализация handler."""
+        self.release = asyncio.Event()
+        self.running = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def __call__(self, _event: Any, _data: dict[str, Any]) -> str:
+        """
+        Выполняет "обработку" до release.
+
+        Returns:
+            Результат обработки
+        """
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.release.wait()
+        finally:
+            self.running -= 1
+        return "success"
+
+
+class TestConcurrencyLimitMiddleware:
+    """Тесты для ConcurrencyLimitMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrent_handlers(self) -> None:
+        """Тест: одновременно выполняется не больше limit handlers, остальные ждут."""
+        middleware = ConcurrencyLimitMiddleware(limit=3, queue_size=10)
+        handler = SlowHandler()
+
+        tasks = [asyncio.create_task(middleware(handler, make_message(i), {})) for i in range(8)]
+        await asyncio.sleep(0.01)
+
+        assert handler.running == 3
+        assert middleware.stats()["queue_depth"] == 5
+
+        handler.release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert results == ["success"] * 8
+        assert handler.peak == 3
+        stats = middleware.stats()
+        assert stats["processed"] == 8
+        assert stats["queued"] == 5
+        assert stats["peak_queue_depth"] == 5
+        assert stats["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_sheds_with_busy_reply(self) -> None:
+        """Тест: при заполненной очереди сообщение отклоняется с ответом "перегружен"."""
+        middleware = ConcurrencyLimitMiddleware(limit=1, queue_size=1)
+        handler = SlowHandler()
+
+        running = asyncio.create_task(middleware(handler, make_message(1), {}))
+        queued = asyncio.create_task(middleware(handler, make_message(2), {}))
+        await asyncio.sleep(0.01)
+
+        shed_message = make_message(3)
+        result = await middleware(handler, shed_message, {})
+
+        assert result is None
+        shed_message.answer.assert_called_once_with(BUSY_MESSAGE, parse_mode=None)
+        assert middleware.shed == 1
+
+        handler.release.set()
+        await asyncio.gather(running, queued)
+        assert handler.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_busy_reply_goes_through_outbound_queue(self) -> None:
+        """Тест: ответ "перегружен" отправляется через очередь исходящих сообщений."""
+        middleware = ConcurrencyLimitMiddleware(limit=1, queue_size=0)
+        handler = SlowHandler()
+        outbound = MagicMock()
+        outbound.send = AsyncMock()
+
+        running = asyncio.create_task(middleware(handler, make_message(1), {}))
+        await asyncio.sleep(0.01)
+
+        shed_message = make_message(2)
+        result = await middleware(handler, shed_message, {"outbound": outbound})
+
+        assert result is None
+        outbound.send.assert_awaited_once()
+        assert outbound.send.call_args[0][0] == 2
+        shed_message.answer.assert_not_called()
+
+        handler.release.set()
+        await running
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_replies_busy(self) -> None:
+        """Тест: сообщение, не дождавшееся handler за queue_timeout, отклоняется."""
+        middleware = ConcurrencyLimitMiddleware(limit=1, queue_size=10, queue_timeout=0.05)
+        handler = SlowHandler()
+
+        running = asyncio.create_task(middleware(handler, make_message(1), {}))
+        await asyncio.sleep(0)
+
+        waiting_message = make_message(2)
+        result = await middleware(handler, waiting_message, {})
+
+        assert result is None
+        waiting_message.answer.assert_called_once()
+        assert middleware.timed_out == 1
+        assert middleware.waiting == 0
+
+        handler.release.set()
+        await running
+        # Место в пуле освобождается: следующее сообщение обрабатывается сразу
+        assert await middleware(handler, make_message(3), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_handler_error_releases_slot(self) -> None:
+        """Тест: ошибка handler освобождает место в пуле."""
+        middleware = ConcurrencyLimitMiddleware(limit=1, queue_size=0)
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError):
+            await middleware(handler, make_message(), {})
+
+        assert middleware.active == 0
+        handler.side_effect = None
+        handler.return_value = "success"
+        assert await middleware(handler, make_message(), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_disabled(self) -> None:
+        """Тест: при отключении ограничение не применяется."""
+        middleware = ConcurrencyLimitMiddleware(limit=1, queue_size=0, enabled=False)
+        handler = SlowHandler()
+
+        tasks = [asyncio.create_task(middleware(handler, make_message(), {})) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert handler.running == 3
+        handler.release.set()
+        await asyncio.gather(*tasks)
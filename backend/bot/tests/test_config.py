@@ -75,3 +75,43 @@ class TestConfig:
         assert config.retry_attempts == 3
         # Проверяем БД поля
         assert config.db_password == "test_password"
+
+    def test_token_rate_limit_disabled_by_default(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Тест: лимит по токенам LLM выключен, если не включён явно.
+
+        Args:
+            monkeypatch: Fixture для изменения переменных окружения
+        """
+        monkeypatch.setenv("TELEGRAM_TOKEN", "test_token_123")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test_api_key_456")
+        monkeypatch.setenv("DB_PASSWORD", "test_password")
+        monkeypatch.delenv("TOKEN_RATE_LIMIT_ENABLED", raising=False)
+
+        config = Config(_env_file=None)  # type: ignore[call-arg]
+
+        assert config.token_rate_limit_enabled is False
+
+    def test_webhook_without_secret_warns(
+        self, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """
+        Тест: webhook режим без WEBHOOK_SECRET логирует предупреждение.
+
+        Args:
+            monkeypatch: Fixture для изменения переменных окружения
+            caplog: Fixture для перехвата логов
+        """
+        monkeypatch.setenv("TELEGRAM_TOKEN", "test_token_123")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test_api_key_456")
+        monkeypatch.setenv("DB_PASSWORD", "test_password")
+        monkeypatch.delenv("WEBHOOK_SECRET", raising=False)
+
+        with caplog.at_level("WARNING", logger="src.config"):
+            Config(_env_file=None, bot_mode="webhook")  # type: ignore[call-arg]
+            assert "WEBHOOK_SECRET is not set" in caplog.text
+
+            caplog.clear()
+            Config(_env_file=None, bot_mode="webhook", webhook_secret="s3cret")  # type: ignore[call-arg]
+            Config(_env_file=None, bot_mode="polling")  # type: ignore[call-arg]
+            assert "WEBHOOK_SECRET" not in caplog.text
@@ -0,0 +1,148 @@
+"""Тесты для модуля ContextBuilder."""
+
+from src.config import Config
+from src.context_builder import MESSAGE_TOKEN_OVERHEAD, SUMMARY_PREFIX, ContextBuilder
+
+
+class TestContextBuilder:
+    """Тесты класса ContextBuilder."""
+
+    def test_estimate_tokens_uses_chars_per_token(self, test_config: Config) -> None:
+        """
+        Тест: оценка токенов по количеству символов.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.context_chars_per_token = 3.0
+        builder = ContextBuilder(test_config)
+
+        tokens = builder.estimate_tokens({"role": "user", "content": "a" * 30})
+
+        assert tokens == 10 + MESSAGE_TOKEN_OVERHEAD
+
+    def test_estimate_tokens_cached_by_id(self, test_config: Config) -> None:
+        """
+        Тест: оценка токенов кешируется по ID сообщения.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        builder = ContextBuilder(test_config)
+        message = {"id": "msg-1", "role": "user", "content": "a" * 30}
+
+        first = builder.estimate_tokens(message)
+        # Содержимое сохранённого сообщения не меняется - используется кеш
+        message["content"] = "a" * 300
+        second = builder.estimate_tokens(message)
+
+        assert first == second
+        assert builder.token_cache["msg-1"] == first
+
+    def test_build_keeps_everything_within_budget(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: короткий диалог целиком помещается в бюджет.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        builder = ContextBuilder(test_config)
+
+        context = builder.build(sample_messages)
+
+        assert context == sample_messages
+
+    def test_build_drops_oldest_messages_over_budget(self, test_config: Config) -> None:
+        """
+        Тест: старые сообщения отбрасываются, системный промпт сохраняется.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.context_token_budget = 100
+        test_config.context_chars_per_token = 1.0
+        builder = ContextBuilder(test_config)
+
+        history = [
+            {"role": "system", "content": "s" * 10},
+            {"role": "user", "content": "old" * 20},
+            {"role": "assistant", "content": "a" * 30},
+            {"role": "user", "content": "new" * 10},
+        ]
+
+        context = builder.build(history)
+
+        # system (14) + new (34) + assistant (34) = 82; old (64) не помещается
+        assert [msg["content"] for msg in context] == [
+            "s" * 10,
+            "a" * 30,
+            "new" * 10,
+        ]
+
+    def test_build_always_includes_last_message(self, test_config: Config) -> None:
+        """
+        Тест: последнее сообщение включается даже при превышении бюджета.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.context_token_budget = 100
+        test_config.context_chars_per_token = 1.0
+        builder = ContextBuilder(test_config)
+
+        history = [
+            {"role": "system", "content": "system"},
+            {"role": "user", "content": "x" * 500},
+        ]
+
+        context = builder.build(history)
+
+        assert len(context) == 2
+        assert context[-1]["content"] == "x" * 500
+
+    def test_build_prepends_system_prompt_when_missing(self, test_config: Config) -> None:
+        """
+        Тест: системный промпт добавляется, если он не попал в окно истории.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        builder = ContextBuilder(test_config)
+        history = [{"role": "user", "content": "Привет"}]
+
+        context = builder.build(history, system_prompt="Ты помощник")
+
+        assert context[0] == {"role": "system", "content": "Ты помощник"}
+        assert context[1]["content"] == "Привет"
+        # Исходная история не изменяется
+        assert len(history) == 1
+
+    def test_build_pins_summary_as_system_message(self, test_config: Config) -> None:
+        """
+        Тест: summary всегда включается в контекст как системное сообщение.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.context_token_budget = 100
+        test_config.context_chars_per_token = 1.0
+        builder = ContextBuilder(test_config)
+
+        history = [
+            {"role": "system", "content": "system"},
+            {"role": "summary", "content": "Пользователь изучает Python"},
+            {"role": "user", "content": "x" * 60},
+            {"role": "assistant", "content": "y" * 40},
+        ]
+
+        context = builder.build(history)
+
+        assert context[1] == {
+            "role": "system",
+            "content": SUMMARY_PREFIX + "Пользователь изучает Python",
+        }
+        # Бюджет исчерпан summary и последним сообщением
+        assert [msg["content"] for msg in context[2:]] == ["y" * 40]
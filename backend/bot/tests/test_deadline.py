@@ -0,0 +1,41 @@
+"""Тесты для модуля Deadline."""
+
+import time
+
+import pytest
+
+from src.deadline import Deadline, DeadlineExceededError
+
+
+class TestDeadline:
+    """Тесты класса Deadline."""
+
+    def test_remaining_and_allows(self) -> None:
+        """Тест: оставшееся время и проверка задержки."""
+        deadline = Deadline(10.0)
+
+        assert 9.0 < deadline.remaining() <= 10.0
+        assert deadline.expired is False
+        assert deadline.allows(5.0) is True
+        assert deadline.allows(20.0) is False
+
+    def test_expired(self) -> None:
+        """Тест: бюджет исчерпан после истечения времени."""
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+
+        assert deadline.expired is True
+        assert deadline.remaining() == 0.0
+        assert deadline.elapsed() >= 0.02
+
+    def test_check_raises_when_expired(self) -> None:
+        """Тест: check выбрасывает исключение с названием операции."""
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+
+        with pytest.raises(DeadlineExceededError, match="before LLM request"):
+            deadline.check("LLM request")
+
+    def test_check_passes_within_budget(self) -> None:
+        """Тест: check не выбрасывает исключение в пределах бюджета."""
+        Deadline(10.0).check("LLM request")
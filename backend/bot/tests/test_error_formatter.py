@@ -21,6 +21,15 @@ def test_timeout_error() -> None:
     assert "⏱️" in result
 
 
+def test_deadline_error() -> None:
+    """Тест: форматирование ошибки исчерпания бюджета времени на ответ."""
+    error = "Reply deadline exceeded: Deadline of 90.0s leaves no time for retry in 2.00s"
+    result = get_error_message(error)
+
+    assert "отведённое время" in result
+    assert "⏱️" in result
+
+
 def test_connection_error() -> None:
     """Тест: форматирование ошибки connection."""
     error = "Connection refused to API server"
@@ -0,0 +1,161 @@
+"""Тесты для модуля HTTP транспорта LLM клиента."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import Config
+from src.http_client import NEW_CONNECTION_EVENT, ConnectionStats, create_http_client
+from src.llm_client import LLMClient
+
+
+@pytest.fixture
+async def slow_server() -> AsyncGenerator[str, None]:
+    """
+    Локальный HTTP сервер, отвечающий на HEAD с задержкой.
+
+    Задержка удерживает соединение занятым, поэтому параллельные
+    запросы по HTTP/1.1 открывают отдельные соединения.
+
+    Yields:
+        Базовый URL сервера
+    """
+
+    async def handle(_request: web.Request) -> web.Response:
+        await asyncio.sleep(0.05)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_route("HEAD", "/v1", handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield str(server.make_url("/v1"))
+    await server.close()
+
+
+class TestConnectionStats:
+    """Тесты класса ConnectionStats."""
+
+    def test_reuse_rate_without_requests(self) -> None:
+        """Тест: без запросов доля переиспользования равна 0."""
+        assert ConnectionStats().reuse_rate == 0.0
+
+    def test_reuse_rate(self) -> None:
+        """Тест: доля запросов по уже открытым соединениям."""
+        stats = ConnectionStats(requests=10, new_connections=2)
+
+        assert stats.reuse_rate == pytest.approx(0.8)
+
+    @pytest.mark.asyncio
+    async def test_on_request_counts_new_connections(self) -> None:
+        """Тест: event hook считает запросы, trace - новые соединения."""
+        stats = ConnectionStats()
+        request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+
+        await stats.on_request(request)
+        trace = request.extensions["trace"]
+        await trace("connection.connect_tcp.started", {})
+        await trace(NEW_CONNECTION_EVENT, {"return_value": None})
+        await stats.on_request(httpx.Request("POST", "https://openrouter.ai/api/v1/chat"))
+
+        assert stats.requests == 2
+        assert stats.new_connections == 1
+        assert stats.reuse_rate == pytest.approx(0.5)
+
+
+class TestCreateHttpClient:
+    """Тесты функции create_http_client."""
+
+    @pytest.mark.asyncio
+    async def test_timeouts_from_config(self, test_config: Config) -> None:
+        """
+        Тест: таймауты по фазам берутся из конфигурации.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_connect_timeout = 3.0
+        test_config.llm_read_timeout = 45.0
+        test_config.llm_write_timeout = 7.0
+        test_config.llm_pool_timeout = 2.0
+
+        client = create_http_client(test_config, ConnectionStats())
+
+        assert client.timeout == httpx.Timeout(connect=3.0, read=45.0, write=7.0, pool=2.0)
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_request_hook_installed(self, test_config: Config) -> None:
+        """
+        Тест: запросы клиента учитываются в статистике соединений.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        stats = ConnectionStats()
+        client = create_http_client(test_config, stats)
+        client._transport = httpx.MockTransport(lambda _request: httpx.Response(200))
+
+        await client.head("https://openrouter.ai/api/v1")
+
+        assert stats.requests == 1
+        await client.aclose()
+
+
+class TestWarmupConnections:
+    """Тесты количества соединений, открываемых прогревом LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_http1_warms_configured_connections(
+        self, test_config: Config, slow_server: str
+    ) -> None:
+        """
+        Тест: по HTTP/1.1 прогрев открывает llm_warmup_connections соединений.
+
+        Args:
+            test_config: Тестовая конфигурация
+            slow_server: URL локального сервера
+        """
+        config = test_config.model_copy(
+            update={
+                "openrouter_base_url": slow_server,
+                "llm_http2": False,
+                "llm_warmup_connections": 3,
+            }
+        )
+        llm_client = LLMClient(config)
+
+        await llm_client.warmup()
+
+        assert llm_client.connection_stats.new_connections == 3
+        await llm_client.close()
+
+    @pytest.mark.asyncio
+    async def test_http2_warms_single_connection(
+        self, test_config: Config, slow_server: str
+    ) -> None:
+        """
+        Тест: по HTTP/2 прогревается одно соединение (запросы мультиплексируются).
+
+        Args:
+            test_config: Тестовая конфигурация
+            slow_server: URL локального сервера
+        """
+        config = test_config.model_copy(
+            update={
+                "openrouter_base_url": slow_server,
+                "llm_http2": True,
+                "llm_warmup_connections": 3,
+            }
+        )
+        llm_client = LLMClient(config)
+
+        await llm_client.warmup()
+
+        assert llm_client.connection_stats.requests == 1
+        assert llm_client.connection_stats.new_connections == 1
+        await llm_client.close()
@@ -0,0 +1,87 @@
+"""Тесты для InFlightMiddleware."""
+
+import asyncio
+from typing import Any
+
+import pytest
+from aiogram.types import Update, User
+
+from src.middlewares.inflight import InFlightMiddleware
+
+
+class TestInFlightMiddleware:
+    """Тесты для InFlightMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_tracks_active_handlers(self) -> None:
+        """Тест: обновление учитывается, пока выполняется handler."""
+        middleware = InFlightMiddleware()
+        release = asyncio.Event()
+
+        async def handler(_event: Any, _data: dict[str, Any]) -> str:
+            await release.wait()
+            return "success"
+
+        task = asyncio.create_task(middleware(handler, Update(update_id=1), {}))
+        await asyncio.sleep(0)
+        assert middleware.active == 1
+
+        release.set()
+        assert await task == "success"
+        assert middleware.active == 0
+        assert middleware.completed == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_error_is_untracked(self) -> None:
+        """Тест: обновление перестаёт учитываться после ошибки handler."""
+        middleware = InFlightMiddleware()
+
+        async def handler(_event: Any, _data: dict[str, Any]) -> None:
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await middleware(handler, Update(update_id=1), {})
+
+        assert middleware.active == 0
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_completion(self) -> None:
+        """Тест: drain дожидается завершения handlers без отмены."""
+        middleware = InFlightMiddleware()
+
+        async def handler(_event: Any, _data: dict[str, Any]) -> None:
+            await asyncio.sleep(0.05)
+
+        tasks = [
+            asyncio.create_task(middleware(handler, Update(update_id=i), {})) for i in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        assert await middleware.drain(timeout=1.0) == []
+        assert all(task.done() and not task.cancelled() for task in tasks)
+
+    @pytest.mark.asyncio
+    async def test_drain_cancels_and_reports_after_timeout(self) -> None:
+        """Тест: по истечении timeout handlers отменяются и попадают в отчёт."""
+        middleware = InFlightMiddleware()
+        finished: list[int] = []
+
+        async def handler(event: Update, _data: dict[str, Any]) -> None:
+            try:
+                await asyncio.sleep(10)
+            finally:
+                finished.append(event.update_id)
+
+        user = User(id=42, is_bot=False, first_name="User")
+        task = asyncio.create_task(
+            middleware(handler, Update(update_id=7), {"event_from_user": user})
+        )
+        await asyncio.sleep(0)
+
+        abandoned = await middleware.drain(timeout=0.05)
+
+        assert abandoned == ["update 7 (user 42)"]
+        assert task.cancelled()
+        # Отменённый handler успел выполнить finally до возврата drain
+        assert finished == [7]
+        assert middleware.abandoned == 1
@@ -1,12 +1,19 @@
 """Тесты для модуля LLMClient."""
 
-from unittest.mock import AsyncMock, MagicMock
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
-from openai import APIConnectionError, APIError, RateLimitError
+from openai import APIConnectionError, APIError, APITimeoutError, RateLimitError
 
 from src.config import Config
+from src.deadline import Deadline
 from src.llm_client import LLMAPIError, LLMClient
+from src.telemetry import PURPOSE_SUMMARY, PURPOSE_TURN
 
 
 class TestLLMClient:
@@ -717,3 +724,654 @@ class TestLLMClientEdgeCases:
         # Проверяем что запрос прошел без ошибок
         assert response == "Это тестовый ответ от LLM."
         mock_openai_client.chat.completions.create.assert_called_once()
+
+
+class TestLLMClientPromptCaching:
+    """Тесты разметки промпта для кеширования у провайдера."""
+
+    def test_cache_control_on_system_prefix(self, test_config: Config) -> None:
+        """
+        Тест: длинный системный префикс размечается cache_control для Anthropic.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.prompt_cache_min_chars = 100
+        llm_client = LLMClient(test_config)
+        messages = [
+            {"role": "system", "content": "s" * 80},
+            {"role": "system", "content": "summary" * 10},
+            {"role": "user", "content": "Привет"},
+        ]
+
+        prepared = llm_client._prepare_messages(messages, "anthropic/claude-3.5-sonnet")
+
+        # Маркер ставится на последнее системное сообщение префикса
+        assert prepared[0] == messages[0]
+        assert prepared[1]["content"] == [
+            {
+                "type": "text",
+                "text": "summary" * 10,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        assert prepared[2] == messages[2]
+        # Исходные сообщения не изменяются
+        assert messages[1]["content"] == "summary" * 10
+
+    def test_no_cache_control_for_short_prefix(self, test_config: Config) -> None:
+        """
+        Тест: короткий системный промпт не размечается.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.prompt_cache_min_chars = 1000
+        llm_client = LLMClient(test_config)
+        messages = [{"role": "system", "content": "short"}, {"role": "user", "content": "Hi"}]
+
+        prepared = llm_client._prepare_messages(messages, "anthropic/claude-3.5-sonnet")
+
+        assert prepared == messages
+
+    def test_no_cache_control_for_auto_caching_models(self, test_config: Config) -> None:
+        """
+        Тест: модели с автоматическим кешированием не размечаются.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.prompt_cache_min_chars = 0
+        llm_client = LLMClient(test_config)
+        messages = [{"role": "system", "content": "s" * 5000}, {"role": "user", "content": "Hi"}]
+
+        assert llm_client._prepare_messages(messages, "openai/gpt-4o") == messages
+
+        test_config.prompt_cache_enabled = False
+        assert llm_client._prepare_messages(messages, "anthropic/claude-3.5-sonnet") == messages
+
+    def test_get_cached_tokens(self) -> None:
+        """Тест: извлечение кешированных токенов из usage."""
+        usage = MagicMock()
+        usage.prompt_tokens_details.cached_tokens = 1200
+        assert LLMClient._get_cached_tokens(usage) == 1200
+
+        usage.prompt_tokens_details = None
+        assert LLMClient._get_cached_tokens(usage) == 0
+
+    @pytest.mark.asyncio
+    async def test_generate_response_sends_prepared_messages(
+        self, test_config: Config, mock_openai_client: AsyncMock
+    ) -> None:
+        """
+        Тест: в API отправляются размеченные сообщения.
+
+        Args:
+            test_config: Тестовая конфигурация
+            mock_openai_client: Mock клиента OpenAI
+        """
+        test_config.prompt_cache_min_chars = 10
+        llm_client = LLMClient(test_config)
+        llm_client.client = mock_openai_client
+        messages = [{"role": "system", "content": "s" * 50}, {"role": "user", "content": "Hi"}]
+
+        await llm_client.generate_response(messages, 12345)
+
+        sent_messages = mock_openai_client.chat.completions.create.call_args.kwargs["messages"]
+        assert sent_messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+class TestLLMClientTelemetry:
+    """Тесты записи телеметрии LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_successful_turn_recorded(
+        self,
+        test_config: Config,
+        mock_openai_client: AsyncMock,
+        sample_messages: list[dict[str, str]],
+    ) -> None:
+        """
+        Тест: успешный ход записывается с токенами и задержкой.
+
+        Args:
+            test_config: Тестовая конфигурация
+            mock_openai_client: Mock клиента OpenAI
+            sample_messages: Примеры сообщений
+        """
+        recorder = MagicMock()
+        llm_client = LLMClient(test_config, usage_recorder=recorder)
+        llm_client.client = mock_openai_client
+
+        await llm_client.generate_response(sample_messages, 12345)
+
+        recorder.record.assert_called_once()
+        turn = recorder.record.call_args.args[0]
+        assert turn.user_id == 12345
+        assert turn.model == test_config.openrouter_model
+        assert turn.prompt_tokens == 50
+        assert turn.completion_tokens == 20
+        assert turn.retries == 0
+        assert turn.is_fallback is False
+        assert turn.success is True
+        assert turn.purpose == PURPOSE_TURN
+        assert turn.latency_ms >= 0
+
+    @pytest.mark.asyncio
+    async def test_usage_listeners_notified(
+        self,
+        test_config: Config,
+        mock_openai_client: AsyncMock,
+        sample_messages: list[dict[str, str]],
+    ) -> None:
+        """
+        Тест: подписчики получают фактический usage хода (без recorder).
+
+        Args:
+            test_config: Тестовая конфигурация
+            mock_openai_client: Mock клиента OpenAI
+            sample_messages: Примеры сообщений
+        """
+        listener = MagicMock()
+        llm_client = LLMClient(test_config)
+        llm_client.client = mock_openai_client
+        llm_client.add_usage_listener(listener)
+
+        await llm_client.generate_response(sample_messages, 12345)
+
+        listener.assert_called_once()
+        turn = listener.call_args.args[0]
+        assert turn.user_id == 12345
+        assert turn.prompt_tokens == 50
+        assert turn.completion_tokens == 20
+
+    @pytest.mark.asyncio
+    async def test_summary_purpose_recorded(
+        self,
+        test_config: Config,
+        mock_openai_client: AsyncMock,
+        sample_messages: list[dict[str, str]],
+    ) -> None:
+        """
+        Тест: назначение запроса передаётся в телеметрию.
+
+        Args:
+            test_config: Тестовая конфигурация
+            mock_openai_client: Mock клиента OpenAI
+            sample_messages: Примеры сообщений
+        """
+        recorder = MagicMock()
+        llm_client = LLMClient(test_config, usage_recorder=recorder)
+        llm_client.client = mock_openai_client
+
+        await llm_client.generate_response(sample_messages, 12345, purpose=PURPOSE_SUMMARY)
+
+        assert recorder.record.call_args.args[0].purpose == PURPOSE_SUMMARY
+
+    @pytest.mark.asyncio
+    async def test_fallback_turn_recorded(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: ход через fallback модель записывается с флагом и числом retry.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.openrouter_fallback_model = "cheap/model"
+        recorder = MagicMock()
+        llm_client = LLMClient(test_config, usage_recorder=recorder)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+        mock_choice = AsyncMock()
+        mock_choice.message.content = "Ответ"
+        mock_completion = AsyncMock()
+        mock_completion.choices = [mock_choice]
+        mock_completion.usage.prompt_tokens = 7
+        mock_completion.usage.completion_tokens = 3
+        mock_completion.usage.total_tokens = 10
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = [
+            RateLimitError("Rate limit", response=mock_response, body=None),
+            RateLimitError("Rate limit", response=mock_response, body=None),
+            RateLimitError("Rate limit", response=mock_response, body=None),
+            mock_completion,
+        ]
+        llm_client.client = mock_client
+
+        await llm_client.generate_response(sample_messages, 12345)
+
+        turn = recorder.record.call_args.args[0]
+        assert turn.model == "cheap/model"
+        assert turn.is_fallback is True
+        assert turn.retries == test_config.retry_attempts
+        assert turn.prompt_tokens == 7
+        assert turn.success is True
+
+    @pytest.mark.asyncio
+    async def test_failed_turn_recorded(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: неуспешный ход записывается с success=False.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.openrouter_fallback_model = None
+        recorder = MagicMock()
+        llm_client = LLMClient(test_config, usage_recorder=recorder)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = RateLimitError(
+            "Rate limit", response=mock_response, body=None
+        )
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError):
+            await llm_client.generate_response(sample_messages, 12345)
+
+        turn = recorder.record.call_args.args[0]
+        assert turn.success is False
+        assert turn.retries == test_config.retry_attempts - 1
+
+
+class TestLLMClientConnections:
+    """Тесты прогрева и закрытия соединений LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_warmup_sends_parallel_requests(self, test_config: Config) -> None:
+        """
+        Тест: прогрев выполняет заданное количество запросов к API.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_http2 = False
+        test_config.llm_warmup_connections = 3
+        llm_client = LLMClient(test_config)
+        llm_client.http_client.head = AsyncMock()  # type: ignore[method-assign]
+
+        await llm_client.warmup()
+
+        assert llm_client.http_client.head.await_count == 3
+        llm_client.http_client.head.assert_awaited_with(test_config.openrouter_base_url)
+
+    @pytest.mark.asyncio
+    async def test_warmup_errors_not_raised(self, test_config: Config) -> None:
+        """
+        Тест: ошибки прогрева не прерывают запуск.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        llm_client = LLMClient(test_config)
+        llm_client.http_client.head = AsyncMock(  # type: ignore[method-assign]
+            side_effect=ConnectionError("unreachable")
+        )
+
+        await llm_client.warmup()
+
+    @pytest.mark.asyncio
+    async def test_warmup_disabled(self, test_config: Config) -> None:
+        """
+        Тест: при выключенном прогреве запросы не выполняются.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_warmup_enabled = False
+        llm_client = LLMClient(test_config)
+        llm_client.http_client.head = AsyncMock()  # type: ignore[method-assign]
+
+        await llm_client.warmup()
+
+        llm_client.http_client.head.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_close_closes_http_client(self, test_config: Config) -> None:
+        """
+        Тест: close закрывает общий HTTP клиент.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        llm_client = LLMClient(test_config)
+
+        await llm_client.close()
+
+        assert llm_client.http_client.is_closed
+
+
+class TestLLMClientModelPool:
+    """Тесты маршрутизации LLMClient по пулу моделей."""
+
+    @pytest.mark.asyncio
+    async def test_failover_along_pool(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: при сбое запрос переходит по пулу до успешной модели.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_attempts = 1
+        test_config.llm_model_pool = {"a": 1.0, "b": 0.0, "c": 0.0}
+        llm_client = LLMClient(test_config)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+        mock_choice = AsyncMock()
+        mock_choice.message.content = "Ответ от c"
+        mock_completion = AsyncMock()
+        mock_completion.choices = [mock_choice]
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = [
+            RateLimitError("Rate limit", response=mock_response, body=None),
+            RateLimitError("Rate limit", response=mock_response, body=None),
+            mock_completion,
+        ]
+        llm_client.client = mock_client
+
+        response = await llm_client.generate_response(sample_messages, 12345)
+
+        assert response == "Ответ от c"
+        models = [
+            call.kwargs["model"] for call in mock_client.chat.completions.create.call_args_list
+        ]
+        assert models == ["a", "b", "c"]
+        assert llm_client.router.stats["a"].error_rate > 0
+        assert llm_client.router.stats["c"].latency is not None
+
+    @pytest.mark.asyncio
+    async def test_all_models_failed(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: при сбое всех моделей ошибка содержит причины по каждой модели.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_attempts = 1
+        test_config.llm_model_pool = {"a": 1.0, "b": 0.0}
+        llm_client = LLMClient(test_config)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = RateLimitError(
+            "Rate limit", response=mock_response, body=None
+        )
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError) as exc_info:
+            await llm_client.generate_response(sample_messages, 12345)
+
+        assert "All models failed" in str(exc_info.value)
+        assert "a: Rate limit exceeded" in str(exc_info.value)
+        assert "b: Rate limit exceeded" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_no_failover_on_timeout(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: timeout не приводит к переходу на другую модель.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_attempts = 1
+        test_config.llm_model_pool = {"a": 1.0, "b": 0.0}
+        llm_client = LLMClient(test_config)
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = APITimeoutError(request=MagicMock())
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError, match="Request timeout"):
+            await llm_client.generate_response(sample_messages, 12345)
+
+        assert mock_client.chat.completions.create.call_count == 1
+
+
+class TestLLMClientDeadline:
+    """Тесты соблюдения deadline в LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_retry_delay_beyond_deadline_fails_fast(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: retry не выполняется, если задержка не укладывается в deadline.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_delay = 1.0
+        test_config.openrouter_fallback_model = "cheap/model"
+        recorder = MagicMock()
+        llm_client = LLMClient(test_config, usage_recorder=recorder)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = RateLimitError(
+            "Rate limit", response=mock_response, body=None
+        )
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError, match="deadline"):
+            await llm_client.generate_response(sample_messages, 12345, deadline=Deadline(0.5))
+
+        assert mock_client.chat.completions.create.call_count == 1
+        assert recorder.record.call_args.args[0].success is False
+
+    @pytest.mark.asyncio
+    async def test_slow_request_cut_by_deadline(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: запрос прерывается по истечении оставшегося бюджета.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        llm_client = LLMClient(test_config)
+
+        async def slow_create(**_: object) -> None:
+            await asyncio.sleep(5)
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = slow_create
+        llm_client.client = mock_client
+
+        start = time.monotonic()
+        with pytest.raises(LLMAPIError, match="deadline"):
+            await llm_client.generate_response(sample_messages, 12345, deadline=Deadline(0.1))
+
+        assert time.monotonic() - start < 1.0
+        assert mock_client.chat.completions.create.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_no_failover_after_deadline(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: переход на fallback не выполняется после исчерпания deadline.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_attempts = 1
+        test_config.openrouter_fallback_model = "cheap/model"
+        llm_client = LLMClient(test_config)
+
+        mock_response = MagicMock()
+        mock_response.request = MagicMock()
+
+        async def slow_rate_limit(**_: object) -> None:
+            await asyncio.sleep(0.05)
+            raise RateLimitError("Rate limit", response=mock_response, body=None)
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = slow_rate_limit
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError, match="deadline"):
+            await llm_client.generate_response(sample_messages, 12345, deadline=Deadline(0.02))
+
+        assert mock_client.chat.completions.create.call_count == 1
+
+
+def make_rate_limit_error(headers: dict[str, str] | None = None) -> RateLimitError:
+    """
+    Создаёт RateLimitError с реальным HTTP ответом 429.
+
+    Args:
+        headers: Заголовки ответа (например, retry-after)
+
+    Returns:
+        Исключение RateLimitError
+    """
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return RateLimitError("Rate limit", response=response, body=None)
+
+
+class TestLLMClientRetryPolicy:
+    """Тесты политики повторов LLMClient (Retry-After, бюджет retry)."""
+
+    def test_get_retry_after(self) -> None:
+        """Тест: разбор заголовков retry-after-ms, retry-after и HTTP-date."""
+        assert LLMClient._get_retry_after(make_rate_limit_error()) is None
+        assert LLMClient._get_retry_after(make_rate_limit_error({"retry-after": "3"})) == 3.0
+        assert LLMClient._get_retry_after(make_rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+        assert (
+            LLMClient._get_retry_after(
+                make_rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+            )
+            == 0.0
+        )
+        assert LLMClient._get_retry_after(make_rate_limit_error({"retry-after": "soon"})) is None
+
+    def test_get_retry_after_http_date_without_zone(self) -> None:
+        """Тест: HTTP-date с зоной -0000 (naive datetime) трактуется как UTC."""
+        retry_at = datetime.now(UTC) + timedelta(seconds=30)
+        header = format_datetime(retry_at.replace(tzinfo=None))
+
+        assert header.endswith("-0000")
+        delay = LLMClient._get_retry_after(make_rate_limit_error({"retry-after": header}))
+        assert delay == pytest.approx(30.0, abs=2.0)
+
+    @pytest.mark.asyncio
+    async def test_retry_honors_retry_after_with_jitter(
+        self,
+        test_config: Config,
+        mock_openai_client: AsyncMock,
+        sample_messages: list[dict[str, str]],
+    ) -> None:
+        """
+        Тест: задержка retry берётся из Retry-After с добавлением jitter.
+
+        Args:
+            test_config: Тестовая конфигурация
+            mock_openai_client: Mock клиента OpenAI
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_jitter = 0.25
+        llm_client = LLMClient(test_config)
+        success = mock_openai_client.chat.completions.create.return_value
+        mock_openai_client.chat.completions.create.side_effect = [
+            make_rate_limit_error({"retry-after": "2"}),
+            success,
+        ]
+        llm_client.client = mock_openai_client
+
+        with patch("src.llm_client.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+            await llm_client.generate_response(sample_messages, 12345)
+
+        delay = mock_sleep.await_args.args[0]
+        assert 2.0 <= delay <= 2.5
+
+    @pytest.mark.asyncio
+    async def test_long_retry_after_not_waited(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: слишком долгий Retry-After не ожидается, запрос переходит на fallback.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_after_max = 10.0
+        test_config.openrouter_fallback_model = "cheap/model"
+        llm_client = LLMClient(test_config)
+
+        mock_choice = AsyncMock()
+        mock_choice.message.content = "Ответ"
+        mock_completion = AsyncMock()
+        mock_completion.choices = [mock_choice]
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = [
+            make_rate_limit_error({"retry-after": "120"}),
+            mock_completion,
+        ]
+        llm_client.client = mock_client
+
+        response = await llm_client.generate_response(sample_messages, 12345)
+
+        assert response == "Ответ"
+        models = [
+            call.kwargs["model"] for call in mock_client.chat.completions.create.call_args_list
+        ]
+        assert models == [test_config.openrouter_model, "cheap/model"]
+
+    @pytest.mark.asyncio
+    async def test_retry_budget_exhausted_fails_fast(
+        self, test_config: Config, sample_messages: list[dict[str, str]]
+    ) -> None:
+        """
+        Тест: при исчерпании бюджета retry запрос не повторяется.
+
+        Args:
+            test_config: Тестовая конфигурация
+            sample_messages: Примеры сообщений
+        """
+        test_config.retry_budget_min_retries = 0
+        test_config.retry_budget_ratio = 0.0
+        llm_client = LLMClient(test_config)
+
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create.side_effect = make_rate_limit_error()
+        llm_client.client = mock_client
+
+        with pytest.raises(LLMAPIError, match="Rate limit exceeded"):
+            await llm_client.generate_response(sample_messages, 12345)
+
+        assert mock_client.chat.completions.create.call_count == 1
+
+    def test_sdk_retries_disabled(self, test_config: Config) -> None:
+        """
+        Тест: встроенные повторы SDK отключены (повторами управляет LLMClient).
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        assert LLMClient(test_config).client.max_retries == 0
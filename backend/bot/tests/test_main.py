@@ -0,0 +1,51 @@
+"""Тесты для точки входа приложения."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src import main
+
+
+@pytest.mark.usefixtures("test_config")
+class TestMainAsync:
+    """Тесты функции main_async (переменные окружения из фикстуры test_config)."""
+
+    @pytest.mark.asyncio
+    async def test_cli_overrides_select_sharded_mode(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Тест: --mode и --workers переопределяют конфигурацию.
+
+        Args:
+            monkeypatch: Fixture для подмены запуска
+        """
+        run_sharded = AsyncMock()
+        monkeypatch.setattr(main, "run_sharded", run_sharded)
+        monkeypatch.setattr(main, "run_bot", AsyncMock())
+
+        await main.main_async(None, mode="webhook", workers=3)
+
+        config = run_sharded.call_args.args[0]
+        assert config.bot_mode == "webhook"
+        assert config.scale_workers == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("workers", [0, 65])
+    async def test_cli_overrides_validated(
+        self, monkeypatch: pytest.MonkeyPatch, workers: int
+    ) -> None:
+        """
+        Тест: недопустимое --workers отклоняется валидацией Config.
+
+        Args:
+            monkeypatch: Fixture для подмены запуска
+            workers: Количество worker вне диапазона 1..64
+        """
+        run_sharded = AsyncMock()
+        monkeypatch.setattr(main, "run_sharded", run_sharded)
+        monkeypatch.setattr(main, "run_bot", AsyncMock())
+
+        with pytest.raises(SystemExit):
+            await main.main_async(None, mode="webhook", workers=workers)
+
+        run_sharded.assert_not_called()
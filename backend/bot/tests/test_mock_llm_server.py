@@ -0,0 +1,278 @@
+"""Тесты для mock LLM сервера и работы LLMClient через него."""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+
+import httpx
+import pytest
+from aiohttp.test_utils import TestServer
+
+from scripts.mock_llm_server import FAULT_HEADER, MockLLMServer, MockLLMSettings
+from src.config import Config
+from src.llm_client import LLMAPIError, LLMClient
+
+ServerFactory = Callable[[MockLLMSettings], Awaitable[tuple[MockLLMServer, str]]]
+
+
+@pytest.fixture
+async def start_mock_server() -> AsyncGenerator[ServerFactory, None]:
+    """
+    Фабрика mock LLM серверов на случайном локальном порту.
+
+    Yields:
+        Функция (settings) -> (сервер, base_url для OPENROUTER_BASE_URL)
+    """
+    servers: list[TestServer] = []
+
+    async def factory(settings: MockLLMSettings) -> tuple[MockLLMServer, str]:
+        mock = MockLLMServer(settings)
+        server = TestServer(mock.create_app())
+        await server.start_server()
+        servers.append(server)
+        return mock, str(server.make_url("/v1"))
+
+    yield factory
+
+    for server in servers:
+        await server.close()
+
+
+def make_client(config: Config, base_url: str, **overrides: object) -> LLMClient:
+    """
+    Создаёт LLMClient, направленный на mock сервер.
+
+    Args:
+        config: Тестовая конфигурация
+        base_url: Адрес mock сервера
+        **overrides: Переопределения полей конфигурации
+
+    Returns:
+        LLMClient
+    """
+    settings = {"openrouter_base_url": base_url, "llm_http2": False, **overrides}
+    return LLMClient(config.model_copy(update=settings))
+
+
+class TestMockLLMServer:
+    """Тесты HTTP API mock сервера."""
+
+    @pytest.mark.asyncio
+    async def test_chat_completion_returns_usage(self, start_mock_server: ServerFactory) -> None:
+        """
+        Тест: обычный ответ содержит сообщение и usage.
+
+        Args:
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(
+            MockLLMSettings(latency_ms=0, completion_tokens=5, tokens_per_second=1000)
+        )
+
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{base_url}/chat/completions",
+                json={"model": "m1", "messages": [{"role": "user", "content": "a" * 40}]},
+            )
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["model"] == "m1"
+        assert data["choices"][0]["message"]["content"] == "tok0 tok1 tok2 tok3 tok4"
+        assert data["usage"] == {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        assert mock.stats.requests == 1
+        assert mock.stats.by_model == {"m1": 1}
+
+    @pytest.mark.asyncio
+    async def test_streaming_response(self, start_mock_server: ServerFactory) -> None:
+        """
+        Тест: streaming ответ приходит чанками SSE и завершается [DONE].
+
+        Args:
+            start_mock_server: Фабрика mock серверов
+        """
+        _, base_url = await start_mock_server(
+            MockLLMSettings(latency_ms=0, completion_tokens=3, tokens_per_second=1000)
+        )
+
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{base_url}/chat/completions",
+                json={
+                    "model": "m1",
+                    "messages": [{"role": "user", "content": "hi"}],
+                    "stream": True,
+                    "stream_options": {"include_usage": True},
+                },
+            )
+
+        events = [line[6:] for line in response.text.splitlines() if line.startswith("data: ")]
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert events[-1] == "[DONE]"
+        # role + 3 токена + finish + usage
+        assert len(events) == 7
+        assert '"completion_tokens": 3' in events[-2]
+
+    @pytest.mark.asyncio
+    async def test_forced_429_has_retry_after(self, start_mock_server: ServerFactory) -> None:
+        """
+        Тест: заголовок X-Mock-Fault вызывает 429 с Retry-After.
+
+        Args:
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(MockLLMSettings(retry_after=2))
+
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{base_url}/chat/completions",
+                json={"model": "m1", "messages": []},
+                headers={FAULT_HEADER: "429"},
+            )
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+        assert mock.stats.errors_429 == 1
+
+    def test_latency_distributions_reproducible_with_seed(self) -> None:
+        """Тест: задержки воспроизводимы при одинаковом seed и не отрицательны."""
+        for distribution in ("fixed", "uniform", "normal", "lognormal", "exponential"):
+            settings = MockLLMSettings(
+                latency_distribution=distribution, latency_ms=100, latency_jitter_ms=200, seed=7
+            )
+            server_a = MockLLMServer(settings)
+            server_b = MockLLMServer(settings)
+            samples_a = [server_a.sample_latency("m") for _ in range(20)]
+            samples_b = [server_b.sample_latency("m") for _ in range(20)]
+
+            assert samples_a == samples_b
+            assert all(s >= 0 for s in samples_a)
+
+    def test_model_latency_override(self) -> None:
+        """Тест: задержка модели берётся из model_latency_ms."""
+        server = MockLLMServer(MockLLMSettings(latency_ms=100, model_latency_ms={"slow": 900}))
+
+        assert server.sample_latency("slow") == pytest.approx(0.9)
+        assert server.sample_latency("other") == pytest.approx(0.1)
+
+    def test_invalid_distribution_raises(self) -> None:
+        """Тест: неизвестное распределение задержки вызывает ValueError."""
+        with pytest.raises(ValueError, match="Invalid latency distribution"):
+            MockLLMServer(MockLLMSettings(latency_distribution="pareto"))
+
+
+class TestLLMClientWithMockServer:
+    """Тесты LLMClient против mock сервера (реальный HTTP)."""
+
+    @pytest.mark.asyncio
+    async def test_generate_response(
+        self, test_config: Config, start_mock_server: ServerFactory
+    ) -> None:
+        """
+        Тест: LLMClient получает ответ от mock сервера через OPENROUTER_BASE_URL.
+
+        Args:
+            test_config: Тестовая конфигурация
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(
+            MockLLMSettings(latency_ms=0, completion_tokens=2, tokens_per_second=1000)
+        )
+        client = make_client(test_config, base_url)
+
+        try:
+            response = await client.generate_response(
+                [{"role": "user", "content": "Привет"}], user_id=1
+            )
+        finally:
+            await client.close()
+
+        assert response == "tok0 tok1"
+        assert mock.stats.by_model == {test_config.openrouter_model: 1}
+
+    @pytest.mark.asyncio
+    async def test_retries_on_injected_429(
+        self, test_config: Config, start_mock_server: ServerFactory
+    ) -> None:
+        """
+        Тест: при постоянных 429 клиент делает retry_attempts попыток на модель.
+
+        Args:
+            test_config: Тестовая конфигурация
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(MockLLMSettings(error_429_rate=1.0, retry_after=0))
+        client = make_client(
+            test_config,
+            base_url,
+            retry_attempts=3,
+            retry_delay=0.01,
+            openrouter_fallback_model=None,
+        )
+
+        try:
+            with pytest.raises(LLMAPIError, match="Rate limit exceeded"):
+                await client.generate_response([{"role": "user", "content": "Привет"}], user_id=1)
+        finally:
+            await client.close()
+
+        assert mock.stats.errors_429 == 3
+
+    @pytest.mark.asyncio
+    async def test_fallback_on_500(
+        self, test_config: Config, start_mock_server: ServerFactory
+    ) -> None:
+        """
+        Тест: при ошибках 500 основной модели клиент переходит на fallback модель.
+
+        Args:
+            test_config: Тестовая конфигурация
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(MockLLMSettings(error_500_rate=1.0))
+        client = make_client(
+            test_config,
+            base_url,
+            retry_attempts=1,
+            openrouter_fallback_model="mock/fallback",
+        )
+
+        try:
+            with pytest.raises(LLMAPIError, match="All models failed"):
+                await client.generate_response([{"role": "user", "content": "Привет"}], user_id=1)
+        finally:
+            await client.close()
+
+        assert mock.stats.by_model == {test_config.openrouter_model: 1, "mock/fallback": 1}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_overlap(
+        self, test_config: Config, start_mock_server: ServerFactory
+    ) -> None:
+        """
+        Тест: параллельные запросы выполняются конкурентно (общее время ~ одной задержки).
+
+        Args:
+            test_config: Тестовая конфигурация
+            start_mock_server: Фабрика mock серверов
+        """
+        mock, base_url = await start_mock_server(
+            MockLLMSettings(latency_ms=200, completion_tokens=1, tokens_per_second=1000)
+        )
+        client = make_client(test_config, base_url)
+
+        try:
+            start = time.monotonic()
+            responses = await asyncio.gather(
+                *(
+                    client.generate_response([{"role": "user", "content": "Привет"}], user_id=i)
+                    for i in range(10)
+                )
+            )
+            elapsed = time.monotonic() - start
+        finally:
+            await client.close()
+
+        assert len(responses) == 10
+        assert mock.stats.requests == 10
+        assert elapsed < 1.5
@@ -0,0 +1,114 @@
+"""Тесты для модуля ModelRouter."""
+
+import random
+
+import pytest
+
+from src.config import Config
+from src.model_router import ModelRouter
+
+
+class TestModelRouter:
+    """Тесты класса ModelRouter."""
+
+    def test_default_pool_from_primary_and_fallback(self, test_config: Config) -> None:
+        """
+        Тест: без пула используются основная модель и fallback только для failover.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.openrouter_model = "primary/model"
+        test_config.openrouter_fallback_model = "fallback/model"
+
+        router = ModelRouter(test_config)
+
+        assert router.weights == {"primary/model": 1.0, "fallback/model": 0.0}
+        # Fallback не выбирается первым даже при лучшей статистике
+        router.record_success("fallback/model", 0.1)
+        router.record_success("primary/model", 10.0)
+        assert router.route() == ["primary/model", "fallback/model"]
+
+    def test_explicit_model_first(self, test_config: Config) -> None:
+        """
+        Тест: явно указанная модель идёт первой, остальные - в порядке пула.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_model_pool = {"a": 1.0, "b": 1.0, "c": 0.0}
+        router = ModelRouter(test_config)
+
+        assert router.route("b") == ["b", "a", "c"]
+        assert router.route("other") == ["other", "a", "b", "c"]
+
+    def test_ewma_updates(self, test_config: Config) -> None:
+        """
+        Тест: EWMA задержки и доли ошибок.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_model_pool = {"a": 1.0}
+        test_config.llm_router_ewma_alpha = 0.5
+        router = ModelRouter(test_config)
+
+        router.record_success("a", 2.0)
+        router.record_success("a", 4.0)
+        router.record_failure("a")
+
+        assert router.stats["a"].latency == pytest.approx(3.0)
+        assert router.stats["a"].error_rate == pytest.approx(0.5)
+
+        router.record_success("a", 3.0)
+        assert router.stats["a"].error_rate == pytest.approx(0.25)
+
+    def test_routes_away_from_slow_model(self, test_config: Config) -> None:
+        """
+        Тест: медленная модель выбирается первой значительно реже.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_model_pool = {"fast": 1.0, "slow": 1.0}
+        router = ModelRouter(test_config, rng=random.Random(42))
+        router.record_success("fast", 1.0)
+        router.record_success("slow", 10.0)
+
+        first_choices = [router.route()[0] for _ in range(1000)]
+
+        assert first_choices.count("fast") > 850
+        # Вторая модель остаётся в списке для failover
+        assert set(router.route()) == {"fast", "slow"}
+
+    def test_routes_away_from_failing_model(self, test_config: Config) -> None:
+        """
+        Тест: модель с высокой долей ошибок выбирается реже.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_model_pool = {"a": 1.0, "b": 1.0}
+        router = ModelRouter(test_config, rng=random.Random(42))
+        router.record_success("a", 1.0)
+        router.record_success("b", 1.0)
+        for _ in range(5):
+            router.record_failure("b")
+
+        first_choices = [router.route()[0] for _ in range(1000)]
+
+        assert first_choices.count("a") > 700
+
+    def test_weights_spread_load(self, test_config: Config) -> None:
+        """
+        Тест: при равной задержке нагрузка распределяется по весам.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.llm_model_pool = {"a": 3.0, "b": 1.0}
+        router = ModelRouter(test_config, rng=random.Random(42))
+
+        first_choices = [router.route()[0] for _ in range(4000)]
+
+        assert 2700 < first_choices.count("a") < 3300
@@ -0,0 +1,295 @@
+"""Тесты для очереди исходящих сообщений Telegram."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from src.config import Config
+from src.outbound import (
+    PRIORITY_CONTINUATION,
+    PRIORITY_REPLY,
+    OutboundQueue,
+    TokenBucket,
+    answer,
+)
+
+
+def make_queue(config: Config, **overrides: object) -> OutboundQueue:
+    """
+    Создаёт очередь с переопределёнными лимитами.
+
+    Args:
+        config: Тестовая конфигурация
+        **overrides: Переопределения полей конфигурации
+
+    Returns:
+        OutboundQueue
+    """
+    return OutboundQueue(config.model_copy(update=overrides))
+
+
+class TestTokenBucket:
+    """Тесты класса TokenBucket."""
+
+    def test_burst_then_rate(self) -> None:
+        """Тест: после исчерпания всплеска задержка определяется скоростью."""
+        bucket = TokenBucket(rate=10.0, burst=2)
+        now = time.monotonic()
+
+        for _ in range(2):
+            assert bucket.delay(now) == 0.0
+            bucket.consume(now)
+
+        assert bucket.delay(now) == pytest.approx(0.1, abs=1e-3)
+        assert bucket.delay(now + 0.11) == 0.0
+
+    def test_is_full_after_refill(self) -> None:
+        """Тест: bucket считается полным после восстановления всех токенов."""
+        bucket = TokenBucket(rate=10.0, burst=2)
+        now = time.monotonic()
+        bucket.consume(now)
+
+        assert not bucket.is_full(now)
+        assert bucket.is_full(now + 0.2)
+
+
+class TestOutboundQueue:
+    """Тесты класса OutboundQueue."""
+
+    @pytest.mark.asyncio
+    async def test_send_returns_result(self, test_config: Config) -> None:
+        """
+        Тест: send выполняет запрос и возвращает его результат.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = OutboundQueue(test_config)
+
+        async def call() -> str:
+            return "sent"
+
+        assert await queue.send(1, call) == "sent"
+        assert queue.sent == 1
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_send_propagates_error(self, test_config: Config) -> None:
+        """
+        Тест: ошибка запроса возвращается отправителю.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = OutboundQueue(test_config)
+
+        async def call() -> None:
+            raise RuntimeError("network")
+
+        with pytest.raises(RuntimeError, match="network"):
+            await queue.send(1, call)
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_per_chat_rate_limited(self, test_config: Config) -> None:
+        """
+        Тест: отправка в один чат ограничена лимитом на чат.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_chat_rate=20.0, outbound_chat_burst=1)
+        sent_at: list[float] = []
+
+        async def call() -> None:
+            sent_at.append(time.monotonic())
+
+        await asyncio.gather(*(queue.send(1, call) for _ in range(4)))
+        await queue.stop()
+
+        # 4 сообщения при 20/с и всплеске 1: не быстрее ~0.15с
+        assert sent_at[-1] - sent_at[0] >= 0.14
+
+    @pytest.mark.asyncio
+    async def test_global_rate_limited(self, test_config: Config) -> None:
+        """
+        Тест: суммарная отправка во все чаты ограничена глобальным лимитом.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_global_rate=50.0, outbound_global_burst=5)
+        sent_at: list[float] = []
+
+        async def call() -> None:
+            sent_at.append(time.monotonic())
+
+        await asyncio.gather(*(queue.send(chat_id, call) for chat_id in range(15)))
+        await queue.stop()
+
+        # 5 сразу + 10 со скоростью 50/с: не быстрее ~0.2с
+        assert len(sent_at) == 15
+        assert sent_at[-1] - sent_at[0] >= 0.18
+
+    @pytest.mark.asyncio
+    async def test_chats_do_not_block_each_other(self, test_config: Config) -> None:
+        """
+        Тест: ограниченный чат не задерживает отправку в другие чаты.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_chat_rate=1.0, outbound_chat_burst=1)
+        order: list[int] = []
+
+        async def call(chat_id: int) -> None:
+            order.append(chat_id)
+
+        first = asyncio.create_task(queue.send(1, lambda: call(1)))
+        second = asyncio.create_task(queue.send(1, lambda: call(1)))
+        other = asyncio.create_task(queue.send(2, lambda: call(2)))
+        await asyncio.wait_for(asyncio.gather(first, other), timeout=0.5)
+
+        assert order == [1, 2]
+        assert not second.done()
+        await queue.stop(timeout=0)
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self, test_config: Config) -> None:
+        """
+        Тест: ответы с высоким приоритетом отправляются раньше продолжений.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_global_rate=10.0, outbound_global_burst=1)
+        order: list[str] = []
+
+        async def call(name: str) -> None:
+            order.append(name)
+
+        # Первая отправка забирает глобальный токен, остальные ждут в очереди
+        tasks = [asyncio.create_task(queue.send(1, lambda: call("first")))]
+        await asyncio.sleep(0)
+        tasks.append(
+            asyncio.create_task(
+                queue.send(2, lambda: call("continuation"), priority=PRIORITY_CONTINUATION)
+            )
+        )
+        tasks.append(
+            asyncio.create_task(queue.send(3, lambda: call("reply"), priority=PRIORITY_REPLY))
+        )
+        await asyncio.gather(*tasks)
+        await queue.stop()
+
+        assert order == ["first", "reply", "continuation"]
+
+    @pytest.mark.asyncio
+    async def test_flood_wait_retried_in_order(self, test_config: Config) -> None:
+        """
+        Тест: при 429 отправка повторяется после retry_after, порядок в чате сохраняется.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_chat_rate=1000.0)
+        order: list[str] = []
+        attempts = {"first": 0}
+
+        async def first() -> None:
+            attempts["first"] += 1
+            if attempts["first"] == 1:
+                raise TelegramRetryAfter(method=MagicMock(), message="Flood", retry_after=0)
+            order.append("first")
+
+        async def second() -> None:
+            order.append("second")
+
+        await asyncio.gather(queue.send(1, first), queue.send(1, second))
+        await queue.stop()
+
+        assert order == ["first", "second"]
+        assert queue.flood_waits == 1
+
+    @pytest.mark.asyncio
+    async def test_flood_wait_gives_up_after_retries(self, test_config: Config) -> None:
+        """
+        Тест: после max_flood_retries ошибка flood control возвращается отправителю.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_max_flood_retries=1)
+
+        async def call() -> None:
+            raise TelegramRetryAfter(method=MagicMock(), message="Flood", retry_after=0)
+
+        with pytest.raises(TelegramRetryAfter):
+            await queue.send(1, call)
+        await queue.stop()
+
+        assert queue.flood_waits == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_unsent(self, test_config: Config) -> None:
+        """
+        Тест: stop отменяет сообщения, не отправленные за timeout.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_chat_rate=0.1, outbound_chat_burst=1)
+
+        async def call() -> None:
+            return None
+
+        await queue.send(1, call)
+        pending = asyncio.create_task(queue.send(1, call))
+        await asyncio.sleep(0.01)
+        await queue.stop(timeout=0.05)
+
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        assert queue.depth == 0
+
+
+class TestAnswer:
+    """Тесты функции answer."""
+
+    @pytest.mark.asyncio
+    async def test_answer_goes_through_queue(self, test_config: Config) -> None:
+        """
+        Тест: ответ отправляется через очередь с лимитом на чат.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        queue = make_queue(test_config, outbound_chat_rate=10.0, outbound_chat_burst=1)
+        message = MagicMock(spec=Message)
+        message.chat = MagicMock()
+        message.chat.id = 1
+        message.answer = AsyncMock()
+
+        start = time.monotonic()
+        await answer(message, "первый", queue, parse_mode=None)
+        await answer(message, "второй", queue, parse_mode=None)
+        elapsed = time.monotonic() - start
+        await queue.stop()
+
+        assert queue.sent == 2
+        assert elapsed >= 0.09
+        message.answer.assert_called_with("второй", parse_mode=None)
+
+    @pytest.mark.asyncio
+    async def test_answer_without_queue(self) -> None:
+        """Тест: без очереди ответ отправляется напрямую."""
+        message = MagicMock(spec=Message)
+        message.answer = AsyncMock()
+
+        await answer(message, "текст")
+
+        message.answer.assert_called_once_with("текст")
@@ -9,6 +9,30 @@ from aiogram.types import Message, User
 from src.middlewares.rate_limit import RateLimitMiddleware
 
 
+class FakeClock:
+    """Управляемые монотонные часы."""
+
+    def __init__(self) -> None:
+        """Инициализация часов."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """
+        Returns:
+            Текущее время
+        """
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """
+        Сдвигает время вперёд.
+
+        Args:
+            seconds: Сдвиг в секундах
+        """
+        self.now += seconds
+
+
 class TestRateLimitMiddleware:
     """Тесты для RateLimitMiddleware."""
 
@@ -197,23 +221,164 @@ class TestRateLimitMiddleware:
 
     def test_cleanup_old_records(self) -> None:
         """
-        Тест: метод cleanup_old_records очищает старые записи.
+        Тест: метод cleanup_old_records очищает записи с восстановленным лимитом.
         """
-        middleware = RateLimitMiddleware(rate=5, per=1.0, enabled=True)
+        clock = FakeClock()
+        middleware = RateLimitMiddleware(rate=5, per=1.0, enabled=True, clock=clock)
 
-        # Добавляем запросы для нескольких пользователей
-        current_time = time.time()
-        middleware.user_requests[11111] = [current_time - 2.0, current_time - 1.5]  # Старые
-        middleware.user_requests[22222] = [current_time - 0.5, current_time]  # Свежие
-        middleware.user_requests[33333] = [current_time - 5.0]  # Очень старые
+        # Запросы нескольких пользователей в разное время
+        middleware.check(33333, clock.now)  # Очень старый
+        clock.advance(3.0)
+        middleware.check(11111, clock.now)  # Старый
+        clock.advance(1.5)
+        middleware.check(22222, clock.now)  # Свежий
+        middleware.check(22222, clock.now)
 
         # Вызываем cleanup
         middleware.cleanup_old_records()
 
-        # Пользователь 11111 и 33333 должны быть удалены (все timestamps старые)
-        assert 11111 not in middleware.user_requests
-        assert 33333 not in middleware.user_requests
+        # Пользователь 11111 и 33333 должны быть удалены (лимит восстановлен)
+        assert 11111 not in middleware.user_tat
+        assert 33333 not in middleware.user_tat
 
         # Пользователь 22222 должен остаться
-        assert 22222 in middleware.user_requests
-        assert len(middleware.user_requests[22222]) == 2
+        assert 22222 in middleware.user_tat
+
+    def test_idle_users_expire_without_cleanup(self) -> None:
+        """
+        Тест: записи неактивных пользователей удаляются при обработке новых запросов.
+        """
+        clock = FakeClock()
+        middleware = RateLimitMiddleware(rate=10, per=60.0, enabled=True, clock=clock)
+
+        for user_id in range(100):
+            middleware.check(user_id, clock.now)
+        assert len(middleware.user_tat) == 100
+
+        # Через период лимит всех пользователей восстановлен: новые запросы
+        # вытесняют старые записи без полного обхода
+        clock.advance(61.0)
+        for user_id in range(1000, 1100):
+            middleware.check(user_id, clock.now)
+
+        assert len(middleware.user_tat) == 100
+        assert all(user_id >= 1000 for user_id in middleware.user_tat)
+
+    def test_steady_rate_after_burst(self) -> None:
+        """
+        Тест: после всплеска запросы разрешаются равномерно (per / rate).
+        """
+        clock = FakeClock()
+        middleware = RateLimitMiddleware(rate=4, per=60.0, enabled=True, clock=clock)
+
+        assert all(middleware.check(1, clock.now) == 0.0 for _ in range(4))
+        assert middleware.check(1, clock.now) == pytest.approx(15.0)
+
+        clock.advance(15.0)
+        assert middleware.check(1, clock.now) == 0.0
+        assert middleware.check(1, clock.now) > 0.0
+
+    @pytest.mark.asyncio
+    async def test_repeated_blocks_notify_once(self) -> None:
+        """
+        Тест: при повторных блокировках пользователь уведомляется один раз.
+        """
+        clock = FakeClock()
+        middleware = RateLimitMiddleware(rate=1, per=60.0, enabled=True, clock=clock)
+
+        handler = AsyncMock(return_value="success")
+        message = MagicMock(spec=Message)
+        message.from_user = MagicMock(spec=User)
+        message.from_user.id = 12345
+        message.answer = AsyncMock()
+
+        assert await middleware(handler, message, {}) == "success"
+        for _ in range(5):
+            assert await middleware(handler, message, {}) is None
+
+        message.answer.assert_called_once()
+        assert middleware.blocked == 5
+        assert middleware.suppressed == 4
+
+        # После окончания блокировки запрос проходит, новая блокировка снова уведомляется
+        clock.advance(60.0)
+        assert await middleware(handler, message, {}) == "success"
+        assert await middleware(handler, message, {}) is None
+        assert message.answer.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_block_reply_goes_through_outbound_queue(self) -> None:
+        """
+        Тест: уведомление о лимите отправляется через очередь исходящих сообщений.
+        """
+        middleware = RateLimitMiddleware(rate=1, per=60.0, enabled=True, clock=FakeClock())
+        handler = AsyncMock(return_value="success")
+        message = MagicMock(spec=Message)
+        message.from_user = MagicMock(spec=User)
+        message.from_user.id = 12345
+        message.chat = MagicMock()
+        message.chat.id = 12345
+        message.answer = AsyncMock()
+        outbound = MagicMock()
+        outbound.send = AsyncMock()
+
+        assert await middleware(handler, message, {"outbound": outbound}) == "success"
+        assert await middleware(handler, message, {"outbound": outbound}) is None
+
+        outbound.send.assert_awaited_once()
+        message.answer.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_shared_backend_blocks_after_local_allow(self) -> None:
+        """
+        Тест: запрос, разрешённый локально, блокируется общим лимитом без расхода локального.
+        """
+        clock = FakeClock()
+        backend = MagicMock()
+        backend.acquire = AsyncMock(return_value=30.0)
+        middleware = RateLimitMiddleware(
+            rate=2, per=60.0, enabled=True, clock=clock, backend=backend
+        )
+
+        handler = AsyncMock(return_value="success")
+        message = MagicMock(spec=Message)
+        message.from_user = MagicMock(spec=User)
+        message.from_user.id = 12345
+        message.answer = AsyncMock()
+
+        assert await middleware(handler, message, {}) is None
+        handler.assert_not_called()
+        message.answer.assert_called_once()
+        assert "30 секунд" in message.answer.call_args.args[0]
+        assert middleware.blocked == 1
+        # Локальный лимит не израсходован
+        assert middleware.user_tat[12345] == clock.now
+
+        # Повторные сообщения в период блокировки не обращаются к backend
+        for _ in range(3):
+            assert await middleware(handler, message, {}) is None
+        backend.acquire.assert_awaited_once_with(12345)
+        assert middleware.suppressed == 3
+
+    @pytest.mark.asyncio
+    async def test_shared_backend_skipped_when_local_blocks(self) -> None:
+        """
+        Тест: при превышении локального лимита backend не вызывается.
+        """
+        backend = MagicMock()
+        backend.acquire = AsyncMock(return_value=0.0)
+        middleware = RateLimitMiddleware(
+            rate=1, per=60.0, enabled=True, clock=FakeClock(), backend=backend
+        )
+
+        handler = AsyncMock(return_value="success")
+        message = MagicMock(spec=Message)
+        message.from_user = MagicMock(spec=User)
+        message.from_user.id = 12345
+        message.answer = AsyncMock()
+
+        assert await middleware(handler, message, {}) == "success"
+        assert await middleware(handler, message, {}) is None
+
+        assert backend.acquire.await_count == 1
+        assert middleware.blocked == 1
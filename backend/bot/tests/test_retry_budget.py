@@ -0,0 +1,62 @@
+"""Тесты для модуля RetryBudget."""
+
+from unittest.mock import patch
+
+from src.config import Config
+from src.retry_budget import RetryBudget
+
+
+class TestRetryBudget:
+    """Тесты класса RetryBudget."""
+
+    def test_min_retries_without_traffic(self, test_config: Config) -> None:
+        """
+        Тест: минимальное количество retry доступно даже без запросов.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.retry_budget_min_retries = 2
+        budget = RetryBudget(test_config)
+
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is False
+
+    def test_retries_capped_by_ratio(self, test_config: Config) -> None:
+        """
+        Тест: retry ограничены долей от исходных запросов.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.retry_budget_ratio = 0.1
+        test_config.retry_budget_min_retries = 0
+        budget = RetryBudget(test_config)
+
+        for _ in range(50):
+            budget.record_request()
+
+        granted = sum(budget.try_acquire() for _ in range(20))
+
+        assert granted == 5
+
+    def test_window_expiry(self, test_config: Config) -> None:
+        """
+        Тест: после окна старые retry перестают учитываться.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.retry_budget_min_retries = 1
+        test_config.retry_budget_window = 10.0
+        budget = RetryBudget(test_config)
+
+        with patch("src.retry_budget.time.monotonic", return_value=1000.0):
+            assert budget.try_acquire() is True
+            assert budget.try_acquire() is False
+
+        with patch("src.retry_budget.time.monotonic", return_value=1011.0):
+            assert budget.try_acquire() is True
+
+        assert len(budget._buckets) == 1
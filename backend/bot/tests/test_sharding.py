@@ -0,0 +1,324 @@
+"""Тесты для распределения обновлений по worker процессам."""
+
+import asyncio
+import random
+from collections import Counter
+from collections.abc import AsyncGenerator
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.config import Config
+from src.sharding import HashRing, ShardRouter, WorkerPool, worker_config, worker_urls
+from src.webhook import SECRET_TOKEN_HEADER, WebhookServer
+from tests.test_webhook import BOT_TOKEN, SECRET, make_update
+
+
+class TestHashRing:
+    """Тесты класса HashRing."""
+
+    def test_same_key_same_node(self) -> None:
+        """Тест: ключ всегда попадает на один и тот же узел."""
+        ring = HashRing(["a", "b", "c"])
+
+        assert all(ring.node_for(42) == ring.node_for(42) for _ in range(10))
+
+    def test_distribution_is_balanced(self) -> None:
+        """Тест: пользователи распределяются по узлам примерно равномерно."""
+        ring = HashRing(["a", "b", "c", "d"])
+
+        counts = Counter(ring.node_for(user_id) for user_id in range(20000))
+
+        assert set(counts) == {"a", "b", "c", "d"}
+        assert min(counts.values()) > 20000 / 4 * 0.75
+
+    def test_adding_node_moves_few_keys(self) -> None:
+        """Тест: при добавлении узла переезжает около 1/N пользователей."""
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        moved = sum(before.node_for(key) != after.node_for(key) for key in range(20000))
+
+        # Ожидается ~1/4; переезд только на новый узел
+        assert moved < 20000 * 0.35
+        assert all(
+            after.node_for(key) == "d"
+            for key in range(2000)
+            if before.node_for(key) != after.node_for(key)
+        )
+
+    def test_empty_nodes_rejected(self) -> None:
+        """Тест: кольцо без узлов не создаётся."""
+        with pytest.raises(ValueError):
+            HashRing([])
+
+
+class TestWorkerConfig:
+    """Тесты конфигурации worker процессов."""
+
+    def test_worker_ports_and_rate_split(self, test_config: Config) -> None:
+        """
+        Тест: worker получает свой порт и долю глобального лимита отправки.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        config = test_config.model_copy(
+            update={
+                "scale_workers": 3,
+                "worker_base_port": 9000,
+                "webhook_url": "https://bot.example.com",
+                "outbound_global_rate": 30.0,
+                "outbound_global_burst": 30,
+            }
+        )
+
+        worker = worker_config(config, 2)
+
+        assert worker_urls(config) == [
+            "http://127.0.0.1:9000",
+            "http://127.0.0.1:9001",
+            "http://127.0.0.1:9002",
+        ]
+        assert worker.bot_mode == "webhook"
+        assert worker.webhook_port == 9002
+        assert worker.webhook_url is None
+        assert worker.scale_workers == 1
+        assert worker.outbound_global_rate == pytest.approx(10.0)
+        assert worker.outbound_global_burst == 10
+
+
+class FakeProcess:
+    """Процесс worker без запуска (управляемый тестом)."""
+
+    def __init__(self, index: int) -> None:
+        """
+        Args:
+            index: Номер worker
+        """
+        self.name = f"bot-worker-{index}"
+        self.exitcode: int | None = None
+        self.started = False
+        self.terminated = False
+
+    def start(self) -> None:
+        """Запуск процесса."""
+        self.started = True
+
+    def is_alive(self) -> bool:
+        """True пока процесс не завершился."""
+        return self.started and self.exitcode is None
+
+    def crash(self) -> None:
+        """Аварийное завершение процесса."""
+        self.exitcode = 1
+
+    def terminate(self) -> None:
+        """SIGTERM: процесс завершается."""
+        self.terminated = True
+        self.exitcode = -15
+
+    def kill(self) -> None:
+        """SIGKILL."""
+        self.exitcode = -9
+
+    def join(self, timeout: float | None = None) -> None:
+        """Процесс уже завершён."""
+
+
+class TestWorkerPool:
+    """Тесты класса WorkerPool."""
+
+    def test_crashed_worker_restarted(self) -> None:
+        """Тест: завершившийся worker перезапускается под тем же номером."""
+        spawned: list[FakeProcess] = []
+
+        def factory(index: int) -> FakeProcess:
+            process = FakeProcess(index)
+            spawned.append(process)
+            return process
+
+        pool = WorkerPool(factory, count=2)
+        pool.start()
+        first = pool.processes[1]
+        first.crash()  # type: ignore[attr-defined]
+
+        assert pool.check()
+
+        assert pool.restarts == 1
+        assert len(spawned) == 3
+        assert pool.processes[1] is not first
+        assert pool.processes[1].is_alive()
+        assert pool.processes[0] is spawned[0]
+
+    def test_crash_loop_gives_up(self) -> None:
+        """Тест: worker, падающий чаще max_restarts за окно, не перезапускается."""
+        now = [0.0]
+        pool = WorkerPool(
+            FakeProcess, count=1, max_restarts=2, restart_window=60.0, clock=lambda: now[0]
+        )
+        pool.start()
+
+        for _ in range(2):
+            pool.processes[0].crash()  # type: ignore[attr-defined]
+            assert pool.check()
+        pool.processes[0].crash()  # type: ignore[attr-defined]
+        assert not pool.check()
+        assert pool.restarts == 2
+
+        # Вне окна старые перезапуски не учитываются
+        now[0] = 61.0
+        assert pool.check()
+        assert pool.restarts == 3
+
+    @pytest.mark.asyncio
+    async def test_watch_returns_on_crash_loop(self) -> None:
+        """Тест: watch() завершается, когда перезапуск прекращён."""
+        pool = WorkerPool(FakeProcess, count=1, check_interval=0.01, max_restarts=0)
+        pool.start()
+        watch = asyncio.create_task(pool.watch())
+        await asyncio.sleep(0.03)
+        assert not watch.done()
+
+        pool.processes[0].crash()  # type: ignore[attr-defined]
+        await asyncio.wait_for(watch, timeout=1.0)
+
+        await pool.stop(timeout=1.0)
+        assert pool.processes[0].exitcode == 1
+
+
+class Cluster:
+    """Роутер и worker серверы с записью обработанных сообщений."""
+
+    def __init__(
+        self,
+        router: ShardRouter,
+        client: TestClient,
+        workers: list[WebhookServer],
+        handled: dict[int, list[tuple[int, str]]],
+    ) -> None:
+        """
+        Args:
+            router: Роутер обновлений
+            client: HTTP клиент роутера
+            workers: Worker серверы
+            handled: Обработанные сообщения по worker: (user_id, текст)
+        """
+        self.router = router
+        self.client = client
+        self.workers = workers
+        self.handled = handled
+
+    async def stop(self) -> None:
+        """Останавливает роутер, затем worker (как супервизор)."""
+        await self.router.stop(timeout=10.0)
+        for worker in self.workers:
+            await worker.stop(timeout=10.0)
+
+
+@pytest.fixture
+async def cluster(test_config: Config) -> AsyncGenerator[Cluster, None]:
+    """
+    Создаёт роутер и два worker сервера на локальных портах.
+
+    Args:
+        test_config: Тестовая конфигурация
+
+    Yields:
+        Cluster
+    """
+    config = test_config.model_copy(update={"bot_mode": "webhook", "webhook_secret": SECRET})
+    bot = Bot(token=BOT_TOKEN)
+    handled: dict[int, list[tuple[int, str]]] = {}
+    servers: list[TestServer] = []
+    workers: list[WebhookServer] = []
+
+    for index in range(2):
+        records: list[tuple[int, str]] = []
+        handled[index] = records
+        dispatcher = Dispatcher()
+
+        async def on_message(message: Message, records: list[tuple[int, str]] = records) -> None:
+            # Разное время обработки провоцирует перестановки без упорядочивания
+            await asyncio.sleep(random.uniform(0, 0.005))
+            records.append((message.chat.id, message.text or ""))
+
+        dispatcher.message.register(on_message)
+        worker = WebhookServer(dispatcher, bot, config)
+        server = TestServer(worker.create_app())
+        await server.start_server()
+        workers.append(worker)
+        servers.append(server)
+
+    urls = [str(server.make_url("")).rstrip("/") for server in servers]
+    router = ShardRouter(bot, config, urls)
+    client = TestClient(TestServer(router.create_app()))
+    await client.start_server()
+
+    yield Cluster(router, client, workers, handled)
+
+    await client.close()
+    for server in servers:
+        await server.close()
+    await bot.session.close()
+
+
+class TestShardRouter:
+    """Тесты класса ShardRouter."""
+
+    @pytest.mark.asyncio
+    async def test_user_affinity_and_order(self, cluster: Cluster) -> None:
+        """
+        Тест: все сообщения пользователя попадают в один worker в исходном порядке.
+
+        Args:
+            cluster: Роутер и worker серверы
+        """
+        users = 20
+        per_user = 10
+        updates = [
+            make_update(seq * users + user_id, user_id=user_id + 1, text=str(seq))
+            for seq in range(per_user)
+            for user_id in range(users)
+        ]
+
+        for update in updates:
+            response = await cluster.client.post(
+                "/webhook", json=update, headers={SECRET_TOKEN_HEADER: SECRET}
+            )
+            assert response.status == 200
+        await cluster.stop()
+
+        by_user: dict[int, list[str]] = {}
+        owners: dict[int, set[int]] = {}
+        for index, records in cluster.handled.items():
+            for user_id, text in records:
+                by_user.setdefault(user_id, []).append(text)
+                owners.setdefault(user_id, set()).add(index)
+
+        assert len(by_user) == users
+        assert all(len(owner) == 1 for owner in owners.values())
+        assert all(texts == [str(seq) for seq in range(per_user)] for texts in by_user.values())
+        # Оба worker получили пользователей
+        assert all(cluster.handled.values())
+        assert sum(cluster.router.forwarded.values()) == users * per_user
+        assert cluster.router.dropped == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_update_counted_as_dropped(self, cluster: Cluster) -> None:
+        """
+        Тест: обновление, которое worker не принял (401), не теряется молча.
+
+        Args:
+            cluster: Роутер и worker серверы
+        """
+        cluster.router.config = cluster.router.config.model_copy(update={"webhook_secret": None})
+
+        response = await cluster.client.post("/webhook", json=make_update(1, user_id=7))
+        await cluster.stop()
+
+        assert response.status == 200
+        assert cluster.router.dropped == 1
+        assert not any(cluster.handled.values())
@@ -0,0 +1,224 @@
+"""Тесты для общего rate limit реплик (PostgresRateLimitBackend)."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.shared_rate_limit import MAX_BATCH, PostgresRateLimitBackend
+
+
+class FakeRateLimitDatabase:
+    """
+    Database с эмуляцией upsert таблицы rate_limits (GCRA на стороне "БД").
+
+    Attributes:
+        now: Время "БД" в секундах epoch
+        tat: TAT пользователей
+        batches: Параметры выполненных запросов
+        fail: Исключение, которое выбрасывает запрос
+        delay: Задержка выполнения запроса в секундах
+    """
+
+    def __init__(self) -> None:
+        """Инициализация состояния."""
+        self.now = 1_700_000_000.0
+        self.tat: dict[int, float] = {}
+        self.batches: list[dict[str, Any]] = []
+        self.fail: Exception | None = None
+        self.delay = 0.0
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Any]:
+        """
+        Yields:
+            Сессия с методом execute
+        """
+        session = MagicMock()
+        session.execute = self.execute
+        yield session
+
+    async def execute(self, statement: Any, params: dict[str, Any] | None = None) -> Any:
+        """
+        Выполняет upsert пакета или очистку.
+
+        Args:
+            statement: SQL запрос
+            params: Параметры запроса
+
+        Returns:
+            Результат с методом all() и rowcount
+        """
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail is not None:
+            raise self.fail
+
+        result = MagicMock()
+        if str(statement).lstrip().startswith("DELETE"):
+            expired = [user_id for user_id, tat in self.tat.items() if tat <= self.now]
+            for user_id in expired:
+                del self.tat[user_id]
+            result.rowcount = len(expired)
+            return result
+
+        self.batches.append(params)
+        interval = params["interval"]
+        tolerance = params["tolerance"]
+        rows = []
+        for user_id, hits in zip(params["user_ids"], params["hits"], strict=True):
+            tat = max(self.tat.get(user_id, self.now), self.now)
+            capacity = int((self.now + tolerance - tat) // interval) + 1
+            allowed = max(0, min(hits, params["burst"], capacity))
+            self.tat[user_id] = tat + allowed * interval
+            rows.append((user_id, self.tat[user_id], allowed, self.now))
+        result.all.return_value = rows
+        return result
+
+
+class FakeClock:
+    """Управляемые монотонные часы."""
+
+    def __init__(self) -> None:
+        """Инициализация часов."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """
+        Returns:
+            Текущее время
+        """
+        return self.now
+
+
+def make_backend(db: FakeRateLimitDatabase, **kwargs: Any) -> PostgresRateLimitBackend:
+    """
+    Создаёт backend для тестов.
+
+    Args:
+        db: Эмуляция БД
+        **kwargs: Переопределяемые параметры backend
+
+    Returns:
+        PostgresRateLimitBackend
+    """
+    params: dict[str, Any] = {"rate": 3, "per": 60.0, "batch_window": 0.001, **kwargs}
+    return PostgresRateLimitBackend(db, **params)  # type: ignore[arg-type]
+
+
+class TestPostgresRateLimitBackend:
+    """Тесты класса PostgresRateLimitBackend."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_checks_share_one_round_trip(self) -> None:
+        """
+        Тест: одновременные проверки разных пользователей отправляются одним запросом.
+        """
+        db = FakeRateLimitDatabase()
+        backend = make_backend(db)
+
+        waits = await asyncio.gather(*(backend.acquire(user_id) for user_id in range(50)))
+
+        assert waits == [0.0] * 50
+        assert backend.round_trips == 1
+        assert len(db.batches) == 1
+        assert sorted(db.batches[0]["user_ids"]) == list(range(50))
+
+    @pytest.mark.asyncio
+    async def test_limit_applies_to_requests_in_one_batch(self) -> None:
+        """
+        Тест: из пакета одного пользователя разрешается не больше лимита.
+        """
+        db = FakeRateLimitDatabase()
+        backend = make_backend(db)
+
+        waits = await asyncio.gather(*(backend.acquire(1) for _ in range(5)))
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        # Следующий запрос разрешён через per / rate секунд
+        assert waits[3] == pytest.approx(20.0)
+        assert waits[4] == pytest.approx(20.0)
+        assert db.batches[0]["hits"] == [5]
+
+    @pytest.mark.asyncio
+    async def test_replicas_share_limit(self) -> None:
+        """
+        Тест: реплики с общей БД делят один лимит пользователя.
+        """
+        db = FakeRateLimitDatabase()
+        replicas = [make_backend(db), make_backend(db)]
+
+        waits = [await replicas[index % 2].acquire(1) for index in range(4)]
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] > 0
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_immediately(self) -> None:
+        """
+        Тест: заполненный пакет отправляется без ожидания batch_window.
+        """
+        db = FakeRateLimitDatabase()
+        backend = make_backend(db, batch_window=60.0)
+
+        waits = await asyncio.wait_for(
+            asyncio.gather(*(backend.acquire(user_id) for user_id in range(MAX_BATCH))),
+            timeout=5.0,
+        )
+
+        assert waits == [0.0] * MAX_BATCH
+        assert backend.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_backend_error_degrades_to_local(self) -> None:
+        """
+        Тест: при ошибке БД запросы разрешаются, backend не используется retry_after секунд.
+        """
+        db = FakeRateLimitDatabase()
+        db.fail = ConnectionError("connection refused")
+        clock = FakeClock()
+        backend = make_backend(db, retry_after=30.0, clock=clock)
+
+        assert await backend.acquire(1) == 0.0
+        assert not backend.available
+
+        # В период паузы БД не запрашивается
+        db.fail = None
+        assert await backend.acquire(1) == 0.0
+        assert backend.round_trips == 1
+        assert backend.degraded == 2
+
+        clock.now += 30.0
+        assert backend.available
+        assert await backend.acquire(1) == 0.0
+        assert backend.round_trips == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_backend_times_out(self) -> None:
+        """
+        Тест: медленный ответ БД не задерживает сообщение дольше timeout.
+        """
+        db = FakeRateLimitDatabase()
+        db.delay = 5.0
+        backend = make_backend(db, timeout=0.05)
+
+        wait = await asyncio.wait_for(backend.acquire(1), timeout=1.0)
+
+        assert wait == 0.0
+        assert not backend.available
+
+    @pytest.mark.asyncio
+    async def test_cleanup_removes_expired_users(self) -> None:
+        """
+        Тест: cleanup удаляет пользователей с восстановленным лимитом.
+        """
+        db = FakeRateLimitDatabase()
+        backend = make_backend(db)
+        await asyncio.gather(backend.acquire(1), backend.acquire(2))
+
+        db.now += 60.0
+        assert await backend.cleanup() == 2
+        assert db.tat == {}
@@ -7,6 +7,7 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from src.config import Config
+from src.deadline import Deadline
 from src.models import Message, UserSettings
 from src.storage import Storage
 
@@ -872,6 +873,41 @@ async def test_save_history_all_retries_fail(mock_database: AsyncMock, test_conf
     assert mock_database.session.call_count == 4  # 2 ensure + 2 save attempts
 
 
+@pytest.mark.asyncio
+async def test_save_history_retry_skipped_after_deadline(
+    mock_database: AsyncMock, test_config: Config
+) -> None:
+    """
+    Тест: retry сохранения не выполняется, если не укладывается в deadline.
+
+    Args:
+        mock_database: Mock базы данных
+        test_config: Тестовая конфигурация
+    """
+    test_config.save_retry_attempts = 3
+    test_config.save_retry_delay = 1.0
+
+    storage = Storage(mock_database, test_config)
+    user_id = 12345
+    messages = [{"role": "user", "content": "Test", "timestamp": datetime.now(UTC).isoformat()}]
+
+    mock_ensure_session = AsyncMock()
+    mock_ensure_session.__aenter__.return_value = mock_ensure_session
+    mock_ensure_session.__aexit__.return_value = AsyncMock()
+    mock_ensure_session.execute = AsyncMock(return_value=AsyncMock())
+
+    failed_session = AsyncMock()
+    failed_session.__aenter__.side_effect = Exception("Database error")
+
+    mock_database.session.side_effect = [mock_ensure_session, failed_session]
+
+    # Остаётся 0.5s - задержка перед retry (1s) не укладывается
+    with pytest.raises(Exception, match="Database error"):
+        await storage.save_history(user_id, messages, deadline=Deadline(0.5))
+
+    assert mock_database.session.call_count == 2  # Только первая попытка
+
+
 @pytest.mark.asyncio
 async def test_save_history_success_on_first_attempt(
     mock_database: AsyncMock, test_config: Config
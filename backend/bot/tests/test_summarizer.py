@@ -0,0 +1,235 @@
+"""Тесты для модуля ConversationSummarizer."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.background import BackgroundTasks
+from src.config import Config
+from src.context_builder import ContextBuilder
+from src.summarizer import ConversationSummarizer
+from src.telemetry import PURPOSE_SUMMARY
+
+
+def make_history(count: int, content_length: int = 100) -> list[dict[str, str]]:
+    """
+    Создаёт историю диалога из сохранённых сообщений.
+
+    Args:
+        count: Количество сообщений (без системного)
+        content_length: Длина каждого сообщения
+
+    Returns:
+        История с системным промптом и сообщениями с ID
+    """
+    history = [{"id": "sys", "role": "system", "content": "system", "timestamp": ""}]
+    history.extend(
+        {
+            "id": f"msg-{i}",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": str(i) * content_length,
+            "timestamp": f"2024-01-01T00:{i:02d}:00+00:00",
+        }
+        for i in range(count)
+    )
+    return history
+
+
+@pytest.fixture
+def summary_config(test_config: Config) -> Config:
+    """
+    Конфигурация с включённым сжатием и низким порогом.
+
+    Args:
+        test_config: Тестовая конфигурация
+
+    Returns:
+        Конфигурация для тестов summarizer
+    """
+    test_config.summary_enabled = True
+    test_config.summary_trigger_tokens = 200
+    test_config.summary_keep_messages = 2
+    test_config.context_chars_per_token = 1.0
+    return test_config
+
+
+class TestConversationSummarizer:
+    """Тесты класса ConversationSummarizer."""
+
+    def test_model_defaults_to_fallback(self, test_config: Config) -> None:
+        """
+        Тест: для сжатия по умолчанию используется fallback модель.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.openrouter_fallback_model = "cheap/model"
+        summarizer = ConversationSummarizer(
+            AsyncMock(), AsyncMock(), ContextBuilder(test_config), test_config
+        )
+
+        assert summarizer.model == "cheap/model"
+
+    def test_needs_summary_threshold(self, summary_config: Config) -> None:
+        """
+        Тест: сжатие требуется только при превышении порога токенов.
+
+        Args:
+            summary_config: Конфигурация для тестов summarizer
+        """
+        short_summarizer = ConversationSummarizer(
+            AsyncMock(), AsyncMock(), ContextBuilder(summary_config), summary_config
+        )
+        long_summarizer = ConversationSummarizer(
+            AsyncMock(), AsyncMock(), ContextBuilder(summary_config), summary_config
+        )
+
+        assert short_summarizer.needs_summary(make_history(4, content_length=10)) is False
+        assert long_summarizer.needs_summary(make_history(4, content_length=100)) is True
+
+    @pytest.mark.asyncio
+    async def test_schedule_disabled(self, test_config: Config) -> None:
+        """
+        Тест: при выключенном сжатии задачи не создаются.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.summary_enabled = False
+        storage = AsyncMock()
+        summarizer = ConversationSummarizer(
+            AsyncMock(), storage, ContextBuilder(test_config), test_config
+        )
+
+        summarizer.schedule(12345, make_history(40, content_length=1000))
+
+        assert not summarizer._tasks
+        storage.load_recent_history.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_schedule_summarizes_old_messages(self, summary_config: Config) -> None:
+        """
+        Тест: старые сообщения сжимаются, последние остаются как есть.
+
+        Args:
+            summary_config: Конфигурация для тестов summarizer
+        """
+        history = make_history(6)
+        llm_client = AsyncMock()
+        llm_client.generate_response = AsyncMock(return_value="  Краткое содержание  ")
+        storage = AsyncMock()
+        storage.load_recent_history = AsyncMock(return_value=history)
+        summarizer = ConversationSummarizer(
+            llm_client, storage, ContextBuilder(summary_config), summary_config
+        )
+
+        summarizer.schedule(12345, history)
+        await summarizer.wait_pending(timeout=1.0)
+
+        # В LLM ушли только 4 старых сообщения (2 последних сохраняются)
+        llm_messages = llm_client.generate_response.call_args.kwargs["messages"]
+        assert "0000" in llm_messages[1]["content"]
+        assert "5555" not in llm_messages[1]["content"]
+        assert llm_client.generate_response.call_args.kwargs["purpose"] == PURPOSE_SUMMARY
+
+        storage.save_summary.assert_awaited_once()
+        args = storage.save_summary.call_args
+        assert args.args[1] == ["msg-0", "msg-1", "msg-2", "msg-3"]
+        assert args.args[2] == "Краткое содержание"
+        assert args.kwargs["created_at"].minute == 3
+        assert 12345 not in summarizer._in_progress
+
+    @pytest.mark.asyncio
+    async def test_summarize_waits_for_pending_save(self, summary_config: Config) -> None:
+        """
+        Тест: история загружается после фонового сохранения последнего хода.
+
+        Args:
+            summary_config: Конфигурация для тестов summarizer
+        """
+        history = make_history(6)
+        events: list[str] = []
+        release_save = asyncio.Event()
+
+        async def slow_save() -> None:
+            await release_save.wait()
+            events.append("save")
+
+        async def load(*_args: object, **_kwargs: object) -> list[dict[str, str]]:
+            events.append("load")
+            return history
+
+        llm_client = AsyncMock()
+        llm_client.generate_response = AsyncMock(return_value="summary")
+        storage = AsyncMock()
+        storage.load_recent_history = AsyncMock(side_effect=load)
+        background = BackgroundTasks()
+        summarizer = ConversationSummarizer(
+            llm_client, storage, ContextBuilder(summary_config), summary_config, background
+        )
+
+        background.spawn("save_history:12345", slow_save(), key=12345)
+        summarizer.schedule(12345, history)
+        await asyncio.sleep(0.01)
+        storage.load_recent_history.assert_not_called()
+
+        release_save.set()
+        await summarizer.wait_pending(timeout=1.0)
+
+        assert events == ["save", "load"]
+        storage.save_summary.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_schedule_single_task_per_user(self, summary_config: Config) -> None:
+        """
+        Тест: для пользователя одновременно выполняется только одна задача.
+
+        Args:
+            summary_config: Конфигурация для тестов summarizer
+        """
+        history = make_history(6)
+        release = asyncio.Event()
+
+        async def slow_summary(**_: object) -> str:
+            await release.wait()
+            return "summary"
+
+        llm_client = AsyncMock()
+        llm_client.generate_response = AsyncMock(side_effect=slow_summary)
+        storage = AsyncMock()
+        storage.load_recent_history = AsyncMock(return_value=history)
+        summarizer = ConversationSummarizer(
+            llm_client, storage, ContextBuilder(summary_config), summary_config
+        )
+
+        summarizer.schedule(12345, history)
+        summarizer.schedule(12345, history)
+        assert len(summarizer._tasks) == 1
+
+        release.set()
+        await summarizer.wait_pending(timeout=1.0)
+        storage.save_summary.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_summarize_error_is_logged_not_raised(self, summary_config: Config) -> None:
+        """
+        Тест: ошибка LLM при сжатии не пробрасывается и не сохраняет summary.
+
+        Args:
+            summary_config: Конфигурация для тестов summarizer
+        """
+        history = make_history(6)
+        llm_client = AsyncMock()
+        llm_client.generate_response = AsyncMock(side_effect=RuntimeError("LLM down"))
+        storage = AsyncMock()
+        storage.load_recent_history = AsyncMock(return_value=history)
+        summarizer = ConversationSummarizer(
+            llm_client, storage, ContextBuilder(summary_config), summary_config
+        )
+
+        summarizer.schedule(12345, history)
+        await summarizer.wait_pending(timeout=1.0)
+
+        storage.save_summary.assert_not_called()
+        assert 12345 not in summarizer._in_progress
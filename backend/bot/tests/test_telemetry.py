@@ -0,0 +1,182 @@
+"""Тесты для модуля телеметрии LLM."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import func, select
+
+from src.config import Config
+from src.database import Database
+from src.models import LLMUsage
+from src.telemetry import UsageRecord, UsageRecorder
+
+
+def make_record(user_id: int = 12345, **kwargs: object) -> UsageRecord:
+    """
+    Создаёт запись телеметрии для тестов.
+
+    Args:
+        user_id: ID пользователя
+        **kwargs: Переопределяемые поля записи
+
+    Returns:
+        Запись телеметрии
+    """
+    params: dict[str, object] = {"model": "test/model", "latency_ms": 100, **kwargs}
+    return UsageRecord(user_id=user_id, **params)  # type: ignore[arg-type]
+
+
+class TestUsageRecorder:
+    """Тесты класса UsageRecorder."""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_batch(self, test_config: Config, test_db_real: Database) -> None:
+        """
+        Тест: накопленные записи пишутся в llm_usage одним пакетом.
+
+        Args:
+            test_config: Тестовая конфигурация
+            test_db_real: Реальная тестовая БД
+        """
+        recorder = UsageRecorder(test_db_real, test_config)
+        recorder.record(make_record(prompt_tokens=10, completion_tokens=5))
+        recorder.record(make_record(user_id=2, is_fallback=True, success=False))
+
+        written = await recorder.flush()
+
+        assert written == 2
+        async with test_db_real.session() as session:
+            rows = (await session.execute(select(LLMUsage))).scalars().all()
+        assert len(rows) == 2
+        assert {row.user_id for row in rows} == {12345, 2}
+        assert sum(row.prompt_tokens for row in rows) == 10
+        assert any(row.is_fallback and not row.success for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_record_flushes_when_batch_full(
+        self, test_config: Config, test_db_real: Database
+    ) -> None:
+        """
+        Тест: при заполнении пакета запись запускается автоматически.
+
+        Args:
+            test_config: Тестовая конфигурация
+            test_db_real: Реальная тестовая БД
+        """
+        test_config.telemetry_batch_size = 3
+        recorder = UsageRecorder(test_db_real, test_config)
+
+        for _ in range(3):
+            recorder.record(make_record())
+        await recorder.stop()
+
+        async with test_db_real.session() as session:
+            count = (await session.execute(select(func.count()).select_from(LLMUsage))).scalar()
+        assert count == 3
+        assert not recorder._buffer
+
+    def test_record_disabled(self, test_config: Config) -> None:
+        """
+        Тест: при выключенной телеметрии записи не буферизуются.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.telemetry_enabled = False
+        recorder = UsageRecorder(AsyncMock(spec=Database), test_config)
+
+        recorder.record(make_record())
+
+        assert not recorder._buffer
+
+    def test_buffer_bounded(self, test_config: Config) -> None:
+        """
+        Тест: при переполнении буфера отбрасываются самые старые записи.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.telemetry_batch_size = 100
+        test_config.telemetry_max_buffer = 2
+        recorder = UsageRecorder(AsyncMock(spec=Database), test_config)
+
+        for user_id in range(3):
+            recorder.record(make_record(user_id=user_id))
+
+        assert [item.user_id for item in recorder._buffer] == [1, 2]
+        assert recorder.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_error_keeps_records(self, test_config: Config) -> None:
+        """
+        Тест: при ошибке БД записи возвращаются в буфер.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        database = AsyncMock(spec=Database)
+        database.session.side_effect = RuntimeError("DB down")
+        recorder = UsageRecorder(database, test_config)
+        recorder.record(make_record())
+
+        written = await recorder.flush()
+
+        assert written == 0
+        assert len(recorder._buffer) == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_error_requeue_bounded(self, test_config: Config) -> None:
+        """
+        Тест: возвращённый после ошибки пакет не увеличивает буфер сверх max_buffer.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.telemetry_batch_size = 100
+        test_config.telemetry_max_buffer = 3
+        database = AsyncMock(spec=Database)
+        recorder = UsageRecorder(database, test_config)
+
+        def db_down() -> None:
+            # Новые записи поступают, пока пакет записывается
+            for user_id in (3, 4):
+                recorder.record(make_record(user_id=user_id))
+            raise RuntimeError("DB down")
+
+        database.session.side_effect = db_down
+        for user_id in range(3):
+            recorder.record(make_record(user_id=user_id))
+
+        assert await recorder.flush() == 0
+
+        assert [item.user_id for item in recorder._buffer] == [2, 3, 4]
+        assert recorder.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_record_single_flush_and_backoff_when_db_down(self, test_config: Config) -> None:
+        """
+        Тест: при недоступной БД записи не порождают попытку записи на каждый ход.
+
+        Одна запись на заполненный пакет, после ошибки - пауза до flush_interval.
+
+        Args:
+            test_config: Тестовая конфигурация
+        """
+        test_config.telemetry_batch_size = 2
+        test_config.telemetry_flush_interval = 60.0
+        database = AsyncMock(spec=Database)
+        database.session.side_effect = RuntimeError("DB down")
+        recorder = UsageRecorder(database, test_config)
+
+        for _ in range(5):
+            recorder.record(make_record())
+        await asyncio.gather(*recorder._pending_flushes)
+
+        for _ in range(5):
+            recorder.record(make_record())
+        await asyncio.sleep(0)
+
+        assert database.session.call_count == 1
+        assert not recorder._pending_flushes
+        assert len(recorder._buffer) == 10
@@ -0,0 +1,232 @@
+"""Тесты для TokenRateLimitMiddleware."""
+
+import time
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import Message, User
+
+from src.middlewares.token_limit import TokenRateLimitMiddleware
+from src.telemetry import PURPOSE_SUMMARY, UsageRecord
+
+
+def make_message(user_id: int = 12345, text: str = "Привет") -> MagicMock:
+    """
+    Создаёт mock сообщения пользователя.
+
+    Args:
+        user_id: ID пользователя
+        text: Текст сообщения
+
+    Returns:
+        Mock объекта Message
+    """
+    message = MagicMock(spec=Message)
+    message.from_user = MagicMock(spec=User)
+    message.from_user.id = user_id
+    message.text = text
+    message.answer = AsyncMock()
+    return message
+
+
+def make_usage(user_id: int, prompt_tokens: int, completion_tokens: int) -> UsageRecord:
+    """
+    Создаёт телеметрию хода с фактическим usage.
+
+    Args:
+        user_id: ID пользователя
+        prompt_tokens: Токены промпта
+        completion_tokens: Токены ответа
+
+    Returns:
+        UsageRecord
+    """
+    return UsageRecord(
+        user_id=user_id,
+        model="test/model",
+        latency_ms=100,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+
+
+class TestTokenRateLimitMiddleware:
+    """Тесты для TokenRateLimitMiddleware."""
+
+    def test_estimate_uses_previous_prompt(self) -> None:
+        """Тест: оценка = промпт предыдущего хода + токены сообщения + резерв на ответ."""
+        middleware = TokenRateLimitMiddleware(chars_per_token=3.0, completion_reserve=100)
+
+        assert middleware.estimate_tokens(1, "a" * 30) == 110
+
+        middleware.record_usage(make_usage(1, prompt_tokens=500, completion_tokens=50))
+
+        assert middleware.estimate_tokens(1, "a" * 30) == 610
+
+    def test_summary_usage_not_counted(self) -> None:
+        """Тест: фоновая суммаризация не расходует лимит и не меняет оценку хода."""
+        middleware = TokenRateLimitMiddleware(chars_per_token=3.0, completion_reserve=100)
+        middleware.record_usage(make_usage(1, prompt_tokens=500, completion_tokens=50))
+
+        summary = make_usage(1, prompt_tokens=8000, completion_tokens=300)
+        summary.purpose = PURPOSE_SUMMARY
+        middleware.record_usage(summary)
+
+        assert middleware.user_totals[1] == 550
+        assert middleware.estimate_tokens(1, "a" * 30) == 610
+
+    @pytest.mark.asyncio
+    async def test_blocks_when_usage_exceeds_limit(self) -> None:
+        """
+        Тест: после фактического расхода лимита запрос блокируется.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=1000, per=60.0, completion_reserve=100)
+        message = make_message()
+
+        async def handler(_event: Any, _data: dict[str, Any]) -> str:
+            # LLMClient сообщает фактический usage во время обработки
+            middleware.record_usage(make_usage(12345, prompt_tokens=800, completion_tokens=150))
+            return "success"
+
+        assert await middleware(handler, message, {}) == "success"
+
+        blocked_handler = AsyncMock()
+        result = await middleware(blocked_handler, message, {})
+
+        assert result is None
+        blocked_handler.assert_not_called()
+        message.answer.assert_called_once()
+        assert "Превышен лимит" in message.answer.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_repeated_blocks_notify_once(self) -> None:
+        """
+        Тест: при повторных блокировках пользователь уведомляется один раз.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=1000, per=60.0, completion_reserve=100)
+        middleware.record_usage(make_usage(12345, prompt_tokens=800, completion_tokens=150))
+        message = make_message()
+        handler = AsyncMock()
+
+        for _ in range(5):
+            assert await middleware(handler, message, {}) is None
+
+        handler.assert_not_called()
+        message.answer.assert_called_once()
+        assert middleware.blocked == 5
+        assert middleware.suppressed == 4
+
+        # После освобождения лимита запрос проходит, новая блокировка снова уведомляется
+        middleware.user_usage[12345].clear()
+        middleware.user_totals[12345] = 0
+        assert await middleware(AsyncMock(return_value="success"), message, {}) == "success"
+        middleware.record_usage(make_usage(12345, prompt_tokens=800, completion_tokens=150))
+        assert await middleware(handler, message, {}) is None
+        assert message.answer.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_first_request_allowed_even_if_estimate_exceeds_limit(self) -> None:
+        """
+        Тест: первый запрос в пустом окне пропускается при любой оценке.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=10, completion_reserve=1000)
+        handler = AsyncMock(return_value="success")
+
+        assert await middleware(handler, make_message(), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_reservation_limits_concurrent_requests(self) -> None:
+        """
+        Тест: резерв выполняющегося запроса учитывается для параллельного запроса.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=1500, completion_reserve=1000)
+        second_handler = AsyncMock(return_value="second")
+        second_message = make_message()
+        results: list[Any] = []
+
+        async def handler(_event: Any, _data: dict[str, Any]) -> str:
+            # Пока первый запрос выполняется, приходит второй от того же пользователя
+            results.append(await middleware(second_handler, second_message, {}))
+            return "first"
+
+        assert await middleware(handler, make_message(), {}) == "first"
+
+        assert results == [None]
+        second_handler.assert_not_called()
+        # Резерв снят после завершения обработки
+        assert middleware.reserved == {}
+
+    @pytest.mark.asyncio
+    async def test_reservation_released_on_error(self) -> None:
+        """
+        Тест: резерв снимается, даже если handler завершился исключением.
+        """
+        middleware = TokenRateLimitMiddleware()
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError):
+            await middleware(handler, make_message(), {})
+
+        assert middleware.reserved == {}
+
+    @pytest.mark.asyncio
+    async def test_users_are_independent(self) -> None:
+        """
+        Тест: расход одного пользователя не влияет на других.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=1000, completion_reserve=100)
+        middleware.record_usage(make_usage(1, prompt_tokens=5000, completion_tokens=500))
+        handler = AsyncMock(return_value="success")
+
+        assert await middleware(handler, make_message(user_id=1), {}) is None
+        assert await middleware(handler, make_message(user_id=2), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_commands_not_limited(self) -> None:
+        """
+        Тест: команды не ограничиваются лимитом токенов.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=100, completion_reserve=10)
+        middleware.record_usage(make_usage(12345, prompt_tokens=500, completion_tokens=50))
+        handler = AsyncMock(return_value="success")
+
+        assert await middleware(handler, make_message(text="/help"), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_disabled_skips_check(self) -> None:
+        """
+        Тест: при enabled=False лимит не проверяется.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=100, enabled=False)
+        middleware.record_usage(make_usage(12345, prompt_tokens=500, completion_tokens=50))
+        handler = AsyncMock(return_value="success")
+
+        assert await middleware(handler, make_message(), {}) == "success"
+
+    @pytest.mark.asyncio
+    async def test_usage_expires_after_period(self) -> None:
+        """
+        Тест: расход за пределами периода не учитывается.
+        """
+        middleware = TokenRateLimitMiddleware(tokens=1000, per=60.0, completion_reserve=100)
+        middleware.record_usage(make_usage(12345, prompt_tokens=900, completion_tokens=100))
+        # Сдвигаем запись за пределы окна
+        middleware.user_usage[12345][0] = (time.time() - 61, 1000)
+        handler = AsyncMock(return_value="success")
+
+        assert await middleware(handler, make_message(), {}) == "success"
+        assert 12345 not in middleware.user_usage
+
+    def test_cleanup_old_records(self) -> None:
+        """Тест: cleanup удаляет пользователей без расхода в окне."""
+        middleware = TokenRateLimitMiddleware(per=60.0)
+        middleware.record_usage(make_usage(1, prompt_tokens=10, completion_tokens=10))
+        middleware.record_usage(make_usage(2, prompt_tokens=10, completion_tokens=10))
+        middleware.user_usage[1][0] = (time.time() - 61, 20)
+
+        middleware.cleanup_old_records()
+
+        assert 1 not in middleware.user_usage
+        assert 1 not in middleware.last_prompt_tokens
+        assert middleware.user_totals[2] == 20
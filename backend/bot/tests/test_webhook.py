@@ -0,0 +1,286 @@
+"""Тесты для webhook сервера (синтетические обновления Telegram)."""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.config import Config
+from src.webhook import SECRET_TOKEN_HEADER, WebhookServer, extract_user_id
+
+SECRET = "test_secret-123"
+# Токен в формате Telegram (тестовый токен из конфигурации не проходит валидацию aiogram)
+BOT_TOKEN = "123456:TEST-token_for_webhook_tests"
+
+
+def make_update(update_id: int, user_id: int, text: str = "Привет") -> dict[str, Any]:
+    """
+    Создаёт синтетическое обновление Telegram с текстовым сообщением.
+
+    Args:
+        update_id: ID обновления
+        user_id: ID пользователя (и чата)
+        text: Текст сообщения
+
+    Returns:
+        JSON обновления
+    """
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "text": text,
+        },
+    }
+
+
+class WebhookHarness:
+    """Webhook сервер с тестовым dispatcher и HTTP клиентом."""
+
+    def __init__(self, server: WebhookServer, client: TestClient, handled: list[int]) -> None:
+        """
+        Args:
+            server: Webhook сервер
+            client: HTTP клиент aiohttp
+            handled: ID пользователей обработанных сообщений
+        """
+        self.server = server
+        self.client = client
+        self.handled = handled
+
+    async def post(self, update: dict[str, Any], secret: str | None = SECRET) -> int:
+        """
+        Отправляет обновление на webhook.
+
+        Args:
+            update: JSON обновления
+            secret: Секретный токен (None - без заголовка)
+
+        Returns:
+            HTTP статус ответа
+        """
+        headers = {SECRET_TOKEN_HEADER: secret} if secret is not None else {}
+        response = await self.client.post(
+            self.server.config.webhook_path, json=update, headers=headers
+        )
+        return response.status
+
+
+@pytest.fixture
+async def webhook(test_config: Config) -> AsyncGenerator[WebhookHarness, None]:
+    """
+    Создаёт webhook сервер с dispatcher, считающим обработанные сообщения.
+
+    Args:
+        test_config: Тестовая конфигурация
+
+    Yields:
+        WebhookHarness
+    """
+    config = test_config.model_copy(
+        update={"bot_mode": "webhook", "webhook_secret": SECRET, "webhook_drain_timeout": 1.0}
+    )
+    handled: list[int] = []
+    dispatcher = Dispatcher()
+
+    @dispatcher.message()
+    async def on_message(message: Message) -> None:
+        await asyncio.sleep(0.01)
+        handled.append(message.from_user.id if message.from_user else 0)
+
+    bot = Bot(token=BOT_TOKEN)
+    server = WebhookServer(dispatcher, bot, config)
+    client = TestClient(TestServer(server.create_app()))
+    await client.start_server()
+
+    yield WebhookHarness(server, client, handled)
+
+    await client.close()
+    await bot.session.close()
+
+
+class TestWebhookServer:
+    """Тесты класса WebhookServer."""
+
+    @pytest.mark.asyncio
+    async def test_update_processed(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: обновление принимается (200) и передаётся в dispatcher.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        assert await webhook.post(make_update(1, user_id=42)) == 200
+
+        await webhook.server.stop()
+
+        assert webhook.handled == [42]
+        assert webhook.server.received == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_secret_rejected(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: обновление без верного секретного токена отклоняется (401).
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        assert await webhook.post(make_update(1, user_id=42), secret="wrong") == 401
+        assert await webhook.post(make_update(2, user_id=42), secret=None) == 401
+
+        await webhook.server.stop()
+
+        assert webhook.handled == []
+
+    @pytest.mark.asyncio
+    async def test_malformed_body_rejected(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: некорректное тело запроса отклоняется (400), а не приводит к 500.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        headers = {SECRET_TOKEN_HEADER: SECRET}
+        path = webhook.server.config.webhook_path
+
+        malformed = await webhook.client.post(path, data=b"{not json", headers=headers)
+        not_object = await webhook.client.post(path, json=[1, 2], headers=headers)
+        await webhook.server.stop()
+
+        assert malformed.status == 400
+        assert not_object.status == 400
+        assert webhook.server.received == 0
+
+    @pytest.mark.asyncio
+    async def test_health(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: health check возвращает 200, пока сервер принимает обновления.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        response = await webhook.client.get("/health")
+
+        assert response.status == 200
+        assert (await response.json())["accepting"] is True
+
+    @pytest.mark.asyncio
+    async def test_drain_finishes_accepted_and_rejects_new(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: при остановке принятые обновления дообрабатываются, новые получают 503.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        for i in range(5):
+            assert await webhook.post(make_update(i, user_id=i)) == 200
+
+        stop_task = asyncio.create_task(webhook.server.stop())
+        await asyncio.sleep(0)
+        status = await webhook.post(make_update(100, user_id=100))
+        abandoned = await stop_task
+
+        assert status == 503
+        assert abandoned == 0
+        assert sorted(webhook.handled) == [0, 1, 2, 3, 4]
+        assert webhook.server.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_drain_timeout_reports_abandoned(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: обновления, не обработанные за timeout, отменяются и учитываются.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+
+        @webhook.server.dispatcher.edited_message()
+        async def slow(_message: Message) -> None:
+            await asyncio.sleep(10)
+
+        update = make_update(1, user_id=42)
+        update["edited_message"] = update.pop("message")
+        assert await webhook.post(update) == 200
+
+        abandoned = await webhook.server.stop(timeout=0.05)
+
+        assert abandoned == 1
+        assert webhook.server.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_high_rate_synthetic_updates(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: пачка синтетических обновлений от многих пользователей обрабатывается полностью.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        count = 1000
+        start = time.monotonic()
+
+        statuses = await asyncio.gather(
+            *(webhook.post(make_update(i, user_id=i % 100)) for i in range(count))
+        )
+        accept_time = time.monotonic() - start
+        await webhook.server.stop(timeout=10.0)
+
+        assert statuses.count(200) == count
+        assert len(webhook.handled) == count
+        # Приём не ждёт обработки: 1000 обновлений принимаются быстрее, чем за 10с
+        assert accept_time < 10.0
+
+    @pytest.mark.asyncio
+    async def test_user_updates_processed_in_order(self, webhook: WebhookHarness) -> None:
+        """
+        Тест: обновления одного пользователя обрабатываются последовательно по порядку.
+
+        Args:
+            webhook: Webhook сервер с тестовым dispatcher
+        """
+        processed: list[str] = []
+
+        @webhook.server.dispatcher.edited_message()
+        async def record(message: Message) -> None:
+            # Первое обновление обрабатывается дольше остальных
+            await asyncio.sleep(0.05 if message.text == "0" else 0)
+            processed.append(message.text or "")
+
+        for i in range(3):
+            update = make_update(i, user_id=42, text=str(i))
+            update["edited_message"] = update.pop("message")
+            assert await webhook.post(update) == 200
+        await webhook.server.stop()
+
+        assert processed == ["0", "1", "2"]
+
+
+class TestExtractUserId:
+    """Тесты функции extract_user_id."""
+
+    def test_message_sender(self) -> None:
+        """Тест: ID пользователя берётся из отправителя сообщения."""
+        assert extract_user_id(make_update(1, user_id=42)) == 42
+
+    def test_callback_query(self) -> None:
+        """Тест: ID пользователя из callback_query."""
+        update = {"update_id": 1, "callback_query": {"id": "q", "from": {"id": 7}}}
+
+        assert extract_user_id(update) == 7
+
+    def test_chat_without_sender(self) -> None:
+        """Тест: для постов канала используется ID чата."""
+        update = {"update_id": 1, "channel_post": {"chat": {"id": -100}}}
+
+        assert extract_user_id(update) == -100
+
+    def test_unknown_update(self) -> None:
+        """Тест: обновление без пользователя и чата."""
+        assert extract_user_id({"update_id": 1}) is None
@@ -7,6 +7,8 @@ export const apiConfig = {
   },
   endpoints: {
     stats: "/api/v1/stats",
+    login: "/api/v1/auth/login",
+    refresh: "/api/v1/auth/refresh",
     health: "/health",
   },
 }
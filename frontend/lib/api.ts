@@ -1,22 +1,103 @@
-import axios, { AxiosInstance } from "axios"
+import axios, { AxiosError, AxiosInstance, InternalAxiosRequestConfig } from "axios"
 import { apiConfig } from "@/config/api"
-import { StatsResponse, Period } from "@/types/api"
+import { StatsResponse, Period, TokenResponse } from "@/types/api"
+
+// Обновляем access токен заранее, чтобы запрос не ушёл с истекающим токеном
+const TOKEN_REFRESH_MARGIN_MS = 30_000
+
+type RetriableRequest = InternalAxiosRequestConfig & { _authRetried?: boolean }
 
 class ApiClient {
   private client: AxiosInstance
+  private accessToken: string | null = null
+  private refreshToken: string | null = null
+  private accessExpiresAt = 0
+  private pendingAuth: Promise<void> | null = null
 
   constructor() {
     this.client = axios.create({
       baseURL: apiConfig.baseUrl,
       timeout: apiConfig.timeout,
-      auth: apiConfig.auth.username
-        ? {
-            username: apiConfig.auth.username,
-            password: apiConfig.auth.password,
-          }
-        : undefined,
       headers: { "Content-Type": "application/json" },
     })
+
+    // Пароль проверяется один раз при входе, дальше запросы идут с Bearer токеном
+    this.client.interceptors.request.use(async (config) => {
+      if (!apiConfig.auth.username || !this.needsToken(config.url)) {
+        return config
+      }
+      await this.ensureAccessToken()
+      config.headers.set("Authorization", `Bearer ${this.accessToken}`)
+      return config
+    })
+
+    // Токен отозван или ключ подписи сменился (перезапуск API): входим заново и повторяем
+    this.client.interceptors.response.use(undefined, async (error: AxiosError) => {
+      const request = error.config as RetriableRequest | undefined
+      if (
+        error.response?.status !== 401 ||
+        !request ||
+        request._authRetried ||
+        !apiConfig.auth.username ||
+        !this.needsToken(request.url)
+      ) {
+        throw error
+      }
+      request._authRetried = true
+      this.clearTokens()
+      return this.client.request(request)
+    })
+  }
+
+  private needsToken(url: string | undefined): boolean {
+    const { login, refresh, health } = apiConfig.endpoints
+    return url !== login && url !== refresh && url !== health
+  }
+
+  private clearTokens(): void {
+    this.accessToken = null
+    this.refreshToken = null
+    this.accessExpiresAt = 0
+  }
+
+  private async ensureAccessToken(): Promise<void> {
+    if (this.accessToken && Date.now() < this.accessExpiresAt - TOKEN_REFRESH_MARGIN_MS) {
+      return
+    }
+    // Одновременные запросы ждут один вход/обновление
+    if (!this.pendingAuth) {
+      this.pendingAuth = this.authenticate().finally(() => {
+        this.pendingAuth = null
+      })
+    }
+    await this.pendingAuth
+  }
+
+  private async authenticate(): Promise<void> {
+    if (this.refreshToken) {
+      try {
+        const response = await this.client.post<TokenResponse>(apiConfig.endpoints.refresh, {
+          refresh_token: this.refreshToken,
+        })
+        this.storeTokens(response.data)
+        return
+      } catch {
+        // Refresh токен истёк или отклонён: входим по паролю
+        this.clearTokens()
+      }
+    }
+
+    const response = await this.client.post<TokenResponse>(apiConfig.endpoints.login, {
+      username: apiConfig.auth.username,
+      password: apiConfig.auth.password,
+    })
+    this.storeTokens(response.data)
+  }
+
+  private storeTokens(tokens: TokenResponse): void {
+    this.accessToken = tokens.access_token
+    this.refreshToken = tokens.refresh_token
+    this.accessExpiresAt = Date.now() + tokens.expires_in * 1000
   }
 
   async getStats(period: Period): Promise<StatsResponse> {
@@ -24,11 +24,37 @@ export interface TopUser {
   last_activity: string
 }
 
+export interface ModelUsage {
+  model: string
+  requests: number
+  prompt_tokens: number
+  completion_tokens: number
+  cached_tokens: number
+}
+
+export interface LLMUsageStats {
+  total_requests: number
+  latency_p50_ms: number
+  latency_p95_ms: number
+  latency_p99_ms: number
+  fallback_rate: number
+  error_rate: number
+  by_model: ModelUsage[]
+}
+
 export interface StatsResponse {
   summary: Summary
   activity_timeline: ActivityPoint[]
   recent_dialogs: RecentDialog[]
   top_users: TopUser[]
+  llm_usage?: LLMUsageStats | null
 }
 
 export type Period = "day" | "week" | "month"
+
+export interface TokenResponse {
+  access_token: string
+  refresh_token: string
+  token_type: string
+  expires_in: number
+}